@@ -9,13 +9,31 @@ JWT_SECRET = os.environ.get("JWT_SECRET")
 JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
 REFRESH_TOKEN_EXPIRE_MINUTES = int(os.environ.get("REFRESH_TOKEN_EXPIRE_MINUTES", 60*24*30))
+# In-process Bloom filter over revoked refresh-token jtis (grown on rebuild if the blacklist is larger)
+TOKEN_BLACKLIST_BLOOM_CAPACITY = int(os.environ.get("TOKEN_BLACKLIST_BLOOM_CAPACITY", 1000000))
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = float(os.environ.get("TOKEN_BLACKLIST_BLOOM_ERROR_RATE", 0.001))
+# Each worker rebuilds its filter this often so expired revocations drop out of it
+TOKEN_BLACKLIST_FILTER_REBUILD_MINUTES = int(os.environ.get("TOKEN_BLACKLIST_FILTER_REBUILD_MINUTES", 360))
 ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS")
 FROM_EMAIL = os.environ.get("FROM_EMAIL")
 ENV = os.environ.get("ENV", "production")
 GOOGLE_CLIENT_IDS = os.environ.get("GOOGLE_CLIENT_IDS", "")
+# Google ID-token signing certs: cached for the max-age Google sends, refreshed this long before expiry
+GOOGLE_CERTS_URL = os.environ.get("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_CERTS_TIMEOUT_SECONDS = float(os.environ.get("GOOGLE_CERTS_TIMEOUT_SECONDS", 5))
+GOOGLE_CERTS_REFRESH_MARGIN_SECONDS = int(os.environ.get("GOOGLE_CERTS_REFRESH_MARGIN_SECONDS", 300))
+GOOGLE_CERTS_MIN_REFETCH_SECONDS = int(os.environ.get("GOOGLE_CERTS_MIN_REFETCH_SECONDS", 30))
 # Zoho Zepto Mail Configuration
 ZEPTO_MAIL_API_KEY = os.environ.get("ZEPTO_MAIL_API_KEY")
 
+# Outbound email: shared client limits and the background delivery queue
+EMAIL_TIMEOUT_SECONDS = float(os.environ.get("EMAIL_TIMEOUT_SECONDS", 10))
+EMAIL_MAX_CONNECTIONS = int(os.environ.get("EMAIL_MAX_CONNECTIONS", 10))
+EMAIL_QUEUE_MAX_SIZE = int(os.environ.get("EMAIL_QUEUE_MAX_SIZE", 1000))
+EMAIL_QUEUE_WORKERS = int(os.environ.get("EMAIL_QUEUE_WORKERS", 4))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 4))
+EMAIL_RETRY_BACKOFF_SECONDS = float(os.environ.get("EMAIL_RETRY_BACKOFF_SECONDS", 1))
+
 PUBLIC_PATHS = os.environ.get("PUBLIC_PATHS")
 if not PUBLIC_PATHS:
 	PUBLIC_PATHS = ",".join([
@@ -38,4 +56,54 @@ if not PUBLIC_PATHS:
 # Razorpay
 RAZORPAY_KEY_ID = os.environ.get("RAZORPAY_KEY_ID")
 RAZORPAY_KEY_SECRET = os.environ.get("RAZORPAY_KEY_SECRET")
-RAZORPAY_WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET")
\ No newline at end of file
+RAZORPAY_WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET")
+RAZORPAY_API_BASE_URL = os.environ.get("RAZORPAY_API_BASE_URL", "https://api.razorpay.com/v1")
+RAZORPAY_TIMEOUT_SECONDS = float(os.environ.get("RAZORPAY_TIMEOUT_SECONDS", 10))
+RAZORPAY_MAX_RETRIES = int(os.environ.get("RAZORPAY_MAX_RETRIES", 3))
+RAZORPAY_MAX_CONCURRENCY = int(os.environ.get("RAZORPAY_MAX_CONCURRENCY", 10))
+
+# Redis (optional shared cache tier)
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# OTP storage: "redis" (shared by all workers; needs REDIS_URL) or "memory" (single worker only)
+OTP_STORE_BACKEND = os.environ.get("OTP_STORE_BACKEND") or ("redis" if REDIS_URL else "memory")
+OTP_SWEEP_INTERVAL_SECONDS = float(os.environ.get("OTP_SWEEP_INTERVAL_SECONDS", 1))
+
+# Rate limiting: counters shared through "redis" (needs REDIS_URL) or "mongodb", or per-process "memory"
+RATE_LIMIT_STORAGE = os.environ.get("RATE_LIMIT_STORAGE") or ("redis" if REDIS_URL else "memory")
+RATE_LIMIT_STRATEGY = os.environ.get("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+# Proxies whose X-Forwarded-For entries are skipped when finding the client address
+RATE_LIMIT_TRUSTED_PROXIES = os.environ.get(
+	"RATE_LIMIT_TRUSTED_PROXIES",
+	"127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16",
+)
+
+# How long an active login/OTP lockout stays cached in Redis (needs REDIS_URL; resets clear it)
+ATTEMPT_LOCK_CACHE_TTL_SECONDS = float(os.environ.get("ATTEMPT_LOCK_CACHE_TTL_SECONDS", 5))
+
+# Auth context cache used by UserContextMiddleware
+AUTH_CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("AUTH_CONTEXT_CACHE_TTL_SECONDS", 30))
+AUTH_CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CONTEXT_CACHE_MAX_ENTRIES", 10000))
+
+# Plan cache: in-process TTL (bounds cross-worker staleness after an admin edit) and Redis TTL
+PLAN_CACHE_TTL_SECONDS = int(os.environ.get("PLAN_CACHE_TTL_SECONDS", 60))
+PLAN_CACHE_REDIS_TTL_SECONDS = int(os.environ.get("PLAN_CACHE_REDIS_TTL_SECONDS", 3600))
+
+# Password hashing: Argon2 cost (new hashes only; existing hashes keep their own parameters)
+# and the size of the thread pool that runs hash/verify off the event loop
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 4))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+
+# Monthly payment generation cron: payments per insert_many batch
+PAYMENT_GENERATION_BATCH_SIZE = int(os.environ.get("PAYMENT_GENERATION_BATCH_SIZE", 500))
+# Split each payment generation run into N independently locked partitions (1 = single run)
+PAYMENT_GENERATION_PARTITIONS = int(os.environ.get("PAYMENT_GENERATION_PARTITIONS", 1))
+
+# List endpoints: how long a computed total is reused across pages (0 disables)
+LIST_TOTAL_CACHE_TTL_SECONDS = int(os.environ.get("LIST_TOTAL_CACHE_TTL_SECONDS", 15))
+
+# Streaming imports/exports: rows per bulk write on import, cursor batch size on export
+TENANT_IMPORT_CHUNK_SIZE = int(os.environ.get("TENANT_IMPORT_CHUNK_SIZE", 200))
+EXPORT_CURSOR_BATCH_SIZE = int(os.environ.get("EXPORT_CURSOR_BATCH_SIZE", 500))
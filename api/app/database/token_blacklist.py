@@ -1,14 +1,111 @@
+"""
+Revoked refresh tokens, keyed by the token's `jti` (unique index).
+
+Entries expire with the token they revoke (TTL index on `expiresAt`).
+
+Each process keeps a Bloom filter of revoked jtis, built from the collection
+at startup and updated on every revocation, so checking a token that was never
+revoked needs no database read. A Bloom filter cannot forget entries, so it
+is rebuilt from the live (unexpired) entries every
+TOKEN_BLACKLIST_FILTER_REBUILD_MINUTES; otherwise revocations would pile up
+past its capacity and its false-positive rate would keep climbing. Revocations made by other processes are not in
+this process's filter; refresh-token rotation is still safe because consuming
+a token goes through blacklist_token(), whose insert fails on the unique jti
+index if the token was already revoked anywhere.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.utils.bloom_filter import BloomFilter
 from .mongodb import db
 
+logger = logging.getLogger(__name__)
+
 blacklist_collection = db["token_blacklist"]
 
-from datetime import datetime, timezone
+_filter: Optional[BloomFilter] = None
+# Revocations made while the filter is being (re)built, replayed into it at the end
+_pending: Optional[list] = None
+_stats = {"lookups": 0, "filterSkips": 0, "dbReads": 0}
+
+
+async def load_blacklist_filter() -> int:
+    """
+    (Re)build this process's Bloom filter from the collection.
+
+    Until the first load finishes every check goes to the database, so this
+    can run in the background at startup. Returns the entry count.
+    """
+    global _filter, _pending
+    if _filter is not None and _filter.count > _filter.capacity:
+        logger.warning(
+            f"Token blacklist filter holds {_filter.count} entries, over its capacity of {_filter.capacity}; "
+            "rebuilding it (consider a shorter TOKEN_BLACKLIST_FILTER_REBUILD_MINUTES)"
+        )
+    _pending = []
+    try:
+        bloom = await _build_filter()
+        for jti in _pending:
+            bloom.add(jti)
+        _filter = bloom
+    finally:
+        _pending = None
+    logger.info(f"Token blacklist filter loaded with {bloom.count} entries ({bloom.memory_bytes // 1024} KiB)")
+    return bloom.count
+
+
+async def _build_filter() -> BloomFilter:
+    existing = await blacklist_collection.estimated_document_count()
+    bloom = BloomFilter(
+        max(settings.TOKEN_BLACKLIST_BLOOM_CAPACITY, existing * 2),
+        settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE,
+    )
+    # Skip entries past expiresAt that the TTL monitor has not removed yet
+    query = {"jti": {"$type": "string"}, "expiresAt": {"$not": {"$lte": datetime.now(timezone.utc)}}}
+    cursor = blacklist_collection.find(query, {"_id": 0, "jti": 1}).batch_size(10000)
+    async for doc in cursor:
+        bloom.add(doc["jti"])
+    return bloom
+
+
+async def blacklist_token(jti: str, expires_at: datetime) -> bool:
+    """
+    Revoke a refresh token until it expires.
+
+    Returns: False if the token was already revoked.
+    """
+    if _filter is not None:
+        _filter.add(jti)
+    if _pending is not None:
+        _pending.append(jti)
+    try:
+        await blacklist_collection.insert_one({
+            "jti": jti,
+            "expiresAt": expires_at,
+            "revokedAt": datetime.now(timezone.utc),
+        })
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def is_token_blacklisted(jti: str) -> bool:
+    _stats["lookups"] += 1
+    if _filter is not None and jti not in _filter:
+        _stats["filterSkips"] += 1
+        return False
+    _stats["dbReads"] += 1
+    return await blacklist_collection.find_one({"jti": jti}, {"_id": 1}) is not None
 
-async def blacklist_token(token: str):
-    await blacklist_collection.insert_one({
-        "token": token,
-        "createdAt": datetime.now(timezone.utc)
-    })
 
-async def is_token_blacklisted(token: str) -> bool:
-    return await blacklist_collection.find_one({"token": token}) is not None
+def blacklist_stats() -> dict:
+    return {
+        **_stats,
+        "filterLoaded": _filter is not None,
+        "filterEntries": _filter.count if _filter is not None else 0,
+        "filterBytes": _filter.memory_bytes if _filter is not None else 0,
+    }
@@ -0,0 +1,46 @@
+"""
+Multi-document transactions.
+
+Transactions need a replica set or sharded cluster. The docker-compose
+MongoDB is a standalone server, so support is detected once from `hello` and
+callers fall back to running the same writes without a session there (each
+write still atomic on its own). Callbacks take the session as their only
+argument and pass it to every operation; `session=None` is what Motor expects
+outside a transaction.
+"""
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorClientSession
+
+from app.database.mongodb import client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_supported: Optional[bool] = None
+
+
+async def transactions_supported() -> bool:
+    global _supported
+    if _supported is None:
+        hello = await client.admin.command("hello")
+        _supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        if not _supported:
+            logger.warning("MongoDB is a standalone server; multi-document writes run without transactions")
+    return _supported
+
+
+async def run_in_transaction(callback: Callable[[Optional[AsyncIOMotorClientSession]], Awaitable[T]]) -> T:
+    """
+    Run `callback(session)` in a transaction and return its result.
+
+    The driver retries the whole callback on TransientTransactionError and the
+    commit on UnknownTransactionCommitResult, so callbacks must be safe to
+    re-run (no side effects outside the session).
+    """
+    if not await transactions_supported():
+        return await callback(None)
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
@@ -11,6 +11,7 @@ from fastapi.responses import JSONResponse
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timezone, timedelta
+import asyncio
 import logging
 from pymongo.errors import OperationFailure
 
@@ -18,10 +19,25 @@ import os
 from app.routes import health, auth, property, room, tenant, bed, subscription, dashboard, staff, payment, coupon, plan
 from app.utils.rate_limit import limiter
 from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from slowapi.middleware import SlowAPIASGIMiddleware
 from app.utils.exception_handlers import add_global_exception_handlers
 from app.middleware.user_context import UserContextMiddleware
 from app.middleware.timing_middleware import TimingMiddleware
+from app.utils.scheduler_lock import run_exclusive, run_partitioned
+from app.utils.helpers import shutdown_password_executor
+from app.utils.razorpay_gateway import razorpay_gateway
+from app.utils.email_queue import email_queue
+from app.utils.email_service import close_email_client
+from app.utils.google_certs import google_cert_cache
+from app.utils.otp_store import otp_backend
+from app.utils.attempt_tracking import ensure_attempt_indexes
+from app.database.token_blacklist import load_blacklist_filter
+from app.migrations.backfill_token_blacklist_jti import backfill_blacklist_jti
+from app.migrations.backfill_search_terms import backfill_search_terms
+from app.migrations.backfill_partition_hash import backfill_partition_hash
+from app.migrations.backfill_object_id_refs import backfill_object_id_refs
+from app.migrations.backfill_payment_amount_paise import backfill_amount_paise_and_reconcile
+from app.config import settings
 
 # Configure logging for APScheduler
 logging.basicConfig()
@@ -57,7 +73,10 @@ async def ensure_indexes():
     logger.info("✓ Users indexes created")
     
     # ============ TOKEN BLACKLIST COLLECTION ============
+    # Legacy entries (raw token string) expire 7 days after logout
     await create_index_safe("token_blacklist", "createdAt", expireAfterSeconds=60*60*24*7)
+    await create_index_safe("token_blacklist", "jti", unique=True, partialFilterExpression={"jti": {"$type": "string"}})
+    await create_index_safe("token_blacklist", "expiresAt", expireAfterSeconds=0)
     logger.info("✓ Token blacklist indexes created")
     
     # ============ PROPERTIES COLLECTION ============
@@ -71,6 +90,12 @@ async def ensure_indexes():
     await create_index_safe("rooms", "propertyId")
     await create_index_safe("rooms", "active")
     await create_index_safe("rooms", [("propertyId", 1), ("active", 1)])
+    # Search: prefix terms (typeahead) and whole words ($text)
+    await create_index_safe("rooms", [("propertyId", 1), ("searchTerms", 1)])
+    try:
+        await create_index_safe("rooms", [("roomNumber", "text"), ("description", "text")])
+    except Exception:
+        pass  # Text indexes can conflict, skip if already exists
     logger.info("✓ Rooms indexes created")
     
     # ============ BEDS COLLECTION ============
@@ -86,6 +111,12 @@ async def ensure_indexes():
     await create_index_safe("tenants", "status")
     await create_index_safe("tenants", [("propertyId", 1), ("autoGeneratePayments", 1)])
     await create_index_safe("tenants", [("propertyId", 1), ("status", 1)])
+    # Keyset pagination for the tenant list (createdAt, _id)
+    await create_index_safe("tenants", [("propertyId", 1), ("createdAt", -1), ("_id", -1)])
+    # Prefix search terms (typeahead); the text index for whole words is declared below
+    await create_index_safe("tenants", [("propertyId", 1), ("searchTerms", 1)])
+    # Partitioned payment generation ($mod on partitionHash is evaluated on index keys)
+    await create_index_safe("tenants", [("autoGeneratePayments", 1), ("partitionHash", 1)])
     logger.info("✓ Tenants indexes created")
     
     # ============ PAYMENTS COLLECTION ============
@@ -94,6 +125,8 @@ async def ensure_indexes():
     await create_index_safe("payments", "status")
     await create_index_safe("payments", "dueDate")
     await create_index_safe("payments", [("propertyId", 1), ("status", 1)])
+    # Keyset pagination for the payment list (dueDate, createdAt, _id)
+    await create_index_safe("payments", [("propertyId", 1), ("dueDate", -1), ("createdAt", -1), ("_id", -1)])
     # Unique index to prevent duplicate payments (non-sparse to enforce uniqueness)
         # Additional compound index for common tenant queries
     await create_index_safe("tenants", [("propertyId", 1), ("billingConfig.status", 1)])
@@ -110,6 +143,14 @@ async def ensure_indexes():
     await create_index_safe("staff", "role")
     await create_index_safe("staff", "status")
     await create_index_safe("staff", [("propertyId", 1), ("archived", 1)])
+    # Keyset pagination for the staff list (_id)
+    await create_index_safe("staff", [("propertyId", 1), ("_id", -1)])
+    # Search: prefix terms (typeahead) and whole words ($text)
+    await create_index_safe("staff", [("propertyId", 1), ("searchTerms", 1)])
+    try:
+        await create_index_safe("staff", [("name", "text"), ("mobileNumber", "text"), ("address", "text")])
+    except Exception:
+        pass  # Text indexes can conflict, skip if already exists
         # Compound index for efficient payment queries by property and due date
     await create_index_safe("payments", [("propertyId", 1), ("dueDate", 1)])
     logger.info("✓ Staff indexes created")
@@ -127,11 +168,14 @@ async def ensure_indexes():
     await create_index_safe("email_otps", "email")
     await create_index_safe("email_otps", "createdAt", expireAfterSeconds=60*10)  # Auto-delete after 10 minutes
     logger.info("✓ Email OTP indexes created (TTL: 10 minutes)")
+    # Undeliverable emails, kept 30 days for inspection
+    await create_index_safe("email_dead_letters", "createdAt", expireAfterSeconds=60*60*24*30)
     
     # ============ OTP ATTEMPTS COLLECTION ============
         # Compound index for room number uniqueness checks
     await create_index_safe("rooms", [("propertyId", 1), ("roomNumber", 1)])
-    await create_index_safe("otp_attempts", "email")
+    # Unique email keys for the login/OTP attempt counters (replaces the old non-unique index)
+    await ensure_attempt_indexes()
     await create_index_safe("otp_attempts", "createdAt", expireAfterSeconds=60*60)  # Auto-delete after 1 hour
     logger.info("✓ OTP Attempts indexes created (TTL: 1 hour)")
     
@@ -169,6 +213,18 @@ async def lifespan(app):
     from app.services.plan_service import PlanService
     logger = logging.getLogger(__name__)
     
+    # Revoked refresh tokens: key legacy entries by jti, then build the in-process filter
+    await backfill_blacklist_jti()
+    app.state.blacklist_filter_task = asyncio.create_task(load_blacklist_filter())
+    # Prefix search terms for documents written before they existed
+    app.state.search_terms_task = asyncio.create_task(backfill_search_terms())
+    # Partition hashes for tenants written before partitioned payment generation
+    app.state.partition_hash_task = asyncio.create_task(backfill_partition_hash())
+    # Typed *Ref join keys for documents written before they existed
+    app.state.object_id_refs_task = asyncio.create_task(backfill_object_id_refs())
+    # Numeric amountPaise for payments written before it existed
+    app.state.amount_paise_task = asyncio.create_task(backfill_amount_paise_and_reconcile())
+
     plans_created = await PlanService.create_default_plans()
     if plans_created > 0:
         logger.info(f"✓ Created {plans_created} default subscription plans (free, pro, premium)")
@@ -181,21 +237,40 @@ async def lifespan(app):
     # Import here to avoid circular imports
     from app.services.tenant_service import TenantService
     from app.services.razorpay_subscription_service import RazorpaySubscriptionService
+    from app.services.dashboard_stats_service import DashboardStatsService
     tenant_service = TenantService()
     
+    # Every worker runs its own scheduler; wrappers take a Mongo lease per
+    # period so each job runs once across all workers and containers.
+    DAY_SECONDS = 24 * 60 * 60
+    HOUR_SECONDS = 60 * 60
+    
     # Wrapper for scheduled job to add logging
     async def generate_payments_job():
-        result = await tenant_service.generate_monthly_payments()
+        if settings.PAYMENT_GENERATION_PARTITIONS > 1:
+            # Partitions are claimed independently, so idle workers share the run
+            return await run_partitioned(
+                "generate_monthly_payments",
+                lambda partition, partitions: tenant_service.generate_monthly_payments(partition=partition, partitions=partitions),
+                partitions=settings.PAYMENT_GENERATION_PARTITIONS,
+                period_seconds=DAY_SECONDS,
+            )
         # Result already contains timing info - logged by service
-        return result
+        return await run_exclusive("generate_monthly_payments", tenant_service.generate_monthly_payments, period_seconds=DAY_SECONDS)
     
     # Wrapper for auto-renewal job
     async def auto_renewal_job():
-        result = await RazorpaySubscriptionService.check_and_renew_subscriptions()
-        return result
+        return await run_exclusive("auto_renewal_subscriptions", RazorpaySubscriptionService.check_and_renew_subscriptions, period_seconds=DAY_SECONDS)
+    
+    # Wrapper for dashboard stats reconciliation job
+    async def dashboard_stats_reconcile_job():
+        return await run_exclusive("dashboard_stats_reconcile", DashboardStatsService.reconcile, period_seconds=DAY_SECONDS)
     
     # Wrapper for database cleanup job
     async def db_cleanup_job():
+        return await run_exclusive("db_cleanup", cleanup_expired_records, period_seconds=HOUR_SECONDS)
+    
+    async def cleanup_expired_records():
         """Cleanup expired OTPs and old attempt records."""
         logger = logging.getLogger(__name__)
         now = datetime.now(timezone.utc)
@@ -251,17 +326,61 @@ async def lifespan(app):
         coalesce=True
     )
     
+    # Job 4: Rebuild materialized dashboard stats daily at 02:00 UTC and report drift
+    scheduler.add_job(
+        dashboard_stats_reconcile_job,
+        trigger=CronTrigger(hour=2, minute=0, timezone="UTC"),
+        id="dashboard_stats_reconcile",
+        name="Reconcile materialized dashboard stats",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=300
+    )
+    
+    # Job 5: Rebuild this worker's revoked-token Bloom filter so expired entries drop out.
+    # Every worker holds its own filter, so this is deliberately not lease-wrapped.
+    scheduler.add_job(
+        load_blacklist_filter,
+        trigger="interval",
+        minutes=settings.TOKEN_BLACKLIST_FILTER_REBUILD_MINUTES,
+        id="token_blacklist_filter_rebuild",
+        name="Rebuild the revoked-token Bloom filter",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    
     scheduler.start()
     app.state.scheduler = scheduler
+
+    # Background workers for outbound email (OTP, password reset, welcome)
+    await email_queue.start()
+    await otp_backend.start()
+
+    # Warm Google's ID-token signing certs so the first Google sign-in doesn't wait on them
+    if settings.GOOGLE_CLIENT_IDS.strip():
+        google_cert_cache.prefetch()
     
     logger.info("✓ Background scheduler initialized")
-    logger.info("✓ Jobs registered: generate_monthly_payments, auto_renewal_subscriptions, db_cleanup")
+    logger.info("✓ Jobs registered: generate_monthly_payments, auto_renewal_subscriptions, db_cleanup, dashboard_stats_reconcile")
     
     yield
     
     # Shutdown scheduler
     scheduler.shutdown()
     logger.info("✓ Background scheduler shut down")
+    shutdown_password_executor()
+    await razorpay_gateway.aclose()
+    await email_queue.stop()
+    await otp_backend.stop()
+    await close_email_client()
+    await google_cert_cache.aclose()
+    app.state.blacklist_filter_task.cancel()
+    app.state.search_terms_task.cancel()
+    app.state.partition_hash_task.cancel()
+    app.state.object_id_refs_task.cancel()
+    app.state.amount_paise_task.cancel()
 
 
 
@@ -279,7 +398,8 @@ if enforce_https:
     app.add_middleware(HTTPSRedirectMiddleware)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse(status_code=429, content={"detail": "Too many requests. Please try again later."}))
-app.add_middleware(SlowAPIMiddleware)
+# Pure ASGI variant: about half the per-request cost of the BaseHTTPMiddleware one
+app.add_middleware(SlowAPIASGIMiddleware)
 
 # Production-safe CORS setup
 allowed_origins_env = os.getenv("ALLOWED_ORIGINS")
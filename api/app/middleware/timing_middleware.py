@@ -1,25 +1,37 @@
 import time
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger("api.timing")
 
-class TimingMiddleware(BaseHTTPMiddleware):
-    """Middleware to track request processing time and log slow requests"""
-    
-    async def dispatch(self, request: Request, call_next):
+class TimingMiddleware:
+    """Pure ASGI middleware to track request processing time and log slow requests"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        
-        # Log slow requests (> 1 second) for performance monitoring
-        if process_time > 1.0:
-            logger.warning(
-                f"SLOW REQUEST: {request.method} {request.url.path} "
-                f"took {process_time:.2f}s"
-            )
-        
-        # Add timing header for debugging
-        response.headers["X-Process-Time"] = f"{process_time:.4f}"
-        return response
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+
+                # Log slow requests (> 1 second) for performance monitoring
+                if process_time > 1.0:
+                    logger.warning(
+                        f"SLOW REQUEST: {scope['method']} {scope['path']} "
+                        f"took {process_time:.2f}s"
+                    )
+
+                # Add timing header for debugging
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = f"{process_time:.4f}"
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -1,17 +1,84 @@
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 from app.database.mongodb import db
 from bson import ObjectId
 from app.utils.ownership import build_owner_query
+from app.utils.auth_context_cache import auth_context_cache
 from jose import jwt
-from fastapi import HTTPException, status
+from fastapi import status
 from app.config import settings
 import logging
 from jose import JWTError, ExpiredSignatureError
 from starlette.responses import JSONResponse
 
-class UserContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+logger = logging.getLogger("uvicorn.error")
+
+# Public endpoints always allowed in addition to PUBLIC_PATHS (comma-separated env var)
+DEFAULT_PUBLIC_PATHS = {
+    "/api/v1/health",
+    "/api/v1/health/auth-config",
+    "/api/v1/auth/login",
+    "/api/v1/auth/register",
+    "/api/v1/auth/google",
+    "/api/v1/auth/email/send-otp",
+    "/api/v1/auth/email/verify-otp",
+    "/api/v1/auth/email/resend-otp",
+    "/api/v1/auth/forgot-password",
+    "/api/v1/auth/verify-reset-otp",
+    "/api/v1/auth/reset-password",
+    "/api/v1/auth/refresh",
+    "/api/v1/auth/logout",  # Logout only needs refresh token, not access token
+    "/api/v1/subscription/limits/free",  # Plan limits are public
+    "/api/v1/subscription/limits/pro",
+    "/api/v1/subscription/limits/premium",
+    "/api/v1/subscription/plans",  # Get all available plans
+}
+
+# Public path prefixes (for paths with dynamic segments)
+PUBLIC_PREFIXES = (
+    "/api/v1/coupons/validate/",  # Coupon validation is public
+)
+
+
+class UserContextMiddleware:
+    """
+    Pure ASGI middleware that authenticates the bearer token and attaches
+    user_id, role, property_ids, current_user and subscription to request.state.
+
+    Implemented without BaseHTTPMiddleware so the request and response bodies
+    are passed straight through (no extra task or stream wrapping per request).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.public_paths = {p.strip() for p in settings.PUBLIC_PATHS.split(",") if p.strip()}
+        self.public_paths.update(DEFAULT_PUBLIC_PATHS)
+
+    def is_public(self, path: str) -> bool:
+        # Check exact path match or prefix match
+        return path in self.public_paths or path.startswith(PUBLIC_PREFIXES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self.is_public(scope["path"]):
+            # Allow public access, skip authentication
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        error_response = await self.authenticate(request)
+        if error_response is not None:
+            await error_response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    async def authenticate(self, request: Request):
+        """
+        Resolve the auth context for a request and store it on request.state.
+
+        Returns a JSONResponse to send instead of the route when authentication
+        fails, otherwise None.
+        """
         SECRET_KEY = settings.JWT_SECRET
         ALGORITHM = settings.JWT_ALGORITHM
         user_id = None
@@ -19,45 +86,8 @@ class UserContextMiddleware(BaseHTTPMiddleware):
         role = None
         property_ids = []
         subscription = None
+        cached_context = None
         auth_header = request.headers.get("Authorization")
-        logger = logging.getLogger("uvicorn.error")
-
-        # Read public endpoints from environment variable PUBLIC_PATHS (comma-separated)
-        public_paths = {p.strip() for p in settings.PUBLIC_PATHS.split(",") if p.strip()}
-        public_paths.update({
-            "/api/v1/health",
-            "/api/v1/health/auth-config",
-            "/api/v1/auth/login",
-            "/api/v1/auth/register",
-            "/api/v1/auth/google",
-            "/api/v1/auth/email/send-otp",
-            "/api/v1/auth/email/verify-otp",
-            "/api/v1/auth/email/resend-otp",
-            "/api/v1/auth/forgot-password",
-            "/api/v1/auth/verify-reset-otp",
-            "/api/v1/auth/reset-password",
-            "/api/v1/auth/refresh",
-            "/api/v1/auth/logout",  # Logout only needs refresh token, not access token
-            "/api/v1/subscription/limits/free",  # Plan limits are public
-            "/api/v1/subscription/limits/pro",
-            "/api/v1/subscription/limits/premium",
-            "/api/v1/subscription/plans",  # Get all available plans
-        })
-        
-        # Public path prefixes (for paths with dynamic segments)
-        public_prefixes = [
-            "/api/v1/coupons/validate/",  # Coupon validation is public
-        ]
-        
-        # Check exact path match or prefix match
-        is_public = request.url.path in public_paths or any(
-            request.url.path.startswith(prefix) for prefix in public_prefixes
-        )
-        
-        if is_public:
-            # Allow public access, skip authentication
-            response = await call_next(request)
-            return response
 
         if auth_header and auth_header.startswith("Bearer "):
             token = auth_header.split(" ", 1)[1]
@@ -67,16 +97,23 @@ class UserContextMiddleware(BaseHTTPMiddleware):
                 if user_id is None:
                     logger.warning("JWT missing 'sub' claim.")
                     return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Invalid authentication credentials"})
-                user = await db["users"].find_one({"_id": ObjectId(user_id)})
-                if user:
-                    role = user.get("role")
-                    owned_properties = await db["properties"].find(
-                        build_owner_query(user_id),
-                        {"_id": 1}
-                    ).to_list(length=None)
-                    property_ids = [str(doc["_id"]) for doc in owned_properties]
-                    # Sanitize user object (remove sensitive fields)
-                    user = {k: v for k, v in user.items() if k not in ["password", "hashed_password"]}
+                cached_context = await auth_context_cache.get(user_id)
+                if cached_context:
+                    user = cached_context["user"]
+                    role = cached_context["role"]
+                    property_ids = cached_context["property_ids"]
+                    subscription = cached_context["subscription"]
+                else:
+                    user = await db["users"].find_one({"_id": ObjectId(user_id)})
+                    if user:
+                        role = user.get("role")
+                        owned_properties = await db["properties"].find(
+                            build_owner_query(user_id),
+                            {"_id": 1}
+                        ).to_list(length=None)
+                        property_ids = [str(doc["_id"]) for doc in owned_properties]
+                        # Sanitize user object (remove sensitive fields)
+                        user = {k: v for k, v in user.items() if k not in ["password", "hashed_password"]}
             except ExpiredSignatureError:
                 logger.info(f"Expired JWT for user_id: {user_id}")
                 return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Your session has expired. Please log in again or refresh your token."})
@@ -89,23 +126,29 @@ class UserContextMiddleware(BaseHTTPMiddleware):
         else:
             logger.warning("Missing or invalid Authorization header.")
             return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Missing or invalid Authorization header"})
-        
-        # Load subscription info
-        if user_id:
+
+        # Load subscription info (already present when the context came from cache)
+        if user_id and not cached_context:
             from app.services.subscription_service import SubscriptionService
             try:
                 subscription = await SubscriptionService.get_subscription(user_id)
             except Exception as e:
                 logger.warning(f"Failed to load subscription for {user_id}: {e}")
                 subscription = None
-        
+
+            # Only cache complete contexts so a transient failure is retried next request
+            if user and subscription:
+                await auth_context_cache.set(user_id, {
+                    "user": user,
+                    "role": role,
+                    "property_ids": property_ids,
+                    "subscription": subscription,
+                })
+
         # Attach metadata to request.state
         request.state.user_id = user_id
         request.state.role = role
         request.state.property_ids = property_ids
         request.state.current_user = user
         request.state.subscription = subscription
-        response = await call_next(request)
-        return response
-
-
+        return None
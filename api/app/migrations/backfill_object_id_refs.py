@@ -0,0 +1,60 @@
+"""
+Backfill typed ObjectId reference fields (see app.utils.refs):
+
+    tenants.roomRef / tenants.bedRef
+    beds.roomRef
+    payments.tenantRef / payments.bedRef
+
+Batched and resumable per collection (see app.migrations.batching);
+started in the background at startup. Until it reaches a document, the list
+pipelines derive the missing ref from its string id (app.utils.refs.ref_or_source).
+Re-running after completion is a no-op.
+
+Usage:
+    python -m app.migrations.backfill_object_id_refs [--batch-size 1000] [--restart]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.migrations.batching import DEFAULT_BATCH_SIZE, run_batched_backfill
+from app.utils.refs import REFS_BY_COLLECTION, object_id_or_none
+
+
+def _build_set(refs: dict):
+    def build_set(doc: dict) -> dict:
+        return {ref_field: object_id_or_none(doc.get(source_field)) for source_field, ref_field in refs.items()}
+    return build_set
+
+
+async def backfill_object_id_refs(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Run (or resume) the backfill for every collection.
+
+    Returns: {collection: {"updated": int, "batches": int, "duration_ms": int}}
+    """
+    results = {}
+    for collection_name, refs in REFS_BY_COLLECTION.items():
+        # Every ref of a collection is written together, so checking the first is enough
+        first_ref = next(iter(refs.values()))
+        results[collection_name] = await run_batched_backfill(
+            f"{collection_name}_object_id_refs",
+            collection_name,
+            query={first_ref: {"$exists": False}},
+            projection={"_id": 1, **{source_field: 1 for source_field in refs}},
+            build_set=_build_set(refs),
+            batch_size=batch_size,
+            restart=restart,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill typed ObjectId reference fields")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoints and start from the first document")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(backfill_object_id_refs(args.batch_size, args.restart)))
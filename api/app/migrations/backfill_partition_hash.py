@@ -0,0 +1,49 @@
+"""
+Backfill `partitionHash` (see app.utils.scheduler_lock.partition_hash) on tenants.
+
+Partitioned payment generation selects each partition in the tenant query, so
+tenants written before the field existed are skipped by partitioned runs
+until this reaches them. Batched and resumable (see app.migrations.batching);
+started in the background at startup. Re-running after completion is a no-op.
+
+Usage:
+    python -m app.migrations.backfill_partition_hash [--batch-size 1000] [--restart]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.migrations.batching import DEFAULT_BATCH_SIZE, run_batched_backfill
+from app.utils.scheduler_lock import PARTITION_HASH_FIELD, partition_hash
+
+
+def _build_set(doc: dict) -> dict:
+    return {PARTITION_HASH_FIELD: partition_hash(doc["_id"])}
+
+
+async def backfill_partition_hash(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Run (or resume) the backfill.
+
+    Returns: {"updated": int, "batches": int, "duration_ms": int}
+    """
+    return await run_batched_backfill(
+        "tenants_partition_hash",
+        "tenants",
+        query={PARTITION_HASH_FIELD: {"$exists": False}},
+        projection={"_id": 1},
+        build_set=_build_set,
+        batch_size=batch_size,
+        restart=restart,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill partitionHash on tenants")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start from the first document")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(backfill_partition_hash(args.batch_size, args.restart)))
@@ -0,0 +1,63 @@
+"""
+Backfill `amountPaise` on existing payment documents.
+
+Batched and resumable (see app.migrations.batching); started in the
+background at startup. Until it reaches a payment, totals derive its paise
+from `amount` (app.utils.money.payment_paise). Re-running after completion
+is a no-op.
+
+Usage:
+    python -m app.migrations.backfill_payment_amount_paise [--batch-size 1000] [--restart]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.migrations.batching import DEFAULT_BATCH_SIZE, run_batched_backfill
+from app.utils.money import payment_paise
+
+MIGRATION_ID = "payments_amount_paise"
+
+
+def _amount_paise(doc: dict) -> dict:
+    return {"amountPaise": payment_paise(doc)}
+
+
+async def backfill_amount_paise(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Run (or resume) the backfill.
+
+    Returns: {"updated": int, "batches": int, "duration_ms": int}
+    """
+    return await run_batched_backfill(
+        MIGRATION_ID,
+        "payments",
+        query={"amountPaise": {"$exists": False}},
+        projection={"_id": 1, "amount": 1},
+        build_set=_amount_paise,
+        batch_size=batch_size,
+        restart=restart,
+    )
+
+
+async def backfill_amount_paise_and_reconcile(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Run the backfill, then rebuild dashboard stats if it changed any payment,
+    so stats stored while the field was missing are corrected right away.
+    """
+    result = await backfill_amount_paise(batch_size=batch_size, restart=restart)
+    if result["updated"]:
+        from app.services.dashboard_stats_service import DashboardStatsService
+        await DashboardStatsService.reconcile()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill payments.amountPaise")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start from the first payment")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(backfill_amount_paise_and_reconcile(args.batch_size, args.restart)))
@@ -0,0 +1,53 @@
+"""
+Backfill `searchTerms` (see app.utils.search_terms) on tenants, staff and rooms.
+
+Batched and resumable per collection (see app.migrations.batching). Started
+in the background at startup; until it finishes, prefix search misses the
+documents it has not reached yet. Re-running after completion is a no-op.
+
+Usage:
+    python -m app.migrations.backfill_search_terms [--batch-size 1000] [--restart]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.migrations.batching import DEFAULT_BATCH_SIZE, run_batched_backfill
+from app.utils.search_terms import SEARCH_FIELDS_BY_COLLECTION, SEARCH_TERMS_FIELD, search_terms
+
+
+def _build_set(fields: tuple):
+    def build_set(doc: dict) -> dict:
+        return {SEARCH_TERMS_FIELD: search_terms(doc, fields)}
+    return build_set
+
+
+async def backfill_search_terms(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Run (or resume) the backfill for every searchable collection.
+
+    Returns: {collection: {"updated": int, "batches": int, "duration_ms": int}}
+    """
+    results = {}
+    for collection_name, fields in SEARCH_FIELDS_BY_COLLECTION.items():
+        results[collection_name] = await run_batched_backfill(
+            f"{collection_name}_search_terms",
+            collection_name,
+            query={SEARCH_TERMS_FIELD: {"$exists": False}},
+            projection={"_id": 1, **{field: 1 for field in fields}},
+            build_set=_build_set(fields),
+            batch_size=batch_size,
+            restart=restart,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill searchTerms on tenants, staff and rooms")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoints and start from the first document")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(backfill_search_terms(args.batch_size, args.restart)))
@@ -0,0 +1,63 @@
+"""
+Backfill `jti` and `expiresAt` on token_blacklist entries that stored the raw token.
+
+The blacklist used to hold the full refresh token string; it is now keyed by
+the token's `jti`. Legacy entries keep their `createdAt` TTL. Tokens without a
+readable `jti` can never pass the refresh check, so they get a placeholder
+that no real token will match.
+
+Batched and resumable (see app.migrations.batching). Runs at startup before
+the blacklist filter is loaded; re-running after completion is a no-op.
+
+Usage:
+    python -m app.migrations.backfill_token_blacklist_jti [--batch-size 1000] [--restart]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from jose import jwt
+
+from app.migrations.batching import DEFAULT_BATCH_SIZE, run_batched_backfill
+
+MIGRATION_ID = "token_blacklist_jti"
+
+
+def _jti_fields(doc: dict) -> dict:
+    try:
+        claims = jwt.get_unverified_claims(doc["token"])
+    except Exception:
+        claims = {}
+    fields = {"jti": claims.get("jti") or f"legacy:{doc['_id']}"}
+    if isinstance(claims.get("exp"), (int, float)):
+        fields["expiresAt"] = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    return fields
+
+
+async def backfill_blacklist_jti(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Run (or resume) the backfill.
+
+    Returns: {"updated": int, "batches": int, "duration_ms": int}
+    """
+    return await run_batched_backfill(
+        MIGRATION_ID,
+        "token_blacklist",
+        query={"jti": {"$exists": False}, "token": {"$exists": True}},
+        projection={"_id": 1, "token": 1},
+        build_set=_jti_fields,
+        batch_size=batch_size,
+        restart=restart,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill token_blacklist.jti")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start from the first entry")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(backfill_blacklist_jti(args.batch_size, args.restart)))
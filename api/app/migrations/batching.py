@@ -0,0 +1,92 @@
+"""
+Shared driver for batched, resumable backfill migrations.
+
+Documents matching `query` are walked in `_id` order, `batch_size` at a time,
+and updated with one unordered bulk_write per batch. The last processed `_id`
+is checkpointed in the `migrations` collection after every batch, so an
+interrupted run resumes where it stopped and a finished run is a no-op.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from pymongo import UpdateOne
+
+from app.database.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+async def run_batched_backfill(
+    migration_id: str,
+    collection_name: str,
+    query: dict,
+    projection: dict,
+    build_set: Callable[[dict], dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    restart: bool = False,
+) -> dict:
+    """
+    Run (or resume) a backfill.
+
+    Args:
+        migration_id: Checkpoint key in the `migrations` collection
+        collection_name: Collection to update
+        query: Selects documents that still need the backfill; re-applied per
+            document so concurrent writers that already fixed a document win
+        projection: Fields `build_set` needs
+        build_set: Maps a projected document to its `$set` payload
+
+    Returns: {"updated": int, "batches": int, "duration_ms": int}
+    """
+    start_time = time.time()
+    migrations = db["migrations"]
+    collection = db[collection_name]
+
+    if restart:
+        await migrations.delete_one({"_id": migration_id})
+
+    checkpoint = await migrations.find_one({"_id": migration_id}) or {}
+    last_id = checkpoint.get("lastId")
+    if checkpoint.get("completedAt"):
+        logger.info(f"[MIGRATION] {migration_id} already completed at {checkpoint['completedAt']}")
+
+    result = {"updated": 0, "batches": 0}
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+
+        batch = await collection.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        operations = [UpdateOne({**query, "_id": doc["_id"]}, {"$set": build_set(doc)}) for doc in batch]
+        write_result = await collection.bulk_write(operations, ordered=False)
+        last_id = batch[-1]["_id"]
+        result["updated"] += write_result.modified_count
+        result["batches"] += 1
+
+        await migrations.update_one(
+            {"_id": migration_id},
+            {
+                "$set": {"lastId": last_id, "updatedAt": datetime.now(timezone.utc).isoformat()},
+                "$inc": {"updated": write_result.modified_count},
+            },
+            upsert=True,
+        )
+        logger.info(f"[MIGRATION] {migration_id}: batch {result['batches']} updated {write_result.modified_count} (last _id {last_id})")
+
+    await migrations.update_one(
+        {"_id": migration_id},
+        {"$set": {"completedAt": datetime.now(timezone.utc).isoformat()}},
+        upsert=True,
+    )
+
+    result["duration_ms"] = int((time.time() - start_time) * 1000)
+    logger.info(f"[MIGRATION] {migration_id} finished: updated={result['updated']}, batches={result['batches']}, duration={result['duration_ms']}ms")
+    return result
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Literal, Union
 from datetime import datetime, date
 from enum import Enum
+from app.utils.money import to_paise
 
 class PaymentStatus(str, Enum):
     PAID = 'paid'
@@ -61,10 +62,15 @@ class PaymentBase(BaseModel):
         return value
 
 class PaymentCreate(PaymentBase):
-    pass
+    @field_validator('amount')
+    @classmethod
+    def validate_amount(cls, value):
+        to_paise(value)
+        return value
 
 class Payment(PaymentBase):
     id: str
+    amountPaise: Optional[int] = None  # Numeric amount in paise, derived from amount
     createdAt: datetime
     updatedAt: datetime
     tenantName: Optional[str] = None  # Enriched field from tenant lookup
@@ -84,4 +90,10 @@ class PaymentUpdate(BaseModel):
     status: Optional[str] = None
     dueDate: Optional[Union[str, date]] = None  # Can be string (ISO format) or date object
     paidDate: Optional[Union[str, date]] = None  # Can be string (ISO format) or date object
-    method: Optional[str] = None
\ No newline at end of file
+    method: Optional[str] = None
+
+    @field_validator('amount')
+    @classmethod
+    def validate_amount(cls, value):
+        to_paise(value)
+        return value
\ No newline at end of file
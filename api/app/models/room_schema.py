@@ -1,5 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Bulk provisioning writes every room and bed in one transaction; keep it well
+# under MongoDB's per-transaction limits
+MAX_BULK_ROOMS = 500
+MAX_BEDS_PER_ROOM = 50
 
 class Room(BaseModel):
     id: Optional[str] = None
@@ -13,3 +18,16 @@ class Room(BaseModel):
     archivedAt: Optional[str] = None
     createdAt: Optional[str] = None
     updatedAt: Optional[str] = None
+
+
+class RoomBulkItem(BaseModel):
+    roomNumber: str
+    floor: str
+    price: int
+    numberOfBeds: int = Field(ge=0, le=MAX_BEDS_PER_ROOM)
+    active: bool = True
+
+
+class RoomBulkCreate(BaseModel):
+    propertyId: str
+    rooms: List[RoomBulkItem] = Field(min_length=1, max_length=MAX_BULK_ROOMS)
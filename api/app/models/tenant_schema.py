@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Literal
 from enum import Enum
+from app.utils.money import to_paise
 
 class BillingStatus(str, Enum):
     PAID = 'paid'
@@ -83,6 +84,12 @@ class TenantCreate(BaseModel):
     billingConfig: Optional[BillingConfig] = None
     autoGeneratePayments: bool = True  # Default to True for auto-payment creation
 
+    @field_validator('rent')
+    @classmethod
+    def validate_rent(cls, value):
+        to_paise(value)
+        return value
+
 class TenantUpdate(BaseModel):
     propertyId: Optional[str] = None
     roomId: Optional[str] = None
@@ -98,3 +105,9 @@ class TenantUpdate(BaseModel):
     checkoutDate: Optional[str] = None
     billingConfig: Optional[BillingConfig] = None
     autoGeneratePayments: Optional[bool] = None
+
+    @field_validator('rent')
+    @classmethod
+    def validate_rent(cls, value):
+        to_paise(value)
+        return value
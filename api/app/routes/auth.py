@@ -25,7 +25,7 @@ from app.models.user_schema import (
     ResetPasswordRequest,
     ChangePasswordRequest,
 )
-from app.utils.otp_memory_store import get_resend_cooldown_remaining
+from app.utils.otp_store import get_resend_cooldown_remaining
 from fastapi.responses import JSONResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -1,184 +1,78 @@
 from fastapi import APIRouter, Request, HTTPException
-from app.database.mongodb import getCollection
-from datetime import datetime, timedelta
-from bson import ObjectId
+from app.services.dashboard_stats_service import DashboardStatsService
+from app.utils.money import paise_to_rupees, format_rupees
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+ALL_PROPERTIES = "all"
+
+
+def _format_stats(stats: dict) -> dict:
+    active_tenants_count = stats.get("activeTenants", 0)
+    total_beds = stats.get("totalBeds", 0)
+    occupied_beds = stats.get("occupiedBeds", 0)
+    occupancy_rate = (occupied_beds / total_beds * 100) if total_beds > 0 else 0
+
+    # Current month revenue and today's check-ins are bucketed by date
+    today = datetime.now()
+    monthly_revenue_paise = (stats.get("revenuePaiseByMonth") or {}).get(today.strftime("%Y-%m"), 0)
+    check_ins_today = (stats.get("checkInsByDate") or {}).get(today.date().isoformat(), 0)
+
+    return {
+        "totalTenants": active_tenants_count,  # Count only active tenants
+        "activeTenants": active_tenants_count,
+        "vacatedTenants": stats.get("vacatedTenants", 0),
+        "totalBeds": total_beds,
+        "occupiedBeds": occupied_beds,
+        "occupancyRate": round(occupancy_rate, 2),
+        "monthlyRevenue": paise_to_rupees(monthly_revenue_paise),
+        "monthlyRevenueFormatted": format_rupees(monthly_revenue_paise),
+        "pendingPayments": stats.get("pendingCount", 0),
+        "duePaymentAmountFormatted": format_rupees(stats.get("pendingAmountPaise", 0)),
+        "checkInsToday": check_ins_today,
+        "totalStaff": stats.get("totalStaff", 0),
+        "availableStaff": stats.get("availableStaff", 0),
+    }
+
+
 @router.get("/stats")
 async def get_dashboard_stats(request: Request, property_id: str):
-    """Get aggregated dashboard statistics for a specific property"""
+    """
+    Get aggregated dashboard statistics for a property, or for every property
+    the user has access to with property_id=all (totals plus a per-property breakdown)
+    """
     property_ids = getattr(request.state, "property_ids", [])
-    
+
+    if property_id == ALL_PROPERTIES:
+        # One $in read over the materialized stats documents
+        stats_by_property = await DashboardStatsService.get_stats_many(property_ids)
+        data = _format_stats(DashboardStatsService.rollup(stats_by_property.values()))
+        data["propertyCount"] = len(stats_by_property)
+        data["properties"] = [
+            {"propertyId": pid, **_format_stats(stats)} for pid, stats in stats_by_property.items()
+        ]
+        return {"data": data}
+
     # Validate that the requested property_id belongs to the user
     if property_id not in property_ids:
         raise HTTPException(status_code=403, detail="You don't have access to this property")
-    
-    # Get collections
-    tenants_col = getCollection("tenants")
-    beds_col = getCollection("beds")
-    payments_col = getCollection("payments")
-    staff_col = getCollection("staff")
-    
-    # Count tenants for this property - separate active and vacated
-    # Handle tenants with missing tenantStatus field (treat as 'active' by default)
-    active_tenants_count = await tenants_col.count_documents({
-        "propertyId": property_id,
-        "archived": {"$ne": True},
-        "$or": [
-            {"tenantStatus": "active"},
-            {"tenantStatus": {"$exists": False}}  # Existing tenants without the field default to active
-        ]
-    })
-    vacated_tenants_count = await tenants_col.count_documents({
-        "propertyId": property_id,
-        "archived": {"$ne": True},
-        "tenantStatus": "vacated"
-    })
-    tenants_count = active_tenants_count  # Count only active tenants
-    
-    # Count beds and occupancy
-    total_beds = await beds_col.count_documents({"propertyId": property_id})
-    occupied_beds = await beds_col.count_documents({
-        "propertyId": property_id,
-        "status": "occupied"
-    })
-    
-    occupancy_rate = (occupied_beds / total_beds * 100) if total_beds > 0 else 0
-    
-    # Get current month dates
-    today = datetime.now()
-    month_start = datetime(today.year, today.month, 1).date()
-    # Get last day of month
-    if today.month == 12:
-        month_end = datetime(today.year + 1, 1, 1).date() - timedelta(days=1)
-    else:
-        month_end = datetime(today.year, today.month + 1, 1).date() - timedelta(days=1)
-    
-    month_start_str = month_start.isoformat()
-    month_end_str = month_end.isoformat()
-    
-    # Get revenue metrics
-    paid_payments = await payments_col.aggregate([
-        {
-            "$match": {
-                "propertyId": property_id,
-                "status": "paid",
-                "paidDate": {
-                    "$gte": month_start_str,
-                    "$lte": month_end_str
-                }
-            }
-        },
-        {
-            "$addFields": {
-                "amountNumeric": {
-                    "$toInt": {
-                        "$replaceAll": {
-                            "input": {
-                                "$replaceAll": {
-                                    "input": "$amount",
-                                    "find": "₹",
-                                    "replacement": ""
-                                }
-                            },
-                            "find": ",",
-                            "replacement": ""
-                        }
-                    }
-                }
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total": {"$sum": "$amountNumeric"}
-            }
-        }
-    ]).to_list(None)
-    
-    paid_this_month = paid_payments[0]["total"] if paid_payments else 0
-    
-    # Get pending payments
-    pending_payments = await payments_col.aggregate([
-        {
-            "$match": {
-                "propertyId": property_id,
-                "status": "due"
-            }
-        },
-        {
-            "$addFields": {
-                "amountNumeric": {
-                    "$toInt": {
-                        "$replaceAll": {
-                            "input": {
-                                "$replaceAll": {
-                                    "input": "$amount",
-                                    "find": "₹",
-                                    "replacement": ""
-                                }
-                            },
-                            "find": ",",
-                            "replacement": ""
-                        }
-                    }
-                }
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "count": {"$sum": 1},
-                "amount": {"$sum": "$amountNumeric"}
-            }
-        }
-    ]).to_list(None)
-    
-    pending_count = pending_payments[0]["count"] if pending_payments else 0
-    pending_amount = pending_payments[0]["amount"] if pending_payments else 0
-    
-    # Get monthly revenue (all paid in current month)
-    monthly_revenue = paid_this_month
-    
-    # Count check-ins today
-    today_start = datetime.combine(today.date(), datetime.min.time()).isoformat()
-    today_end = datetime.combine(today.date(), datetime.max.time()).isoformat()
-    
-    check_ins_today = await tenants_col.count_documents({
-        "propertyId": property_id,
-        "joinDate": {
-            "$gte": today_start,
-            "$lte": today_end
-        }
-    })
-    
-    # Get staff info
-    total_staff = await staff_col.count_documents({
-        "propertyId": property_id,
-        "active": True
-    })
-    
-    available_staff = await staff_col.count_documents({
-        "propertyId": property_id,
-        "active": True,
-        "status": "available"
-    })
-    
-    return {
-        "data": {
-            "totalTenants": tenants_count,
-            "activeTenants": active_tenants_count,
-            "vacatedTenants": vacated_tenants_count,
-            "totalBeds": total_beds,
-            "occupiedBeds": occupied_beds,
-            "occupancyRate": round(occupancy_rate, 2),
-            "monthlyRevenue": monthly_revenue,
-            "monthlyRevenueFormatted": f"₹{monthly_revenue:,.0f}",
-            "pendingPayments": pending_count,
-            "duePaymentAmountFormatted": f"₹{pending_amount:,.0f}",
-            "checkInsToday": check_ins_today,
-            "totalStaff": total_staff,
-            "availableStaff": available_staff,
-        }
-    }
+
+    # Single _id lookup on the materialized stats document
+    stats = await DashboardStatsService.get_stats(property_id)
+    return {"data": _format_stats(stats)}
+
+
+@router.post("/stats/reconcile")
+async def reconcile_dashboard_stats(request: Request, property_id: Optional[str] = None):
+    """Rebuild dashboard stats from source collections and report any drift"""
+    property_ids = getattr(request.state, "property_ids", [])
+
+    if property_id is not None:
+        if property_id not in property_ids:
+            raise HTTPException(status_code=403, detail="You don't have access to this property")
+        property_ids = [property_id]
+
+    result = await DashboardStatsService.reconcile(property_ids)
+    return {"data": result}
@@ -2,6 +2,13 @@ from fastapi import APIRouter, status
 from fastapi.responses import JSONResponse
 from app.database.mongodb import db
 from app.config import settings
+from app.utils.auth_context_cache import auth_context_cache
+from app.utils.plan_cache import plan_cache
+from app.utils.email_queue import email_queue
+from app.utils.google_certs import google_cert_cache
+from app.database.token_blacklist import blacklist_stats
+from app.utils.otp_store import otp_backend
+from app.utils.attempt_tracking import attempt_tracking_stats
 
 router = APIRouter()
 
@@ -28,3 +35,38 @@ async def auth_config_health_check():
             }
         },
     }
+
+
+@router.get("/health/auth-cache", tags=["health"])
+async def auth_cache_stats():
+    return {"status": "ok", "authContextCache": auth_context_cache.stats()}
+
+
+@router.get("/health/plan-cache", tags=["health"])
+async def plan_cache_stats():
+    return {"status": "ok", "planCache": plan_cache.stats()}
+
+
+@router.get("/health/email-queue", tags=["health"])
+async def email_queue_stats():
+    return {"status": "ok", "emailQueue": email_queue.stats()}
+
+
+@router.get("/health/google-certs", tags=["health"])
+async def google_certs_stats():
+    return {"status": "ok", "googleCerts": google_cert_cache.stats()}
+
+
+@router.get("/health/token-blacklist", tags=["health"])
+async def token_blacklist_stats():
+    return {"status": "ok", "tokenBlacklist": blacklist_stats()}
+
+
+@router.get("/health/otp-store", tags=["health"])
+async def otp_store_stats():
+    return {"status": "ok", "otpStore": otp_backend.stats()}
+
+
+@router.get("/health/attempt-tracking", tags=["health"])
+async def attempt_tracking_health():
+    return {"status": "ok", "attemptTracking": attempt_tracking_stats()}
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, HTTPException, Body, Request, Query
+from fastapi.responses import StreamingResponse
 from typing import List
 from datetime import datetime, date
 from bson import ObjectId
 from ..models.payment_schema import Payment, PaymentCreate, PaymentUpdate, PaymentMethod
-from ..services.payment_service import PaymentService
+from ..services.payment_service import PaymentService, PAYMENT_EXPORT_FIELDS, PAYMENT_LIST_SORT
 from app.database.mongodb import getCollection
+from app.utils.pagination import apply_cursor, count_cache, list_meta, page_result, wants_total
+from app.utils.streaming import MEDIA_TYPES, buffered, encode_rows, gzip_stream, resolve_format
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 payment_service = PaymentService()
@@ -98,11 +101,61 @@ async def get_payment_methods():
     return {"data": methods}
 
 @router.get("/stats", response_model=dict)
-async def payment_stats(request: Request):
-    """Get payment statistics for the user's properties."""
+async def payment_stats(request: Request, breakdown: bool = False):
+    """Get payment statistics for the user's properties.
+
+    Pass breakdown=true to include per-property totals in the same response.
+    """
     property_ids = getattr(request.state, "property_ids", [])
+    if breakdown:
+        return await payment_service.get_payment_stats(property_ids=property_ids, include_breakdown=True)
     return await payment_service.get_payment_stats(property_ids=property_ids)
 
+def _due_date_bounds(startDate: str = None, endDate: str = None):
+    """YYYY-MM-DD bounds for a dueDate range given as dates or ISO datetimes"""
+    def to_date(value):
+        if not value:
+            return None
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date().isoformat()
+    return to_date(startDate), to_date(endDate)
+
+@router.get("/export")
+async def export_payments(
+    request: Request,
+    propertyId: str,
+    startDate: str = None,
+    endDate: str = None,
+    status: str = Query(default=None, pattern="^(paid|due)$"),
+    format: str = "csv",
+    gzip: bool = False,
+):
+    """
+    Stream the payment ledger of a property (dueDate range, inclusive) as CSV
+    or NDJSON, oldest first. gzip=true sends a .gz file compressed on the fly.
+    """
+    property_ids = getattr(request.state, "property_ids", [])
+    if propertyId not in property_ids:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        fmt = resolve_format(format)
+        start_date, end_date = _due_date_bounds(startDate, endDate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = payment_service.export_payments(propertyId, start_date, end_date, status)
+    body = buffered(encode_rows(rows, fmt, PAYMENT_EXPORT_FIELDS))
+    filename = f"payments-{propertyId}.{fmt}"
+    media_type = MEDIA_TYPES[fmt]
+    headers = {}
+    if gzip:
+        body = gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+        # Already compressed: keeps GZipMiddleware from compressing it again
+        headers["Content-Encoding"] = "identity"
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
 @router.get("", response_model=dict)
 async def list_payments(
     request: Request,
@@ -113,7 +166,14 @@ async def list_payments(
     page_size: int = 50,
     startDate: str = None,
     endDate: str = None,
+    cursor: str = None,
+    include_total: bool = None,
 ):
+    """
+    List payments by page number, or by `cursor` (meta.nextCursor of the
+    previous page) for keyset paging on (dueDate, createdAt, _id). Cursor
+    requests skip the total unless include_total=true.
+    """
     from datetime import datetime
 
     page = max(1, page)
@@ -128,7 +188,8 @@ async def list_payments(
                 "total": 0,
                 "page": page,
                 "pageSize": page_size,
-                "hasMore": False
+                "hasMore": False,
+                "nextCursor": None,
             }
         }
     
@@ -152,166 +213,43 @@ async def list_payments(
 
     if startDate or endDate:
         date_query = {}
-        if startDate:
-            start_datetime = datetime.fromisoformat(startDate.replace('Z', '+00:00'))
-            date_query["$gte"] = start_datetime.date().isoformat()
-        if endDate:
-            end_datetime = datetime.fromisoformat(endDate.replace('Z', '+00:00'))
-            date_query["$lte"] = end_datetime.date().isoformat()
+        start_date, end_date = _due_date_bounds(startDate, endDate)
+        if start_date:
+            date_query["$gte"] = start_date
+        if end_date:
+            date_query["$lte"] = end_date
         if date_query:
             match_stage["dueDate"] = date_query
 
     skip = (page - 1) * page_size
+
+    # Total over the whole filter, reused briefly across pages
+    total = None
+    if wants_total(include_total, cursor):
+        total = await count_cache.count(payment_service.collection, match_stage)
+
+    try:
+        page_match = apply_cursor(match_stage, PAYMENT_LIST_SORT, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cursor:
+        skip = 0
     
-    # Get total count
-    count_pipeline = [
-        {"$match": match_stage},
-        {"$count": "total"}
-    ]
-    count_result = await payment_service.collection.aggregate(count_pipeline).to_list(1)
-    total = count_result[0]["total"] if count_result else 0
+    # Single aggregation pipeline replaces all N+1 queries; one extra row tells whether more pages exist
+    pipeline = PaymentService.build_list_pipeline(page_match, skip, page_size + 1)
     
-    # Single aggregation pipeline replaces all N+1 queries
-    pipeline = [
-        {"$match": match_stage},
-        {"$sort": {"dueDate": -1, "createdAt": -1}},  # Sort by latest due date first, then by creation date
-        {"$skip": skip},
-        {"$limit": page_size},
-        # Lookup tenant name
-        {
-            "$lookup": {
-                "from": "tenants",
-                "let": {"tenantId": "$tenantId"},
-                "as": "tenant",
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": [
-                                    {"$toString": "$_id"},
-                                    {"$toString": "$$tenantId"}
-                                ]
-                            }
-                        }
-                    },
-                    {"$project": {"_id": 1, "name": 1, "roomId": 1, "tenantStatus": 1}}
-                ]
-            }
-        },
-        # Lookup bed and room info
-        {
-            "$lookup": {
-                "from": "beds",
-                "let": {"bedId": "$bed"},
-                "as": "bed_info",
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": [
-                                    {"$toString": "$_id"},
-                                    {"$toString": "$$bedId"}
-                                ]
-                            }
-                        }
-                    },
-                    {
-                        "$lookup": {
-                            "from": "rooms",
-                            "let": {"roomId": "$roomId"},
-                            "as": "room_info",
-                            "pipeline": [
-                                {
-                                    "$match": {
-                                        "$expr": {
-                                            "$eq": [
-                                                {"$toString": "$_id"},
-                                                {"$toString": "$$roomId"}
-                                            ]
-                                        }
-                                    }
-                                },
-                                {"$project": {"roomNumber": 1}}
-                            ]
-                        }
-                    },
-                    {
-                        "$project": {
-                            "_id": 1,
-                            "roomNumber": {"$arrayElemAt": ["$room_info.roomNumber", 0]}
-                        }
-                    }
-                ]
-            }
-        },
-        # Fallback: resolve room directly from tenant.roomId for older/incomplete payment records
-        {
-            "$lookup": {
-                "from": "rooms",
-                "let": {"tenantRoomId": {"$arrayElemAt": ["$tenant.roomId", 0]}},
-                "as": "tenant_room_info",
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$eq": [
-                                    {"$toString": "$_id"},
-                                    {"$toString": "$$tenantRoomId"}
-                                ]
-                            }
-                        }
-                    },
-                    {"$project": {"roomNumber": 1}}
-                ]
-            }
-        },
-        # Project final output
-        {
-            "$project": {
-                "_id": 1,
-                "tenantId": 1,
-                "propertyId": 1,
-                "bed": 1,
-                "amount": 1,
-                "status": 1,
-                "dueDate": 1,
-                "paidDate": 1,
-                "method": 1,
-                "createdAt": 1,
-                "updatedAt": 1,
-                "tenantName": {"$arrayElemAt": ["$tenant.name", 0]},
-                "tenantStatus": {"$arrayElemAt": ["$tenant.tenantStatus", 0]},
-                "roomNumber": {
-                    "$ifNull": [
-                        {"$arrayElemAt": ["$bed_info.roomNumber", 0]},
-                        {
-                            "$ifNull": [
-                                {"$arrayElemAt": ["$tenant_room_info.roomNumber", 0]},
-                                "N/A"
-                            ]
-                        }
-                    ]
-                }
-            }
-        }
-    ]
-    
-    payments_cursor = await payment_service.collection.aggregate(pipeline).to_list(page_size)
+    docs = await payment_service.collection.aggregate(pipeline).to_list(page_size + 1)
+    docs, next_cursor = page_result(docs, page_size, PAYMENT_LIST_SORT)
     
     # Convert to Payment objects
     payments = []
-    for p in payments_cursor:
+    for p in docs:
         p["id"] = str(p["_id"])
         payments.append(Payment(**p))
     
     return {
         "data": payments,
-        "meta": {
-            "total": total,
-            "page": page,
-            "pageSize": page_size,
-            "hasMore": (skip + len(payments)) < total
-        }
+        "meta": list_meta(total, page, page_size, next_cursor),
     }
 
 @router.get("/{payment_id}", response_model=Payment)
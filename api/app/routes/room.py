@@ -1,31 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from app.services.room_service import RoomService
 from app.services.subscription_enforcement import SubscriptionEnforcement
-from app.models.room_schema import Room
+from app.models.room_schema import Room, RoomBulkCreate
 from app.database.mongodb import db
+from app.utils.search_terms import SEARCH_TERMS_FIELD, search_filter
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 room_service = RoomService()
 
 @router.get("")
 @router.get("/")
-async def get_rooms(request: Request, property_id: str = None, search: str = None, page: int = 1, page_size: int = 50):
+async def get_rooms(request: Request, property_id: str = None, search: str = None, page: int = 1, page_size: int = 50, search_mode: str = "prefix"):
     property_ids = getattr(request.state, "property_ids", [])
     query = {"propertyId": {"$in": property_ids}}
     if property_id:
         query["propertyId"] = property_id
-    if search:
-        query["$or"] = [
-            {"roomNumber": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+    try:
+        # roomNumber/description by word prefix, or whole words with search_mode=text
+        query.update(search_filter(search, search_mode))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     page = max(1, page)
     page_size = min(100, max(1, page_size))  # Cap at 100 per page
     skip = (page - 1) * page_size
     
     total = await room_service.collection.count_documents(query)
-    rooms = await room_service.collection.find(query).skip(skip).limit(page_size).to_list(length=page_size)
+    rooms = await room_service.collection.find(query, {SEARCH_TERMS_FIELD: 0}).skip(skip).limit(page_size).to_list(length=page_size)
     
     for doc in rooms:
         doc["id"] = str(doc["_id"])
@@ -81,6 +82,35 @@ async def create_room(request: Request, room: Room):
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error creating room. Please try again.")
 
+@router.post("/bulk")
+async def create_rooms_bulk(request: Request, payload: RoomBulkCreate):
+    """Provision many rooms and their beds in one transaction"""
+    try:
+        user_id = getattr(request.state, "user_id", None)
+        property_ids = getattr(request.state, "property_ids", [])
+        if payload.propertyId not in property_ids:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden: Property not accessible by user.")
+
+        await SubscriptionEnforcement.ensure_can_create_room(user_id, payload.propertyId, count=len(payload.rooms))
+
+        result = await room_service.create_rooms_bulk(
+            payload.propertyId, [room.model_dump() for room in payload.rooms]
+        )
+        return {
+            "data": [room.model_dump() for room in result["rooms"]],
+            "meta": {
+                "roomsCreated": result["roomsCreated"],
+                "bedsCreated": result["bedsCreated"],
+                "timingsMs": result["timingsMs"],
+            },
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error creating rooms. Please try again.")
+
 @router.patch("/{room_id}")
 async def patch_room(request: Request, room_id: str, room: Room):
     try:
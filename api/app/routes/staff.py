@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Request
 from app.services.staff_service import StaffService
 from app.services.subscription_enforcement import SubscriptionEnforcement
 from app.models.staff_schema import StaffCreate, StaffUpdate
+from app.utils.pagination import list_meta, wants_total
 
 router = APIRouter(prefix="/staff", tags=["staff"])
 staff_service = StaffService()
@@ -15,35 +16,39 @@ async def get_staff(
     role: str = None,
     page: int = 1,
     page_size: int = 50,
+    cursor: str = None,
+    include_total: bool = None,
+    search_mode: str = "prefix",
 ):
-    """Get list of staff members"""
+    """
+    Get list of staff members.
+
+    Pass `cursor` (meta.nextCursor of the previous page) for keyset paging;
+    the total is then only computed when include_total=true.
+    """
     page = max(1, page)
     page_size = min(100, max(1, page_size))
     skip = (page - 1) * page_size
 
-    staff_list, total = await staff_service.get_staff_list(
-        property_id=property_id,
-        search=search,
-        role=role,
-        skip=skip,
-        limit=page_size,
-    )
-
     property_ids = getattr(request.state, "property_ids", [])
-    filtered = (
-        [s for s in staff_list if s.propertyId and s.propertyId in property_ids]
-        if property_id is None
-        else staff_list
-    )
+    try:
+        staff_list, total, next_cursor = await staff_service.get_staff_list(
+            property_id=property_id,
+            search=search,
+            search_mode=search_mode,
+            role=role,
+            skip=skip,
+            limit=page_size,
+            property_ids=property_ids,
+            cursor=cursor,
+            include_total=wants_total(include_total, cursor),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
-        "data": [staff.model_dump(exclude_none=True) for staff in filtered],
-        "meta": {
-            "total": total,
-            "page": page,
-            "pageSize": page_size,
-            "hasMore": skip + page_size < total,
-        },
+        "data": [staff.model_dump(exclude_none=True) for staff in staff_list],
+        "meta": list_meta(total, page, page_size, next_cursor),
     }
 
 
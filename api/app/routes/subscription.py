@@ -7,6 +7,7 @@ from app.services.subscription_lifecycle import SubscriptionLifecycle
 from app.services.razorpay_service import RazorpayService
 from app.services.coupon_service import CouponService
 from app.services.razorpay_webhook_service import RazorpayWebhookService
+from app.config import settings
 
 router = APIRouter(prefix="/subscription", tags=["subscription"])
 
@@ -200,7 +201,7 @@ async def create_checkout_session(
                 "discountAmount": discount_amount,
                 "couponCode": coupon_code if coupon_code else None,
                 "currency": order_doc.currency,
-                "keyId": RazorpayService.client.auth[0]
+                "keyId": settings.RAZORPAY_KEY_ID
             }
         }
     except HTTPException:
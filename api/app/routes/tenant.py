@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Request
+from fastapi import APIRouter, HTTPException, Query, status, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from app.services.tenant_service import TenantService
 from app.services.subscription_enforcement import SubscriptionEnforcement
 from app.models.tenant_schema import TenantCreate, TenantUpdate
+from app.utils.pagination import list_meta, wants_total
+from app.utils.streaming import MEDIA_TYPES, buffered, encode_rows, iter_file, iter_records, ndjson_line, resolve_format, spool
 
 router = APIRouter(prefix="/tenants", tags=["tenants"])
 tenant_service = TenantService()
@@ -14,8 +18,16 @@ async def get_tenants(
     status: str = None,
     page: int = 1,
     page_size: int = 50,
-    sort: str = None
+    sort: str = None,
+    cursor: str = None,
+    include_total: bool = None,
+    search_mode: str = "prefix",
 ):
+    """
+    List tenants by page number, or by `cursor` (meta.nextCursor of the
+    previous page) for keyset paging. Cursor requests skip the total unless
+    include_total=true.
+    """
     page = max(1, page)
     page_size = min(100, max(1, page_size))  # Cap at 100 per page
     skip = (page - 1) * page_size
@@ -28,7 +40,8 @@ async def get_tenants(
                 "total": 0,
                 "page": page,
                 "pageSize": page_size,
-                "hasMore": False
+                "hasMore": False,
+                "nextCursor": None,
             }
         }
 
@@ -37,27 +50,78 @@ async def get_tenants(
 
     scoped_property_ids = [property_id] if property_id else property_ids
     
-    tenants, total = await tenant_service.get_tenants(
-        property_id=property_id,
-        search=search,
-        status=status,
-        skip=skip,
-        limit=page_size,
-        include_room_bed=True,  # Enrich with room/bed data
-        property_ids=scoped_property_ids,
-        sort=sort,
-    )
+    try:
+        tenants, total, next_cursor = await tenant_service.get_tenants(
+            property_id=property_id,
+            search=search,
+            search_mode=search_mode,
+            status=status,
+            skip=skip,
+            limit=page_size,
+            include_room_bed=True,  # Enrich with room/bed data
+            property_ids=scoped_property_ids,
+            sort=sort,
+            cursor=cursor,
+            include_total=wants_total(include_total, cursor),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "data": [tenant.model_dump(exclude_none=True) for tenant in tenants],
-        "meta": {
-            "total": total,
-            "page": page,
-            "pageSize": page_size,
-            "hasMore": skip + page_size < total
-        }
+        "meta": list_meta(total, page, page_size, next_cursor),
     }
 
+@router.post("/import")
+async def import_tenants(request: Request, property_id: str, format: str = None):
+    """
+    Bulk-create tenants from a CSV or NDJSON request body (format defaults
+    from the Content-Type). Rows take the POST /tenants fields, plus
+    roomNumber/bedNumber as an alternative to roomId/bedId; CSV columns use
+    dotted names for billingConfig (billingConfig.status, ...).
+
+    The body is spooled to a temp file first, then parsed row by row while
+    results stream back as NDJSON: one line per row, then a {"summary": ...}
+    line.
+    """
+    property_ids = getattr(request.state, "property_ids", [])
+    if property_id not in property_ids:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    try:
+        fmt = resolve_format(format, request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One quota check for the whole import; rows past the limit are rejected individually
+    user_id = getattr(request.state, "user_id", None)
+    remaining = await SubscriptionEnforcement.ensure_can_create_tenant(user_id, property_id)
+
+    upload = await spool(request.stream())
+    results = tenant_service.import_tenants(property_id, iter_records(iter_file(upload), fmt), max_new=remaining)
+    return StreamingResponse(
+        (ndjson_line(result) async for result in results),
+        media_type=MEDIA_TYPES["ndjson"],
+        background=BackgroundTask(upload.close),
+    )
+
+@router.get("/export")
+async def export_tenants(request: Request, property_id: str, format: str = "csv", tenant_status: str = Query(None, alias="status")):
+    """Stream every tenant of a property as CSV (importable again) or NDJSON"""
+    property_ids = getattr(request.state, "property_ids", [])
+    if property_id not in property_ids:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    try:
+        fmt = resolve_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = tenant_service.export_tenants(property_id, tenant_status)
+    return StreamingResponse(
+        buffered(encode_rows(rows, fmt, TenantService.EXPORT_FIELDS)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="tenants-{property_id}.{fmt}"'},
+    )
+
 @router.get("/{tenant_id}")
 async def get_tenant(request: Request, tenant_id: str):
     tenant = await tenant_service.get_tenant(tenant_id)
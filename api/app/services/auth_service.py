@@ -6,15 +6,13 @@ from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 import random
 import time
-from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as google_requests
 
 from app.database.mongodb import db
 from app.database.token_blacklist import blacklist_token, is_token_blacklisted
 from app.config import settings
 from app.utils.helpers import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     SECRET_KEY,
@@ -29,8 +27,10 @@ from app.utils.attempt_tracking import (
     reset_otp_attempts,
     delete_otp_attempts,
 )
-from app.utils.email_service import send_otp_email
-from app.utils.otp_memory_store import (
+from app.utils.email_queue import email_queue
+from app.utils.google_certs import GoogleCertsUnavailable, google_cert_cache
+from app.utils.auth_context_cache import auth_context_cache
+from app.utils.otp_store import (
     generate_and_store_otp,
     get_otp,
     verify_otp,
@@ -56,7 +56,7 @@ def _get_google_client_ids() -> list[str]:
     return [client_id.strip() for client_id in settings.GOOGLE_CLIENT_IDS.split(",") if client_id.strip()]
 
 
-def _verify_google_id_token(id_token: str) -> dict:
+async def _verify_google_id_token(id_token: str) -> dict:
     if not id_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Google idToken is required")
 
@@ -67,19 +67,15 @@ def _verify_google_id_token(id_token: str) -> dict:
             detail="Google sign-in is not configured on server",
         )
 
-    last_error = None
-    token_info = None
-    request_adapter = google_requests.Request()
-
-    for audience in allowed_client_ids:
-        try:
-            token_info = google_id_token.verify_oauth2_token(id_token, request_adapter, audience=audience)
-            break
-        except Exception as exc:
-            last_error = exc
-
-    if not token_info:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Google token") from last_error
+    try:
+        token_info = await google_cert_cache.verify_id_token(id_token, audience=allowed_client_ids)
+    except GoogleCertsUnavailable as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google sign-in is temporarily unavailable",
+        ) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Google token") from exc
 
     issuer = token_info.get("iss")
     if issuer not in ["accounts.google.com", "https://accounts.google.com"]:
@@ -156,7 +152,7 @@ async def register_user_service(user: UserCreate):
         "name": user.name,
         "email": normalized_email,
         "phone": user.phone,
-        "password": hash_password(user.password),
+        "password": await hash_password_async(user.password),
         "role": "propertyowner",
         "isVerified": True,
         "isEmailVerified": True,
@@ -206,7 +202,7 @@ async def login_user_service(data: UserLogin):
     
     # SECURITY: Verify password AND check user existence together
     # This prevents timing attacks that could reveal if email exists
-    if not user or not verify_password(data.password, user.get("password", "")):
+    if not user or not await verify_password_async(data.password, user.get("password", "")):
         failed_count = await increment_login_attempts(normalized_email)
         remaining_attempts = 5 - failed_count
         
@@ -254,6 +250,7 @@ async def login_user_service(data: UserLogin):
         {"_id": user["_id"]},
         {"$set": {"lastLogin": now, "updatedAt": now}},
     )
+    await auth_context_cache.invalidate(user["_id"])
 
     user_id = str(user["_id"])
     
@@ -266,7 +263,7 @@ async def login_user_service(data: UserLogin):
 
 async def google_sign_in_service(payload):
     now = datetime.now(timezone.utc)
-    token_info = _verify_google_id_token(payload.idToken)
+    token_info = await _verify_google_id_token(payload.idToken)
 
     email = token_info.get("email")
     name = token_info.get("name") or token_info.get("given_name") or "Google User"
@@ -281,7 +278,7 @@ async def google_sign_in_service(payload):
         user_doc = {
             "name": name,
             "email": email,
-            "password": hash_password(f"google-{random.randint(100000, 999999)}"),
+            "password": await hash_password_async(f"google-{random.randint(100000, 999999)}"),
             "role": "propertyowner",
             "isVerified": True,
             "isDeleted": False,
@@ -317,6 +314,7 @@ async def google_sign_in_service(payload):
             }
         },
     )
+    await auth_context_cache.invalidate(user["_id"])
 
     user_id = str(user["_id"])
     response = _build_auth_payload(user, user_id)
@@ -367,15 +365,15 @@ async def send_email_otp_service(email: str):
             detail="Email already verified. Please proceed to complete registration."
         )
     
-    # Generate OTP and store in memory
+    # Generate OTP and store it
     otp, is_new = await generate_and_store_otp(normalized_email, "registration")
     
-    # Send OTP via Zoho Zepto Mail
-    email_sent = await send_otp_email(normalized_email, otp)
+    # Queue OTP email for background delivery via Zoho Zepto Mail
+    email_queued = await email_queue.enqueue("otp", normalized_email, otp=otp)
     
-    if not email_sent:
-        # Log warning but don't fail the request - OTP is stored in memory
-        print(f"[WARNING] Failed to send OTP email to {normalized_email}, but OTP stored in memory: {otp}")
+    if not email_queued:
+        # Log warning but don't fail the request - OTP is stored
+        print(f"[WARNING] Could not queue OTP email to {normalized_email}, but OTP stored")
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -394,7 +392,7 @@ async def verify_email_otp_service(email: str, otp: str, otp_type: str = "regist
 
     normalized_email = email.strip().lower()
 
-    # Verify OTP using in-memory store
+    # Verify OTP against the OTP store
     is_valid, error_message = await verify_otp(normalized_email, otp, otp_type=otp_type)
     if not is_valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_message)
@@ -445,18 +443,25 @@ async def get_current_user_service(request: Request):
     return JSONResponse(status_code=status.HTTP_200_OK, content={"data": user_out.model_dump()})
 
 
+def _token_expiry(claims: dict) -> datetime:
+    return datetime.fromtimestamp(claims["exp"], timezone.utc)
+
+
 async def refresh_token_service(payload):
     refresh_token = payload.refreshToken
     if not refresh_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing refresh token")
 
-    if await is_token_blacklisted(refresh_token):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is invalidated (blacklisted)")
-
     try:
         decoded = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
         if decoded.get("type") != "refresh":
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
+        jti = decoded.get("jti")
+        if not jti:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+        if await is_token_blacklisted(jti):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is invalidated (blacklisted)")
 
         user_id = decoded.get("sub")
         user = await users_collection.find_one({"_id": ObjectId(user_id)})
@@ -467,7 +472,9 @@ async def refresh_token_service(payload):
         if user.get("isDeleted"):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is deleted")
 
-        await blacklist_token(refresh_token)
+        # Rotation: consuming the token revokes it; losing the insert race means it was already used
+        if not await blacklist_token(jti, _token_expiry(decoded)):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is invalidated (blacklisted)")
         new_refresh_token = create_refresh_token({"sub": user_id})
         token = create_access_token({"sub": user_id})
         expires_at = int(time.time()) + 60 * 60 * 24 * 30
@@ -503,7 +510,15 @@ async def logout_user_service(payload):
     if not refresh_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing refresh token")
 
-    await blacklist_token(refresh_token)
+    try:
+        decoded = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        # Forged or already expired: there is nothing left to revoke
+        return {"success": True}
+    if decoded.get("type") != "refresh" or not decoded.get("jti"):
+        return {"success": True}
+
+    await blacklist_token(decoded["jti"], _token_expiry(decoded))
     return {"success": True}
 
 
@@ -535,20 +550,21 @@ async def forgot_password_service(email: str):
             },
         )
 
-    # Generate OTP and store in memory with type password_reset
+    # Generate OTP and store it with type password_reset
     otp, is_new = await generate_and_store_otp(normalized_email, "password_reset")
 
-    # Send OTP via Zoho Zepto Mail
-    email_sent = await send_otp_email(
+    # Queue OTP email for background delivery via Zoho Zepto Mail
+    email_queued = await email_queue.enqueue(
+        "otp",
         normalized_email,
-        otp,
+        otp=otp,
         app_name="Hostel Manager",
         otp_type="password_reset",
     )
     
-    if not email_sent:
-        # Log warning but don't fail the request - OTP is stored in memory
-        print(f"[WARNING] Failed to send password reset OTP email to {normalized_email}, but OTP stored in memory: {otp}")
+    if not email_queued:
+        # Log warning but don't fail the request - OTP is stored
+        print(f"[WARNING] Could not queue password reset OTP email to {normalized_email}, but OTP stored")
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -577,7 +593,7 @@ async def reset_password_service(email: str, otp: str, new_password: str):
     normalized_email = email.strip().lower()
     now = datetime.now(timezone.utc)
 
-    # Verify OTP using in-memory store
+    # Verify OTP against the OTP store
     is_valid, error_message = await verify_otp(normalized_email, otp, otp_type="password_reset")
     if not is_valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_message)
@@ -597,7 +613,7 @@ async def reset_password_service(email: str, otp: str, new_password: str):
         )
 
     # Update user password
-    hashed_password = hash_password(new_password)
+    hashed_password = await hash_password_async(new_password)
     await users_collection.update_one(
         {"_id": user["_id"]},
         {
@@ -607,8 +623,9 @@ async def reset_password_service(email: str, otp: str, new_password: str):
             }
         }
     )
+    await auth_context_cache.invalidate(user["_id"])
 
-    # Delete the OTP from memory after successful reset
+    # Delete the OTP after successful reset
     await delete_otp(normalized_email)
 
     return JSONResponse(
@@ -657,7 +674,7 @@ async def change_password_service(request: Request, old_password: str, new_passw
     if user.get("isDeleted"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is deleted")
 
-    if not verify_password(old_password, user.get("password", "")):
+    if not await verify_password_async(old_password, user.get("password", "")):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Old password is incorrect")
 
     now = datetime.now(timezone.utc)
@@ -665,11 +682,12 @@ async def change_password_service(request: Request, old_password: str, new_passw
         {"_id": user_id},
         {
             "$set": {
-                "password": hash_password(new_password),
+                "password": await hash_password_async(new_password),
                 "updatedAt": now,
             }
         },
     )
+    await auth_context_cache.invalidate(user_id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
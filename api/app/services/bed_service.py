@@ -2,21 +2,30 @@
 import uuid
 from datetime import datetime, timezone
 from typing import List, Optional
+from pymongo import ReturnDocument
 from app.database.mongodb import db
+from app.services.dashboard_stats_service import DashboardStatsService
+from app.utils.refs import with_refs, BED_REFS
 from app.models.bed_schema import BedCreate, BedUpdate, BedOut
 
 class BedService:
     def __init__(self):
         self.db = db
 
-    async def create_bed(self, bed: BedCreate) -> BedOut:
-        now = datetime.now(timezone.utc).isoformat()
+    @staticmethod
+    def build_bed_doc(bed: BedCreate, now: str) -> dict:
+        """New bed document, as stored by create_bed and bulk room provisioning"""
         doc = bed.model_dump()
         doc["createdAt"] = now
         doc["updatedAt"] = now
         doc["id"] = str(uuid.uuid4())
         doc["isDeleted"] = False
+        return with_refs(doc, BED_REFS)
+
+    async def create_bed(self, bed: BedCreate) -> BedOut:
+        doc = self.build_bed_doc(bed, datetime.now(timezone.utc).isoformat())
         await self.db["beds"].insert_one(doc)
+        await DashboardStatsService.apply_change("beds", None, doc)
         return BedOut(**doc)
 
     async def get_bed(self, bed_id: str) -> Optional[BedOut]:
@@ -43,23 +52,27 @@ class BedService:
         for protected_key in ["isDeleted"]:
             update_data.pop(protected_key, None)
 
+        # Fetch the pre-image so the dashboard stats delta can be applied
         try:
-            result = await self.db["beds"].find_one_and_update(
+            original = await self.db["beds"].find_one_and_update(
                 {"_id": ObjectId(bed_id), "isDeleted": {"$ne": True}},
                 {"$set": update_data},
-                return_document=True
+                return_document=ReturnDocument.BEFORE
             )
-            if result:
-                result["id"] = str(result["_id"])
+            if original:
+                result = {**original, **update_data, "id": str(original["_id"])}
+                await DashboardStatsService.apply_change("beds", original, result)
                 return BedOut(**result)
         except:
             # If ObjectId conversion fails, try by id field
-            result = await self.db["beds"].find_one_and_update(
+            original = await self.db["beds"].find_one_and_update(
                 {"id": bed_id, "isDeleted": {"$ne": True}},
                 {"$set": update_data},
-                return_document=True
+                return_document=ReturnDocument.BEFORE
             )
-            if result:
+            if original:
+                result = {**original, **update_data}
+                await DashboardStatsService.apply_change("beds", original, result)
                 return BedOut(**result)
         return None
 
@@ -67,18 +80,20 @@ class BedService:
         from bson import ObjectId
         now = datetime.now(timezone.utc).isoformat()
         try:
-            result = await self.db["beds"].update_one(
+            original = await self.db["beds"].find_one_and_update(
                 {"_id": ObjectId(bed_id), "isDeleted": {"$ne": True}},
                 {"$set": {"isDeleted": True, "updatedAt": now}}
             )
-            return result.modified_count == 1
         except:
             # If ObjectId conversion fails, try by id field
-            result = await self.db["beds"].update_one(
+            original = await self.db["beds"].find_one_and_update(
                 {"id": bed_id, "isDeleted": {"$ne": True}},
                 {"$set": {"isDeleted": True, "updatedAt": now}}
             )
-            return result.modified_count == 1
+        if not original:
+            return False
+        await DashboardStatsService.apply_change("beds", original, None)
+        return True
 
     async def get_available_beds_with_rooms(self, property_id: str) -> List[dict]:
         """Get all available beds for a property, grouped by rooms with room information"""
@@ -0,0 +1,427 @@
+"""
+Dashboard Stats Service
+Maintains one materialized `dashboard_stats` document per property so
+GET /dashboard/stats is a single _id lookup instead of a scan of the
+tenants, beds, payments and staff collections.
+
+Every write path reports the affected document before and after the write;
+the difference of their counter contributions is applied with one `$inc`.
+Bulk writes that touch many documents rebuild the affected properties instead.
+`reconcile()` rebuilds documents from scratch and reports any drift.
+
+Rebuilds run one aggregation per source collection (a `$facet` where a
+collection feeds several counters), grouped by propertyId, so rebuilding one
+property or a whole batch costs the same four concurrent round trips.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+from app.database.mongodb import db
+from app.utils.money import PAYMENT_PAISE_EXPRESSION, payment_paise
+
+logger = logging.getLogger(__name__)
+
+STATS_COLLECTION = "dashboard_stats"
+
+# Scalar counters kept on every stats document
+COUNTER_FIELDS = [
+    "activeTenants",
+    "vacatedTenants",
+    "totalBeds",
+    "occupiedBeds",
+    "pendingCount",
+    "pendingAmountPaise",
+    "totalStaff",
+    "availableStaff",
+]
+# Counters bucketed by month (YYYY-MM) / day (YYYY-MM-DD)
+MAP_FIELDS = ["revenuePaiseByMonth", "checkInsByDate"]
+# Properties rebuilt per set of aggregations during reconciliation
+RECONCILE_BATCH_SIZE = 200
+
+
+def tenant_counters(doc: dict) -> Dict[str, float]:
+    if not doc or doc.get("isDeleted") or doc.get("archived"):
+        return {}
+    counters = {}
+    # Tenants without tenantStatus predate the field and are treated as active
+    tenant_status = doc.get("tenantStatus") or "active"
+    if tenant_status == "active":
+        counters["activeTenants"] = 1
+    elif tenant_status == "vacated":
+        counters["vacatedTenants"] = 1
+    if doc.get("joinDate"):
+        counters[f"checkInsByDate.{str(doc['joinDate'])[:10]}"] = 1
+    return counters
+
+
+def bed_counters(doc: dict) -> Dict[str, float]:
+    if not doc or doc.get("isDeleted"):
+        return {}
+    return {
+        "totalBeds": 1,
+        "occupiedBeds": 1 if doc.get("status") == "occupied" else 0,
+    }
+
+
+def payment_counters(doc: dict) -> Dict[str, float]:
+    if not doc or doc.get("isDeleted"):
+        return {}
+    amount_paise = payment_paise(doc)
+    if doc.get("status") == "due":
+        return {"pendingCount": 1, "pendingAmountPaise": amount_paise}
+    if doc.get("status") == "paid" and doc.get("paidDate"):
+        return {f"revenuePaiseByMonth.{str(doc['paidDate'])[:7]}": amount_paise}
+    return {}
+
+
+def staff_counters(doc: dict) -> Dict[str, float]:
+    if not doc or doc.get("archived") or doc.get("isDeleted"):
+        return {}
+    return {
+        "totalStaff": 1,
+        "availableStaff": 1 if doc.get("status", "active") == "active" else 0,
+    }
+
+
+COUNTERS_BY_KIND = {
+    "tenants": tenant_counters,
+    "beds": bed_counters,
+    "payments": payment_counters,
+    "staff": staff_counters,
+}
+
+
+def _normalize_number(value: float):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
+def _stats_document(property_id: str, totals: Dict[str, float]) -> dict:
+    """Shape flat counter totals ("field" / "mapField.key") as a stats document"""
+    stats = {field: 0 for field in COUNTER_FIELDS}
+    for field in MAP_FIELDS:
+        stats[field] = {}
+    for field, value in totals.items():
+        if "." in field:
+            map_field, key = field.split(".", 1)
+            if value:
+                stats[map_field][key] = _normalize_number(value)
+        else:
+            stats[field] = _normalize_number(value)
+    stats["_id"] = property_id
+    return stats
+
+
+# Aggregation equivalents of the *_counters functions. Keep them in step:
+# tests/test_dashboard_stats_service.py checks both give the same totals.
+def _missing_or_blank(field: str) -> dict:
+    return {"$eq": [{"$ifNull": [f"${field}", ""]}, ""]}
+
+
+def _prefix(field: str, length: int) -> dict:
+    return {"$substrCP": [{"$toString": f"${field}"}, 0, length]}
+
+
+_NOT_DELETED = {"isDeleted": {"$ne": True}}
+_NOT_ARCHIVED = {"archived": {"$ne": True}}
+_PRESENT = {"$nin": [None, ""]}
+
+
+def _compute_pipelines(property_ids: List[str]) -> Dict[str, list]:
+    scope = {"propertyId": {"$in": property_ids}}
+    tenant_status = {"$cond": [_missing_or_blank("tenantStatus"), "active", "$tenantStatus"]}
+    # staff_counters defaults only a missing status, not an explicit null
+    staff_status = {"$cond": [{"$eq": [{"$type": "$status"}, "missing"]}, "active", "$status"]}
+    return {
+        "tenants": [
+            {"$match": {**scope, **_NOT_DELETED, **_NOT_ARCHIVED}},
+            {"$facet": {
+                "status": [
+                    {"$group": {"_id": {"propertyId": "$propertyId", "status": tenant_status}, "count": {"$sum": 1}}},
+                ],
+                "checkIns": [
+                    {"$match": {"joinDate": _PRESENT}},
+                    {"$group": {"_id": {"propertyId": "$propertyId", "day": _prefix("joinDate", 10)}, "count": {"$sum": 1}}},
+                ],
+            }},
+        ],
+        "beds": [
+            {"$match": {**scope, **_NOT_DELETED}},
+            {"$group": {
+                "_id": "$propertyId",
+                "total": {"$sum": 1},
+                "occupied": {"$sum": {"$cond": [{"$eq": ["$status", "occupied"]}, 1, 0]}},
+            }},
+        ],
+        "payments": [
+            {"$match": {**scope, **_NOT_DELETED, "status": {"$in": ["due", "paid"]}}},
+            {"$facet": {
+                "pending": [
+                    {"$match": {"status": "due"}},
+                    {"$group": {
+                        "_id": "$propertyId",
+                        "count": {"$sum": 1},
+                        "amount": {"$sum": PAYMENT_PAISE_EXPRESSION},
+                    }},
+                ],
+                "revenue": [
+                    {"$match": {"status": "paid", "paidDate": _PRESENT}},
+                    {"$group": {
+                        "_id": {"propertyId": "$propertyId", "month": _prefix("paidDate", 7)},
+                        "amount": {"$sum": PAYMENT_PAISE_EXPRESSION},
+                    }},
+                ],
+            }},
+        ],
+        "staff": [
+            {"$match": {**scope, **_NOT_DELETED, **_NOT_ARCHIVED}},
+            {"$group": {
+                "_id": "$propertyId",
+                "total": {"$sum": 1},
+                "available": {"$sum": {"$cond": [{"$eq": [staff_status, "active"]}, 1, 0]}},
+            }},
+        ],
+    }
+
+
+def _fold_tenants(rows: list):
+    facets = rows[0] if rows else {}
+    for row in facets.get("status", []):
+        field = {"active": "activeTenants", "vacated": "vacatedTenants"}.get(row["_id"]["status"])
+        if field:
+            yield row["_id"]["propertyId"], field, row["count"]
+    for row in facets.get("checkIns", []):
+        yield row["_id"]["propertyId"], f"checkInsByDate.{row['_id']['day']}", row["count"]
+
+
+def _fold_beds(rows: list):
+    for row in rows:
+        yield row["_id"], "totalBeds", row["total"]
+        yield row["_id"], "occupiedBeds", row["occupied"]
+
+
+def _fold_payments(rows: list):
+    facets = rows[0] if rows else {}
+    for row in facets.get("pending", []):
+        yield row["_id"], "pendingCount", row["count"]
+        yield row["_id"], "pendingAmountPaise", row["amount"]
+    for row in facets.get("revenue", []):
+        yield row["_id"]["propertyId"], f"revenuePaiseByMonth.{row['_id']['month']}", row["amount"]
+
+
+def _fold_staff(rows: list):
+    for row in rows:
+        yield row["_id"], "totalStaff", row["total"]
+        yield row["_id"], "availableStaff", row["available"]
+
+
+_FOLDERS = {
+    "tenants": _fold_tenants,
+    "beds": _fold_beds,
+    "payments": _fold_payments,
+    "staff": _fold_staff,
+}
+
+
+class DashboardStatsService:
+    """Incrementally maintained per-property dashboard counters"""
+
+    @staticmethod
+    async def apply_changes(kind: str, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> None:
+        """
+        Apply counter deltas for a batch of (before, after) document pairs.
+
+        `before` is None for inserts and `after` is None for hard deletes.
+        Failures are logged and left for the reconciliation job, so a stats
+        update can never fail the write that triggered it.
+        """
+        counters_for = COUNTERS_BY_KIND[kind]
+        deltas: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+        for before, after in changes:
+            if before and before.get("propertyId"):
+                for field, value in counters_for(before).items():
+                    deltas[str(before["propertyId"])][field] -= value
+            if after and after.get("propertyId"):
+                for field, value in counters_for(after).items():
+                    deltas[str(after["propertyId"])][field] += value
+
+        now = datetime.now(timezone.utc).isoformat()
+        for property_id, fields in deltas.items():
+            inc = {field: _normalize_number(value) for field, value in fields.items() if value}
+            if not inc:
+                continue
+            try:
+                await db[STATS_COLLECTION].update_one(
+                    {"_id": property_id},
+                    {"$inc": inc, "$set": {"updatedAt": now}},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.error(f"Failed to update dashboard stats for {property_id}: {str(e)}")
+
+    @staticmethod
+    async def apply_change(kind: str, before: Optional[dict], after: Optional[dict]) -> None:
+        await DashboardStatsService.apply_changes(kind, [(before, after)])
+
+    @staticmethod
+    async def compute_many(property_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Compute stats documents for several properties from scratch.
+
+        One aggregation per source collection, grouped by propertyId and run
+        concurrently, so the cost is four round trips whatever the number of
+        properties. The pipelines mirror the *_counters functions above.
+        """
+        property_ids = list(dict.fromkeys(str(pid) for pid in property_ids if pid))
+        if not property_ids:
+            return {}
+        pipelines = _compute_pipelines(property_ids)
+        results = await asyncio.gather(*(
+            db[kind].aggregate(pipeline).to_list(length=None) for kind, pipeline in pipelines.items()
+        ))
+
+        totals: Dict[str, Dict[str, float]] = {pid: defaultdict(float) for pid in property_ids}
+        for kind, rows in zip(pipelines, results):
+            for property_id, field, value in _FOLDERS[kind](rows):
+                if property_id in totals:
+                    totals[property_id][field] += value
+        return {property_id: _stats_document(property_id, fields) for property_id, fields in totals.items()}
+
+    @staticmethod
+    async def compute(property_id: str) -> dict:
+        """Compute the stats document for a property from scratch."""
+        return (await DashboardStatsService.compute_many([property_id]))[str(property_id)]
+
+    @staticmethod
+    async def _store(stats_by_property: Dict[str, dict]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        operations = []
+        for stats in stats_by_property.values():
+            stats["updatedAt"] = now
+            stats["rebuiltAt"] = now
+            operations.append(ReplaceOne({"_id": stats["_id"]}, stats, upsert=True))
+        if operations:
+            await db[STATS_COLLECTION].bulk_write(operations, ordered=False)
+
+    @staticmethod
+    async def rebuild(property_id: str) -> dict:
+        """Recompute and store the stats document for a property."""
+        stats = await DashboardStatsService.compute(property_id)
+        await DashboardStatsService._store({stats["_id"]: stats})
+        return stats
+
+    @staticmethod
+    async def rebuild_many(property_ids: Iterable[str]) -> Dict[str, dict]:
+        property_ids = [str(pid) for pid in property_ids if pid]
+        try:
+            stats_by_property = await DashboardStatsService.compute_many(property_ids)
+            await DashboardStatsService._store(stats_by_property)
+            return stats_by_property
+        except Exception as e:
+            logger.error(f"Failed to rebuild dashboard stats for {property_ids}: {str(e)}")
+            return {}
+
+    @staticmethod
+    async def delete(property_id: str) -> None:
+        await db[STATS_COLLECTION].delete_one({"_id": property_id})
+
+    @staticmethod
+    async def get_stats(property_id: str) -> dict:
+        """Single indexed read; builds the document on first access."""
+        stats = await db[STATS_COLLECTION].find_one({"_id": property_id})
+        if not stats:
+            stats = await DashboardStatsService.rebuild(property_id)
+        return stats
+
+    @staticmethod
+    async def get_stats_many(property_ids: Iterable[str]) -> Dict[str, dict]:
+        """One $in read for all properties; missing documents are built together."""
+        property_ids = list(dict.fromkeys(str(pid) for pid in property_ids if pid))
+        found = {
+            doc["_id"]: doc
+            async for doc in db[STATS_COLLECTION].find({"_id": {"$in": property_ids}})
+        }
+        missing = [pid for pid in property_ids if pid not in found]
+        if missing:
+            found.update(await DashboardStatsService.rebuild_many(missing))
+        return {pid: found[pid] for pid in property_ids if pid in found}
+
+    @staticmethod
+    def rollup(stats_documents: Iterable[dict]) -> dict:
+        """Sum several properties' stats documents into one."""
+        totals: Dict[str, float] = defaultdict(float)
+        for stats in stats_documents:
+            for field in COUNTER_FIELDS:
+                totals[field] += stats.get(field, 0) or 0
+            for map_field in MAP_FIELDS:
+                for key, value in (stats.get(map_field) or {}).items():
+                    totals[f"{map_field}.{key}"] += value or 0
+        return _stats_document("all", totals)
+
+    @staticmethod
+    def _diff(stored: Optional[dict], actual: dict) -> dict:
+        stored = stored or {}
+        drift = {}
+        for field in COUNTER_FIELDS:
+            stored_value = stored.get(field, 0) or 0
+            if abs(stored_value - actual[field]) > 0.005:
+                drift[field] = {"stored": stored_value, "actual": actual[field]}
+        for map_field in MAP_FIELDS:
+            stored_map = stored.get(map_field) or {}
+            actual_map = actual[map_field]
+            for key in set(stored_map) | set(actual_map):
+                stored_value = stored_map.get(key, 0) or 0
+                actual_value = actual_map.get(key, 0)
+                if abs(stored_value - actual_value) > 0.005:
+                    drift[f"{map_field}.{key}"] = {"stored": stored_value, "actual": actual_value}
+        return drift
+
+    @staticmethod
+    async def reconcile(property_ids: Optional[List[str]] = None) -> dict:
+        """
+        Rebuild stats documents from scratch and report drift.
+
+        Args:
+            property_ids: Properties to reconcile; all non-deleted properties when None
+
+        Returns: {"checked": int, "drifted": int, "drift": {propertyId: {field: {stored, actual}}}, "duration_ms": int}
+        """
+        start_time = time.time()
+        if property_ids is None:
+            property_ids = [
+                str(doc["_id"])
+                async for doc in db["properties"].find({"isDeleted": {"$ne": True}}, {"_id": 1})
+            ]
+
+        result = {"checked": 0, "drifted": 0, "drift": {}, "errors": []}
+        for offset in range(0, len(property_ids), RECONCILE_BATCH_SIZE):
+            batch = [str(pid) for pid in property_ids[offset:offset + RECONCILE_BATCH_SIZE]]
+            try:
+                stored = {doc["_id"]: doc async for doc in db[STATS_COLLECTION].find({"_id": {"$in": batch}})}
+                actual = await DashboardStatsService.compute_many(batch)
+                await DashboardStatsService._store(actual)
+            except Exception as e:
+                logger.error(f"[RECONCILE] Error for properties {batch}: {str(e)}")
+                result["errors"].extend({"propertyId": pid, "error": str(e)} for pid in batch)
+                continue
+            for property_id in batch:
+                result["checked"] += 1
+                drift = DashboardStatsService._diff(stored.get(property_id), actual[property_id])
+                if drift:
+                    result["drifted"] += 1
+                    result["drift"][property_id] = drift
+
+        result["duration_ms"] = int((time.time() - start_time) * 1000)
+        if result["drifted"]:
+            logger.warning(f"[RECONCILE] Dashboard stats drift in {result['drifted']}/{result['checked']} properties: {result['drift']}")
+        else:
+            logger.info(f"[RECONCILE] Dashboard stats consistent for {result['checked']} properties ({result['duration_ms']}ms)")
+        return result
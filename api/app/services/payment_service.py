@@ -1,8 +1,22 @@
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime, timezone
 from bson import ObjectId
 from ..models.payment_schema import Payment, PaymentCreate, PaymentStatus
+from app.config import settings
 from app.database.mongodb import getCollection
+from app.services.dashboard_stats_service import DashboardStatsService
+from app.utils.money import PAYMENT_PAISE_EXPRESSION, to_paise, format_rupees
+from app.utils.refs import object_id_or_none, ref_or_source, with_refs, PAYMENT_REFS
+
+# Payment list order; _id breaks ties so keyset cursors are stable
+PAYMENT_LIST_SORT = [("dueDate", -1), ("createdAt", -1), ("_id", -1)]
+# Ledger export order (oldest first), served by the same index walked backwards
+PAYMENT_EXPORT_SORT = [("dueDate", 1), ("createdAt", 1), ("_id", 1)]
+PAYMENT_EXPORT_FIELDS = [
+    "id", "dueDate", "paidDate", "status", "amount", "amountPaise", "method",
+    "tenantId", "tenantName", "tenantStatus", "roomNumber", "bed", "createdAt",
+]
 
 class PaymentService:
     def __init__(self):
@@ -15,10 +29,9 @@ class PaymentService:
             return Payment(**payment)
         return None
 
-    async def create_payment(self, payment_data: PaymentCreate) -> Payment:
-        from pymongo.errors import DuplicateKeyError
-        
-        now = datetime.now(timezone.utc)
+    @staticmethod
+    def build_payment_doc(payment_data: PaymentCreate, now: datetime) -> dict:
+        """New payment document, as stored by create_payment and bulk tenant import"""
         payment_dict = payment_data.model_dump()
         
         # Convert date object to ISO string for MongoDB storage
@@ -29,13 +42,22 @@ class PaymentService:
         if payment_dict.get("status") == "paid" and not payment_dict.get("paidDate"):
             payment_dict["paidDate"] = now.date().isoformat()
         
+        payment_dict["amountPaise"] = to_paise(payment_dict.get("amount"))
+        with_refs(payment_dict, PAYMENT_REFS)
         payment_dict["isDeleted"] = False
         payment_dict["createdAt"] = now
         payment_dict["updatedAt"] = now
+        return payment_dict
+
+    async def create_payment(self, payment_data: PaymentCreate) -> Payment:
+        from pymongo.errors import DuplicateKeyError
+        
+        payment_dict = self.build_payment_doc(payment_data, datetime.now(timezone.utc))
         
         try:
             result = await self.collection.insert_one(payment_dict)
             payment_dict["id"] = str(result.inserted_id)
+            await DashboardStatsService.apply_change("payments", None, payment_dict)
             return Payment(**payment_dict)
         except DuplicateKeyError:
             # Payment already exists for this tenant on this due date
@@ -50,42 +72,223 @@ class PaymentService:
                 return Payment(**existing)
             raise
 
-    async def get_payment_stats(self, property_ids: Optional[List[str]] = None):
+    @staticmethod
+    def build_list_pipeline(match_stage: dict, skip: int, limit: int) -> list:
+        """
+        Paged payment list enriched with tenant name/status and room number.
+
+        Joins use the typed tenantRef/bedRef/roomRef fields with
+        localField/foreignField so every lookup is an `_id` index hit. Documents
+        the refs backfill has not reached join on their converted string ids.
+        """
+        return [
+            {"$match": match_stage},
+            {"$sort": dict(PAYMENT_LIST_SORT)},  # Latest due date first, then by creation date
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$addFields": {"tenantRef": ref_or_source("$tenantRef", "$tenantId"), "bedRef": ref_or_source("$bedRef", "$bed")}},
+            # Lookup tenant name
+            {"$lookup": {"from": "tenants", "localField": "tenantRef", "foreignField": "_id", "as": "tenant"}},
+            # Lookup bed, then its room
+            {"$lookup": {"from": "beds", "localField": "bedRef", "foreignField": "_id", "as": "bed_info"}},
+            {
+                "$addFields": {
+                    "bedRoomRef": ref_or_source(
+                        {"$arrayElemAt": ["$bed_info.roomRef", 0]}, {"$arrayElemAt": ["$bed_info.roomId", 0]}
+                    ),
+                    "tenantRoomRef": ref_or_source(
+                        {"$arrayElemAt": ["$tenant.roomRef", 0]}, {"$arrayElemAt": ["$tenant.roomId", 0]}
+                    ),
+                }
+            },
+            {"$lookup": {"from": "rooms", "localField": "bedRoomRef", "foreignField": "_id", "as": "bed_room_info"}},
+            # Fallback: resolve room directly from the tenant's room for older/incomplete payment records
+            {"$lookup": {"from": "rooms", "localField": "tenantRoomRef", "foreignField": "_id", "as": "tenant_room_info"}},
+            # Project final output
+            {
+                "$project": {
+                    "_id": 1,
+                    "tenantId": 1,
+                    "propertyId": 1,
+                    "bed": 1,
+                    "amount": 1,
+                    "amountPaise": 1,
+                    "status": 1,
+                    "dueDate": 1,
+                    "paidDate": 1,
+                    "method": 1,
+                    "createdAt": 1,
+                    "updatedAt": 1,
+                    "tenantName": {"$arrayElemAt": ["$tenant.name", 0]},
+                    "tenantStatus": {"$arrayElemAt": ["$tenant.tenantStatus", 0]},
+                    "roomNumber": {
+                        "$ifNull": [
+                            {"$arrayElemAt": ["$bed_room_info.roomNumber", 0]},
+                            {
+                                "$ifNull": [
+                                    {"$arrayElemAt": ["$tenant_room_info.roomNumber", 0]},
+                                    "N/A"
+                                ]
+                            }
+                        ]
+                    }
+                }
+            }
+        ]
+
+    async def export_payments(
+        self,
+        property_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        The payment ledger of a property (dueDate range inclusive), oldest first.
+
+        Reads one cursor in batches of EXPORT_CURSOR_BATCH_SIZE. Instead of the
+        list pipeline's per-row $lookups, each batch resolves the tenants and
+        beds it has not seen yet with one $in query per collection; room numbers
+        are loaded once per property. Rows are yielded as they are resolved.
+        """
+        batch_size = max(1, settings.EXPORT_CURSOR_BATCH_SIZE)
+        rooms = getCollection("rooms").find({"propertyId": property_id}, {"roomNumber": 1})
+        room_numbers = {room["_id"]: room.get("roomNumber") async for room in rooms}
+        tenants: Dict[ObjectId, dict] = {}
+        bed_rooms: Dict[ObjectId, Optional[ObjectId]] = {}
+
+        query = {"propertyId": property_id, "isDeleted": {"$ne": True}}
+        if start_date or end_date:
+            query["dueDate"] = {}
+            if start_date:
+                query["dueDate"]["$gte"] = start_date
+            if end_date:
+                query["dueDate"]["$lte"] = end_date
+        if status:
+            query["status"] = status
+        projection = {field: 1 for field in PAYMENT_EXPORT_FIELDS if field not in ("id", "tenantName", "tenantStatus", "roomNumber")}
+        cursor = self.collection.find(query, projection).sort(PAYMENT_EXPORT_SORT).batch_size(batch_size)
+
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await self._resolve_export_names(batch, tenants, bed_rooms)
+                for row in batch:
+                    yield self._export_row(row, tenants, bed_rooms, room_numbers)
+                batch = []
+        if batch:
+            await self._resolve_export_names(batch, tenants, bed_rooms)
+            for row in batch:
+                yield self._export_row(row, tenants, bed_rooms, room_numbers)
+
+    @staticmethod
+    async def _resolve_export_names(batch: List[dict], tenants: Dict, bed_rooms: Dict) -> None:
+        """Fill the tenant and bed dictionaries for ids first seen in this batch"""
+        tenant_ids = {object_id_or_none(doc.get("tenantId")) for doc in batch} - set(tenants) - {None}
+        bed_ids = {object_id_or_none(doc.get("bed")) for doc in batch} - set(bed_rooms) - {None}
+
+        async def fetch(name, ids, projection):
+            if not ids:
+                return []
+            return await getCollection(name).find({"_id": {"$in": list(ids)}}, projection).to_list(length=None)
+
+        tenant_docs, bed_docs = await asyncio.gather(
+            fetch("tenants", tenant_ids, {"name": 1, "tenantStatus": 1, "roomId": 1}),
+            fetch("beds", bed_ids, {"roomId": 1}),
+        )
+        # Ids that no longer resolve are remembered too, so they are not asked for again
+        tenants.update({tenant_id: {} for tenant_id in tenant_ids})
+        tenants.update({doc["_id"]: doc for doc in tenant_docs})
+        bed_rooms.update({bed_id: None for bed_id in bed_ids})
+        bed_rooms.update({doc["_id"]: object_id_or_none(doc.get("roomId")) for doc in bed_docs})
+
+    @staticmethod
+    def _export_row(doc: dict, tenants: Dict, bed_rooms: Dict, room_numbers: Dict) -> dict:
+        tenant = tenants.get(object_id_or_none(doc.get("tenantId"))) or {}
+        # Room of the payment's bed, else the tenant's current room, as in the list pipeline
+        room_id = bed_rooms.get(object_id_or_none(doc.get("bed"))) or object_id_or_none(tenant.get("roomId"))
+        doc["id"] = str(doc.pop("_id"))
+        doc["tenantName"] = tenant.get("name")
+        doc["tenantStatus"] = tenant.get("tenantStatus")
+        doc["roomNumber"] = room_numbers.get(room_id) or "N/A"
+        return doc
+
+    async def get_payment_stats(self, property_ids: Optional[List[str]] = None, include_breakdown: bool = False):
+        """
+        Collected/pending totals with counts per month (by dueDate), from a single $group.
+
+        When include_breakdown is True the same rows are also folded per property.
+        """
         query = {"isDeleted": {"$ne": True}}
 
         if property_ids is not None:
             if not property_ids:
-                return {
+                stats = {
                     'collected': '₹0',
                     'pending': '₹0',
                 }
+                if include_breakdown:
+                    stats['byProperty'] = []
+                return stats
             query["propertyId"] = {"$in": property_ids}
 
-        payments = await self.collection.find(query).to_list(length=1000)
-        
-        def parse_amount(amount_str):
-            """Parse amount string that may contain currency symbols and commas"""
-            if not amount_str:
-                return 0.0
-            try:
-                # Remove currency symbols and commas, then convert to float
-                cleaned = str(amount_str).replace('₹', '').replace(',', '').strip()
-                return float(cleaned) if cleaned else 0.0
-            except (ValueError, TypeError):
-                return 0.0
-        
-        collected = sum(
-            parse_amount(p["amount"])
-            for p in payments if p["status"] == PaymentStatus.PAID.value
-        )
-        pending = sum(
-            parse_amount(p["amount"])
-            for p in payments if p["status"] == PaymentStatus.DUE.value
-        )
-        return {
-            'collected': f'₹{collected:,.0f}',
-            'pending': f'₹{pending:,.0f}',
-        }
+        # One row per (property, month, status); bounded by properties x months x 2
+        rows = await self.collection.aggregate([
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": {
+                        "propertyId": "$propertyId",
+                        "month": {"$substrCP": [{"$ifNull": ["$dueDate", ""]}, 0, 7]},
+                        "status": "$status",
+                    },
+                    "amountPaise": {"$sum": PAYMENT_PAISE_EXPRESSION},
+                    "count": {"$sum": 1},
+                }
+            },
+        ]).to_list(length=None)
+
+        def empty_bucket():
+            return {"collectedPaise": 0, "pendingPaise": 0, "paidCount": 0, "dueCount": 0}
+
+        def add(bucket, status, amount_paise, count):
+            if status == PaymentStatus.PAID.value:
+                bucket["collectedPaise"] += amount_paise
+                bucket["paidCount"] += count
+            elif status == PaymentStatus.DUE.value:
+                bucket["pendingPaise"] += amount_paise
+                bucket["dueCount"] += count
+
+        def formatted(bucket):
+            return {
+                'collected': format_rupees(bucket["collectedPaise"]),
+                'pending': format_rupees(bucket["pendingPaise"]),
+                **bucket,
+            }
+
+        totals = empty_bucket()
+        by_month = {}
+        by_property = {}
+        for row in rows:
+            key = row["_id"]
+            status = key.get("status")
+            amount_paise = row.get("amountPaise") or 0
+            add(totals, status, amount_paise, row["count"])
+            add(by_month.setdefault(key.get("month") or "unscheduled", empty_bucket()), status, amount_paise, row["count"])
+            add(by_property.setdefault(key.get("propertyId"), empty_bucket()), status, amount_paise, row["count"])
+
+        stats = formatted(totals)
+        stats['byMonth'] = [
+            {'month': month, **formatted(bucket)}
+            for month, bucket in sorted(by_month.items(), reverse=True)
+        ]
+        if include_breakdown:
+            stats['byProperty'] = [
+                {'propertyId': property_id, **formatted(bucket)}
+                for property_id, bucket in by_property.items()
+            ]
+        return stats
 
     async def update_payment(self, payment_id: str, payment_update) -> Optional[Payment]:
         from datetime import date as date_type
@@ -111,29 +314,44 @@ class PaymentService:
         if update_data.get("paidDate") and hasattr(update_data["paidDate"], 'isoformat'):
             update_data["paidDate"] = update_data["paidDate"].isoformat()
         
+        # Keep the numeric amount in sync with the display string
+        if "amount" in update_data:
+            update_data["amountPaise"] = to_paise(update_data["amount"])
+        
         for protected_key in ["isDeleted"]:
             update_data.pop(protected_key, None)
 
+        with_refs(update_data, PAYMENT_REFS)
         update_data["updatedAt"] = datetime.now(timezone.utc)
         await self.collection.update_one({"_id": ObjectId(payment_id)}, {"$set": update_data})
+        original = dict(payment)
         payment.update(update_data)
+        await DashboardStatsService.apply_change("payments", original, payment)
         payment["id"] = str(payment["_id"])
         return Payment(**payment)
 
     async def delete_payment(self, payment_id: str) -> bool:
         """Delete a single payment by ID"""
         now = datetime.now(timezone.utc).isoformat()
-        result = await self.collection.update_one(
+        original = await self.collection.find_one_and_update(
             {"_id": ObjectId(payment_id), "isDeleted": {"$ne": True}},
             {"$set": {"isDeleted": True, "updatedAt": now}}
         )
-        return result.modified_count > 0
+        if not original:
+            return False
+        await DashboardStatsService.apply_change("payments", original, None)
+        return True
 
     async def delete_payments_by_tenant(self, tenant_id: str) -> int:
         """Delete all payments for a specific tenant. Returns count of deleted payments."""
         now = datetime.now(timezone.utc).isoformat()
+        live_payments = await self.collection.find(
+            {"tenantId": tenant_id, "isDeleted": {"$ne": True}},
+            {"propertyId": 1, "status": 1, "amount": 1, "amountPaise": 1, "paidDate": 1}
+        ).to_list(length=None)
         result = await self.collection.update_many(
             {"tenantId": tenant_id, "isDeleted": {"$ne": True}},
             {"$set": {"isDeleted": True, "updatedAt": now}}
         )
+        await DashboardStatsService.apply_changes("payments", [(p, None) for p in live_payments])
         return result.modified_count
\ No newline at end of file
@@ -10,6 +10,7 @@ from bson import ObjectId
 
 from app.database.mongodb import db
 from app.models.plan_schema import Plan, PlanCreate, PlanUpdate
+from app.utils.plan_cache import plan_cache
 
 
 class PlanService:
@@ -41,6 +42,7 @@ class PlanService:
         
         # Insert into database
         result = await db.plans.insert_one(plan_dict)
+        await plan_cache.invalidate()
         
         # Fetch and return created plan
         created_plan = await db.plans.find_one({"_id": result.inserted_id})
@@ -59,7 +61,7 @@ class PlanService:
         Returns:
             Plan if found, None otherwise
         """
-        plan = await db.plans.find_one({"name": name.lower()})
+        plan = await plan_cache.get_plan(name)
         if plan:
             plan['id'] = str(plan['_id'])
             return Plan(**plan)
@@ -96,11 +98,10 @@ class PlanService:
         Returns:
             List of plans sorted by sort_order
         """
-        query = {"is_active": True} if active_only else {}
-        cursor = db.plans.find(query).sort("sort_order", 1)
-        
         plans = []
-        async for plan in cursor:
+        for plan in await plan_cache.get_plans():
+            if active_only and plan.get("is_active") is not True:
+                continue
             plan['id'] = str(plan['_id'])
             plans.append(Plan(**plan))
         
@@ -132,6 +133,7 @@ class PlanService:
             {"name": plan_name.lower()},
             {"$set": update_dict}
         )
+        await plan_cache.invalidate()
         
         # Fetch and return updated plan
         updated_plan = await db.plans.find_one({"name": plan_name.lower()})
@@ -165,6 +167,7 @@ class PlanService:
             )
         
         result = await db.plans.delete_one({"name": plan_name.lower()})
+        await plan_cache.invalidate()
         return result.deleted_count > 0
 
     @staticmethod
@@ -187,6 +190,7 @@ class PlanService:
                 }
             }
         )
+        await plan_cache.invalidate()
         
         if result.modified_count > 0 or result.matched_count > 0:
             return await PlanService.get_plan_by_name(plan_name)
@@ -216,6 +220,7 @@ class PlanService:
                 }
             }
         )
+        await plan_cache.invalidate()
         
         if result.modified_count > 0 or result.matched_count > 0:
             return await PlanService.get_plan_by_name(plan_name)
@@ -338,6 +343,7 @@ class PlanService:
         ]
         
         result = await db.plans.insert_many(default_plans)
+        await plan_cache.invalidate()
         return len(result.inserted_ids)
 
     @staticmethod
@@ -3,6 +3,8 @@ import uuid
 from app.database.mongodb import db
 from app.models.property_schema import PropertyOut
 from app.utils.ownership import build_owner_query, normalize_property_owners
+from app.utils.auth_context_cache import auth_context_cache
+from app.services.dashboard_stats_service import DashboardStatsService
 from typing import List
 from datetime import datetime, timezone
 from bson import ObjectId
@@ -27,6 +29,7 @@ class PropertyService:
             {"_id": ObjectId(owner_id)},
             {"$addToSet": {"propertyIds": doc["id"]}}
         )
+        await auth_context_cache.invalidate(owner_id)
         return PropertyOut(**doc)
 
     async def list_properties(self, user_id: str) -> List[PropertyOut]:
@@ -136,5 +139,7 @@ class PropertyService:
         
         # Remove property ID from all users
         await self.db["users"].update_many({}, {"$pull": {"propertyIds": property_id}})
+        await DashboardStatsService.delete(property_id)
+        await auth_context_cache.invalidate(*normalize_property_owners(dict(existing)).get("ownerIds", []))
         
         return {"success": True, "propertyId": property_id}
\ No newline at end of file
@@ -2,12 +2,11 @@ from app.models.razorpay_order import RazorpayOrder
 from app.config import settings
 from app.database.mongodb import db
 from datetime import datetime
-import razorpay
+from app.utils.razorpay_gateway import razorpay_gateway
 import hmac
 import hashlib
 
 class RazorpayService:
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
 
     @staticmethod
     async def create_order(user_id: str, plan: str, period: int, amount: int, currency: str, receipt: str, coupon_code: str = None):
@@ -23,7 +22,7 @@ class RazorpayService:
                 "coupon_code": coupon_code or ""
             }
         }
-        order = RazorpayService.client.order.create(order_data)
+        order = await razorpay_gateway.create_order(order_data)
         now = datetime.now().isoformat()
         order_doc = RazorpayOrder(
             order_id=order["id"],
@@ -3,19 +3,20 @@ Razorpay Subscription Service
 Handles recurring/automatic billing for subscriptions
 """
 
-import razorpay
+import asyncio
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 import logging
 
-from app.config.settings import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET
+from bson import ObjectId
+
 from app.database.mongodb import db
+from app.utils.auth_context_cache import auth_context_cache
+from app.utils.plan_cache import plan_cache
+from app.utils.razorpay_gateway import razorpay_gateway
 
 logger = logging.getLogger(__name__)
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
-
 
 class RazorpaySubscriptionService:
     """Service for managing Razorpay subscriptions (recurring payments)"""
@@ -82,7 +83,7 @@ class RazorpaySubscriptionService:
                 subscription_data['token'] = payment_method_id
             
             # Create Razorpay subscription
-            subscription = razorpay_client.subscription.create(subscription_data)
+            subscription = await razorpay_gateway.create_subscription(subscription_data)
             
             logger.info(f"✓ Razorpay subscription created: {subscription['id']} for user {owner_id}")
             return subscription
@@ -103,7 +104,7 @@ class RazorpaySubscriptionService:
             Dict with cancellation details
         """
         try:
-            subscription = razorpay_client.subscription.cancel(razorpay_subscription_id)
+            subscription = await razorpay_gateway.cancel_subscription(razorpay_subscription_id)
             logger.info(f"✓ Razorpay subscription cancelled: {razorpay_subscription_id}")
             return subscription
             
@@ -124,7 +125,7 @@ class RazorpaySubscriptionService:
             Dict with pause details
         """
         try:
-            subscription = razorpay_client.subscription.pause(
+            subscription = await razorpay_gateway.pause_subscription(
                 razorpay_subscription_id,
                 {'pause_at': 'now', 'resume_after': pause_months}
             )
@@ -147,7 +148,7 @@ class RazorpaySubscriptionService:
             Dict with subscription status
         """
         try:
-            subscription = razorpay_client.subscription.fetch(razorpay_subscription_id)
+            subscription = await razorpay_gateway.fetch_subscription(razorpay_subscription_id)
             return subscription
             
         except Exception as e:
@@ -187,78 +188,24 @@ class RazorpaySubscriptionService:
             }).to_list(None)
             
             stats['checked'] = len(expiring_subs)
-            
-            for sub in expiring_subs:
-                try:
-                    # Get user and payment method info
-                    user = await db.users.find_one({'_id': sub['ownerId']})
-                    if not user or not user.get('razorpayCustomerId'):
-                        stats['failed'] += 1
-                        stats['errors'].append(f"User {sub['ownerId']} missing Razorpay customer ID")
-                        continue
-                    
-                    # Create renewal order via Razorpay API
-                    plan = await db.plans.find_one({'name': sub['plan']})
-                    if not plan:
-                        stats['failed'] += 1
-                        stats['errors'].append(f"Plan {sub['plan']} not found")
-                        continue
-                    
-                    period_str = str(sub['period'])
-                    price = plan['periods'].get(period_str, 0)
-                    
-                    if price == 0:
-                        stats['failed'] += 1
-                        stats['errors'].append(f"Invalid price for {sub['plan']} {period_str}m")
-                        continue
-                    
-                    # Create renewal via Razorpay subscription or order
-                    # For now, we'll create an order and track it
-                    order = razorpay_client.order.create({
-                        'amount': price,
-                        'currency': 'INR',
-                        'receipt': f"renew_{sub['ownerId'][:10]}_{datetime.now().strftime('%Y%m%d')}",
-                        'notes': {
-                            'owner_id': sub['ownerId'],
-                            'plan': sub['plan'],
-                            'period': str(sub['period']),
-                            'renewal': 'true',
-                            'subscription_id': str(sub['_id'])
-                        }
-                    })
-                    
-                    # Store renewal order for payment verification
-                    # Extension will happen in handle_subscription_payment_success when this order is paid
-                    await db.renewal_orders.insert_one({
-                        'ownerId': sub['ownerId'],
-                        'subscriptionId': sub['_id'],
-                        'orderId': order['id'],
-                        'plan': sub['plan'],
-                        'period': sub['period'],
-                        'amount': price,
-                        'createdAt': datetime.now().isoformat(),
-                        'status': 'pending'
-                    })
-                    
-                    stats['renewed'] += 1
-                    logger.info(f"✓ Auto-renewal order created for user {sub['ownerId']}: order {order['id']}")
-                    
-                except Exception as e:
-                    stats['failed'] += 1
-                    error_msg = str(e)
-                    stats['errors'].append(error_msg)
-                    logger.error(f"✗ Renewal failed for subscription {sub.get('_id')}: {error_msg}")
-                    
-                    # Update subscription with error
-                    await db.subscriptions.update_one(
-                        {'_id': sub['_id']},
-                        {
-                            '$set': {
-                                'renewalError': error_msg,
-                                'updatedAt': datetime.now().isoformat()
-                            }
-                        }
-                    )
+            if not expiring_subs:
+                logger.info("Auto-renewal job completed: nothing to renew")
+                return stats
+
+            # Load owners once; ownerId is stored as a string, users are keyed by ObjectId
+            owner_ids = {str(sub['ownerId']) for sub in expiring_subs}
+            user_keys = list(owner_ids) + [ObjectId(i) for i in owner_ids if ObjectId.is_valid(i)]
+            users = await db.users.find(
+                {'_id': {'$in': user_keys}},
+                {'razorpayCustomerId': 1}
+            ).to_list(None)
+            users_by_id = {str(user['_id']): user for user in users}
+
+            # Orders are created concurrently; razorpay_gateway bounds how many are in flight
+            await asyncio.gather(*(
+                RazorpaySubscriptionService._renew_subscription(sub, users_by_id.get(str(sub['ownerId'])), stats)
+                for sub in expiring_subs
+            ))
             
             logger.info(f"Auto-renewal job completed: {stats['renewed']}/{stats['checked']} renewed, {stats['failed']} failed")
             return stats
@@ -268,6 +215,82 @@ class RazorpaySubscriptionService:
             stats['errors'].append(str(e))
             return stats
 
+    @staticmethod
+    async def _renew_subscription(sub: Dict, user: Optional[Dict], stats: Dict) -> None:
+        """Create the renewal order for one expiring subscription and record the outcome in stats"""
+        try:
+            if not user or not user.get('razorpayCustomerId'):
+                stats['failed'] += 1
+                stats['errors'].append(f"User {sub['ownerId']} missing Razorpay customer ID")
+                return
+            
+            # Create renewal order via Razorpay API
+            plan = await plan_cache.get_plan(sub['plan'])
+            if not plan:
+                stats['failed'] += 1
+                stats['errors'].append(f"Plan {sub['plan']} not found")
+                return
+            
+            period_str = str(sub['period'])
+            price = plan['periods'].get(period_str, 0)
+            
+            if price == 0:
+                stats['failed'] += 1
+                stats['errors'].append(f"Invalid price for {sub['plan']} {period_str}m")
+                return
+            
+            # Create renewal via Razorpay subscription or order
+            # For now, we'll create an order and track it
+            order = await razorpay_gateway.create_order({
+                'amount': price,
+                'currency': 'INR',
+                'receipt': f"renew_{sub['ownerId'][:10]}_{datetime.now().strftime('%Y%m%d')}",
+                'notes': {
+                    'owner_id': sub['ownerId'],
+                    'plan': sub['plan'],
+                    'period': str(sub['period']),
+                    'renewal': 'true',
+                    'subscription_id': str(sub['_id'])
+                }
+            })
+            
+            # Store renewal order for payment verification
+            # Extension will happen in handle_subscription_payment_success when this order is paid
+            await db.renewal_orders.insert_one({
+                'ownerId': sub['ownerId'],
+                'subscriptionId': sub['_id'],
+                'orderId': order['id'],
+                'plan': sub['plan'],
+                'period': sub['period'],
+                'amount': price,
+                'createdAt': datetime.now().isoformat(),
+                'status': 'pending'
+            })
+            
+            stats['renewed'] += 1
+            logger.info(f"✓ Auto-renewal order created for user {sub['ownerId']}: order {order['id']}")
+            
+        except Exception as e:
+            stats['failed'] += 1
+            error_msg = str(e)
+            stats['errors'].append(error_msg)
+            logger.error(f"✗ Renewal failed for subscription {sub.get('_id')}: {error_msg}")
+            
+            # Update subscription with error
+            try:
+                await db.subscriptions.update_one(
+                    {'_id': sub['_id']},
+                    {
+                        '$set': {
+                            'renewalError': error_msg,
+                            'updatedAt': datetime.now().isoformat()
+                        }
+                    }
+                )
+                await auth_context_cache.invalidate(sub.get('ownerId'))
+            except Exception as update_error:
+                logger.error(f"✗ Could not record renewal error for {sub.get('_id')}: {str(update_error)}")
+
     @staticmethod
     async def handle_subscription_payment_success(order_id: str, payment_id: str) -> bool:
         """
@@ -322,6 +345,7 @@ class RazorpaySubscriptionService:
                         }
                     }
                 )
+                await auth_context_cache.invalidate(renewal['ownerId'])
                 logger.info(f"✓ Subscription extended for user {renewal['ownerId']} until {new_end.isoformat()}")
             
             logger.info(f"✓ Auto-renewal payment successful: {order_id}")
@@ -372,6 +396,7 @@ class RazorpaySubscriptionService:
                     }
                 }
             )
+            await auth_context_cache.invalidate(renewal['ownerId'])
             
             logger.warning(f"✗ Auto-renewal payment failed for order {order_id}: {error_msg}")
             return True
@@ -1,8 +1,16 @@
+import time
+from collections import Counter
 from app.models.room_schema import Room
 from app.database.mongodb import getCollection
+from app.database.transactions import run_in_transaction
 from datetime import datetime,timezone
+from typing import Optional
 from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
 from app.services.bed_service import BedService
+from app.services.dashboard_stats_service import DashboardStatsService
+from app.utils.refs import with_refs, TENANT_REFS
+from app.utils.search_terms import with_search_terms, ROOM_SEARCH_FIELDS
 from app.models.bed_schema import BedCreate
 
 
@@ -41,6 +49,7 @@ class RoomService:
             room_data["active"] = True
         
         room_data["isDeleted"] = False
+        with_search_terms(room_data, ROOM_SEARCH_FIELDS)
 
         # Check if room number already exists for this property
         existing = await self.collection.find_one({
@@ -68,6 +77,68 @@ class RoomService:
             await bed_service.create_bed(bed)
         return Room(**room_data)
 
+    async def create_rooms_bulk(self, property_id: str, rooms: list[dict]) -> dict:
+        """
+        Create many rooms and all their beds with two insert_many calls in one transaction.
+        Returns the created rooms and per-phase timings in milliseconds.
+        """
+        started = time.perf_counter()
+        room_numbers = [room["roomNumber"] for room in rooms]
+        repeated = sorted(number for number, n in Counter(room_numbers).items() if n > 1)
+        if repeated:
+            raise ValueError(f"Duplicate room numbers in request: {', '.join(repeated)}")
+
+        existing = set(await self.collection.distinct(
+            "roomNumber", {"propertyId": property_id, "isDeleted": {"$ne": True}}
+        ))
+        taken = [number for number in room_numbers if number in existing]
+        if taken:
+            raise ValueError(f"Room numbers already exist for this property: {', '.join(taken)}")
+
+        now = datetime.now(timezone.utc).isoformat()
+        room_docs, bed_docs = [], []
+        for room in rooms:
+            # ObjectIds are assigned up front so beds can reference their room before either is inserted
+            room_id = ObjectId()
+            room_docs.append(with_search_terms({
+                **room,
+                "_id": room_id,
+                "propertyId": property_id,
+                "createdAt": now,
+                "updatedAt": now,
+                "isDeleted": False,
+            }, ROOM_SEARCH_FIELDS))
+            for i in range(1, room["numberOfBeds"] + 1):
+                bed = BedCreate(propertyId=property_id, roomId=str(room_id), bedNumber=str(i), status="available")
+                bed_docs.append(BedService.build_bed_doc(bed, now))
+        prepared = time.perf_counter()
+
+        beds_collection = getCollection("beds")
+
+        async def insert_all(session):
+            await self.collection.insert_many(room_docs, session=session)
+            if bed_docs:
+                await beds_collection.insert_many(bed_docs, session=session)
+
+        await run_in_transaction(insert_all)
+        inserted = time.perf_counter()
+
+        await DashboardStatsService.apply_changes("beds", [(None, bed) for bed in bed_docs])
+        finished = time.perf_counter()
+
+        created = [Room(**{**doc, "id": str(doc["_id"])}) for doc in room_docs]
+        return {
+            "rooms": created,
+            "roomsCreated": len(room_docs),
+            "bedsCreated": len(bed_docs),
+            "timingsMs": {
+                "validate": round((prepared - started) * 1000, 2),
+                "insert": round((inserted - prepared) * 1000, 2),
+                "stats": round((finished - inserted) * 1000, 2),
+                "total": round((finished - started) * 1000, 2),
+            },
+        }
+
     async def update_room(self, room_id: str, room_data: dict):
         from bson import ObjectId
         room_data["updatedAt"] = datetime.now(timezone.utc).isoformat()
@@ -85,6 +156,8 @@ class RoomService:
             if existing:
                 raise ValueError(f"Room number '{room_data['roomNumber']}' already exists for this property")
         
+        with_search_terms(room_data, ROOM_SEARCH_FIELDS)
+
         # Handle bed count changes
         if "numberOfBeds" in room_data:
             await self._handle_bed_count_change(room_id, room_data)
@@ -96,188 +169,215 @@ class RoomService:
             return Room(**doc)
         return None
     
+    @staticmethod
+    def _bed_position(bed: dict) -> Optional[int]:
+        """Numeric bed number, or None for beds that were renamed to something non-numeric"""
+        try:
+            return int(str(bed.get("bedNumber")).strip())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def plan_bed_reduction(room_beds: list, other_available_beds: list, new_bed_count: int) -> dict:
+        """
+        Decide, in memory, what shrinking a room to `new_bed_count` beds does.
+
+        `room_beds` are the room's live beds and `other_available_beds` the
+        available beds in the property's other rooms. Beds numbered above the
+        new count are removed (compared as numbers, so bed 10 goes before bed 9
+        stays); beds with non-numeric numbers are kept. Each displaced tenant
+        gets the lowest-numbered free bed left in the room, then the next free
+        bed elsewhere in the property, else is vacated.
+
+        Returns {"remove": [bed], "relocate": [(bed, target)], "vacate": [bed],
+        "free_in_room": int, "free_elsewhere": int}.
+        """
+        position = RoomService._bed_position
+        ordered = sorted(room_beds, key=lambda bed: (position(bed) is None, position(bed) or 0))
+        remove = [bed for bed in ordered if position(bed) is not None and position(bed) > new_bed_count]
+        removed_ids = {bed["_id"] for bed in remove}
+        free_targets = [
+            bed for bed in ordered
+            if bed["_id"] not in removed_ids and bed.get("status") == "available" and not bed.get("tenantId")
+        ]
+        free_in_room = len(free_targets)
+        free_targets.extend(other_available_beds)
+
+        relocate, vacate = [], []
+        targets = iter(free_targets)
+        for bed in remove:
+            if not bed.get("tenantId"):
+                continue
+            target = next(targets, None)
+            if target is None:
+                vacate.append(bed)
+            else:
+                relocate.append((bed, target))
+        return {
+            "remove": remove,
+            "relocate": relocate,
+            "vacate": vacate,
+            "free_in_room": free_in_room,
+            "free_elsewhere": len(other_available_beds),
+        }
+
+    async def _load_bed_reduction(self, room_id: str, property_id: str, new_bed_count: int, session=None) -> dict:
+        """Fetch the room's beds and the property's free beds once, then plan"""
+        beds_collection = getCollection("beds")
+        room_beds = await beds_collection.find(
+            {"roomId": room_id, "isDeleted": {"$ne": True}}, session=session
+        ).to_list(None)
+        other_available_beds = await beds_collection.find(
+            {
+                "propertyId": property_id,
+                "roomId": {"$ne": room_id},
+                "status": "available",
+                "isDeleted": {"$ne": True},
+            },
+            session=session,
+        ).sort([("roomId", 1), ("_id", 1)]).to_list(None)
+        return self.plan_bed_reduction(room_beds, other_available_beds, new_bed_count)
+
     async def _handle_bed_count_change(self, room_id: str, room_data: dict):
         """Handle changes in number of beds - relocate or vacate tenants as needed"""
         beds_collection = getCollection("beds")
         tenants_collection = getCollection("tenants")
-        
-        # Get current room to compare
-        current_room = await self.collection.find_one({"_id": ObjectId(room_id), "isDeleted": {"$ne": True}})
-        if not current_room:
-            return
-        
-        current_bed_count = current_room.get("numberOfBeds", 0)
-        new_bed_count = room_data.get("numberOfBeds", 0)
-        property_id = room_data.get("propertyId") or current_room.get("propertyId")
-        
-        if new_bed_count < current_bed_count:
-            # Reducing beds - handle affected tenants
-            # Get beds that will be removed (bed numbers > new_bed_count)
-            beds_to_remove = await beds_collection.find({
-                "roomId": room_id,
-                "bedNumber": {"$gt": str(new_bed_count)},
-                "isDeleted": {"$ne": True}
-            }).to_list(None)
-            
+
+        async def apply(session):
+            # Read and plan inside the transaction so a retry re-plans against fresh data
+            current_room = await self.collection.find_one(
+                {"_id": ObjectId(room_id), "isDeleted": {"$ne": True}}, session=session
+            )
+            if not current_room:
+                return None
+
+            current_bed_count = current_room.get("numberOfBeds", 0)
+            new_bed_count = room_data.get("numberOfBeds", 0)
+            property_id = room_data.get("propertyId") or current_room.get("propertyId")
             now = datetime.now(timezone.utc).isoformat()
 
-            for bed in beds_to_remove:
-                tenant_id = bed.get("tenantId")
-                if tenant_id:
-                    # First, try to find an available bed in the SAME ROOM
-                    available_bed = await beds_collection.find_one({
-                        "roomId": room_id,
-                        "status": "available",
-                        "bedNumber": {"$lte": str(new_bed_count)},
-                        "_id": {"$ne": bed["_id"]},
-                        "isDeleted": {"$ne": True}
-                    })
-                    
-                    # If no available bed in same room, try same property
-                    if not available_bed:
-                        available_bed = await beds_collection.find_one({
-                            "propertyId": property_id,
-                            "roomId": {"$ne": room_id},
-                            "status": "available",
-                            "_id": {"$ne": bed["_id"]},
-                            "isDeleted": {"$ne": True}
-                        })
-                    
-                    if available_bed:
-                        # Move tenant to available bed
-                        await beds_collection.update_one(
-                            {"_id": available_bed["_id"]},
-                            {
-                                "$set": {
-                                    "status": "occupied",
-                                    "tenantId": tenant_id,
-                                    "updatedAt": now
-                                }
-                            }
-                        )
-                        # Update tenant's bedId and roomId if relocated to different room
-                        update_data = {
-                            "bedId": str(available_bed["_id"]),
-                            "updatedAt": now
-                        }
-                        if str(available_bed.get("roomId")) != room_id:
-                            update_data["roomId"] = str(available_bed["roomId"])
-                        
-                        await tenants_collection.update_one(
-                            {"_id": ObjectId(tenant_id)},
-                            {"$set": update_data}
-                        )
-                    else:
-                        # No available bed - mark tenant as vacated
-                        await tenants_collection.update_one(
-                            {"_id": ObjectId(tenant_id)},
-                            {
-                                "$set": {
-                                    "tenantStatus": "vacated",
-                                    "checkoutDate": now,
-                                    "billingConfig": None,
-                                    "updatedAt": now
-                                }
-                            }
-                        )
-                
-                # Soft delete the bed
-                await beds_collection.update_one(
-                    {"_id": bed["_id"]},
-                    {"$set": {"isDeleted": True, "updatedAt": now}}
-                )
-        
-        elif new_bed_count > current_bed_count:
-            # Increasing beds - create new beds
-            owner_id = current_room.get("ownerId")
-            for i in range(current_bed_count + 1, new_bed_count + 1):
-                bed = BedCreate(
-                    propertyId=property_id,
-                    roomId=room_id,
-                    bedNumber=str(i),
-                    status="available",
-                    ownerId=owner_id
+            if new_bed_count > current_bed_count:
+                # Increasing beds - create new beds
+                new_beds = [
+                    BedService.build_bed_doc(
+                        BedCreate(propertyId=property_id, roomId=room_id, bedNumber=str(i), status="available"),
+                        now,
+                    )
+                    for i in range(current_bed_count + 1, new_bed_count + 1)
+                ]
+                await beds_collection.insert_many(new_beds, session=session)
+                return {"created": new_beds}
+
+            if new_bed_count == current_bed_count:
+                return None
+
+            plan = await self._load_bed_reduction(room_id, property_id, new_bed_count, session)
+            if not plan["remove"]:
+                return None
+
+            claims = [
+                # Guarded on status so a bed claimed since the plan was made fails the whole change
+                UpdateOne(
+                    {"_id": target["_id"], "status": "available"},
+                    {"$set": {"status": "occupied", "tenantId": bed["tenantId"], "updatedAt": now}},
                 )
-                await bed_service.create_bed(bed)
-    
+                for bed, target in plan["relocate"]
+            ]
+            if claims:
+                result = await beds_collection.bulk_write(claims, ordered=True, session=session)
+                if result.matched_count != len(claims):
+                    # Without a transaction nothing rolls back: release the beds claimed above
+                    # before anything else is written
+                    await beds_collection.bulk_write([
+                        UpdateOne(
+                            {"_id": target["_id"], "tenantId": bed["tenantId"], "updatedAt": now},
+                            {"$set": {"status": "available", "tenantId": None, "updatedAt": now}},
+                        )
+                        for bed, target in plan["relocate"]
+                    ], ordered=False, session=session)
+                    raise ValueError("Beds in this property changed while the room was being resized. Please try again.")
+
+            tenant_ops = []
+            for bed, target in plan["relocate"]:
+                # Update tenant's bedId and roomId if relocated to different room
+                update_data = {"bedId": str(target["_id"]), "updatedAt": now}
+                if str(target.get("roomId")) != room_id:
+                    update_data["roomId"] = str(target["roomId"])
+                tenant_ops.append(UpdateOne(
+                    {"_id": ObjectId(bed["tenantId"])}, {"$set": with_refs(update_data, TENANT_REFS)}
+                ))
+            if plan["vacate"]:
+                # No available bed - mark tenants as vacated
+                tenant_ops.append(UpdateMany(
+                    {"_id": {"$in": [ObjectId(bed["tenantId"]) for bed in plan["vacate"]]}},
+                    {"$set": {"tenantStatus": "vacated", "checkoutDate": now, "billingConfig": None, "updatedAt": now}},
+                ))
+
+            await beds_collection.update_many(
+                {"_id": {"$in": [bed["_id"] for bed in plan["remove"]]}},
+                {"$set": {"isDeleted": True, "updatedAt": now}},
+                session=session,
+            )
+            if tenant_ops:
+                await tenants_collection.bulk_write(tenant_ops, ordered=True, session=session)
+            return {"rebuild": property_id}
+
+        outcome = await run_in_transaction(apply)
+        if not outcome:
+            return
+        if outcome.get("created"):
+            await DashboardStatsService.apply_changes("beds", [(None, bed) for bed in outcome["created"]])
+        if outcome.get("rebuild"):
+            # Bulk bed/tenant writes above bypass the incremental stats hooks
+            await DashboardStatsService.rebuild_many([outcome["rebuild"]])
+
     async def preview_bed_count_change(self, room_id: str, new_bed_count: int):
         """Preview what will happen if bed count is changed"""
-        beds_collection = getCollection("beds")
         tenants_collection = getCollection("tenants")
-        
+
         current_room = await self.collection.find_one({"_id": ObjectId(room_id), "isDeleted": {"$ne": True}})
         if not current_room:
             return None
-        
+
         current_bed_count = current_room.get("numberOfBeds", 0)
         property_id = current_room.get("propertyId")
-        
+
         result = {
             "currentBedCount": current_bed_count,
             "newBedCount": new_bed_count,
             "affectedTenants": [],
             "availableBedsInProperty": 0
         }
-        
+
         if new_bed_count < current_bed_count:
-            # Count available beds in same room first
-            available_beds_same_room = await beds_collection.count_documents({
-                "roomId": room_id,
-                "status": "available",
-                "bedNumber": {"$lte": str(new_bed_count)},
-                "isDeleted": {"$ne": True}
-            })
-            
-            # Count available beds in other rooms of same property
-            available_beds_other_rooms = await beds_collection.count_documents({
-                "propertyId": property_id,
-                "status": "available",
-                "roomId": {"$ne": room_id},
-                "isDeleted": {"$ne": True}
-            })
-            
-            result["availableBedsInSameRoom"] = available_beds_same_room
-            result["availableBedsInProperty"] = available_beds_other_rooms
-            
-            # Get beds that will be removed
-            beds_to_remove = await beds_collection.find({
-                "roomId": room_id,
-                "bedNumber": {"$gt": str(new_bed_count)},
-                "isDeleted": {"$ne": True}
-            }).to_list(None)
-            
-            available_same_room_index = 0
-            available_other_room_index = 0
-            
-            for bed in beds_to_remove:
-                tenant_id = bed.get("tenantId")
-                if tenant_id:
-                    tenant = await tenants_collection.find_one({"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}})
-                    if tenant:
-                        # Determine action: try same room first, then other rooms
-                        will_relocate_same_room = available_same_room_index < available_beds_same_room
-                        will_relocate_other_room = not will_relocate_same_room and available_other_room_index < available_beds_other_rooms
-                        
-                        action = "vacate"
-                        location = None
-                        
-                        if will_relocate_same_room:
-                            action = "relocate"
-                            location = "same_room"
-                            available_same_room_index += 1
-                        elif will_relocate_other_room:
-                            action = "relocate"
-                            location = "other_room"
-                            available_other_room_index += 1
-                        
-                        result["affectedTenants"].append({
-                            "id": str(tenant["_id"]),
-                            "name": tenant.get("name"),
-                            "bedNumber": bed.get("bedNumber"),
-                            "action": action,
-                            "location": location
-                        })
-        
+            # Same planner as the real change, so the preview matches what will happen
+            plan = await self._load_bed_reduction(room_id, property_id, new_bed_count)
+            result["availableBedsInSameRoom"] = plan["free_in_room"]
+            result["availableBedsInProperty"] = plan["free_elsewhere"]
+
+            affected = plan["relocate"] + [(bed, None) for bed in plan["vacate"]]
+            tenant_ids = [ObjectId(bed["tenantId"]) for bed, _ in affected]
+            tenants = {
+                str(tenant["_id"]): tenant
+                async for tenant in tenants_collection.find(
+                    {"_id": {"$in": tenant_ids}, "isDeleted": {"$ne": True}}, {"name": 1}
+                )
+            }
+            for bed, target in sorted(affected, key=lambda pair: self._bed_position(pair[0]) or 0):
+                tenant = tenants.get(str(bed["tenantId"]))
+                if not tenant:
+                    continue
+                location = None
+                if target is not None:
+                    location = "same_room" if str(target.get("roomId")) == room_id else "other_room"
+                result["affectedTenants"].append({
+                    "id": str(tenant["_id"]),
+                    "name": tenant.get("name"),
+                    "bedNumber": bed.get("bedNumber"),
+                    "action": "relocate" if target is not None else "vacate",
+                    "location": location
+                })
+
         return result
 
     async def delete_room(self, room_id: str):
@@ -323,8 +423,10 @@ class RoomService:
             )
         
         # Soft delete the room
-        await self.collection.update_one(
+        room = await self.collection.find_one_and_update(
             {"_id": ObjectId(room_id)}, 
             {"$set": {"isDeleted": True, "updatedAt": now}}
         )
+        if beds and room:
+            await DashboardStatsService.rebuild_many([room.get("propertyId")])
         return {"success": True, "roomId": room_id}
@@ -1,7 +1,14 @@
 from app.models.staff_schema import Staff, StaffOut, StaffCreate, StaffUpdate
 from app.database.mongodb import getCollection
+from app.services.dashboard_stats_service import DashboardStatsService
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+from typing import List, Optional
+from app.utils.pagination import apply_cursor, count_cache, page_result
+from app.utils.search_terms import SEARCH_TERMS_FIELD, STAFF_SEARCH_FIELDS, search_filter, search_terms, with_search_terms
+
+STAFF_LIST_SORT = [("_id", -1)]
 
 
 class StaffService:
@@ -15,19 +22,32 @@ class StaffService:
         role: str = None,
         skip: int = 0,
         limit: int = 50,
+        property_ids: Optional[List[str]] = None,
+        cursor: str = None,
+        include_total: bool = True,
+        search_mode: str = "prefix",
     ):
-        """Get list of staff with optional filtering"""
+        """
+        Get list of staff with optional filtering, newest first.
+
+        `search` matches name, mobileNumber and address by word prefix, or by
+        whole word with search_mode="text" (see app.utils.search_terms).
+
+        Pages by skip/limit or by a keyset `cursor` (skip is ignored when set).
+        Returns: (staff, total, next_cursor); total is None when include_total
+        is False. Raises ValueError for a malformed cursor or unknown search_mode.
+        """
         query = {}
+
+        if property_ids is not None:
+            if not property_ids or (property_id and property_id not in property_ids):
+                return [], 0, None
+            query["propertyId"] = {"$in": property_ids}
         
         if property_id:
             query["propertyId"] = property_id
         
-        if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"mobileNumber": {"$regex": search, "$options": "i"}},
-                {"address": {"$regex": search, "$options": "i"}},
-            ]
+        query.update(search_filter(search, search_mode))
         
         if role:
             query["role"] = role
@@ -35,15 +55,20 @@ class StaffService:
         # Filter out archived by default
         query["archived"] = False
 
-        total = await self.collection.count_documents(query)
+        total = await count_cache.count(self.collection, query) if include_total else None
 
-        staff_list = await self.collection.find(query).skip(skip).limit(limit).sort(
-            "_id", -1
-        ).to_list(length=limit)
+        page_query = apply_cursor(query, STAFF_LIST_SORT, cursor)
+        if cursor:
+            skip = 0
+
+        staff_list = await self.collection.find(page_query).sort(STAFF_LIST_SORT).skip(skip).limit(
+            limit + 1
+        ).to_list(length=limit + 1)
+        staff_list, next_cursor = page_result(staff_list, limit, STAFF_LIST_SORT)
 
         return [
             self._convert_to_out(staff) for staff in staff_list
-        ], total
+        ], total, next_cursor
 
     async def get_staff(self, staff_id: str) -> StaffOut:
         """Get single staff by ID"""
@@ -58,9 +83,11 @@ class StaffService:
         staff_data["createdAt"] = datetime.now(timezone.utc).isoformat()
         staff_data["updatedAt"] = datetime.now(timezone.utc).isoformat()
         staff_data["archived"] = False
+        with_search_terms(staff_data, STAFF_SEARCH_FIELDS)
 
         result = await self.collection.insert_one(staff_data)
         created_staff = await self.collection.find_one({"_id": result.inserted_id})
+        await DashboardStatsService.apply_change("staff", None, created_staff)
         return self._convert_to_out(created_staff)
 
     async def update_staff(self, staff_id: str, staff_data: dict) -> StaffOut:
@@ -68,12 +95,21 @@ class StaffService:
         staff_data["updatedAt"] = datetime.now(timezone.utc).isoformat()
 
         try:
-            result = await self.collection.find_one_and_update(
+            original = await self.collection.find_one_and_update(
                 {"_id": ObjectId(staff_id)},
                 {"$set": staff_data},
-                return_document=True,
+                return_document=ReturnDocument.BEFORE,
             )
-            return self._convert_to_out(result) if result else None
+            if not original:
+                return None
+            result = {**original, **staff_data}
+            # Terms need the stored fields too, so they follow the partial update
+            if any(field in staff_data for field in STAFF_SEARCH_FIELDS):
+                terms = search_terms(result, STAFF_SEARCH_FIELDS)
+                if terms != original.get(SEARCH_TERMS_FIELD):
+                    await self.collection.update_one({"_id": original["_id"]}, {"$set": {SEARCH_TERMS_FIELD: terms}})
+            await DashboardStatsService.apply_change("staff", original, result)
+            return self._convert_to_out(result)
         except Exception:
             return None
 
@@ -85,10 +121,13 @@ class StaffService:
                 "archivedAt": datetime.now(timezone.utc).isoformat(),
                 "updatedAt": datetime.now(timezone.utc).isoformat(),
             }
-            result = await self.collection.update_one(
+            original = await self.collection.find_one_and_update(
                 {"_id": ObjectId(staff_id)}, {"$set": update_data}
             )
-            return result.modified_count > 0
+            if not original:
+                return False
+            await DashboardStatsService.apply_change("staff", original, {**original, **update_data})
+            return True
         except Exception:
             return False
 
@@ -101,10 +140,14 @@ class StaffService:
                 "archivedAt": None,
                 "updatedAt": datetime.now(timezone.utc).isoformat(),
             }
-            result = await self.collection.find_one_and_update(
-                {"_id": ObjectId(staff_id)}, {"$set": update_data}, return_document=True
+            original = await self.collection.find_one_and_update(
+                {"_id": ObjectId(staff_id)}, {"$set": update_data}, return_document=ReturnDocument.BEFORE
             )
-            return self._convert_to_out(result) if result else None
+            if not original:
+                return None
+            result = {**original, **update_data}
+            await DashboardStatsService.apply_change("staff", original, result)
+            return self._convert_to_out(result)
         except Exception:
             return None
 
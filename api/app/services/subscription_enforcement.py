@@ -90,9 +90,12 @@ class SubscriptionEnforcement:
             )
 
     @staticmethod
-    async def ensure_can_create_tenant(owner_id: str, property_id: str) -> None:
+    async def ensure_can_create_tenant(owner_id: str, property_id: str, count: int = 1) -> int:
         """
-        Check if owner can create a new tenant under this property.
+        Check if owner can create `count` new tenants under this property.
+
+        Returns: remaining tenant quota for the property, so a bulk import can
+        check once and stop at the limit
         
         Raises:
             HTTPException 402: If subscription is expired or tenant quota exceeded per property
@@ -140,7 +143,7 @@ class SubscriptionEnforcement:
             )
 
             # Check quota (max tenants per property)
-            if current >= limits["tenants"]:
+            if current + count > limits["tenants"]:
                 raise HTTPException(
                     status_code=status.HTTP_402_PAYMENT_REQUIRED,
                     detail=f"You've reached the limit of {limits['tenants']} tenants per property on {sub.plan.title()} plan. "
@@ -148,8 +151,9 @@ class SubscriptionEnforcement:
                 )
 
             logger.info(
-                f"Tenant creation allowed for {owner_id} ({sub.plan} plan, {current}/{limits['tenants']} tenants in this property)"
+                f"Tenant creation allowed for {owner_id} ({sub.plan} plan, {current}+{count}/{limits['tenants']} tenants in this property)"
             )
+            return limits["tenants"] - current
         except HTTPException:
             raise
         except Exception as e:
@@ -160,9 +164,9 @@ class SubscriptionEnforcement:
             )
 
     @staticmethod
-    async def ensure_can_create_room(owner_id: str, property_id: str) -> None:
+    async def ensure_can_create_room(owner_id: str, property_id: str, count: int = 1) -> None:
         """
-        Check if owner can create a new room in this property.
+        Check if owner can create `count` new rooms in this property.
         
         Raises:
             HTTPException 402: If subscription is expired or room quota exceeded per property
@@ -211,7 +215,7 @@ class SubscriptionEnforcement:
 
             # Check quota (30 rooms per property)
             room_limit = limits["rooms"]
-            if current >= room_limit:
+            if current + count > room_limit:
                 raise HTTPException(
                     status_code=status.HTTP_402_PAYMENT_REQUIRED,
                     detail=f"You've reached the limit of {room_limit} rooms per property. "
@@ -219,7 +223,7 @@ class SubscriptionEnforcement:
                 )
 
             logger.info(
-                f"Room creation allowed for {owner_id} ({sub.plan} plan, {current}/{room_limit} rooms in property)"
+                f"Room creation allowed for {owner_id} ({sub.plan} plan, {current}+{count}/{room_limit} rooms in property)"
             )
         except HTTPException:
             raise
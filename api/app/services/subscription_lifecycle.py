@@ -5,6 +5,7 @@ Handles subscription downgrades, upgrades, and resource archival with grace peri
 
 from app.database.mongodb import db
 from app.services.subscription_service import SubscriptionService
+from app.services.dashboard_stats_service import DashboardStatsService
 from datetime import datetime, timedelta
 from bson import ObjectId
 from app.utils.ownership import build_owner_query
@@ -140,6 +141,10 @@ class SubscriptionLifecycle:
                     if result.modified_count > 0:
                         archived_tenants.append(str(tenant["_id"]))
 
+            # Archived tenants drop out of the dashboard counters
+            if archived_properties or archived_tenants:
+                await DashboardStatsService.rebuild_many(property_ids)
+
             logger.info(
                 f"Downgrade for {owner_id}: archived {len(archived_properties)} properties, "
                 f"{len(archived_rooms)} rooms, {len(archived_tenants)} tenants"
@@ -216,6 +221,9 @@ class SubscriptionLifecycle:
                 }
             )
             
+            if restore_tenants.modified_count:
+                await DashboardStatsService.rebuild_many(property_ids)
+
             logger.info(
                 f"Upgrade for {owner_id}: restored {restore_prop.modified_count} properties, "
                 f"{restore_rooms.modified_count} rooms, {restore_tenants.modified_count} tenants"
@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 from app.utils.ownership import build_owner_query
 import logging
 from app.config.default_plans import get_default_plan
+from app.utils.auth_context_cache import auth_context_cache
+from app.utils.plan_cache import plan_cache
 
 logger = logging.getLogger(__name__)
 
@@ -135,6 +137,7 @@ class SubscriptionService:
                 }},
                 return_document=True
             )
+            await auth_context_cache.invalidate(owner_id)
             
             if result:
                 return Subscription(**result)
@@ -201,8 +204,8 @@ class SubscriptionService:
 
     @staticmethod
     async def get_plan_limits(plan: str):
-        """Get features/limits for a plan from database"""
-        plan_doc = await db.plans.find_one({"name": plan.lower()})
+        """Get features/limits for a plan (cached; falls back to config defaults)"""
+        plan_doc = await plan_cache.get_plan(plan)
         if not plan_doc:
             plan_doc = get_default_plan(plan)
             if not plan_doc:
@@ -216,11 +219,12 @@ class SubscriptionService:
 
     @staticmethod
     async def get_all_plans():
-        """Get all available plans with their pricing tiers from database"""
-        cursor = db.plans.find({"is_active": True}).sort("sort_order", 1)
+        """Get all available plans with their pricing tiers (cached)"""
         result = []
         
-        async for plan_doc in cursor:
+        for plan_doc in await plan_cache.get_plans():
+            if plan_doc.get("is_active") is not True:
+                continue
             plan_info = {
                 'name': plan_doc['name'],
                 'properties': plan_doc['properties'],
@@ -291,6 +295,7 @@ class SubscriptionService:
                 }},
                 return_document=True
             )
+            await auth_context_cache.invalidate(owner_id)
             if result:
                 return Subscription(**result)
         except Exception as e:
@@ -404,6 +409,7 @@ class SubscriptionService:
                 {"$set": sub_doc},
                 upsert=True
             )
+            await auth_context_cache.invalidate(owner_id)
             
             logger.info(f"✓ Created default free subscription for user {owner_id}")
             
@@ -442,6 +448,7 @@ class SubscriptionService:
                     "updatedAt": datetime.now().isoformat()
                 }}
             )
+            await auth_context_cache.invalidate(owner_id)
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error enabling auto-renewal for {owner_id}: {str(e)}")
@@ -466,6 +473,7 @@ class SubscriptionService:
                     "updatedAt": datetime.now().isoformat()
                 }}
             )
+            await auth_context_cache.invalidate(owner_id)
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error disabling auto-renewal for {owner_id}: {str(e)}")
@@ -531,6 +539,7 @@ class SubscriptionService:
                     "updatedAt": now
                 }}
             )
+            await auth_context_cache.invalidate(owner_id)
             
             logger.info(f"✓ Subscription cancelled for user {owner_id}")
             
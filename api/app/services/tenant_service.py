@@ -1,22 +1,109 @@
 from app.models.tenant_schema import Tenant, TenantOut, BillingStatus, BillingCycle
-from app.models.bed_schema import BedUpdate, BedStatus
+from app.models.bed_schema import BedStatus
 from app.models.payment_schema import PaymentMethod
-from app.services.bed_service import BedService
 from app.database.mongodb import getCollection
 from datetime import datetime, timezone, date
 from dateutil.relativedelta import relativedelta
 from bson import ObjectId
 from app.models.payment_schema import PaymentCreate
 from app.services.payment_service import PaymentService
-from app.models.tenant_schema import BillingConfig
-from typing import Optional, List, Tuple
+from app.services.dashboard_stats_service import DashboardStatsService
+from app.utils.money import to_paise
+from app.utils.refs import object_id_or_none, ref_or_source, with_refs, TENANT_REFS, PAYMENT_REFS
+from app.utils.pagination import apply_cursor, count_cache, page_result
+from app.utils.search_terms import search_filter, with_search_terms, TENANT_SEARCH_FIELDS
+from app.models.tenant_schema import BillingConfig, TenantCreate
+from app.services.room_service import RoomService
+from app.database.transactions import run_in_transaction
+from app.config import settings
+from app.utils.scheduler_lock import PARTITION_HASH_FIELD, partition_filter, partition_hash
+from pydantic import ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from typing import AsyncIterable, AsyncIterator, Dict, Optional, List, Tuple
+import logging
+import time
 
+logger = logging.getLogger(__name__)
+
+
+class _ImportBedPool:
+    """Available beds of one property, prefetched once and claimed in memory during an import"""
+
+    def __init__(self, rooms_by_number: Dict[str, str], beds: List[dict]):
+        self.rooms_by_number = rooms_by_number
+        self.free = {str(bed["_id"]): bed for bed in beds}
+        position = RoomService._bed_position
+        self.by_room: Dict[str, List[str]] = {}
+        for bed in sorted(beds, key=lambda b: (position(b) is None, position(b) or 0)):
+            self.by_room.setdefault(bed.get("roomId"), []).append(str(bed["_id"]))
+
+    @classmethod
+    async def load(cls, property_id: str) -> "_ImportBedPool":
+        rooms = getCollection("rooms").find(
+            {"propertyId": property_id, "isDeleted": {"$ne": True}}, {"roomNumber": 1}
+        )
+        rooms_by_number = {str(room.get("roomNumber")): str(room["_id"]) async for room in rooms}
+        beds = await getCollection("beds").find(
+            {"propertyId": property_id, "isDeleted": {"$ne": True}, "status": BedStatus.AVAILABLE.value},
+            {"roomId": 1, "bedNumber": 1, "status": 1, "propertyId": 1, "isDeleted": 1},
+        ).to_list(length=None)
+        return cls(rooms_by_number, beds)
+
+    def claim(self, room_id: Optional[str], bed_id: Optional[str], room_number=None, bed_number=None) -> Optional[dict]:
+        """Take a bed out of the pool for a row. Raises ValueError when the requested bed is not free."""
+        if not room_id and room_number is not None:
+            room_id = self.rooms_by_number.get(str(room_number))
+            if not room_id:
+                raise ValueError(f"Room {room_number} not found")
+
+        if bed_id:
+            bed = self.free.get(bed_id)
+            if not bed:
+                raise ValueError(f"Bed {bed_id} is not available")
+            if room_id and bed.get("roomId") != room_id:
+                raise ValueError(f"Bed {bed_id} is not in room {room_id}")
+        elif bed_number is not None:
+            if not room_id:
+                raise ValueError("roomId or roomNumber is required with bedNumber")
+            bed = next(
+                (self.free[b] for b in self.by_room.get(room_id, []) if str(self.free[b].get("bedNumber")) == str(bed_number)),
+                None,
+            )
+            if not bed:
+                raise ValueError(f"Bed {bed_number} in room {room_number or room_id} is not available")
+        elif room_id:
+            free_in_room = self.by_room.get(room_id)
+            if not free_in_room:
+                raise ValueError(f"No available bed in room {room_number or room_id}")
+            bed = self.free[free_in_room[0]]
+        else:
+            return None
+
+        bed_key = str(bed["_id"])
+        del self.free[bed_key]
+        self.by_room[bed.get("roomId")].remove(bed_key)
+        return bed
+
+
+def _row_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+            for e in error.errors()
+        )
+    return str(error)
 
 
-bed_service = BedService()
-payment_service = PaymentService()
 class TenantService:
 
+    # Columns of GET /tenants/export; the file can be fed back to POST /tenants/import
+    EXPORT_FIELDS = [
+        "id", "name", "phone", "documentId", "address", "rent", "tenantStatus",
+        "joinDate", "checkoutDate", "roomId", "roomNumber", "bedId", "bedNumber",
+        "autoGeneratePayments", "billingConfig.status", "billingConfig.billingCycle",
+        "billingConfig.anchorDay", "billingConfig.method", "createdAt",
+    ]
+
     def __init__(self):
         self.collection = getCollection("tenants")
 
@@ -51,94 +138,33 @@ class TenantService:
 
         return True, current_month_anchor
 
-    async def get_tenants(
-        self,
-        property_id: str = None,
-        search: str = None,
-        status: str = None,
-        skip: int = 0,
-        limit: int = 50,
-        include_room_bed: bool = True,
-        property_ids: Optional[List[str]] = None,
-        sort: str = None,
-    ):
-        query = {"isDeleted": {"$ne": True}}
-
-        if property_ids is not None:
-            if not property_ids:
-                return [], 0
-            query["propertyId"] = {"$in": property_ids}
+    @staticmethod
+    def list_sort(sort_order: int) -> list:
+        """Sort keys for the tenant list; _id breaks createdAt ties so keyset cursors are stable"""
+        return [("createdAt", sort_order), ("_id", sort_order)]
 
-        if property_id:
-            if property_ids is not None and property_id not in property_ids:
-                return [], 0
-            query["propertyId"] = property_id
-        if search:
-            # Search in name, phone, documentId
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"phone": {"$regex": search, "$options": "i"}},
-                {"documentId": {"$regex": search, "$options": "i"}}
-            ]
-        if status:
-            # Filter by tenantStatus (active/vacated)
-            query["tenantStatus"] = status
-        
-        # Get total count
-        total = await self.collection.count_documents(query)
-        
-        # Determine sort order
-        sort_order = -1  # Default: newest first
-        if sort == 'oldest':
-            sort_order = 1
-        
-        # Build aggregation pipeline to replace N+1 queries
-        pipeline = [{"$match": query}]
+    @staticmethod
+    def _build_list_pipeline(query: dict, sort_order: int, skip: int, limit: int, include_room_bed: bool = True) -> list:
+        """
+        Page first, then join: the lookups run for at most `limit` tenants and
+        use the typed roomRef/bedRef fields against the rooms/beds `_id` index.
+        Tenants the refs backfill has not reached join on their converted
+        roomId/bedId instead.
+        """
+        pipeline = [
+            {"$match": query},
+            {"$sort": dict(TenantService.list_sort(sort_order))},  # -1 for newest first, 1 for oldest first
+            {"$skip": skip},
+            {"$limit": limit},
+        ]
         
         if include_room_bed:
             pipeline.extend([
+                {"$addFields": {"roomRef": ref_or_source("$roomRef", "$roomId"), "bedRef": ref_or_source("$bedRef", "$bedId")}},
                 # Lookup room info
-                {
-                    "$lookup": {
-                        "from": "rooms",
-                        "let": {"roomId": "$roomId"},
-                        "as": "room_info",
-                        "pipeline": [
-                            {
-                                "$match": {
-                                    "$expr": {
-                                        "$eq": [
-                                            {"$toString": "$_id"},
-                                            {"$toString": "$$roomId"}
-                                        ]
-                                    }
-                                }
-                            },
-                            {"$project": {"roomNumber": 1}}
-                        ]
-                    }
-                },
+                {"$lookup": {"from": "rooms", "localField": "roomRef", "foreignField": "_id", "as": "room_info"}},
                 # Lookup bed info
-                {
-                    "$lookup": {
-                        "from": "beds",
-                        "let": {"bedId": "$bedId"},
-                        "as": "bed_info",
-                        "pipeline": [
-                            {
-                                "$match": {
-                                    "$expr": {
-                                        "$eq": [
-                                            {"$toString": "$_id"},
-                                            {"$toString": "$$bedId"}
-                                        ]
-                                    }
-                                }
-                            },
-                            {"$project": {"bedNumber": 1}}
-                        ]
-                    }
-                },
+                {"$lookup": {"from": "beds", "localField": "bedRef", "foreignField": "_id", "as": "bed_info"}},
                 # Project enriched fields
                 {
                     "$project": {
@@ -165,22 +191,74 @@ class TenantService:
                     }
                 }
             ])
+        return pipeline
+
+    async def get_tenants(
+        self,
+        property_id: str = None,
+        search: str = None,
+        status: str = None,
+        skip: int = 0,
+        limit: int = 50,
+        include_room_bed: bool = True,
+        property_ids: Optional[List[str]] = None,
+        sort: str = None,
+        cursor: str = None,
+        include_total: bool = True,
+        search_mode: str = "prefix",
+    ):
+        """
+        List tenants, paged either by skip/limit or by a keyset `cursor`
+        (from a previous call's next_cursor; skip is ignored when set).
+
+        `search` matches name, phone and documentId by word prefix, or by
+        whole word with search_mode="text" (see app.utils.search_terms).
+
+        Returns: (tenants, total, next_cursor). total is None when
+        include_total is False; next_cursor is None on the last page.
+        Raises ValueError for a malformed cursor or unknown search_mode.
+        """
+        query = {"isDeleted": {"$ne": True}}
+
+        if property_ids is not None:
+            if not property_ids:
+                return [], 0, None
+            query["propertyId"] = {"$in": property_ids}
+
+        if property_id:
+            if property_ids is not None and property_id not in property_ids:
+                return [], 0, None
+            query["propertyId"] = property_id
+        # Search in name, phone, documentId
+        query.update(search_filter(search, search_mode))
+        if status:
+            # Filter by tenantStatus (active/vacated)
+            query["tenantStatus"] = status
         
-        pipeline.extend([
-            {"$sort": {"createdAt": sort_order}},  # Sort by createdAt: -1 for newest first, 1 for oldest first
-            {"$skip": skip},
-            {"$limit": limit}
-        ])
+        # Determine sort order
+        sort_order = -1  # Default: newest first
+        if sort == 'oldest':
+            sort_order = 1
+        sort_keys = self.list_sort(sort_order)
+
+        page_query = apply_cursor(query, sort_keys, cursor)
+        if cursor:
+            skip = 0
+
+        # Total over the whole filter (not just after the cursor), reused briefly across pages
+        total = await count_cache.count(self.collection, query) if include_total else None
         
-        # Execute aggregation pipeline
-        cursor = self.collection.aggregate(pipeline)
+        # Fetch one extra row to know whether another page exists
+        pipeline = self._build_list_pipeline(page_query, sort_order, skip, limit + 1, include_room_bed)
+        docs = await self.collection.aggregate(pipeline).to_list(length=limit + 1)
+        docs, next_cursor = page_result(docs, limit, sort_keys)
+
         tenants = []
-        
-        async for doc in cursor:
+        for doc in docs:
             doc["id"] = str(doc["_id"])
             tenants.append(TenantOut(**doc))
         
-        return tenants, total
+        return tenants, total, next_cursor
 
     async def get_tenant(self, tenant_id: str):
         doc = await self.collection.find_one({"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}})
@@ -189,7 +267,67 @@ class TenantService:
             return Tenant(**doc)
         return None
 
+    @staticmethod
+    def _bed_filter(bed_id: str) -> dict:
+        # Beds created before ObjectId ids were used are addressed by their `id` field
+        bed_oid = object_id_or_none(bed_id)
+        return {"_id": bed_oid} if bed_oid else {"id": bed_id}
+
+    @classmethod
+    async def _claim_bed(cls, bed_id: str, tenant_id: str, session=None) -> dict:
+        """
+        Occupy a bed for a tenant with one conditional write: it only matches
+        while the bed is available (or already held by this tenant), so two
+        requests can never both get it. Returns the bed before the write.
+        Raises ValueError when the bed is taken or does not exist.
+        """
+        before = await getCollection("beds").find_one_and_update(
+            {
+                **cls._bed_filter(bed_id),
+                "isDeleted": {"$ne": True},
+                "$or": [{"status": BedStatus.AVAILABLE.value}, {"tenantId": tenant_id}],
+            },
+            {"$set": {
+                "status": BedStatus.OCCUPIED.value,
+                "tenantId": tenant_id,
+                "updatedAt": datetime.now(timezone.utc).isoformat(),
+            }},
+            return_document=ReturnDocument.BEFORE,
+            session=session,
+        )
+        if not before:
+            raise ValueError(f"Bed {bed_id} is already occupied by another tenant")
+        return before
+
+    @classmethod
+    async def _release_bed(cls, bed_id: str, tenant_id: str, session=None, only_if_held: bool = False) -> Optional[dict]:
+        """
+        Free a bed unless another tenant holds it (with only_if_held, unless
+        this tenant holds it). Returns the bed before the write, or None.
+        """
+        holder = tenant_id if only_if_held else {"$in": [tenant_id, None]}
+        return await getCollection("beds").find_one_and_update(
+            {**cls._bed_filter(bed_id), "isDeleted": {"$ne": True}, "tenantId": holder},
+            {"$set": {
+                "status": BedStatus.AVAILABLE.value,
+                "tenantId": None,
+                "updatedAt": datetime.now(timezone.utc).isoformat(),
+            }},
+            return_document=ReturnDocument.BEFORE,
+            session=session,
+        )
+
+    @staticmethod
+    def _bed_change(before: dict, status: str) -> Tuple[dict, dict]:
+        """(before, after) pair for the dashboard stats from the pre-image of a claim or release"""
+        return before, {**before, "status": status}
+
     async def create_tenant(self, tenant_data: dict):
+        """
+        Insert the tenant, claim its bed and create its initial payment in one
+        transaction (see app.database.transactions). Raises ValueError when the
+        bed is not available.
+        """
         now = datetime.now(timezone.utc).isoformat()
         if not tenant_data.get("createdAt"):
             tenant_data["createdAt"] = now
@@ -197,14 +335,48 @@ class TenantService:
             tenant_data["updatedAt"] = now
         
         tenant_data["isDeleted"] = False
-
-        # Validate bed is available if provided
-        bed_id = tenant_data.get("bedId")
-        if bed_id:
-            bed = await bed_service.get_bed(bed_id)
-            if bed and bed.status == BedStatus.OCCUPIED.value:
-                raise ValueError(f"Bed is already occupied")
+        billing_config = self._apply_billing_config(tenant_data)
         
+        tenant_data["_id"] = ObjectId()
+        tenant_data["id"] = str(tenant_data["_id"])
+        tenant_data[PARTITION_HASH_FIELD] = partition_hash(tenant_data["id"])
+        with_refs(tenant_data, TENANT_REFS)
+        with_search_terms(tenant_data, TENANT_SEARCH_FIELDS)
+
+        payment = self._initial_payment(tenant_data, billing_config, datetime.now(timezone.utc).date())
+        payment_doc = PaymentService.build_payment_doc(payment, datetime.now(timezone.utc)) if payment else None
+        tenant_doc = {k: v for k, v in tenant_data.items() if k != "id"}
+
+        async def write(session):
+            # Claim first: a taken bed fails the request before anything is written
+            bed_before = None
+            if tenant_data.get("bedId"):
+                bed_before = await self._claim_bed(tenant_data["bedId"], tenant_data["id"], session)
+            await self.collection.insert_one(dict(tenant_doc), session=session)
+            if payment_doc:
+                await getCollection("payments").insert_one(dict(payment_doc), session=session)
+            return bed_before
+
+        try:
+            bed_before = await run_in_transaction(write)
+        except Exception:
+            await self._undo_tenant_inserts([tenant_data["_id"]])
+            raise
+
+        await DashboardStatsService.apply_change("tenants", None, tenant_data)
+        if bed_before:
+            await DashboardStatsService.apply_change("beds", *self._bed_change(bed_before, BedStatus.OCCUPIED.value))
+        if payment_doc:
+            await DashboardStatsService.apply_change("payments", None, payment_doc)
+
+        return Tenant(**tenant_data)
+
+    @staticmethod
+    def _apply_billing_config(tenant_data: dict) -> Optional[BillingConfig]:
+        """
+        Store billingConfig as a dict only when payments are auto-generated.
+        Returns the config to bill with, or None.
+        """
         # Get autoGeneratePayments flag
         auto_generate = tenant_data.get("autoGeneratePayments", True)
         
@@ -220,48 +392,310 @@ class TenantService:
         elif not auto_generate:
             # Remove billingConfig if auto-generate is disabled
             tenant_data.pop("billingConfig", None)
-        
-        result = await self.collection.insert_one(tenant_data)
-        tenant_data["id"] = str(result.inserted_id)
-        
-        # Update bed with tenantId and occupied status after tenant is created
-        if tenant_data.get("bedId"):
-            await bed_service.update_bed(tenant_data["bedId"], BedUpdate(status=BedStatus.OCCUPIED.value, tenantId=tenant_data["id"]))
+        return billing_config
 
+    @classmethod
+    def _initial_payment(cls, tenant_data: dict, billing_config: Optional[BillingConfig], today: date) -> Optional[PaymentCreate]:
+        """The payment to create with a new tenant, if its billing plan calls for one now."""
         # Create payment only if autoGeneratePayments is True and billingConfig exists
-        if auto_generate and billing_config:
-            anchor_day = billing_config.anchorDay
-            today_date = datetime.now(timezone.utc).date()
-            should_create_initial_payment, due_date = self._calculate_initial_payment_plan(
-                anchor_day=anchor_day,
-                billing_status=billing_config.status,
-                today=today_date,
+        if not billing_config:
+            return None
+        should_create_initial_payment, due_date = cls._calculate_initial_payment_plan(
+            anchor_day=billing_config.anchorDay,
+            billing_status=billing_config.status,
+            today=today,
+        )
+        if not should_create_initial_payment:
+            return None
+        return PaymentCreate(
+            tenantId=tenant_data["id"],
+            propertyId=tenant_data["propertyId"],
+            bed=tenant_data.get("bedId") or "",
+            amount=tenant_data["rent"],
+            status=billing_config.status,
+            dueDate=due_date,
+            method=billing_config.method or PaymentMethod.CASH.value
+        )
+
+    def _plan_import_row(self, property_id: str, record: dict, pool: _ImportBedPool, now: datetime) -> dict:
+        """
+        Validate one import row with TenantCreate, claim its bed from the pool and
+        build the tenant (and initial payment) documents create_tenant would write.
+        Raises ValueError (including pydantic's ValidationError) for a rejected row.
+        """
+        record = dict(record)
+        room_number = record.pop("roomNumber", None)
+        bed_number = record.pop("bedNumber", None)
+        record.pop("id", None)
+        if record.setdefault("propertyId", property_id) != property_id:
+            raise ValueError("propertyId does not match the property being imported into")
+
+        tenant_data = TenantCreate(**record).model_dump(exclude_unset=True)
+        bed = pool.claim(tenant_data.get("roomId"), tenant_data.get("bedId"), room_number, bed_number)
+        if bed:
+            tenant_data["roomId"] = bed.get("roomId")
+            tenant_data["bedId"] = str(bed["_id"])
+
+        created_at = now.isoformat()
+        tenant_data.setdefault("createdAt", created_at)
+        tenant_data.setdefault("updatedAt", created_at)
+        tenant_data["isDeleted"] = False
+        tenant_data["_id"] = ObjectId()
+        tenant_data[PARTITION_HASH_FIELD] = partition_hash(tenant_data["_id"])
+        billing_config = self._apply_billing_config(tenant_data)
+        with_refs(tenant_data, TENANT_REFS)
+        with_search_terms(tenant_data, TENANT_SEARCH_FIELDS)
+
+        payment = self._initial_payment({**tenant_data, "id": str(tenant_data["_id"])}, billing_config, now.date())
+        return {
+            "tenant": tenant_data,
+            "bed": bed,
+            "payment": PaymentService.build_payment_doc(payment, now) if payment else None,
+        }
+
+    async def _write_import_chunk(self, chunk: List[dict]) -> List[dict]:
+        """
+        Write one chunk of planned rows: a guarded bulk bed claim, then
+        insert_many for tenants and payments, in a transaction where the
+        deployment supports one. Returns the per-row results.
+        """
+        tenants = [item["tenant"] for item in chunk]
+        claims = [item for item in chunk if item["bed"]]
+        payments = [item["payment"] for item in chunk if item["payment"]]
+        updated_at = datetime.now(timezone.utc).isoformat()
+
+        async def write(session):
+            if claims:
+                result = await getCollection("beds").bulk_write([
+                    UpdateOne(
+                        {"_id": item["bed"]["_id"], "status": BedStatus.AVAILABLE.value, "isDeleted": {"$ne": True}},
+                        {"$set": {
+                            "status": BedStatus.OCCUPIED.value,
+                            "tenantId": str(item["tenant"]["_id"]),
+                            "updatedAt": updated_at,
+                        }},
+                    )
+                    for item in claims
+                ], ordered=False, session=session)
+                if result.matched_count != len(claims):
+                    raise ValueError("Some beds were taken while importing; retry these rows")
+            await self.collection.insert_many(tenants, ordered=False, session=session)
+            if payments:
+                await getCollection("payments").insert_many(payments, ordered=False, session=session)
+
+        try:
+            await run_in_transaction(write)
+        except Exception as e:
+            logger.error(f"Tenant import chunk of {len(chunk)} rows failed: {str(e)}")
+            # Without transaction support part of the chunk may have been written
+            await self._undo_tenant_inserts([doc["_id"] for doc in tenants])
+            message = str(e) if isinstance(e, ValueError) else "Error writing tenants. Please try again."
+            return [{"row": item["row"], "status": "error", "error": message} for item in chunk]
+
+        await DashboardStatsService.apply_changes("tenants", [(None, doc) for doc in tenants])
+        await DashboardStatsService.apply_changes("beds", [
+            (item["bed"], {**item["bed"], "status": BedStatus.OCCUPIED.value}) for item in claims
+        ])
+        await DashboardStatsService.apply_changes("payments", [(None, doc) for doc in payments])
+        return [
+            {
+                "row": item["row"],
+                "status": "created",
+                "id": str(item["tenant"]["_id"]),
+                "name": item["tenant"].get("name"),
+                "roomId": item["tenant"].get("roomId"),
+                "bedId": item["tenant"].get("bedId"),
+                "paymentCreated": item["payment"] is not None,
+            }
+            for item in chunk
+        ]
+
+    async def _undo_tenant_inserts(self, tenant_ids: List[ObjectId]) -> None:
+        """
+        Compensate for new tenants whose writes failed part-way. Only needed
+        without transaction support; after an aborted transaction it matches nothing.
+        """
+        try:
+            await getCollection("beds").update_many(
+                {"tenantId": {"$in": [str(tid) for tid in tenant_ids]}},
+                {"$set": {"status": BedStatus.AVAILABLE.value, "tenantId": None}},
             )
+            await getCollection("payments").delete_many({"tenantId": {"$in": [str(tid) for tid in tenant_ids]}})
+            await self.collection.delete_many({"_id": {"$in": tenant_ids}})
+        except Exception as e:
+            logger.error(f"Failed to roll back tenant writes: {str(e)}")
+
+    async def import_tenants(
+        self,
+        property_id: str,
+        records: AsyncIterable[Tuple[int, object]],
+        max_new: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Bulk-create tenants from (row number, record) pairs as produced by
+        app.utils.streaming.iter_records.
 
-            if should_create_initial_payment:
-                payment = PaymentCreate(
-                    tenantId=tenant_data["id"],
-                    propertyId=tenant_data["propertyId"],
-                    bed=tenant_data.get("bedId", ""),
-                    amount=tenant_data["rent"],
-                    status=billing_config.status,
-                    dueDate=due_date,
-                    method=billing_config.method or PaymentMethod.CASH.value
-                )
-                await payment_service.create_payment(payment)
+        Beds come from one prefetched map of available beds (bedId, or
+        roomId/roomNumber with an optional bedNumber; the lowest free bed of the
+        room otherwise). Rows are written in chunks of TENANT_IMPORT_CHUNK_SIZE
+        with bulk writes. `max_new` is the remaining tenant quota, checked once
+        by the caller; rows past it are rejected.
 
-        return Tenant(**tenant_data)
+        Yields one {"row", "status", ...} result per row as soon as it is known,
+        then a final {"summary": {...}}.
+        """
+        start = time.perf_counter()
+        chunk_size = max(1, settings.TENANT_IMPORT_CHUNK_SIZE)
+        pool = await _ImportBedPool.load(property_id)
+        summary = {"rows": 0, "created": 0, "failed": 0, "bedsAssigned": 0, "paymentsCreated": 0}
+        chunk: List[dict] = []
+        accepted = 0
+
+        async def flush():
+            nonlocal accepted
+            results = await self._write_import_chunk(chunk)
+            for item, result in zip(chunk, results):
+                if result["status"] == "created":
+                    summary["created"] += 1
+                    summary["bedsAssigned"] += 1 if item["bed"] else 0
+                    summary["paymentsCreated"] += 1 if item["payment"] else 0
+                else:
+                    summary["failed"] += 1
+                    accepted -= 1
+            return results
+
+        async for row_number, record in records:
+            summary["rows"] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                if max_new is not None and accepted >= max_new:
+                    raise ValueError("Tenant limit for this property reached. Upgrade your subscription to add more tenants.")
+                item = self._plan_import_row(property_id, record, pool, datetime.now(timezone.utc))
+            except ValueError as e:
+                summary["failed"] += 1
+                yield {"row": row_number, "status": "error", "error": _row_error(e)}
+                continue
+            item["row"] = row_number
+            chunk.append(item)
+            accepted += 1
+            if len(chunk) >= chunk_size:
+                for result in await flush():
+                    yield result
+                chunk = []
+
+        if chunk:
+            for result in await flush():
+                yield result
+        summary["durationMs"] = int((time.perf_counter() - start) * 1000)
+        yield {"summary": summary}
+
+    async def export_tenants(self, property_id: str, status: Optional[str] = None) -> AsyncIterator[dict]:
+        """
+        Tenants of a property, oldest first, read from a single cursor.
+
+        Room and bed numbers come from two small per-property dictionaries
+        built up front instead of a lookup per row.
+        """
+        rooms = getCollection("rooms").find({"propertyId": property_id}, {"roomNumber": 1})
+        room_numbers = {str(room["_id"]): room.get("roomNumber") async for room in rooms}
+        beds = getCollection("beds").find({"propertyId": property_id}, {"bedNumber": 1})
+        bed_numbers = {str(bed["_id"]): bed.get("bedNumber") async for bed in beds}
+
+        query = {"propertyId": property_id, "isDeleted": {"$ne": True}}
+        if status:
+            query["tenantStatus"] = status
+        projection = {field.split(".")[0]: 1 for field in self.EXPORT_FIELDS if field not in ("id", "roomNumber", "bedNumber")}
+        cursor = self.collection.find(query, projection).sort("_id", 1).batch_size(settings.EXPORT_CURSOR_BATCH_SIZE)
+        async for doc in cursor:
+            doc["id"] = str(doc.pop("_id"))
+            doc["roomNumber"] = room_numbers.get(doc.get("roomId"))
+            doc["bedNumber"] = bed_numbers.get(doc.get("bedId"))
+            yield doc
 
     async def update_tenant(self, tenant_id: str, tenant_data: dict):
+        """
+        Apply a PATCH, moving the tenant between beds as needed, in one transaction.
+
+        The new bed is claimed first with a conditional write, then the tenant
+        is updated only if its bed and status are still the ones the change was
+        planned from, and only then is the old bed released. Without transaction
+        support this ordering still never double-books a bed; with it, the
+        driver retries the whole change on transient errors.
+        Raises ValueError for a taken bed, a missing room/bed or a concurrent change.
+        """
         tenant_data["updatedAt"] = datetime.now(timezone.utc).isoformat()
         for protected_key in ["isDeleted"]:
             tenant_data.pop(protected_key, None)
+        claimed_now: List[str] = []
+
+        async def write(session):
+            claimed_now.clear()
+            data = dict(tenant_data)
+
+            # Get original tenant data
+            orig_doc = await self.collection.find_one({"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}}, session=session)
+            if not orig_doc:
+                return None
+
+            claims, releases = self._plan_bed_moves(orig_doc, data)
 
-        # Get original tenant data
-        orig_doc = await self.collection.find_one({"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}})
-        if not orig_doc:
+            bed_changes = []
+            for bed_id in claims:
+                before = await self._claim_bed(bed_id, tenant_id, session)
+                if before.get("tenantId") != tenant_id:
+                    claimed_now.append(bed_id)
+                bed_changes.append(self._bed_change(before, BedStatus.OCCUPIED.value))
+
+            # Ensure billingConfig is handled properly
+            if "billingConfig" in data:
+                data["billingConfig"] = data["billingConfig"] or None
+
+            # Update the tenant document, unless another request moved it meanwhile
+            with_refs(data, TENANT_REFS)
+            with_search_terms(data, TENANT_SEARCH_FIELDS, orig_doc)
+            doc = await self.collection.find_one_and_update(
+                {
+                    "_id": ObjectId(tenant_id),
+                    "isDeleted": {"$ne": True},
+                    "bedId": orig_doc.get("bedId"),
+                    "tenantStatus": orig_doc.get("tenantStatus"),
+                },
+                {"$set": data},
+                return_document=ReturnDocument.AFTER,
+                session=session,
+            )
+            if not doc:
+                raise ValueError("Tenant was changed by another request. Please reload and try again.")
+
+            for bed_id in releases:
+                before = await self._release_bed(bed_id, tenant_id, session)
+                if before:
+                    bed_changes.append(self._bed_change(before, BedStatus.AVAILABLE.value))
+            return orig_doc, doc, bed_changes
+
+        try:
+            result = await run_in_transaction(write)
+        except Exception:
+            # Without transaction support a bed claimed for this change stays taken otherwise
+            for bed_id in claimed_now:
+                await self._release_bed(bed_id, tenant_id, only_if_held=True)
+            raise
+        if result is None:
             return None
-            
+
+        orig_doc, doc, bed_changes = result
+        await DashboardStatsService.apply_changes("beds", bed_changes)
+        await DashboardStatsService.apply_change("tenants", orig_doc, doc)
+        doc["id"] = str(doc["_id"])
+        return Tenant(**doc)
+
+    @staticmethod
+    def _plan_bed_moves(orig_doc: dict, tenant_data: dict) -> Tuple[List[str], List[str]]:
+        """
+        Work out which beds a tenant update claims and releases, adjusting
+        `tenant_data` for status changes. Raises ValueError for invalid changes.
+        """
         orig_bed_id = orig_doc.get("bedId")
         orig_room_id = orig_doc.get("roomId")
         orig_status = orig_doc.get("tenantStatus", "active")
@@ -271,18 +705,13 @@ class TenantService:
         new_bed_id = tenant_data.get("bedId", orig_bed_id)
         new_room_id = tenant_data.get("roomId", orig_room_id)
         new_status = tenant_data.get("tenantStatus", orig_status)
-        
-        # Validate new bed is available (if different from current bed)
-        if new_bed_id and new_bed_id != orig_bed_id:
-            bed = await bed_service.get_bed(new_bed_id)
-            if bed and bed.status == BedStatus.OCCUPIED.value and bed.tenantId != tenant_id:
-                raise ValueError(f"Bed {new_bed_id} is already occupied by another tenant")
+        claims, releases = [], []
         
         # Handle tenant status change to vacated
         if new_status == "vacated" and orig_status != "vacated":
             # Free up current bed if assigned
             if orig_bed_id:
-                await bed_service.update_bed(orig_bed_id, BedUpdate(status=BedStatus.AVAILABLE.value, tenantId=None))
+                releases.append(orig_bed_id)
             
             # Clear roomId and bedId
             tenant_data["roomId"] = None
@@ -302,7 +731,7 @@ class TenantService:
                 raise ValueError("Room and bed are mandatory when reactivating a vacated tenant")
             
             # Occupy the new bed
-            await bed_service.update_bed(new_bed_id, BedUpdate(status=BedStatus.OCCUPIED.value, tenantId=tenant_id))
+            claims.append(new_bed_id)
             
             # Clear checkout date when reactivating
             if "checkoutDate" not in tenant_data:
@@ -314,221 +743,264 @@ class TenantService:
             if not new_bed_id or not new_room_id:
                 raise ValueError("Room and bed are mandatory for active tenants")
             
-            bed_changed = orig_bed_id != new_bed_id
-            
-            if bed_changed:
-                # Free up old bed if it existed
+            if orig_bed_id != new_bed_id:
+                # Occupy the new bed, then free the old one
+                claims.append(new_bed_id)
                 if orig_bed_id:
-                    await bed_service.update_bed(orig_bed_id, BedUpdate(status=BedStatus.AVAILABLE.value, tenantId=None))
-                
-                # Occupy new bed if it's being assigned
-                if new_bed_id:
-                    await bed_service.update_bed(new_bed_id, BedUpdate(status=BedStatus.OCCUPIED.value, tenantId=tenant_id))
-        
-        # Ensure billingConfig is handled properly
-        if "billingConfig" in tenant_data:
-            tenant_data["billingConfig"] = tenant_data["billingConfig"] or None
-        
-        # Update the tenant document
-        await self.collection.update_one({"_id": ObjectId(tenant_id)}, {"$set": tenant_data})
-        
-        # Fetch and return updated tenant
-        doc = await self.collection.find_one({"_id": ObjectId(tenant_id)})
-        if doc:
-            doc["id"] = str(doc["_id"])
-            return Tenant(**doc)
-        return None
+                    releases.append(orig_bed_id)
+        return claims, releases
 
     async def delete_tenant(self, tenant_id: str):
-        # Find the tenant to get the bedId
-        doc = await self.collection.find_one({"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}})
-        if not doc:
-            return {"success": False, "message": "Tenant not found or already deleted."}
-
-        bed_id = doc.get("bedId")
-        if bed_id:
-            # Set bed to available and clear tenantId
-            await bed_service.update_bed(bed_id, BedUpdate(status=BedStatus.AVAILABLE.value, tenantId=None))
-        
+        """Soft-delete the tenant and its payments and free its bed, in one transaction"""
         now = datetime.now(timezone.utc).isoformat()
-
-        # Soft delete all payments associated with this tenant
         payments_collection = getCollection("payments")
-        await payments_collection.update_many(
-            {"tenantId": tenant_id},
-            {"$set": {"isDeleted": True, "updatedAt": now}}
-        )
-        
-        # Soft delete the tenant and normalize status fields for consistency
-        await self.collection.update_one(
-            {"_id": ObjectId(tenant_id)},
-            {
-                "$set": {
-                    "isDeleted": True,
-                    "updatedAt": now,
-                    "tenantStatus": "vacated",
-                    "checkoutDate": doc.get("checkoutDate") or now,
-                    "billingConfig": None,
-                    "roomId": None,
-                    "bedId": None,
-                }
-            }
-        )
+
+        async def write(session):
+            # Find the tenant to get the bedId
+            doc = await self.collection.find_one({"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}}, session=session)
+            if not doc:
+                return None
+
+            # Soft delete the tenant and normalize status fields for consistency
+            result = await self.collection.update_one(
+                {"_id": ObjectId(tenant_id), "isDeleted": {"$ne": True}},
+                {
+                    "$set": {
+                        "isDeleted": True,
+                        "updatedAt": now,
+                        "tenantStatus": "vacated",
+                        "checkoutDate": doc.get("checkoutDate") or now,
+                        "billingConfig": None,
+                        "roomId": None,
+                        "bedId": None,
+                        "roomRef": None,
+                        "bedRef": None,
+                    }
+                },
+                session=session,
+            )
+            if not result.modified_count:
+                # Deleted by a concurrent request
+                return None
+
+            bed_before = None
+            if doc.get("bedId"):
+                # Set bed to available and clear tenantId
+                bed_before = await self._release_bed(doc["bedId"], tenant_id, session)
+
+            # Soft delete all payments associated with this tenant
+            live_payments = await payments_collection.find(
+                {"tenantId": tenant_id, "isDeleted": {"$ne": True}},
+                {"propertyId": 1, "status": 1, "amount": 1, "amountPaise": 1, "paidDate": 1},
+                session=session,
+            ).to_list(length=None)
+            await payments_collection.update_many(
+                {"tenantId": tenant_id},
+                {"$set": {"isDeleted": True, "updatedAt": now}},
+                session=session,
+            )
+            return doc, bed_before, live_payments
+
+        result = await run_in_transaction(write)
+        if result is None:
+            return {"success": False, "message": "Tenant not found or already deleted."}
+
+        doc, bed_before, live_payments = result
+        if bed_before:
+            await DashboardStatsService.apply_change("beds", *self._bed_change(bed_before, BedStatus.AVAILABLE.value))
+        await DashboardStatsService.apply_changes("payments", [(p, None) for p in live_payments])
+        await DashboardStatsService.apply_change("tenants", doc, None)
         return {
             "success": True, 
             "tenantId": tenant_id,
             "message": "Tenant and all associated payment records soft-deleted successfully."
         }
 
-    async def generate_monthly_payments(self):
+    @classmethod
+    def _plan_missing_due_dates(cls, tenant_doc: dict, latest_due_date: Optional[str], today: date) -> List[date]:
         """
-        Robust cron job with catch-up logic: ensures no payments are missed due to downtime.
-        For each tenant, find the latest payment and generate all missing payments
-        up to the current month's anchor day.
-        
-        Returns: {"created": int, "skipped": int, "errors": list, "duration_ms": int}
+        Compute, in memory, every due date missing for a tenant up to the
+        current month's anchor day (catch-up after downtime).
+
+        Args:
+            tenant_doc: Tenant document with billingConfig/joinDate/checkoutDate
+            latest_due_date: Latest existing (non-deleted) payment dueDate, if any
+            today: Reference date for the run
+        """
+        billing_config = BillingConfig(**tenant_doc["billingConfig"])
+        anchor_day = billing_config.anchorDay
+
+        # Determine the start date for generating missing payments
+        if latest_due_date:
+            # Start from the same anchor day in the month after the latest payment
+            current_due_date = cls._coerce_to_date(latest_due_date) + relativedelta(months=1, day=anchor_day)
+        else:
+            # Fall back to joinDate if no payments exist
+            join_date_str = tenant_doc.get("joinDate")
+            if not join_date_str:
+                return []  # Cannot determine start date
+            join_date = cls._coerce_to_date(join_date_str)
+            # First payment is on the anchorDay of the joining month OR next month
+            current_due_date = join_date + relativedelta(day=anchor_day)
+            if current_due_date < join_date:
+                current_due_date = current_due_date + relativedelta(months=1)
+
+        # Target: the latest anchor day that is not in the future.
+        # If today is March 11 and anchor is 5, target is March 5; on March 3 it is Feb 5.
+        target_due_date = today + relativedelta(day=anchor_day)
+        if target_due_date > today:
+            target_due_date = target_due_date - relativedelta(months=1)
+
+        # Never generate beyond the checkout date
+        checkout_date_str = tenant_doc.get("checkoutDate")
+        if checkout_date_str:
+            target_due_date = min(target_due_date, cls._coerce_to_date(checkout_date_str))
+
+        # Every planned date falls in a later month than the latest payment,
+        # so at most one payment per tenant per month is generated.
+        due_dates = []
+        while current_due_date <= target_due_date:
+            due_dates.append(current_due_date)
+            current_due_date = current_due_date + relativedelta(months=1, day=anchor_day)
+        return due_dates
+
+    async def generate_monthly_payments(self, partition: Optional[int] = None, partitions: int = 1):
+        """
+        Batched cron job with catch-up logic: ensures no payments are missed due to downtime.
+
+        Auto-billing tenants (projected fields only) are read from one cursor,
+        PAYMENT_GENERATION_BATCH_SIZE at a time. For each batch:
+        1. Prefetch the latest dueDate per tenant with one $group aggregation.
+        2. Compute every missing due date in memory.
+        3. insert_many(ordered=False) in bounded chunks; the unique
+           (tenantId, dueDate) index turns races into skipped duplicates.
+
+        With `partitions` > 1 the query only matches tenants whose stored
+        partitionHash falls in `partition`, so several workers split one run
+        without each scanning every tenant. Tenants not yet backfilled
+        (app.migrations.backfill_partition_hash) are picked up by the next run.
+
+        Returns: {"created": int, "skipped": int, "errors": list, "duration_ms": int,
+                  "tenants": int, "batches": int, "tenants_per_sec": float, "inserts_per_sec": float}
         """
         import time
         import logging
-        from datetime import date
+        from pymongo.errors import BulkWriteError
+        from app.config import settings
         
         logger = logging.getLogger(__name__)
         start_time = time.time()
         
         try:
-            result = {"created": 0, "skipped": 0, "errors": []}
+            result = {"created": 0, "skipped": 0, "errors": [], "tenants": 0, "batches": 0}
             payments_collection = getCollection("payments")
             today = datetime.now(timezone.utc).date()
+            batch_size = max(1, settings.PAYMENT_GENERATION_BATCH_SIZE)
+            if partition is not None and partitions > 1:
+                result["partition"] = partition
             
             logger.info(f"[CRON] Starting payment generation at {today.isoformat()}")
-            
-            # 1. Fetch all tenants eligible for auto-billing
-            tenant_cursor = self.collection.find({
-                "isDeleted": {"$ne": True},
-                "autoGeneratePayments": True,
-                "billingConfig": {"$exists": True},
-                "billingConfig.billingCycle": BillingCycle.MONTHLY.value,
-                "tenantStatus": {"$ne": "vacated"} # Skip clearly vacated tenants (already handled by checkout date check below)
-            })
-            
-            async for tenant_doc in tenant_cursor:
-                try:
-                    tenant_id = str(tenant_doc["_id"])
-                    billing_config_dict = tenant_doc.get("billingConfig", {})
-                    if not billing_config_dict:
-                        continue
-                        
-                    billing_config = BillingConfig(**billing_config_dict)
-                    anchor_day = billing_config.anchorDay
-                    
-                    # 2. Find the latest payment's dueDate for this tenant
-                    # Sort by dueDate descending to find the last one
-                    latest_payment = await payments_collection.find_one(
-                        {"tenantId": tenant_id, "isDeleted": {"$ne": True}},
-                        sort=[("dueDate", -1)]
-                    )
-                    
-                    # 3. Determine the start date for generating missing payments
-                    if latest_payment:
-                        # Start from the month after the latest payment
-                        last_due_date = self._coerce_to_date(latest_payment["dueDate"])
-                        # Move to the same anchor day in the next month
-                        current_due_date = last_due_date + relativedelta(months=1, day=anchor_day)
-                    else:
-                        # Fall back to joinDate if no payments exist
-                        join_date_str = tenant_doc.get("joinDate")
-                        if not join_date_str:
-                            continue # Cannot determine start date
-                        
-                        join_date = self._coerce_to_date(join_date_str)
-                        # First payment is on the anchorDay of the joining month OR next month
-                        current_due_date = join_date + relativedelta(day=anchor_day)
-                        if current_due_date < join_date:
-                            current_due_date = current_due_date + relativedelta(months=1)
-                    
-                    # 4. Target due date: The upcoming (or current) anchor day
-                    # If today is March 11 and anchor is 5, target is March 5.
-                    # If today is March 3 and anchor is 5, target is Feb 5 (if not already paid) OR wait until March 5.
-                    # Actually, if today is March 3 and anchor is 5, the "expected" due date for March isn't here yet.
-                    # The "latest" expected due date as of 'today' is:
-                    target_due_date = today + relativedelta(day=anchor_day)
-                    if target_due_date > today:
-                        target_due_date = target_due_date - relativedelta(months=1)
-                    
-                    # Skip if we are already up to date
-                    if current_due_date > target_due_date:
-                        result["skipped"] += 1
-                        continue
 
-                    # 5. Check for checkout date to bound generation
-                    checkout_limit = None
-                    checkout_date_str = tenant_doc.get("checkoutDate")
-                    if checkout_date_str:
-                        checkout_limit = self._coerce_to_date(checkout_date_str)
-
-                    # 6. Generate all missing payments in the gap
-                    while current_due_date <= target_due_date:
-                        # Stop if we pass the checkout date
-                        if checkout_limit and current_due_date > checkout_limit:
-                            break
-
-                        # Guardrail: never generate more than one payment for the same tenant in a month
-                        month_start = current_due_date.replace(day=1)
-                        month_end = month_start + relativedelta(months=1, days=-1)
-                        monthly_exists = await payments_collection.find_one({
-                            "tenantId": tenant_id,
-                            "isDeleted": {"$ne": True},
-                            "dueDate": {
-                                "$gte": month_start.isoformat(),
-                                "$lte": month_end.isoformat(),
-                            },
-                        })
-
-                        if monthly_exists:
-                            result["skipped"] += 1
-                            current_due_date = current_due_date + relativedelta(months=1, day=anchor_day)
+            async def process(tenants: List[dict]):
+                # 1. Latest dueDate for every tenant of the batch in one round trip
+                latest_rows = await payments_collection.aggregate([
+                    {"$match": {
+                        "tenantId": {"$in": [str(t["_id"]) for t in tenants]},
+                        "isDeleted": {"$ne": True},
+                    }},
+                    {"$group": {"_id": "$tenantId", "latestDueDate": {"$max": "$dueDate"}}},
+                ]).to_list(length=None)
+                latest_due_dates = {row["_id"]: row["latestDueDate"] for row in latest_rows}
+
+                # 2. Plan missing payments in memory
+                pending_docs = []
+                for tenant_doc in tenants:
+                    tenant_id = str(tenant_doc["_id"])
+                    try:
+                        if not tenant_doc.get("billingConfig"):
                             continue
-                            
-                        # Build payment data
-                        payment_data = {
-                            "tenantId": tenant_id,
-                            "propertyId": tenant_doc.get("propertyId"),
-                            "bed": tenant_doc.get("bedId", ""),
-                            "amount": tenant_doc.get("rent", "0"),
-                            "status": "due", # Missing payments are always 'due' by default
-                            "dueDate": current_due_date.isoformat(),
-                            "method": billing_config.method or PaymentMethod.CASH.value,
-                            "isDeleted": False,
-                            "createdAt": datetime.now(timezone.utc),
-                            "updatedAt": datetime.now(timezone.utc)
-                        }
-                        
-                        # Double check existence (uniqueness index also protects)
-                        exists = await payments_collection.find_one({
-                            "tenantId": tenant_id,
-                            "dueDate": payment_data["dueDate"],
-                            "isDeleted": {"$ne": True}
-                        })
-                        
-                        if not exists:
-                            await payments_collection.insert_one(payment_data)
-                            result["created"] += 1
-                        else:
+                        due_dates = self._plan_missing_due_dates(tenant_doc, latest_due_dates.get(tenant_id), today)
+                        if not due_dates:
                             result["skipped"] += 1
-                            
-                        # Advance to next month's anchor day
-                        current_due_date = current_due_date + relativedelta(months=1, day=anchor_day)
-
-                except Exception as tenant_error:
-                    logger.error(f"[CRON] Error for tenant {tenant_doc.get('_id')}: {str(tenant_error)}")
-                    result["errors"].append({
-                        "tenantId": str(tenant_doc.get("_id", "unknown")),
-                        "error": str(tenant_error)
-                    })
+                            continue
+
+                        method = tenant_doc["billingConfig"].get("method") or PaymentMethod.CASH.value
+                        rent = tenant_doc.get("rent", "0")
+                        now = datetime.now(timezone.utc)
+                        for due_date in due_dates:
+                            pending_docs.append(with_refs({
+                                "tenantId": tenant_id,
+                                "propertyId": tenant_doc.get("propertyId"),
+                                "bed": tenant_doc.get("bedId", ""),
+                                "amount": rent,
+                                "amountPaise": to_paise(rent),
+                                "status": "due", # Missing payments are always 'due' by default
+                                "dueDate": due_date.isoformat(),
+                                "method": method,
+                                "isDeleted": False,
+                                "createdAt": now,
+                                "updatedAt": now
+                            }, PAYMENT_REFS))
+                    except Exception as tenant_error:
+                        logger.error(f"[CRON] Error for tenant {tenant_id}: {str(tenant_error)}")
+                        result["errors"].append({"tenantId": tenant_id, "error": str(tenant_error)})
+
+                # 3. Bounded, unordered bulk inserts
+                for offset in range(0, len(pending_docs), batch_size):
+                    chunk = pending_docs[offset:offset + batch_size]
+                    failed_indexes = set()
+                    try:
+                        await payments_collection.insert_many(chunk, ordered=False)
+                    except BulkWriteError as bulk_error:
+                        for write_error in bulk_error.details.get("writeErrors", []):
+                            failed_indexes.add(write_error["index"])
+                            if write_error.get("code") == 11000:
+                                # Payment already exists for this tenant on this due date
+                                result["skipped"] += 1
+                            else:
+                                doc = chunk[write_error["index"]]
+                                result["errors"].append({"tenantId": doc["tenantId"], "error": write_error.get("errmsg", "write error")})
+                    except Exception as batch_error:
+                        logger.error(f"[CRON] Insert batch at offset {offset} failed: {str(batch_error)}")
+                        result["errors"].append({"batch": offset, "error": str(batch_error)})
+                        continue
+
+                    inserted = [doc for index, doc in enumerate(chunk) if index not in failed_indexes]
+                    result["created"] += len(inserted)
+                    result["batches"] += 1
+                    await DashboardStatsService.apply_changes("payments", [(None, doc) for doc in inserted])
+
+            # Tenants eligible for auto-billing in this partition, streamed in batches
+            cursor = self.collection.find(
+                {
+                    "isDeleted": {"$ne": True},
+                    "autoGeneratePayments": True,
+                    "billingConfig": {"$exists": True},
+                    "billingConfig.billingCycle": BillingCycle.MONTHLY.value,
+                    "tenantStatus": {"$ne": "vacated"}, # Skip clearly vacated tenants (already handled by checkout date check below)
+                    **partition_filter(partition, partitions),
+                },
+                {"propertyId": 1, "bedId": 1, "rent": 1, "billingConfig": 1, "joinDate": 1, "checkoutDate": 1}
+            ).batch_size(batch_size)
+            tenants = []
+            async for tenant_doc in cursor:
+                tenants.append(tenant_doc)
+                result["tenants"] += 1
+                if len(tenants) >= batch_size:
+                    await process(tenants)
+                    tenants = []
+            if tenants:
+                await process(tenants)
             
-            duration_ms = int((time.time() - start_time) * 1000)
-            result["duration_ms"] = duration_ms
-            logger.info(f"[CRON] Completed: created={result['created']}, skipped={result['skipped']}, errors={len(result['errors'])}, duration={duration_ms}ms")
+            elapsed = max(time.time() - start_time, 1e-6)
+            result["duration_ms"] = int(elapsed * 1000)
+            result["tenants_per_sec"] = round(result["tenants"] / elapsed, 1)
+            result["inserts_per_sec"] = round(result["created"] / elapsed, 1)
+            logger.info(
+                f"[CRON] Completed: tenants={result['tenants']}, created={result['created']}, skipped={result['skipped']}, "
+                f"errors={len(result['errors'])}, batches={result['batches']}, duration={result['duration_ms']}ms, "
+                f"tenants/s={result['tenants_per_sec']}, inserts/s={result['inserts_per_sec']}"
+            )
             return result
             
         except Exception as e:
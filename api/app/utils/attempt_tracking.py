@@ -1,49 +1,236 @@
 """
 Track failed login and OTP verification attempts to prevent brute force attacks
+
+Each failure is a single find_one_and_update with an aggregation-pipeline
+update: restarting an expired window, incrementing the counter and setting
+the lockout all happen in one atomic round trip, so concurrent failures from
+several workers are all counted. Documents are keyed by a unique index on
+email (see ensure_index), which also keeps concurrent upserts from creating
+duplicate counters.
+
+When REDIS_URL is set, active lockouts are cached in Redis for a few seconds
+(ATTEMPT_LOCK_CACHE_TTL_SECONDS), so a locked account being hammered does not
+cost a MongoDB read per request. The cache is shared by every worker, so a
+reset (successful login, new OTP) clears it everywhere at once. Only lockouts
+are cached: an "unlocked" answer always comes from MongoDB, so a lockout set
+by another worker applies immediately. Without Redis every check reads
+MongoDB; a per-process cache would keep rejecting users another worker had
+already reset.
 """
+import logging
 from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.config import settings
 from app.database.mongodb import db
 
-# Collections for tracking attempts
-login_attempts_collection = db["login_attempts"]
-otp_attempts_collection = db["otp_attempts"]
+logger = logging.getLogger(__name__)
 
 MAX_LOGIN_ATTEMPTS = 5
 MAX_OTP_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 10
 
 
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class AttemptTracker:
+    """Failed-attempt counter and lockout for one collection"""
+
+    def __init__(self, collection_name: str, max_attempts: int, lock_cache_ttl_seconds: float, use_redis: bool = False):
+        self.collection = db[collection_name]
+        self.collection_name = collection_name
+        self.max_attempts = max_attempts
+        self.lock_cache_ttl_seconds = lock_cache_ttl_seconds
+        self.use_redis = use_redis
+        self.cache_hits = 0
+        self.db_checks = 0
+
+    def failure_pipeline(self, now: datetime) -> list:
+        """Pipeline update for one failed attempt at `now`"""
+        lockout = timedelta(minutes=LOCKOUT_DURATION_MINUTES)
+        # Start over when the last failure is older than the window or the
+        # previous lockout has run out. A missing updatedAt (new document)
+        # sorts before any date, so it starts over too.
+        restart = {"$or": [
+            {"$lt": ["$updatedAt", now - lockout]},
+            {"$and": [{"$gt": ["$lockedUntil", None]}, {"$lte": ["$lockedUntil", now]}]},
+        ]}
+        return [
+            {"$set": {
+                "failedAttempts": {"$cond": [restart, 1, {"$add": [{"$ifNull": ["$failedAttempts", 0]}, 1]}]},
+                "updatedAt": now,
+            }},
+            # Second stage sees the new count
+            {"$set": {
+                "lockedUntil": {"$cond": [{"$gte": ["$failedAttempts", self.max_attempts]}, now + lockout, None]},
+            }},
+        ]
+
+    async def record_failure(self, email: str) -> int:
+        """Count a failed attempt; returns the number of failures in the current window"""
+        now = datetime.now(timezone.utc)
+        pipeline = self.failure_pipeline(now)
+        try:
+            doc = await self._apply(email, pipeline)
+        except DuplicateKeyError:
+            # Two first failures raced to insert; the document exists now
+            doc = await self._apply(email, pipeline)
+
+        locked_until = doc.get("lockedUntil")
+        if locked_until:
+            await self._remember_lock(email, _as_utc(locked_until))
+        return doc["failedAttempts"]
+
+    async def _apply(self, email: str, pipeline: list) -> dict:
+        return await self.collection.find_one_and_update(
+            {"email": email},
+            pipeline,
+            projection={"_id": 0, "failedAttempts": 1, "lockedUntil": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def check(self, email: str) -> tuple[bool, int | None]:
+        """Returns: (is_locked, minutes_remaining)"""
+        now = datetime.now(timezone.utc)
+        locked_until = await self._cached_lock(email, now)
+        if locked_until is None:
+            self.db_checks += 1
+            # An expired lockout needs no cleanup write: the next failure starts a new window
+            doc = await self.collection.find_one(
+                {"email": email, "lockedUntil": {"$gt": now}},
+                {"_id": 0, "lockedUntil": 1},
+            )
+            if not doc:
+                return False, None
+            locked_until = _as_utc(doc["lockedUntil"])
+            await self._remember_lock(email, locked_until)
+        else:
+            self.cache_hits += 1
+
+        minutes_remaining = int((locked_until - now).total_seconds() / 60)
+        return True, minutes_remaining
+
+    async def reset(self, email: str):
+        await self.collection.update_one(
+            {"email": email},
+            {"$set": {"failedAttempts": 0, "lockedUntil": None, "updatedAt": datetime.now(timezone.utc)}}
+        )
+        await self._forget_lock(email)
+
+    async def delete(self, email: str):
+        await self.collection.delete_one({"email": email})
+        await self._forget_lock(email)
+
+    def _cache_key(self, email: str) -> str:
+        return f"{self.collection_name}:locked:{email}"
+
+    async def _redis(self):
+        from app.utils.cache_service import RedisCache
+        return await RedisCache.get_client()
+
+    async def _cached_lock(self, email: str, now: datetime) -> Optional[datetime]:
+        if not self.use_redis:
+            return None
+        try:
+            raw = await (await self._redis()).get(self._cache_key(email))
+        except Exception as e:
+            logger.error(f"Attempt lock cache read error: {e}")
+            return None
+        if not raw:
+            return None
+        locked_until = datetime.fromisoformat(raw)
+        return locked_until if locked_until > now else None
+
+    async def _remember_lock(self, email: str, locked_until: datetime) -> None:
+        if not self.use_redis:
+            return
+        # Never outlive the lockout itself
+        remaining = (locked_until - datetime.now(timezone.utc)).total_seconds()
+        ttl_ms = int(min(self.lock_cache_ttl_seconds, remaining) * 1000)
+        if ttl_ms <= 0:
+            return
+        try:
+            await (await self._redis()).set(self._cache_key(email), locked_until.isoformat(), px=ttl_ms)
+        except Exception as e:
+            logger.error(f"Attempt lock cache write error: {e}")
+
+    async def _forget_lock(self, email: str) -> None:
+        if not self.use_redis:
+            return
+        try:
+            await (await self._redis()).delete(self._cache_key(email))
+        except Exception as e:
+            # The entry still expires after lock_cache_ttl_seconds
+            logger.error(f"Attempt lock cache delete error: {e}")
+
+    async def ensure_index(self):
+        """Make `email` a unique key, replacing the old non-unique index if present"""
+        existing = (await self.collection.index_information()).get("email_1")
+        if existing and existing.get("unique"):
+            return
+        if existing:
+            try:
+                await self.collection.drop_index("email_1")
+            except OperationFailure as e:
+                if e.code != 27:  # IndexNotFound: another worker dropped it first
+                    raise
+        try:
+            await self.collection.create_index("email", unique=True)
+        except OperationFailure as e:
+            if e.code != 11000:
+                raise
+            # Duplicate counters left by racing upserts before the index existed.
+            # They only hold a few minutes of history, so drop them and start clean.
+            duplicates = await self.collection.aggregate([
+                {"$group": {"_id": "$email", "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+            ]).to_list(length=None)
+            emails = [row["_id"] for row in duplicates]
+            await self.collection.delete_many({"email": {"$in": emails}})
+            logger.warning(f"Removed duplicate attempt counters for {len(emails)} email(s) in {self.collection.name}")
+            await self.collection.create_index("email", unique=True)
+
+    def stats(self) -> dict:
+        return {
+            "lockCache": "redis" if self.use_redis else "off",
+            "cacheHits": self.cache_hits,
+            "dbChecks": self.db_checks,
+        }
+
+
+login_attempts = AttemptTracker(
+    "login_attempts", MAX_LOGIN_ATTEMPTS, settings.ATTEMPT_LOCK_CACHE_TTL_SECONDS, use_redis=bool(settings.REDIS_URL)
+)
+otp_attempts = AttemptTracker(
+    "otp_attempts", MAX_OTP_ATTEMPTS, settings.ATTEMPT_LOCK_CACHE_TTL_SECONDS, use_redis=bool(settings.REDIS_URL)
+)
+
+# Collections for tracking attempts
+login_attempts_collection = login_attempts.collection
+otp_attempts_collection = otp_attempts.collection
+
+
+async def ensure_attempt_indexes():
+    await login_attempts.ensure_index()
+    await otp_attempts.ensure_index()
+
+
+def attempt_tracking_stats() -> dict:
+    return {"login": login_attempts.stats(), "otp": otp_attempts.stats()}
+
+
 async def check_login_attempts(email: str) -> tuple[bool, int | None]:
     """
     Check if user has exceeded login attempts
     Returns: (is_locked, minutes_remaining)
     """
-    normalized_email = email.strip().lower()
-    now = datetime.now(timezone.utc)
-    
-    attempt_doc = await login_attempts_collection.find_one({"email": normalized_email})
-    
-    if not attempt_doc:
-        return False, None
-    
-    # Check if lockout period has expired
-    locked_until = attempt_doc.get("lockedUntil")
-    if locked_until:
-        if locked_until.tzinfo is None:
-            locked_until = locked_until.replace(tzinfo=timezone.utc)
-        
-        if now < locked_until:
-            minutes_remaining = int((locked_until - now).total_seconds() / 60)
-            return True, minutes_remaining
-        else:
-            # Lockout period expired, reset attempts
-            await login_attempts_collection.update_one(
-                {"email": normalized_email},
-                {"$set": {"failedAttempts": 0, "lockedUntil": None}}
-            )
-            return False, None
-    
-    return False, None
+    return await login_attempts.check(email.strip().lower())
 
 
 async def increment_login_attempts(email: str) -> int:
@@ -51,58 +238,12 @@ async def increment_login_attempts(email: str) -> int:
     Increment failed login attempts
     Returns: number of failed attempts after incrementing
     """
-    normalized_email = email.strip().lower()
-    now = datetime.now(timezone.utc)
-    
-    # 1. Fetch current attempt status
-    attempt_doc = await login_attempts_collection.find_one({"email": normalized_email})
-    
-    # 2. Determine if we should reset the counter
-    # If last attempt was more than 10 minutes ago, restart from 1
-    if attempt_doc and attempt_doc.get("updatedAt"):
-        last_attempt = attempt_doc.get("updatedAt")
-        if last_attempt.tzinfo is None:
-            last_attempt = last_attempt.replace(tzinfo=timezone.utc)
-        
-        if now - last_attempt > timedelta(minutes=LOCKOUT_DURATION_MINUTES):
-            # Window expired, reset to 1
-            await login_attempts_collection.update_one(
-                {"email": normalized_email},
-                {"$set": {"failedAttempts": 1, "updatedAt": now, "lockedUntil": None}}
-            )
-            return 1
-
-    # 3. Normal increment within the window
-    result = await login_attempts_collection.find_one_and_update(
-        {"email": normalized_email},
-        {
-            "$inc": {"failedAttempts": 1},
-            "$set": {"updatedAt": now}
-        },
-        upsert=True,
-        return_document=True
-    )
-    
-    failed_attempts = result.get("failedAttempts", 1)
-    
-    # Lock account if max attempts reached
-    if failed_attempts >= MAX_LOGIN_ATTEMPTS:
-        locked_until = now + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-        await login_attempts_collection.update_one(
-            {"email": normalized_email},
-            {"$set": {"lockedUntil": locked_until}}
-        )
-    
-    return failed_attempts
+    return await login_attempts.record_failure(email.strip().lower())
 
 
 async def reset_login_attempts(email: str):
     """Reset login attempts for successful login"""
-    normalized_email = email.strip().lower()
-    await login_attempts_collection.update_one(
-        {"email": normalized_email},
-        {"$set": {"failedAttempts": 0, "lockedUntil": None, "updatedAt": datetime.now(timezone.utc)}}
-    )
+    await login_attempts.reset(email.strip().lower())
 
 
 async def check_otp_attempts(email: str) -> tuple[bool, int | None]:
@@ -110,32 +251,7 @@ async def check_otp_attempts(email: str) -> tuple[bool, int | None]:
     Check if user has exceeded OTP verification attempts
     Returns: (is_locked, minutes_remaining)
     """
-    normalized_email = email.strip().lower()
-    now = datetime.now(timezone.utc)
-    
-    attempt_doc = await otp_attempts_collection.find_one({"email": normalized_email})
-    
-    if not attempt_doc:
-        return False, None
-    
-    # Check if lockout period has expired
-    locked_until = attempt_doc.get("lockedUntil")
-    if locked_until:
-        if locked_until.tzinfo is None:
-            locked_until = locked_until.replace(tzinfo=timezone.utc)
-        
-        if now < locked_until:
-            minutes_remaining = int((locked_until - now).total_seconds() / 60)
-            return True, minutes_remaining
-        else:
-            # Lockout period expired, reset attempts
-            await otp_attempts_collection.update_one(
-                {"email": normalized_email},
-                {"$set": {"failedAttempts": 0, "lockedUntil": None}}
-            )
-            return False, None
-    
-    return False, None
+    return await otp_attempts.check(email.strip().lower())
 
 
 async def increment_otp_attempts(email: str) -> int:
@@ -143,58 +259,14 @@ async def increment_otp_attempts(email: str) -> int:
     Increment failed OTP verification attempts
     Returns: number of failed attempts after incrementing
     """
-    normalized_email = email.strip().lower()
-    now = datetime.now(timezone.utc)
-
-    # 1. Fetch current attempt status
-    attempt_doc = await otp_attempts_collection.find_one({"email": normalized_email})
-    
-    # 2. Determine if we should reset the counter
-    if attempt_doc and attempt_doc.get("updatedAt"):
-        last_attempt = attempt_doc.get("updatedAt")
-        if last_attempt.tzinfo is None:
-            last_attempt = last_attempt.replace(tzinfo=timezone.utc)
-        
-        if now - last_attempt > timedelta(minutes=LOCKOUT_DURATION_MINUTES):
-            # Window expired, reset to 1
-            await otp_attempts_collection.update_one(
-                {"email": normalized_email},
-                {"$set": {"failedAttempts": 1, "updatedAt": now, "lockedUntil": None}}
-            )
-            return 1
-    
-    result = await otp_attempts_collection.find_one_and_update(
-        {"email": normalized_email},
-        {
-            "$inc": {"failedAttempts": 1},
-            "$set": {"updatedAt": now}
-        },
-        upsert=True,
-        return_document=True
-    )
-    
-    failed_attempts = result.get("failedAttempts", 1)
-    
-    # Lock account if max attempts reached
-    if failed_attempts >= MAX_OTP_ATTEMPTS:
-        locked_until = now + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-        await otp_attempts_collection.update_one(
-            {"email": normalized_email},
-            {"$set": {"lockedUntil": locked_until}}
-        )
-    
-    return failed_attempts
+    return await otp_attempts.record_failure(email.strip().lower())
 
 
 async def reset_otp_attempts(email: str):
     """Reset OTP attempts for successful verification"""
-    normalized_email = email.strip().lower()
-    await otp_attempts_collection.update_one(
-        {"email": normalized_email},
-        {"$set": {"failedAttempts": 0, "lockedUntil": None}}
-    )
+    await otp_attempts.reset(email.strip().lower())
+
 
 async def delete_otp_attempts(email: str):
     """Delete OTP attempt record entirely (used when new OTP is requested)"""
-    normalized_email = email.strip().lower()
-    await otp_attempts_collection.delete_one({"email": normalized_email})
\ No newline at end of file
+    await otp_attempts.delete(email.strip().lower())
@@ -0,0 +1,141 @@
+"""
+Per-user auth context cache for UserContextMiddleware.
+
+Every authenticated request needs the user document, the ids of the properties
+the user owns and the active subscription. Loading those costs three Mongo round
+trips, so the result is kept in a bounded in-process LRU with a short TTL.
+When REDIS_URL is configured the context is also written through to RedisCache
+so a cold worker can warm up without touching Mongo.
+
+Services that write users, properties or subscriptions must call
+`auth_context_cache.invalidate(user_id)` so the next request reloads the context.
+"""
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from bson import json_util
+
+from app.config import settings
+from app.models.subscription_schema import Subscription
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "auth_ctx:"
+
+
+class AuthContextCache:
+    """Bounded LRU/TTL cache of {user, role, property_ids, subscription} keyed by user id."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, use_redis: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _copy(context: dict) -> dict:
+        """Return a copy so handlers cannot mutate the cached entry."""
+        subscription = context.get("subscription")
+        return {
+            "user": dict(context["user"]) if context.get("user") else None,
+            "role": context.get("role"),
+            "property_ids": list(context.get("property_ids") or []),
+            "subscription": subscription.model_copy() if subscription else None,
+        }
+
+    def _store_local(self, user_id: str, context: dict) -> None:
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, context)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        """Return the cached context for a user, or None on a miss."""
+        entry = self._entries.get(user_id)
+        if entry:
+            expires_at, context = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return self._copy(context)
+            del self._entries[user_id]
+
+        if self.use_redis:
+            from app.utils.cache_service import RedisCache
+            raw = await RedisCache.get(f"{REDIS_KEY_PREFIX}{user_id}")
+            if raw:
+                try:
+                    context = json_util.loads(raw)
+                    if context.get("subscription"):
+                        context["subscription"] = Subscription(**context["subscription"])
+                    self._store_local(user_id, context)
+                    self.redis_hits += 1
+                    return self._copy(context)
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable auth context for {user_id}: {e}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, user_id: str, context: dict) -> None:
+        """Store a freshly loaded context locally and, if enabled, in Redis."""
+        context = self._copy(context)
+        self._store_local(user_id, context)
+
+        if self.use_redis:
+            from app.utils.cache_service import RedisCache
+            subscription = context.get("subscription")
+            payload = {
+                **context,
+                "subscription": subscription.model_dump() if subscription else None,
+            }
+            await RedisCache.set(
+                f"{REDIS_KEY_PREFIX}{user_id}",
+                json_util.dumps(payload),
+                expire_seconds=self.ttl_seconds,
+            )
+
+    async def invalidate(self, *user_ids) -> None:
+        """Drop cached contexts after a write to users, properties or subscriptions."""
+        for user_id in user_ids:
+            if not user_id:
+                continue
+            user_id = str(user_id)
+            self._entries.pop(user_id, None)
+            self.invalidations += 1
+            if self.use_redis:
+                from app.utils.cache_service import RedisCache
+                await RedisCache.delete(f"{REDIS_KEY_PREFIX}{user_id}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl_seconds,
+            "redisEnabled": self.use_redis,
+            "hits": self.hits,
+            "redisHits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "hitRate": round((self.hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+auth_context_cache = AuthContextCache(
+    max_entries=settings.AUTH_CONTEXT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CONTEXT_CACHE_TTL_SECONDS,
+    use_redis=bool(settings.REDIS_URL),
+)
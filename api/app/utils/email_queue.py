@@ -0,0 +1,207 @@
+"""
+In-process outbound email queue.
+
+Request handlers enqueue an email and return immediately; a few background
+workers deliver it through email_service's pooled client. Retryable failures
+(network errors, 429, 5xx) are retried with exponential backoff; emails that
+still fail, or are permanently rejected, are written to the
+`email_dead_letters` collection for inspection.
+
+The queue is bounded (EMAIL_QUEUE_MAX_SIZE). When it is full the email is
+dead-lettered straight away instead of blocking the request.
+
+Queued emails live in memory only. On shutdown the workers get a short grace
+period to drain the queue, and anything left over is dead-lettered.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import settings
+from app.database.mongodb import db
+from app.utils.email_service import EmailDeliveryError, send_otp_email, send_welcome_email
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTER_COLLECTION = "email_dead_letters"
+
+# Email kind -> sender; senders take raise_on_failure=True and return False when not configured
+SENDERS = {
+    "otp": send_otp_email,
+    "welcome": send_welcome_email,
+}
+
+# Never persist one-time codes in the dead-letter collection
+_REDACTED_PARAMS = {"otp"}
+
+
+class EmailQueue:
+    """Bounded asyncio queue with background delivery workers"""
+
+    def __init__(self, max_size: int, workers: int, max_attempts: int, backoff_seconds: float):
+        self.max_size = max_size
+        self.worker_count = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._latencies_ms: deque = deque(maxlen=1000)
+        self.enqueued = 0
+        self.sent = 0
+        self.retries = 0
+        self.skipped = 0
+        self.dead_lettered = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"email-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Email queue started with {self.worker_count} workers")
+
+    async def stop(self, drain_seconds: float = 5.0) -> None:
+        """Give in-flight and queued emails a grace period, then dead-letter what is left."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"Email queue not drained on shutdown ({self._queue.qsize()} pending)")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            await self._dead_letter(job, "shutdown")
+            self._queue.task_done()
+
+    async def enqueue(self, kind: str, to: str, **params) -> bool:
+        """
+        Queue an email for background delivery.
+
+        Returns: True if queued; False if the queue is full (the email is
+        dead-lettered in that case).
+        """
+        if kind not in SENDERS:
+            raise ValueError(f"Unknown email kind: {kind}")
+        job = {
+            "kind": kind,
+            "to": to,
+            "params": params,
+            "attempts": 0,
+            "enqueuedAt": time.monotonic(),
+            "lastError": None,
+        }
+        if not self.running:
+            # Started from the app lifespan; start lazily for scripts and tests
+            await self.start()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            await self._dead_letter(job, "queue_full")
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            except asyncio.CancelledError:
+                # Shutdown interrupted this delivery; keep a record of it
+                await self._dead_letter(job, "shutdown")
+                raise
+            except Exception as e:
+                logger.error(f"Email worker error for {job['kind']} to {job['to']}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: dict) -> None:
+        sender = SENDERS[job["kind"]]
+        while True:
+            job["attempts"] += 1
+            try:
+                delivered = await sender(job["to"], **job["params"], raise_on_failure=True)
+            except EmailDeliveryError as e:
+                job["lastError"] = str(e)
+                if not e.retryable or job["attempts"] >= self.max_attempts:
+                    await self._dead_letter(job, "rejected" if not e.retryable else "retries_exhausted")
+                    return
+                self.retries += 1
+                delay = self.backoff_seconds * (2 ** (job["attempts"] - 1))
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+                continue
+
+            if delivered:
+                self.sent += 1
+                self._latencies_ms.append((time.monotonic() - job["enqueuedAt"]) * 1000)
+            else:
+                # Email provider not configured; nothing to retry
+                self.skipped += 1
+            return
+
+    async def _dead_letter(self, job: dict, reason: str) -> None:
+        self.dead_lettered += 1
+        params = {
+            key: ("[redacted]" if key in _REDACTED_PARAMS else value)
+            for key, value in job["params"].items()
+        }
+        try:
+            await db[DEAD_LETTER_COLLECTION].insert_one({
+                "kind": job["kind"],
+                "to": job["to"],
+                "params": params,
+                "attempts": job["attempts"],
+                "reason": reason,
+                "error": job.get("lastError"),
+                "createdAt": datetime.now(timezone.utc),
+            })
+        except Exception as e:
+            logger.error(f"Could not dead-letter {job['kind']} email to {job['to']}: {str(e)}")
+        logger.warning(f"Email {job['kind']} to {job['to']} dead-lettered ({reason})")
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(pct: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct))], 1)
+
+        return {
+            "running": self.running,
+            "workers": len(self._workers),
+            "depth": self._queue.qsize() if self._queue else 0,
+            "maxSize": self.max_size,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retries": self.retries,
+            "skipped": self.skipped,
+            "deadLettered": self.dead_lettered,
+            "rejected": self.rejected,
+            "latencyMs": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)},
+        }
+
+
+email_queue = EmailQueue(
+    max_size=settings.EMAIL_QUEUE_MAX_SIZE,
+    workers=settings.EMAIL_QUEUE_WORKERS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    backoff_seconds=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+)
@@ -1,18 +1,74 @@
 """Email service for sending OTP and other notifications via Zoho Zepto Mail"""
-import asyncio
 import httpx
 from typing import Optional
+from app.config import settings
 from app.config.settings import ZEPTO_MAIL_API_KEY, FROM_EMAIL
 
 # Zoho Zepto Mail API endpoint - using India region endpoint
 ZEPTO_API_ENDPOINT = "https://api.zeptomail.in/v1.1/email"
 
+# One pooled client per process so consecutive emails reuse the TLS connection
+_client: Optional[httpx.AsyncClient] = None
+
+
+class EmailDeliveryError(Exception):
+    """Zepto Mail did not accept the email; `retryable` is False for permanent rejections"""
+
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.EMAIL_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.EMAIL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.EMAIL_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_email_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _deliver(payload: dict, headers: dict, label: str, email: str, raise_on_failure: bool = False) -> bool:
+    """POST one email to Zepto Mail. Network errors, 429 and 5xx are retryable."""
+    try:
+        response = await _get_client().post(ZEPTO_API_ENDPOINT, json=payload, headers=headers)
+    except httpx.HTTPError as e:
+        print(f"[ERROR] {type(e).__name__} sending {label} to {email}")
+        if raise_on_failure:
+            raise EmailDeliveryError(f"{type(e).__name__}", retryable=True) from e
+        return False
+
+    if response.status_code in [200, 201, 202]:
+        print(f"[SUCCESS] {label} sent to {email}")
+        return True
+
+    error_text = response.text
+    print(f"[ERROR] Failed to send {label}. Status: {response.status_code}. Response: {error_text}")
+    if raise_on_failure:
+        raise EmailDeliveryError(
+            f"HTTP {response.status_code}: {error_text[:200]}",
+            retryable=response.status_code == 429 or response.status_code >= 500,
+        )
+    return False
+
 
 async def send_otp_email(
     email: str,
     otp: str,
     app_name: str = "Hostel Manager",
     otp_type: str = "registration",
+    raise_on_failure: bool = False,
 ) -> bool:
     """
     Send OTP to user's email via Zoho Zepto Mail
@@ -21,6 +77,7 @@ async def send_otp_email(
         otp: 6-digit OTP code
         app_name: Application name for email template
         otp_type: OTP type (registration or password_reset)
+        raise_on_failure: Raise EmailDeliveryError instead of returning False (used by email_queue)
     Returns:
         True if email sent successfully, False otherwise
     """
@@ -127,32 +184,28 @@ async def send_otp_email(
             "Content-Type": "application/json"
         }
 
-        # Send email using httpx for async operation
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(ZEPTO_API_ENDPOINT, json=payload, headers=headers)
-                if response.status_code in [200, 201, 202]:
-                    print(f"[SUCCESS] OTP email sent to {email}")
-                    return True
-                else:
-                    error_text = response.text
-                    print(f"[ERROR] Failed to send OTP email. Status: {response.status_code}. Response: {error_text}")
-                    return False
-        except asyncio.TimeoutError:
-            print(f"[ERROR] Timeout sending OTP email to {email}")
-            return False
+        # Send through the shared pooled client
+        return await _deliver(payload, headers, "OTP email", email, raise_on_failure)
+    except EmailDeliveryError:
+        raise
     except Exception as e:
         print(f"[ERROR] Exception sending OTP email to {email}: {str(e)}")
         return False
 
 
-async def send_welcome_email(email: str, name: str, app_name: str = "Hostel Manager") -> bool:
+async def send_welcome_email(
+    email: str,
+    name: str,
+    app_name: str = "Hostel Manager",
+    raise_on_failure: bool = False,
+) -> bool:
     """
     Send welcome email after successful registration
     Args:
         email: User's email address
         name: User's full name
         app_name: Application name
+        raise_on_failure: Raise EmailDeliveryError instead of returning False (used by email_queue)
     Returns:
         True if email sent successfully, False otherwise
     """
@@ -216,20 +269,10 @@ async def send_welcome_email(email: str, name: str, app_name: str = "Hostel Mana
             "Content-Type": "application/json"
         }
 
-        # Send email using httpx for async operation
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(ZEPTO_API_ENDPOINT, json=payload, headers=headers)
-                if response.status_code in [200, 201, 202]:
-                    print(f"[SUCCESS] Welcome email sent to {email}")
-                    return True
-                else:
-                    error_text = response.text
-                    print(f"[ERROR] Failed to send welcome email. Status: {response.status_code}. Response: {error_text}")
-                    return False
-        except asyncio.TimeoutError:
-            print(f"[ERROR] Timeout sending welcome email to {email}")
-            return False
+        # Send through the shared pooled client
+        return await _deliver(payload, headers, "Welcome email", email, raise_on_failure)
+    except EmailDeliveryError:
+        raise
     except Exception as e:
         print(f"[ERROR] Exception sending welcome email to {email}: {str(e)}")
         return False
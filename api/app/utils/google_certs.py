@@ -0,0 +1,192 @@
+"""
+Google ID-token verification against an in-memory copy of Google's signing certs.
+
+`google.oauth2.id_token.verify_oauth2_token` fetches the certs with the
+blocking `requests` transport, on every call. GoogleCertCache fetches them
+with `httpx.AsyncClient` instead and keeps them in memory:
+
+- the cached set lives for the `Cache-Control: max-age` Google sends (minus `Age`)
+- once inside GOOGLE_CERTS_REFRESH_MARGIN_SECONDS of expiry, callers keep
+  using the cached set while one background task fetches the next one
+- concurrent cold-cache callers share a single fetch
+- a token signed with an unknown key id (Google rotated keys) triggers one
+  early refetch, at most every GOOGLE_CERTS_MIN_REFETCH_SECONDS
+- if Google is unreachable, the last known set keeps being used
+
+Signature, expiry and audience checks are done by `google.auth.jwt.decode`,
+the same code `verify_oauth2_token` uses.
+"""
+import asyncio
+import base64
+import json
+import logging
+import re
+import time
+from typing import Optional
+
+import httpx
+from google.auth import jwt as google_jwt
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleCertsUnavailable(Exception):
+    """Google's signing certs could not be fetched and none are cached"""
+
+
+def _key_id(token: str) -> Optional[str]:
+    """Read `kid` from the (unverified) JWT header."""
+    try:
+        header = token.split(".", 1)[0]
+        header += "=" * (-len(header) % 4)
+        return json.loads(base64.urlsafe_b64decode(header)).get("kid")
+    except Exception as e:
+        raise ValueError("Malformed token header") from e
+
+
+def _max_age(response: httpx.Response) -> Optional[int]:
+    match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+    if not match:
+        return None
+    age = response.headers.get("Age", "")
+    return max(0, int(match.group(1)) - (int(age) if age.isdigit() else 0))
+
+
+class GoogleCertCache:
+    """Async, max-age aware cache of Google's ID-token signing certs"""
+
+    def __init__(
+        self,
+        certs_url: str,
+        timeout_seconds: float = 5.0,
+        refresh_margin_seconds: float = 300,
+        default_max_age_seconds: int = 3600,
+        min_refetch_seconds: float = 30,
+    ):
+        self.certs_url = certs_url
+        self.timeout_seconds = timeout_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.default_max_age_seconds = default_max_age_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self._certs: dict = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.background_refreshes = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout_seconds))
+            self._lock = asyncio.Lock()
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._lock = None
+
+    async def _fetch(self) -> None:
+        response = await self._get_client().get(self.certs_url)
+        response.raise_for_status()
+        certs = response.json()
+        if not isinstance(certs, dict) or not certs:
+            raise ValueError("Unexpected certs payload")
+        max_age = _max_age(response)
+        now = time.monotonic()
+        self._certs = certs
+        self._fetched_at = now
+        self._expires_at = now + (self.default_max_age_seconds if max_age is None else max_age)
+        self.fetches += 1
+
+    async def _refresh(self) -> dict:
+        """Fetch a new cert set, sharing one fetch between concurrent callers."""
+        seen = self._fetched_at
+        self._get_client()
+        async with self._lock:
+            if self._fetched_at != seen:
+                # Someone else refreshed while we waited for the lock
+                return self._certs
+            try:
+                await self._fetch()
+            except (httpx.HTTPError, ValueError) as e:
+                self.fetch_errors += 1
+                if not self._certs:
+                    raise GoogleCertsUnavailable(f"Could not fetch Google certs: {type(e).__name__}") from e
+                # Keep serving the last known set; retry no sooner than min_refetch_seconds
+                logger.warning(f"[GOOGLE] Cert refresh failed ({type(e).__name__}), using cached certs")
+                self._fetched_at = time.monotonic()
+                self._expires_at = max(self._expires_at, self._fetched_at + self.min_refetch_seconds)
+        return self._certs
+
+    async def _background_refresh(self) -> None:
+        try:
+            self.background_refreshes += 1
+            await self._refresh()
+        except Exception as e:
+            logger.warning(f"[GOOGLE] Background cert refresh failed: {str(e)}")
+        finally:
+            self._refresh_task = None
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._background_refresh(), name="google-certs-refresh")
+
+    def prefetch(self) -> None:
+        """Warm the cache in the background (used at startup)."""
+        self._schedule_refresh()
+
+    async def get_certs(self, key_id: Optional[str] = None) -> dict:
+        now = time.monotonic()
+        fresh = bool(self._certs) and now < self._expires_at
+        if fresh and (key_id is None or key_id in self._certs):
+            self.hits += 1
+            if now >= self._expires_at - self.refresh_margin_seconds:
+                self._schedule_refresh()
+            return self._certs
+        if fresh and now - self._fetched_at < self.min_refetch_seconds:
+            # Unknown key id, but we just fetched: don't let bogus tokens hammer Google
+            return self._certs
+        return await self._refresh()
+
+    async def verify_id_token(self, token: str, audience) -> dict:
+        """
+        Verify a Google ID token's signature, expiry and audience.
+
+        Returns: the token claims.
+        Raises: ValueError if the token is invalid; GoogleCertsUnavailable if
+        no certs could be obtained.
+        """
+        certs = await self.get_certs(_key_id(token))
+        return google_jwt.decode(token, certs=certs, audience=audience)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._certs),
+            "expiresInSeconds": max(0, round(self._expires_at - time.monotonic())) if self._certs else None,
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "fetchErrors": self.fetch_errors,
+            "backgroundRefreshes": self.background_refreshes,
+        }
+
+
+google_cert_cache = GoogleCertCache(
+    certs_url=settings.GOOGLE_CERTS_URL,
+    timeout_seconds=settings.GOOGLE_CERTS_TIMEOUT_SECONDS,
+    refresh_margin_seconds=settings.GOOGLE_CERTS_REFRESH_MARGIN_SECONDS,
+    min_refetch_seconds=settings.GOOGLE_CERTS_MIN_REFETCH_SECONDS,
+)
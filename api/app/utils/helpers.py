@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 from passlib.hash import argon2
 
@@ -19,7 +22,18 @@ if not SECRET_KEY or len(SECRET_KEY) < 32:
 if not SECRET_KEY or len(SECRET_KEY) < 32:
 	raise RuntimeError("JWT_SECRET must be set and at least 32 characters long for security.")
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+	schemes=["argon2"],
+	deprecated="auto",
+	argon2__rounds=settings.ARGON2_TIME_COST,
+	argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+	argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# Argon2 is CPU/memory bound for tens of milliseconds per call. argon2-cffi
+# releases the GIL, so a small dedicated thread pool keeps hashing off the
+# event loop and caps how many hashes run at once per worker.
+_password_executor = None
 
 
 
@@ -44,6 +58,35 @@ def verify_password(plain: str, hashed: str) -> bool:
 	return pwd_context.verify(plain, hashed)
 
 
+def _get_password_executor() -> ThreadPoolExecutor:
+	global _password_executor
+	if _password_executor is None:
+		_password_executor = ThreadPoolExecutor(
+			max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+			thread_name_prefix="password-hash",
+		)
+	return _password_executor
+
+
+async def hash_password_async(password: str) -> str:
+	"""hash_password on the password pool; use this from async code"""
+	loop = asyncio.get_running_loop()
+	return await loop.run_in_executor(_get_password_executor(), hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+	"""verify_password on the password pool; use this from async code"""
+	loop = asyncio.get_running_loop()
+	return await loop.run_in_executor(_get_password_executor(), verify_password, plain, hashed)
+
+
+def shutdown_password_executor() -> None:
+	global _password_executor
+	if _password_executor is not None:
+		_password_executor.shutdown(wait=False, cancel_futures=True)
+		_password_executor = None
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
 	to_encode = data.copy()
 	expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
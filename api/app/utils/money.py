@@ -0,0 +1,103 @@
+"""
+Money helpers.
+
+Payment amounts are entered and displayed as rupee strings such as "₹12,000".
+For arithmetic they are stored alongside as integer paise (`amountPaise`) so
+aggregations can use a plain `$sum` without string processing.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+# Far beyond any real rent or payment; keeps amountPaise inside a BSON int64
+MAX_PAISE = 10 ** 15
+
+
+def to_paise(amount) -> int:
+    """
+    Convert a rupee amount ("₹12,000", "12000.50", 12000) to integer paise.
+
+    Blank or unparseable amounts count as 0. Raises ValueError for NaN,
+    infinite or out-of-range amounts; the payment amount and tenant rent
+    validators call it for that, so such request bodies get a 422.
+    """
+    if amount is None or amount == "":
+        return 0
+    if isinstance(amount, bool):
+        return 0
+    try:
+        if isinstance(amount, (int, float)):
+            rupees = Decimal(str(amount))
+        else:
+            cleaned = str(amount).replace('₹', '').replace(',', '').strip()
+            if not cleaned:
+                return 0
+            rupees = Decimal(cleaned)
+    except (InvalidOperation, ValueError):
+        return 0
+    if not rupees.is_finite():
+        raise ValueError(f"Invalid amount: {amount}")
+    try:
+        paise = int((rupees * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {amount}")
+    if abs(paise) >= MAX_PAISE:
+        raise ValueError(f"Amount out of range: {amount}")
+    return paise
+
+
+def payment_paise(doc: dict) -> int:
+    """
+    A payment's `amountPaise`, or its `amount` converted for payments written
+    before the field existed. Unusable legacy amounts ("NaN", "1e400") count as 0.
+    """
+    if doc.get("amountPaise") is not None:
+        return doc["amountPaise"]
+    try:
+        return to_paise(doc.get("amount"))
+    except ValueError:
+        return 0
+
+
+def _stripped_amount() -> dict:
+    text = {"$toString": "$amount"}
+    for symbol in ("₹", ","):
+        text = {"$replaceAll": {"input": text, "find": symbol, "replacement": ""}}
+    return {"$trim": {"input": text}}
+
+
+# Aggregation equivalent of payment_paise: the same legacy fallback inside a
+# $group. Out-of-range, NaN and infinite amounts fail both bounds and count as 0.
+PAYMENT_PAISE_EXPRESSION = {
+    "$ifNull": [
+        "$amountPaise",
+        {
+            "$let": {
+                "vars": {
+                    "paise": {"$round": [{"$multiply": [
+                        {"$convert": {"input": _stripped_amount(), "to": "decimal", "onError": 0, "onNull": 0}},
+                        100,
+                    ]}, 0]},
+                },
+                "in": {
+                    "$cond": [
+                        {"$and": [{"$gt": ["$$paise", -MAX_PAISE]}, {"$lt": ["$$paise", MAX_PAISE]}]},
+                        {"$toLong": "$$paise"},
+                        0,
+                    ]
+                },
+            }
+        },
+    ]
+}
+
+
+def paise_to_rupees(paise) -> float:
+    """Convert integer paise back to rupees for display"""
+    rupees = (paise or 0) / 100
+    return int(rupees) if float(rupees).is_integer() else rupees
+
+
+def format_rupees(paise) -> str:
+    """Format integer paise the way the app displays amounts, e.g. "₹12,000" """
+    return f"₹{(paise or 0) / 100:,.0f}"
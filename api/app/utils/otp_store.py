@@ -0,0 +1,409 @@
+"""
+OTP storage with expiration, resend cooldown and attempt limits.
+
+Two interchangeable backends sit behind the module-level async API
+(generate_and_store_otp, verify_otp, ...), selected by OTP_STORE_BACKEND:
+
+- "redis": one hash per email in Redis (via RedisCache's client). Keys expire
+  with the OTP through native TTLs, and every read-modify-write (cooldown
+  check + issue, attempt counting, marking verified) runs as a WATCH/MULTI
+  transaction, so all API workers share one consistent view.
+- "memory": a dict in this process, for single-worker deployments and local
+  development. A hashed time wheel sweeps expired entries in the background
+  so abandoned OTPs don't accumulate.
+
+The default is "redis" when REDIS_URL is set, otherwise "memory".
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from redis.exceptions import WatchError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OTP_TTL_SECONDS = 5 * 60
+RESEND_COOLDOWN_SECONDS = 45
+MAX_ATTEMPTS = 5
+LOCK_SECONDS = 10 * 60
+
+REDIS_KEY_PREFIX = "otp:"
+
+
+def _normalize(email: str) -> str:
+    return email.strip().lower()
+
+
+def _new_otp() -> str:
+    return str(random.randint(100000, 999999))
+
+
+def _failed_attempt_message(attempt_count: int) -> str:
+    if attempt_count >= MAX_ATTEMPTS:
+        return "Too many failed attempts. Please request a new OTP after 10 minutes"
+    return f"Invalid OTP. {MAX_ATTEMPTS - attempt_count} attempt(s) remaining"
+
+
+def _locked_message(locked_until: float, now: float) -> str:
+    minutes_remaining = (int(locked_until - now) + 59) // 60
+    return f"Too many failed attempts. Please try again in {minutes_remaining} minutes"
+
+
+def _as_datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(timestamp, timezone.utc) if timestamp else None
+
+
+def _public_record(record: dict) -> dict:
+    """Record shape returned by get_otp (datetimes, like the original in-memory store)."""
+    public = {
+        "otp": record["otp"],
+        "otp_type": record["otp_type"],
+        "created_at": _as_datetime(record["created_at"]),
+        "expires_at": _as_datetime(record["expires_at"]),
+        "last_sent_at": _as_datetime(record["created_at"]),
+        "resend_cooldown_expires_at": _as_datetime(record["resend_cooldown_expires_at"]),
+        "verified": record["verified"],
+        "attempt_count": record["attempt_count"],
+    }
+    if record.get("locked_until"):
+        public["locked_until"] = _as_datetime(record["locked_until"])
+    return public
+
+
+class InMemoryOTPBackend:
+    """Per-process OTP dict with a hashed time-wheel expiry sweeper"""
+
+    def __init__(self, slot_seconds: float = 1.0, slots: int = 512):
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        self._records: dict = {}
+        self._wheel = [set() for _ in range(slots)]
+        self._last_tick: Optional[int] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self.swept = 0
+
+    def _tick(self, timestamp: float) -> int:
+        return int(timestamp // self.slot_seconds)
+
+    def _schedule(self, email: str, expires_at: float) -> None:
+        # Entries further out than one revolution are re-checked each time their slot comes round
+        self._wheel[self._tick(expires_at) % self.slots].add(email)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop expired records from every slot the wheel has passed since the last sweep."""
+        now = time.time() if now is None else now
+        current = self._tick(now)
+        first = current if self._last_tick is None else self._last_tick + 1
+        first = max(first, current - self.slots + 1)
+        removed = 0
+        for tick in range(first, current + 1):
+            slot = self._wheel[tick % self.slots]
+            for email in list(slot):
+                record = self._records.get(email)
+                if record is None:
+                    slot.discard(email)
+                elif record["expires_at"] <= now:
+                    del self._records[email]
+                    slot.discard(email)
+                    removed += 1
+                elif self._tick(record["expires_at"]) % self.slots != tick % self.slots:
+                    # Re-issued since it was scheduled here; it lives in another slot now
+                    slot.discard(email)
+        self._last_tick = current
+        self.swept += removed
+        return removed
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.slot_seconds)
+            self.sweep()
+
+    async def start(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            if self._last_tick is None:
+                self._last_tick = self._tick(time.time()) - 1
+            self._sweeper = asyncio.create_task(self._sweep_forever(), name="otp-expiry-sweeper")
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def _live(self, email: str, now: float) -> Optional[dict]:
+        record = self._records.get(email)
+        if record and record["expires_at"] <= now:
+            del self._records[email]
+            return None
+        return record
+
+    async def generate(self, email: str, otp_type: str) -> Tuple[str, bool]:
+        await self.start()
+        now = time.time()
+        stored = self._live(email, now)
+        # Apply cooldown only when requesting OTP for the same flow.
+        if stored and stored["otp_type"] == otp_type and stored["resend_cooldown_expires_at"] > now:
+            return stored["otp"], False
+
+        record = {
+            "otp": _new_otp(),
+            "otp_type": otp_type,
+            "created_at": now,
+            "expires_at": now + OTP_TTL_SECONDS,
+            "resend_cooldown_expires_at": now + RESEND_COOLDOWN_SECONDS,
+            "verified": False,
+            "attempt_count": 0,
+        }
+        self._records[email] = record
+        self._schedule(email, record["expires_at"])
+        return record["otp"], True
+
+    async def get(self, email: str) -> Optional[dict]:
+        return self._live(email, time.time())
+
+    async def verify(self, email: str, otp: str, otp_type: str) -> Tuple[bool, Optional[str]]:
+        # No awaits between the read and the update, so this is atomic on the event loop
+        now = time.time()
+        stored = self._live(email, now)
+        if not stored:
+            return False, "OTP not found. Please request a new OTP"
+        if stored["otp_type"] != otp_type:
+            return False, "Invalid OTP for this action. Please request a new OTP"
+
+        if stored["otp"] != otp:
+            stored["attempt_count"] += 1
+            if stored["attempt_count"] >= MAX_ATTEMPTS:
+                stored["locked_until"] = now + LOCK_SECONDS
+            return False, _failed_attempt_message(stored["attempt_count"])
+
+        if stored.get("locked_until") and stored["locked_until"] > now:
+            return False, _locked_message(stored["locked_until"], now)
+        return True, None
+
+    async def mark_verified(self, email: str) -> bool:
+        stored = self._live(email, time.time())
+        if not stored:
+            return False
+        stored["verified"] = True
+        return True
+
+    async def cooldown_remaining(self, email: str) -> int:
+        stored = self._records.get(email)
+        if not stored:
+            return 0
+        return max(0, int(stored["resend_cooldown_expires_at"] - time.time()))
+
+    async def delete(self, email: str) -> bool:
+        return self._records.pop(email, None) is not None
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "entries": len(self._records), "swept": self.swept}
+
+
+class RedisOTPBackend:
+    """OTP hashes in Redis with native TTLs and WATCH/MULTI read-modify-writes"""
+
+    def __init__(self, key_prefix: str = REDIS_KEY_PREFIX):
+        self.key_prefix = key_prefix
+        self.conflicts = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def _client(self):
+        from app.utils.cache_service import RedisCache
+        return await RedisCache.get_client()
+
+    def _key(self, email: str) -> str:
+        return f"{self.key_prefix}{email}"
+
+    @staticmethod
+    def _decode(raw: dict) -> Optional[dict]:
+        if not raw or "otp" not in raw:
+            return None
+        return {
+            "otp": raw["otp"],
+            "otp_type": raw.get("otp_type", "registration"),
+            "created_at": float(raw["created_at"]),
+            "expires_at": float(raw["expires_at"]),
+            "resend_cooldown_expires_at": float(raw["resend_cooldown_expires_at"]),
+            "verified": raw.get("verified") == "1",
+            "attempt_count": int(raw.get("attempt_count", 0)),
+            "locked_until": float(raw["locked_until"]) if raw.get("locked_until") else None,
+        }
+
+    async def _transact(self, key: str, apply):
+        """
+        Run `apply(record, now)` with `key` watched.
+
+        `apply` returns (result, writes); writes is a callable that queues the
+        MULTI commands, or None for a read-only outcome. Retries when another
+        worker changed the key in between.
+        """
+        client = await self._client()
+        async with client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    record = self._decode(await pipe.hgetall(key))
+                    result, writes = apply(record, time.time())
+                    if writes is None:
+                        await pipe.unwatch()
+                        return result
+                    pipe.multi()
+                    writes(pipe)
+                    await pipe.execute()
+                    return result
+                except WatchError:
+                    self.conflicts += 1
+
+    async def generate(self, email: str, otp_type: str) -> Tuple[str, bool]:
+        key = self._key(email)
+
+        def apply(stored, now):
+            if stored and stored["otp_type"] == otp_type and stored["resend_cooldown_expires_at"] > now:
+                return (stored["otp"], False), None
+            otp = _new_otp()
+
+            def writes(pipe):
+                pipe.delete(key)
+                pipe.hset(key, mapping={
+                    "otp": otp,
+                    "otp_type": otp_type,
+                    "created_at": now,
+                    "expires_at": now + OTP_TTL_SECONDS,
+                    "resend_cooldown_expires_at": now + RESEND_COOLDOWN_SECONDS,
+                    "verified": 0,
+                    "attempt_count": 0,
+                })
+                pipe.expire(key, OTP_TTL_SECONDS)
+            return (otp, True), writes
+
+        return await self._transact(key, apply)
+
+    async def get(self, email: str) -> Optional[dict]:
+        client = await self._client()
+        return self._decode(await client.hgetall(self._key(email)))
+
+    async def verify(self, email: str, otp: str, otp_type: str) -> Tuple[bool, Optional[str]]:
+        key = self._key(email)
+
+        def apply(stored, now):
+            if not stored:
+                return (False, "OTP not found. Please request a new OTP"), None
+            if stored["otp_type"] != otp_type:
+                return (False, "Invalid OTP for this action. Please request a new OTP"), None
+
+            if stored["otp"] != otp:
+                attempts = stored["attempt_count"] + 1
+
+                def writes(pipe):
+                    # HSET on an existing key keeps its TTL
+                    fields = {"attempt_count": attempts}
+                    if attempts >= MAX_ATTEMPTS:
+                        fields["locked_until"] = now + LOCK_SECONDS
+                    pipe.hset(key, mapping=fields)
+                return (False, _failed_attempt_message(attempts)), writes
+
+            if stored["locked_until"] and stored["locked_until"] > now:
+                return (False, _locked_message(stored["locked_until"], now)), None
+            return (True, None), None
+
+        return await self._transact(key, apply)
+
+    async def mark_verified(self, email: str) -> bool:
+        key = self._key(email)
+
+        def apply(stored, _now):
+            if not stored:
+                # Don't recreate an expired key without a TTL
+                return False, None
+            return True, lambda pipe: pipe.hset(key, "verified", 1)
+
+        return await self._transact(key, apply)
+
+    async def cooldown_remaining(self, email: str) -> int:
+        client = await self._client()
+        cooldown = await client.hget(self._key(email), "resend_cooldown_expires_at")
+        if not cooldown:
+            return 0
+        return max(0, int(float(cooldown) - time.time()))
+
+    async def delete(self, email: str) -> bool:
+        client = await self._client()
+        return bool(await client.delete(self._key(email)))
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "conflicts": self.conflicts}
+
+
+def _create_backend():
+    if settings.OTP_STORE_BACKEND == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("OTP_STORE_BACKEND=redis requires REDIS_URL")
+        return RedisOTPBackend()
+    if settings.OTP_STORE_BACKEND != "memory":
+        raise ValueError(f"Unknown OTP_STORE_BACKEND: {settings.OTP_STORE_BACKEND}")
+    return InMemoryOTPBackend(slot_seconds=settings.OTP_SWEEP_INTERVAL_SECONDS)
+
+
+otp_backend = _create_backend()
+
+
+async def generate_and_store_otp(email: str, otp_type: str = "registration") -> Tuple[str, bool]:
+    """
+    Generate and store an OTP, honouring the resend cooldown.
+
+    Args:
+        email: User email
+        otp_type: Type of OTP (registration or password_reset)
+
+    Returns:
+        Tuple of (otp, is_new). Within the cooldown for the same flow the
+        existing OTP is returned with is_new=False.
+    """
+    return await otp_backend.generate(_normalize(email), otp_type)
+
+
+async def get_otp(email: str) -> Optional[dict]:
+    """Get the live OTP record for an email"""
+    record = await otp_backend.get(_normalize(email))
+    return _public_record(record) if record else None
+
+
+async def verify_otp(email: str, otp: str, otp_type: str = "registration") -> Tuple[bool, Optional[str]]:
+    """
+    Verify OTP and return (is_valid, error_message)
+
+    Args:
+        email: User email
+        otp: Submitted OTP code
+        otp_type: Expected OTP type (registration or password_reset)
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    return await otp_backend.verify(_normalize(email), otp, otp_type)
+
+
+async def mark_otp_verified(email: str) -> bool:
+    """Mark OTP as verified"""
+    return await otp_backend.mark_verified(_normalize(email))
+
+
+async def get_resend_cooldown_remaining(email: str) -> int:
+    """Get remaining cooldown seconds before resend is allowed. Returns 0 if resend is allowed"""
+    return await otp_backend.cooldown_remaining(_normalize(email))
+
+
+async def delete_otp(email: str) -> bool:
+    """Delete an OTP"""
+    return await otp_backend.delete(_normalize(email))
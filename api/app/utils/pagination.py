@@ -0,0 +1,140 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort-key values of the last
+document on a page. The next page is selected with a range filter on those
+keys instead of `$skip`, so every page costs the same regardless of depth.
+
+Totals are optional for cursor requests; when they are computed they go
+through a short-lived in-process cache so consecutive pages don't each pay
+for a full count.
+"""
+
+import base64
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from bson import json_util
+
+from app.config import settings
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+def encode_cursor(values: list) -> str:
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> list:
+    """Decode a cursor produced for `sort`; raises ValueError when malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def cursor_for(doc: dict, sort: SortSpec) -> str:
+    return encode_cursor([doc.get(field) for field, _ in sort])
+
+
+def _after(field: str, direction: int, value) -> Optional[dict]:
+    """Condition for `field` strictly after `value` in sort order (nulls sort lowest)."""
+    if direction < 0:
+        if value is None:
+            return None  # Nothing sorts below null
+        return {"$or": [{field: {"$lt": value}}, {field: None}]}
+    if value is None:
+        return {field: {"$ne": None}}
+    return {field: {"$gt": value}}
+
+
+def keyset_filter(sort: SortSpec, values: list) -> dict:
+    """
+    Filter selecting documents after `values` for a compound sort, e.g. for
+    [(a, -1), (b, -1)]: a < va OR (a == va AND b < vb).
+    """
+    branches = []
+    for index, (field, direction) in enumerate(sort):
+        condition = _after(field, direction, values[index])
+        if condition is None:
+            continue
+        prefix = [{prev_field: values[i]} for i, (prev_field, _) in enumerate(sort[:index])]
+        branches.append({"$and": prefix + [condition]} if prefix else condition)
+    if not branches:
+        # Cursor already at the very end
+        return {"_id": {"$exists": False}}
+    return {"$or": branches}
+
+
+def apply_cursor(query: dict, sort: SortSpec, cursor: Optional[str]) -> dict:
+    """Return `query` narrowed to documents after `cursor` (unchanged when no cursor)"""
+    if not cursor:
+        return query
+    return {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+
+
+def page_result(docs: List[dict], limit: int, sort: SortSpec) -> Tuple[List[dict], Optional[str]]:
+    """
+    Trim a `limit + 1` fetch to `limit` docs and build the next cursor.
+
+    Returns: (docs, next_cursor) where next_cursor is None on the last page.
+    """
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, cursor_for(docs[-1], sort)
+    return docs, None
+
+
+class CountCache:
+    """Small TTL + LRU cache of count_documents results keyed by collection and query"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+
+    def _key(self, collection, query: dict) -> str:
+        return f"{getattr(collection, 'name', id(collection))}:{json_util.dumps(query, sort_keys=True)}"
+
+    async def count(self, collection, query: dict) -> int:
+        key = self._key(collection, query)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry and entry[0] > now:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        total = await collection.count_documents(query)
+        if self.ttl_seconds > 0:
+            self._entries[key] = (now + self.ttl_seconds, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def clear(self):
+        self._entries.clear()
+
+
+count_cache = CountCache(ttl_seconds=settings.LIST_TOTAL_CACHE_TTL_SECONDS)
+
+
+def wants_total(include_total: Optional[bool], cursor: Optional[str]) -> bool:
+    """Totals default on for page-number requests and off for cursor requests"""
+    return include_total if include_total is not None else not cursor
+
+
+def list_meta(total: Optional[int], page: int, page_size: int, next_cursor: Optional[str]) -> dict:
+    return {
+        "total": total,
+        "page": page,
+        "pageSize": page_size,
+        "hasMore": next_cursor is not None,
+        "nextCursor": next_cursor,
+    }
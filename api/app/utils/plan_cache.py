@@ -0,0 +1,180 @@
+"""
+Read-through cache for subscription plans.
+
+Every quota check (SubscriptionEnforcement) and every public plans request
+needs plan limits, but the `plans` collection only changes when an admin edits
+it. The whole collection is a handful of documents, so it is cached as one
+list: a short-TTL in-process L1 in front of RedisCache (when REDIS_URL is set),
+with Mongo as the source of truth.
+
+PlanService writers call `plan_cache.invalidate()`, which clears this worker's
+L1 and the shared Redis copy; other workers pick up the change when their L1
+entry expires (PLAN_CACHE_TTL_SECONDS).
+
+A shared version counter (VERSION_KEY) keeps a slow reader from putting
+stale plans back into Redis: invalidate() increments it, and a worker that
+loaded from Mongo only writes its result if the version is still the one it
+saw before the read (WATCH/MULTI).
+"""
+import asyncio
+import copy
+import json
+import logging
+import time
+from typing import List, Optional
+
+from bson import json_util
+from redis.exceptions import WatchError
+
+from app.config import settings
+from app.database.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "plans:all"
+VERSION_KEY = "plans:version"
+
+
+class PlanCache:
+    """Two-tier (process, Redis) cache of all plan documents sorted by sort_order."""
+
+    def __init__(self, ttl_seconds: int, redis_ttl_seconds: int, use_redis: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.use_redis = use_redis
+        self._plans: Optional[List[dict]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _load_from_db(self) -> List[dict]:
+        return await db.plans.find({}).sort("sort_order", 1).to_list(length=None)
+
+    async def _load_from_redis(self) -> Optional[List[dict]]:
+        from app.utils.cache_service import RedisCache
+        raw = await RedisCache.get(REDIS_KEY)
+        if not raw:
+            return None
+        try:
+            return json_util.loads(raw)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable plan cache entry: {e}")
+            return None
+
+    async def _redis_version(self) -> Optional[str]:
+        """Current shared version ("" before the first invalidation); None if Redis is unreachable"""
+        from app.utils.cache_service import RedisCache
+        try:
+            client = await RedisCache.get_client()
+            return await client.get(VERSION_KEY) or ""
+        except Exception as e:
+            logger.error(f"Plan cache version read error: {e}")
+            return None
+
+    async def _store_in_redis(self, plans: List[dict], version: str) -> bool:
+        """Write plans to Redis unless an invalidation happened since `version` was read"""
+        from app.utils.cache_service import RedisCache
+        try:
+            client = await RedisCache.get_client()
+            async with client.pipeline(transaction=True) as pipe:
+                await pipe.watch(VERSION_KEY)
+                if (await pipe.get(VERSION_KEY) or "") != version:
+                    return False
+                pipe.multi()
+                # Same encoding as RedisCache.set, so RedisCache.get reads it back
+                pipe.set(REDIS_KEY, json.dumps(json_util.dumps(plans)), ex=self.redis_ttl_seconds)
+                await pipe.execute()
+            return True
+        except WatchError:
+            return False
+        except Exception as e:
+            logger.error(f"Plan cache SET error: {e}")
+            return False
+
+    def _fresh(self) -> bool:
+        return self._plans is not None and self._expires_at > time.monotonic()
+
+    async def get_plans(self) -> List[dict]:
+        """All plan documents (active and inactive), sorted by sort_order. Returns copies."""
+        if self._fresh():
+            self.hits += 1
+            return copy.deepcopy(self._plans)
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another coroutine may have filled the cache while we waited
+            if self._fresh():
+                self.hits += 1
+                return copy.deepcopy(self._plans)
+
+            generation = self._generation
+            plans = await self._load_from_redis() if self.use_redis else None
+            if plans is not None:
+                self.redis_hits += 1
+            else:
+                self.misses += 1
+                # Version before the read: a write that lands during it makes the store a no-op
+                version = await self._redis_version() if self.use_redis else None
+                plans = await self._load_from_db()
+                if version is not None and generation == self._generation:
+                    await self._store_in_redis(plans, version)
+
+            # Don't keep a result that was loaded across an invalidation
+            if generation == self._generation:
+                self._plans = plans
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            return copy.deepcopy(plans)
+
+    async def get_plan(self, name: str) -> Optional[dict]:
+        """Plan document by (case-insensitive) name, or None."""
+        name = name.lower()
+        for plan in await self.get_plans():
+            if plan.get("name") == name:
+                return plan
+        return None
+
+    async def invalidate(self) -> None:
+        """Drop cached plans after a write to the plans collection."""
+        self._generation += 1
+        self._plans = None
+        self._expires_at = 0.0
+        self.invalidations += 1
+        if self.use_redis:
+            from app.utils.cache_service import RedisCache
+            try:
+                client = await RedisCache.get_client()
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.incr(VERSION_KEY)
+                    pipe.delete(REDIS_KEY)
+                    await pipe.execute()
+            except Exception as e:
+                logger.error(f"Plan cache invalidation error: {e}")
+
+    def clear(self) -> None:
+        self._plans = None
+        self._expires_at = 0.0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "cached": self._plans is not None,
+            "ttlSeconds": self.ttl_seconds,
+            "redisEnabled": self.use_redis,
+            "hits": self.hits,
+            "redisHits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hitRate": round((self.hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+plan_cache = PlanCache(
+    ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+    redis_ttl_seconds=settings.PLAN_CACHE_REDIS_TTL_SECONDS,
+    use_redis=bool(settings.REDIS_URL),
+)
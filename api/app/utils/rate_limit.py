@@ -1,8 +1,104 @@
+"""
+slowapi limiter with shared storage and proxy-aware client keys.
+
+Counters live in the storage selected by RATE_LIMIT_STORAGE, so every gunicorn
+worker and container enforces one limit per client instead of one each:
+
+- "redis" (default when REDIS_URL is set): limits' Redis storage, which
+  updates the sliding-window counters with atomic Lua scripts
+- "mongodb": limits' MongoDB storage in the app database (atomic
+  find_one_and_update), for deployments without Redis
+- "memory": per-process counters
+
+If the shared storage becomes unreachable the limiter falls back to
+per-process memory until it recovers, rather than failing requests.
+
+Behind nginx every request arrives from the proxy, so clients are keyed by
+X-Forwarded-For: the right-most address that is not a trusted proxy
+(RATE_LIMIT_TRUSTED_PROXIES). Entries to its left are client-supplied and
+ignored. Forwarded headers are only read when the connecting peer is itself
+a trusted proxy; a client connecting directly is keyed by its socket address.
+"""
+import ipaddress
+from functools import lru_cache
+
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from starlette.requests import Request
+
+from app.config import settings
+
+MONGO_COUNTER_COLLECTION = "rate_limit_counters"
+MONGO_WINDOW_COLLECTION = "rate_limit_windows"
+
+_TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in settings.RATE_LIMIT_TRUSTED_PROXIES.split(",")
+    if network.strip()
+]
+
+
+@lru_cache(maxsize=4096)
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """Rate-limit key: the client address as seen by the outermost trusted proxy."""
+    peer = get_remote_address(request)
+    if not _is_trusted_proxy(peer):
+        # Not behind our proxy: the headers are whatever the client chose to send
+        return peer
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _is_trusted_proxy(hop):
+                return hop
+        if hops:
+            # Every hop is internal (e.g. a health check from inside the network)
+            return hops[0]
+    real_ip = request.headers.get("x-real-ip")
+    if real_ip:
+        return real_ip.strip()
+    return peer
+
+
+def storage_config(backend: str) -> tuple:
+    """Map RATE_LIMIT_STORAGE to a limits storage URI and its options."""
+    if backend == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("RATE_LIMIT_STORAGE=redis requires REDIS_URL")
+        return settings.REDIS_URL, {}
+    if backend == "mongodb":
+        return settings.MONGO_URL, {
+            "database_name": settings.MONGO_DB_NAME,
+            "counter_collection_name": MONGO_COUNTER_COLLECTION,
+            "window_collection_name": MONGO_WINDOW_COLLECTION,
+        }
+    if backend == "memory":
+        return "memory://", {}
+    raise ValueError(f"Unknown RATE_LIMIT_STORAGE: {backend}")
+
+
+def create_limiter(backend: str = None, strategy: str = None) -> Limiter:
+    backend = backend or settings.RATE_LIMIT_STORAGE
+    storage_uri, storage_options = storage_config(backend)
+    return Limiter(
+        key_func=client_ip,
+        default_limits=["100/minute"],
+        strategy=strategy or settings.RATE_LIMIT_STRATEGY,
+        storage_uri=storage_uri,
+        storage_options=storage_options,
+        in_memory_fallback_enabled=backend != "memory",
+    )
+
 
-# Small-traffic deployments use in-memory storage only.
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
+limiter = create_limiter()
 
 # Login-specific rate limit (stricter to prevent brute force)
 login_rate_limit_dep = limiter.limit("5/minute")
@@ -0,0 +1,152 @@
+"""
+Async Razorpay REST client.
+
+The official `razorpay` SDK is built on `requests`, so every call blocks the
+event loop for a full network round trip. RazorpayGateway talks to the same
+REST API through one pooled `httpx.AsyncClient` per process:
+
+- connect/read timeouts on every call (RAZORPAY_TIMEOUT_SECONDS)
+- at most RAZORPAY_MAX_CONCURRENCY requests in flight; extra callers wait
+- retries with exponential backoff and jitter (RAZORPAY_MAX_RETRIES)
+
+Retries are conservative for POSTs, which create orders/subscriptions: they
+are only retried when Razorpay cannot have processed the request (connection
+not established, 429, 503). Reads are also retried on timeouts and other 5xx.
+"""
+import asyncio
+import logging
+import random
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the request was not processed and is safe to resend
+_NOT_PROCESSED_STATUSES = {429, 503}
+_RETRYABLE_READ_STATUSES = {429, 500, 502, 503, 504}
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RazorpayAPIError(Exception):
+    """Razorpay rejected the request or could not be reached after retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, error: Optional[dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error = error or {}
+
+
+class RazorpayGateway:
+    """Pooled, bounded, retrying async client for the Razorpay REST API"""
+
+    def __init__(
+        self,
+        key_id: Optional[str],
+        key_secret: Optional[str],
+        base_url: str,
+        timeout_seconds: float = 10.0,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        max_concurrency: int = 10,
+    ):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.base_url = base_url.rstrip("/")
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_concurrency = max(1, max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.key_id or "", self.key_secret or ""),
+                timeout=httpx.Timeout(self.timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _error(response: httpx.Response) -> RazorpayAPIError:
+        try:
+            error = response.json().get("error", {})
+        except ValueError:
+            error = {}
+        description = error.get("description") or response.text or "Razorpay request failed"
+        return RazorpayAPIError(description, status_code=response.status_code, error=error)
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None) -> dict:
+        client = self._get_client()
+        is_read = method.upper() == "GET"
+        retryable_statuses = _RETRYABLE_READ_STATUSES if is_read else _NOT_PROCESSED_STATUSES
+        retryable_errors = httpx.TransportError if is_read else _NOT_SENT_ERRORS
+
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._semaphore:
+                    response = await client.request(method, path, json=json)
+            except retryable_errors as e:
+                if attempt >= self.max_retries:
+                    raise RazorpayAPIError(f"Razorpay unreachable: {type(e).__name__}") from e
+                logger.warning(f"[RAZORPAY] {method} {path} failed ({type(e).__name__}), retrying")
+            except httpx.HTTPError as e:
+                raise RazorpayAPIError(f"Razorpay request failed: {type(e).__name__}") from e
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                if response.status_code not in retryable_statuses or attempt >= self.max_retries:
+                    raise self._error(response)
+                logger.warning(f"[RAZORPAY] {method} {path} returned {response.status_code}, retrying")
+
+            await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    async def create_order(self, order_data: dict) -> dict:
+        return await self.request("POST", "/orders", json=order_data)
+
+    async def create_subscription(self, subscription_data: dict) -> dict:
+        return await self.request("POST", "/subscriptions", json=subscription_data)
+
+    async def cancel_subscription(self, subscription_id: str) -> dict:
+        return await self.request("POST", f"/subscriptions/{subscription_id}/cancel", json={})
+
+    async def pause_subscription(self, subscription_id: str, data: dict) -> dict:
+        return await self.request("POST", f"/subscriptions/{subscription_id}/pause", json=data)
+
+    async def fetch_subscription(self, subscription_id: str) -> dict:
+        return await self.request("GET", f"/subscriptions/{subscription_id}")
+
+
+razorpay_gateway = RazorpayGateway(
+    key_id=settings.RAZORPAY_KEY_ID,
+    key_secret=settings.RAZORPAY_KEY_SECRET,
+    base_url=settings.RAZORPAY_API_BASE_URL,
+    timeout_seconds=settings.RAZORPAY_TIMEOUT_SECONDS,
+    max_retries=settings.RAZORPAY_MAX_RETRIES,
+    max_concurrency=settings.RAZORPAY_MAX_CONCURRENCY,
+)
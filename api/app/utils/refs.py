@@ -0,0 +1,56 @@
+"""
+Typed reference fields.
+
+Cross-collection ids (tenant.roomId, payment.tenantId, ...) are stored as hex
+strings for the API. Each one is mirrored in an ObjectId `*Ref` field so
+aggregation `$lookup`s can join with localField/foreignField on the `_id`
+index instead of comparing `$toString` values per document.
+"""
+
+from typing import Optional
+
+from bson import ObjectId
+
+# Source string field -> typed ObjectId field, per collection
+TENANT_REFS = {"roomId": "roomRef", "bedId": "bedRef"}
+BED_REFS = {"roomId": "roomRef"}
+PAYMENT_REFS = {"tenantId": "tenantRef", "bed": "bedRef"}
+
+REFS_BY_COLLECTION = {
+    "tenants": TENANT_REFS,
+    "beds": BED_REFS,
+    "payments": PAYMENT_REFS,
+}
+
+
+def object_id_or_none(value) -> Optional[ObjectId]:
+    """ObjectId for a hex string id, or None when empty/not an ObjectId"""
+    if isinstance(value, ObjectId):
+        return value
+    if value and ObjectId.is_valid(str(value)):
+        return ObjectId(str(value))
+    return None
+
+
+def with_refs(data: dict, refs: dict) -> dict:
+    """
+    Set the typed ref field for every source field present in `data`.
+
+    Works on full documents and on `$set` payloads: fields that are not
+    being written are left alone, fields cleared to None clear their ref.
+    Mutates and returns `data`.
+    """
+    for source_field, ref_field in refs.items():
+        if source_field in data:
+            data[ref_field] = object_id_or_none(data[source_field])
+    return data
+
+
+def ref_or_source(ref, source) -> dict:
+    """
+    Aggregation join key: the typed `ref`, or the string `source` id converted
+    in the pipeline for documents the refs backfill has not reached yet
+    (app.migrations.backfill_object_id_refs). Ids that are not ObjectIds
+    become null and match nothing, the same as with_refs.
+    """
+    return {"$ifNull": [ref, {"$convert": {"input": source, "to": "objectId", "onError": None, "onNull": None}}]}
@@ -0,0 +1,193 @@
+"""
+Mongo-backed locks for scheduled jobs.
+
+Every gunicorn worker (and every container) starts its own AsyncIOScheduler,
+so each cron trigger fires once per process. Jobs are wrapped with
+`run_exclusive`, which claims a per-period lease in the `scheduler_locks`
+collection; only the process that wins the claim runs the job for that period.
+
+Lock documents look like:
+    {"_id": job_id, "runKey": int, "owner": str, "leaseUntil": datetime,
+     "startedAt": datetime, "finishedAt": datetime}
+
+`runKey` is the index of the period (e.g. day or hour) the run belongs to, so
+a worker whose trigger fires a few seconds later than the winner's sees the
+period as already claimed even after the winner released the lease. If the
+holder dies mid-run, the lease expires and the job runs again in the next
+period (all scheduled jobs here are idempotent catch-up jobs).
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+LOCK_COLLECTION = "scheduler_locks"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Stored on partitioned documents (tenants) so a partition is selected in the query
+PARTITION_HASH_FIELD = "partitionHash"
+
+
+def partition_hash(key: str) -> int:
+    """Stable 32-bit hash of a key (e.g. tenant id); stored as PARTITION_HASH_FIELD"""
+    return zlib.crc32(str(key).encode())
+
+
+def partition_for(key: str, partitions: int) -> int:
+    """Stable partition number in [0, partitions) for a key (e.g. tenant id)"""
+    if partitions <= 1:
+        return 0
+    return partition_hash(key) % partitions
+
+
+def partition_filter(partition: Optional[int], partitions: int) -> dict:
+    """Query matching the documents of one partition (all documents when not partitioned)"""
+    if partition is None or partitions <= 1:
+        return {}
+    return {PARTITION_HASH_FIELD: {"$mod": [partitions, partition]}}
+
+
+class JobLock:
+    """Per-period lease on a named job"""
+
+    @staticmethod
+    def run_key(period_seconds: int, now: Optional[float] = None) -> int:
+        return int((now if now is not None else time.time()) // period_seconds)
+
+    @staticmethod
+    async def acquire(job_id: str, run_key: int, lease_seconds: int, owner: str = WORKER_ID) -> bool:
+        """
+        Claim job_id for run_key. Succeeds when the job has not run in this
+        period yet and no other worker holds a live lease.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            await db[LOCK_COLLECTION].find_one_and_update(
+                {
+                    "_id": job_id,
+                    "runKey": {"$ne": run_key},
+                    "$or": [{"leaseUntil": {"$lte": now}}, {"leaseUntil": None}],
+                },
+                {
+                    "$set": {
+                        "runKey": run_key,
+                        "owner": owner,
+                        "leaseUntil": now + timedelta(seconds=lease_seconds),
+                        "startedAt": now,
+                        "finishedAt": None,
+                    }
+                },
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # The document exists but did not match: claimed for this period or still leased
+            return False
+
+    @staticmethod
+    async def extend(job_id: str, lease_seconds: int, owner: str = WORKER_ID) -> bool:
+        now = datetime.now(timezone.utc)
+        result = await db[LOCK_COLLECTION].update_one(
+            {"_id": job_id, "owner": owner},
+            {"$set": {"leaseUntil": now + timedelta(seconds=lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    @staticmethod
+    async def release(job_id: str, owner: str = WORKER_ID) -> None:
+        now = datetime.now(timezone.utc)
+        await db[LOCK_COLLECTION].update_one(
+            {"_id": job_id, "owner": owner},
+            {"$set": {"leaseUntil": now, "finishedAt": now}},
+        )
+
+
+async def run_exclusive(
+    job_id: str,
+    job: Callable[[], Awaitable],
+    period_seconds: int,
+    lease_seconds: int = 1800,
+    owner: str = WORKER_ID,
+):
+    """
+    Run `job` only if this process wins the lease for the current period.
+
+    The lease is renewed in the background while the job runs, so long runs
+    are not taken over by another worker.
+
+    Returns: the job's result, or None when another worker owns this period.
+    """
+    run_key = JobLock.run_key(period_seconds)
+    try:
+        acquired = await JobLock.acquire(job_id, run_key, lease_seconds, owner)
+    except Exception as e:
+        logger.error(f"[SCHEDULER] Could not acquire lock for {job_id}: {str(e)}")
+        return None
+
+    if not acquired:
+        logger.info(f"[SCHEDULER] Skipping {job_id}: already claimed for this period")
+        return None
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(max(lease_seconds // 3, 1))
+            try:
+                await JobLock.extend(job_id, lease_seconds, owner)
+            except Exception as e:
+                logger.warning(f"[SCHEDULER] Lease renewal failed for {job_id}: {str(e)}")
+
+    logger.info(f"[SCHEDULER] {owner} running {job_id}")
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        return await job()
+    finally:
+        heartbeat_task.cancel()
+        try:
+            await JobLock.release(job_id, owner)
+        except Exception as e:
+            logger.warning(f"[SCHEDULER] Lease release failed for {job_id}: {str(e)}")
+
+
+async def run_partitioned(
+    job_id: str,
+    job: Callable[[int, int], Awaitable],
+    partitions: int,
+    period_seconds: int,
+    lease_seconds: int = 1800,
+    owner: str = WORKER_ID,
+) -> list:
+    """
+    Split a job into `partitions` independently locked pieces.
+
+    Every worker walks the partitions (starting at an offset derived from its
+    worker id so workers spread out) and runs each one it can claim, so the
+    work is shared by however many workers are alive.
+
+    Returns: list of {"partition": int, "result": ...} for partitions run here.
+    """
+    results = []
+    start = partition_for(owner, partitions)
+    for step in range(partitions):
+        partition = (start + step) % partitions
+        result = await run_exclusive(
+            f"{job_id}:p{partition}",
+            lambda partition=partition: job(partition, partitions),
+            period_seconds=period_seconds,
+            lease_seconds=lease_seconds,
+            owner=owner,
+        )
+        if result is not None:
+            results.append({"partition": partition, "result": result})
+    return results
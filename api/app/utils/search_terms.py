@@ -0,0 +1,116 @@
+"""
+Indexed search for the tenant, staff and room lists.
+
+Each searchable document carries a `searchTerms` array: the normalized words
+of its search fields (lower-cased, accents and punctuation stripped), phone
+numbers as bare digits, and a compact form of codes such as "A-101" -> "a101".
+A compound (propertyId, searchTerms) multikey index serves two modes:
+
+- "prefix" (default, typeahead): every query word must be the start of some
+  term. Anchored, case-sensitive regexes on normalized terms become index range
+  scans instead of the unanchored case-insensitive `$regex` collection scans
+  used before.
+- "text": `$text` over the collection's text index, for whole words.
+
+Like the typed refs (app.utils.refs), terms are written alongside the fields
+they derive from; app.migrations.backfill_search_terms fills in existing
+documents.
+"""
+
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+SEARCH_TERMS_FIELD = "searchTerms"
+
+TENANT_SEARCH_FIELDS = ("name", "phone", "documentId")
+STAFF_SEARCH_FIELDS = ("name", "mobileNumber", "address")
+ROOM_SEARCH_FIELDS = ("roomNumber", "description")
+
+SEARCH_FIELDS_BY_COLLECTION = {
+    "tenants": TENANT_SEARCH_FIELDS,
+    "staff": STAFF_SEARCH_FIELDS,
+    "rooms": ROOM_SEARCH_FIELDS,
+}
+
+PHONE_FIELDS = {"phone", "mobileNumber"}
+SEARCH_MODES = ("prefix", "text")
+
+# Later words barely narrow a typeahead result but each adds a regex clause
+_MAX_QUERY_WORDS = 5
+_PHONE_QUERY = re.compile(r"[\d\s+()\-]+")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_search_text(value) -> str:
+    """Lower-case ASCII with accents removed and punctuation turned into spaces"""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def _phone_terms(value) -> List[str]:
+    digits = re.sub(r"\D", "", str(value))
+    if not digits:
+        return []
+    # Also index the local number so "98765..." matches "+91 98765..."
+    return [digits, digits[-10:]] if len(digits) > 10 else [digits]
+
+
+def search_terms(doc: dict, fields: Iterable[str]) -> List[str]:
+    """Sorted, de-duplicated search terms for the given fields of `doc`"""
+    terms = set()
+    for field in fields:
+        value = doc.get(field)
+        if value in (None, ""):
+            continue
+        if field in PHONE_FIELDS:
+            terms.update(_phone_terms(value))
+            continue
+        words = normalize_search_text(value).split()
+        terms.update(words)
+        if len(words) > 1:
+            terms.add("".join(words))
+    return sorted(terms)
+
+
+def with_search_terms(data: dict, fields: Iterable[str], existing: Optional[dict] = None) -> dict:
+    """
+    Set `searchTerms` when any search field is being written.
+
+    Works on full documents and on `$set` payloads; for a partial payload pass
+    the stored document as `existing` so untouched fields keep their terms.
+    Mutates and returns `data`.
+    """
+    fields = tuple(fields)
+    if any(field in data for field in fields):
+        data[SEARCH_TERMS_FIELD] = search_terms({**(existing or {}), **data}, fields)
+    return data
+
+
+def query_words(search: str) -> List[str]:
+    """Normalized words of a search box value; phone-like input collapses to digits"""
+    if _PHONE_QUERY.fullmatch(search.strip()) and re.search(r"\d", search):
+        digits = re.sub(r"\D", "", search)
+        return [digits]
+    return normalize_search_text(search).split()[:_MAX_QUERY_WORDS]
+
+
+def search_filter(search: Optional[str], mode: str = "prefix") -> dict:
+    """
+    Filter clauses for a list query. Empty when there is nothing to search for.
+    Raises ValueError for an unknown mode.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Invalid search_mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}")
+    if not search or not search.strip():
+        return {}
+    if mode == "text":
+        return {"$text": {"$search": search.strip()}}
+
+    words = query_words(search)
+    if not words:
+        # Only punctuation: match nothing rather than everything
+        return {SEARCH_TERMS_FIELD: {"$in": []}}
+    clauses = [{SEARCH_TERMS_FIELD: {"$regex": f"^{re.escape(word)}"}} for word in words]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
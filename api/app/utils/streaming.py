@@ -0,0 +1,205 @@
+"""
+Streaming CSV / NDJSON bodies for bulk import and export endpoints.
+
+Input is read from the raw request stream one line at a time and output is
+produced one row at a time, so memory stays flat whatever the file size.
+CSV columns may use dotted names ("billingConfig.status") for nested fields;
+exports write the same names so an exported file can be imported again.
+"""
+
+import csv
+import io
+import json
+import tempfile
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from starlette.datastructures import UploadFile
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# Bytes gathered before a chunk is handed to the server; many tiny writes cost more than the rows
+CHUNK_BYTES = 64 * 1024
+# Uploads are spooled in memory up to this size, then to a temp file on disk
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+def resolve_format(fmt: Optional[str], content_type: Optional[str] = None) -> str:
+    """Explicit format, else one inferred from the Content-Type. Raises ValueError."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+        return fmt
+    content_type = (content_type or "").lower()
+    return "csv" if "csv" in content_type else "ndjson"
+
+
+async def spool(chunks: AsyncIterable[bytes]) -> UploadFile:
+    """
+    Read a whole request body into a temp file, rewound for reading.
+
+    A StreamingResponse listens for client disconnects by calling receive(),
+    which swallows any body messages still unread, so an upload has to be
+    consumed before its response starts streaming.
+    """
+    upload = UploadFile(tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES))
+    try:
+        async for chunk in chunks:
+            await upload.write(chunk)
+        await upload.seek(0)
+    except BaseException:
+        await upload.close()
+        raise
+    return upload
+
+
+async def iter_file(upload: UploadFile, size: int = CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Chunks of a spooled upload"""
+    while True:
+        data = await upload.read(size)
+        if not data:
+            return
+        yield data
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decoded lines of a byte stream, without line endings; blank lines are skipped"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8-sig").rstrip("\r")
+            if text.strip():
+                yield text
+    text = buffer.decode("utf-8-sig").rstrip("\r")
+    if text.strip():
+        yield text
+
+
+def _unflatten(row: Dict[str, str]) -> dict:
+    """{"a.b": "1"} -> {"a": {"b": "1"}}; empty cells are dropped"""
+    doc: dict = {}
+    for key, value in row.items():
+        if key is None or value is None or value == "":
+            continue
+        target = doc
+        *parents, leaf = key.strip().split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return doc
+
+
+async def iter_records(chunks: AsyncIterable[bytes], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    (row number, record) pairs from a CSV or NDJSON byte stream.
+
+    The record is a dict, or a ValueError for a line that cannot be parsed so
+    the caller can report it and carry on with the next row.
+    """
+    header: Optional[List[str]] = None
+    pending = ""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if fmt == "ndjson":
+            row_number += 1
+            try:
+                record = json.loads(line)
+                yield row_number, record if isinstance(record, dict) else ValueError("Row is not a JSON object")
+            except json.JSONDecodeError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e.msg}")
+            continue
+
+        # A quoted CSV field may contain newlines: wait for the closing quote
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        values = next(csv.reader([pending]))
+        pending = ""
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row_number, _unflatten(dict(zip(header, values)))
+    if pending:
+        yield row_number + 1, ValueError("Unterminated quoted field")
+
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_line(record: dict) -> str:
+    return json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def _cell(record: dict, field: str):
+    value = record
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(part)
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def csv_line(values: Iterable) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerow(values)
+    return out.getvalue()
+
+
+def csv_row(record: dict, fields: List[str]) -> str:
+    return csv_line(_cell(record, field) for field in fields)
+
+
+async def encode_rows(rows: AsyncIterable[dict], fmt: str, fields: List[str]) -> AsyncIterator[str]:
+    """Serialize rows as they arrive: a CSV header then one line per row, or NDJSON"""
+    if fmt == "csv":
+        yield csv_line(fields)
+        async for row in rows:
+            yield csv_row(row, fields)
+    else:
+        async for row in rows:
+            yield ndjson_line(row)
+
+
+async def buffered(lines: AsyncIterable[str], size: int = CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Join small text pieces into UTF-8 chunks of about `size` bytes"""
+    parts: List[bytes] = []
+    pending = 0
+    async for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        pending += len(data)
+        if pending >= size:
+            yield b"".join(parts)
+            parts, pending = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a byte stream into one gzip member as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
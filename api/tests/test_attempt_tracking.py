@@ -0,0 +1,344 @@
+import asyncio
+import unittest
+import sys
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+from app.utils import attempt_tracking
+from app.utils.attempt_tracking import AttemptTracker
+from app.utils.cache_service import RedisCache
+
+_MISSING = object()
+
+
+def _sort_key(value):
+    # BSON comparison order for the types the pipeline touches: missing < null < numbers < dates
+    if value is _MISSING:
+        return (0, 0)
+    if value is None:
+        return (1, 0)
+    if isinstance(value, datetime):
+        return (3, value)
+    return (2, value)
+
+
+def _evaluate(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:], _MISSING)
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    if op == "$cond":
+        condition, then, otherwise = args
+        return _evaluate(then if _evaluate(condition, doc) else otherwise, doc)
+    if op == "$ifNull":
+        value = _evaluate(args[0], doc)
+        return _evaluate(args[1], doc) if value in (None, _MISSING) else value
+    values = [_evaluate(arg, doc) for arg in args]
+    if op == "$or":
+        return any(values)
+    if op == "$and":
+        return all(values)
+    if op == "$add":
+        return sum(values)
+    left, right = (_sort_key(v) for v in values)
+    return {"$lt": left < right, "$lte": left <= right, "$gt": left > right, "$gte": left >= right}[op]
+
+
+class _AttemptsCollection:
+    """Evaluates the pipeline updates AttemptTracker issues against an email-keyed dict"""
+
+    def __init__(self):
+        self.docs = {}
+        self.round_trips = 0
+        self.duplicate_inserts = 0
+
+    async def find_one_and_update(self, query, pipeline, projection=None, upsert=False, return_document=None):
+        self.round_trips += 1
+        await asyncio.sleep(0)
+        email = query["email"]
+        if email not in self.docs and self.duplicate_inserts:
+            # Another worker inserted first; the unique index rejects our upsert
+            self.duplicate_inserts -= 1
+            self.docs[email] = {"email": email}
+            raise DuplicateKeyError("E11000 duplicate key")
+        doc = dict(self.docs.get(email, {"email": email}))
+        for stage in pipeline:
+            doc.update({field: _evaluate(expr, doc) for field, expr in stage["$set"].items()})
+        self.docs[email] = doc
+        return {field: doc[field] for field in projection if field != "_id"}
+
+    async def find_one(self, query, projection=None):
+        self.round_trips += 1
+        doc = self.docs.get(query["email"])
+        if doc and (doc.get("lockedUntil") or datetime.min.replace(tzinfo=timezone.utc)) > query["lockedUntil"]["$gt"]:
+            return {"lockedUntil": doc["lockedUntil"]}
+        return None
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["email"])
+        if doc:
+            doc.update(update["$set"])
+        return SimpleNamespace(matched_count=1 if doc else 0)
+
+    async def delete_one(self, query):
+        self.docs.pop(query["email"], None)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class AttemptTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.collection = _AttemptsCollection()
+        self.redis = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+        patcher = patch.object(RedisCache, "_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tracker = self.worker()
+
+    def worker(self, use_redis=True):
+        """A tracker as another process would have it: same MongoDB and Redis"""
+        tracker = AttemptTracker("login_attempts", max_attempts=5, lock_cache_ttl_seconds=60, use_redis=use_redis)
+        tracker.collection = self.collection
+        return tracker
+
+    async def age(self, email, minutes):
+        """Shift the stored timestamps back as if `minutes` had passed"""
+        doc = self.collection.docs[email]
+        for field in ("updatedAt", "lockedUntil"):
+            if doc.get(field):
+                doc[field] -= timedelta(minutes=minutes)
+        await self.redis.flushall()
+
+    def test_each_failure_is_one_round_trip_and_locks_at_max(self):
+        async def scenario():
+            counts = [await self.tracker.record_failure("a@example.com") for _ in range(5)]
+            return counts, await self.tracker.check("a@example.com")
+
+        counts, (locked, minutes) = asyncio.run(scenario())
+
+        self.assertEqual(counts, [1, 2, 3, 4, 5])
+        self.assertTrue(locked)
+        self.assertEqual(minutes, 9)
+        # Five failures plus zero reads: the lock was cached when the fifth failure set it
+        self.assertEqual(self.collection.round_trips, 5)
+
+    def test_lock_is_not_set_below_max(self):
+        async def scenario():
+            for _ in range(4):
+                await self.tracker.record_failure("a@example.com")
+            return await self.tracker.check("a@example.com")
+
+        self.assertEqual(asyncio.run(scenario()), (False, None))
+        self.assertIsNone(self.collection.docs["a@example.com"]["lockedUntil"])
+
+    def test_stale_window_starts_over(self):
+        async def scenario():
+            for _ in range(3):
+                await self.tracker.record_failure("a@example.com")
+            await self.age("a@example.com", 11)
+            return await self.tracker.record_failure("a@example.com")
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+
+    def test_expired_lock_unlocks_without_a_write_and_next_failure_starts_over(self):
+        async def scenario():
+            for _ in range(5):
+                await self.tracker.record_failure("a@example.com")
+            await self.age("a@example.com", 10)
+            checked = await self.tracker.check("a@example.com")
+            return checked, await self.tracker.record_failure("a@example.com")
+
+        checked, count = asyncio.run(scenario())
+
+        self.assertEqual(checked, (False, None))
+        self.assertEqual(count, 1)
+        self.assertIsNone(self.collection.docs["a@example.com"]["lockedUntil"])
+
+    def test_concurrent_failures_are_all_counted(self):
+        async def scenario():
+            return await asyncio.gather(*(self.tracker.record_failure("a@example.com") for _ in range(20)))
+
+        counts = asyncio.run(scenario())
+
+        self.assertEqual(sorted(counts), list(range(1, 21)))
+        self.assertEqual(self.collection.docs["a@example.com"]["failedAttempts"], 20)
+
+    def test_racing_first_insert_is_retried(self):
+        self.collection.duplicate_inserts = 1
+
+        count = asyncio.run(self.tracker.record_failure("a@example.com"))
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self.collection.round_trips, 2)
+
+    def test_locked_checks_are_served_from_cache(self):
+        async def scenario():
+            for _ in range(5):
+                await self.tracker.record_failure("a@example.com")
+            await self.redis.flushall()
+            return [await self.tracker.check("a@example.com") for _ in range(50)]
+
+        results = asyncio.run(scenario())
+
+        self.assertTrue(all(locked for locked, _ in results))
+        self.assertEqual(self.tracker.stats(), {"lockCache": "redis", "cacheHits": 49, "dbChecks": 1})
+
+    def test_reset_on_one_worker_unlocks_on_every_worker(self):
+        other = self.worker()
+
+        async def scenario():
+            for _ in range(5):
+                await self.tracker.record_failure("a@example.com")
+            locked = await other.check("a@example.com")
+            await self.tracker.reset("a@example.com")
+            return locked, await other.check("a@example.com")
+
+        locked, after_reset = asyncio.run(scenario())
+
+        self.assertTrue(locked[0])
+        self.assertEqual(other.stats()["cacheHits"], 1)
+        self.assertEqual(after_reset, (False, None))
+
+    def test_without_redis_locks_are_confirmed_in_mongo(self):
+        tracker, other = self.worker(use_redis=False), self.worker(use_redis=False)
+
+        async def scenario():
+            for _ in range(5):
+                await tracker.record_failure("a@example.com")
+            locked = [await tracker.check("a@example.com") for _ in range(3)]
+            await other.reset("a@example.com")
+            return locked, await tracker.check("a@example.com")
+
+        locked, after_reset = asyncio.run(scenario())
+
+        self.assertTrue(all(is_locked for is_locked, _ in locked))
+        self.assertEqual(after_reset, (False, None))
+        self.assertEqual(tracker.stats(), {"lockCache": "off", "cacheHits": 0, "dbChecks": 4})
+        self.assertEqual(asyncio.run(self.redis.keys("*")), [])
+
+    def test_unlocked_answers_are_not_cached(self):
+        # A lock set by another worker must apply on this worker's next check
+        async def scenario():
+            first = await self.tracker.check("a@example.com")
+            self.collection.docs["a@example.com"] = {
+                "email": "a@example.com",
+                "failedAttempts": 5,
+                "lockedUntil": datetime.now(timezone.utc) + timedelta(minutes=10),
+            }
+            return first, await self.tracker.check("a@example.com")
+
+        first, second = asyncio.run(scenario())
+
+        self.assertEqual(first, (False, None))
+        self.assertTrue(second[0])
+
+    def test_reset_and_delete_drop_the_cached_lock(self):
+        async def scenario():
+            for _ in range(5):
+                await self.tracker.record_failure("a@example.com")
+            await self.tracker.reset("a@example.com")
+            after_reset = await self.tracker.check("a@example.com")
+            for _ in range(5):
+                await self.tracker.record_failure("a@example.com")
+            await self.tracker.delete("a@example.com")
+            return after_reset, await self.tracker.check("a@example.com")
+
+        self.assertEqual(asyncio.run(scenario()), ((False, None), (False, None)))
+
+    def test_cache_entries_expire(self):
+        self.tracker.lock_cache_ttl_seconds = 0
+
+        async def scenario():
+            for _ in range(5):
+                await self.tracker.record_failure("a@example.com")
+            return await self.tracker.check("a@example.com")
+
+        self.assertTrue(asyncio.run(scenario())[0])
+        self.assertEqual(self.tracker.stats()["dbChecks"], 1)
+
+    def test_module_functions_normalize_email(self):
+        with patch.object(attempt_tracking, "login_attempts", self.tracker):
+            count = asyncio.run(attempt_tracking.increment_login_attempts("  Ann@Example.COM "))
+
+        self.assertEqual(count, 1)
+        self.assertIn("ann@example.com", self.collection.docs)
+
+
+class _IndexedCollection:
+    name = "otp_attempts"
+
+    def __init__(self, indexes, emails):
+        self.indexes = indexes
+        self.emails = list(emails)
+        self.calls = []
+
+    async def index_information(self):
+        return self.indexes
+
+    async def drop_index(self, name):
+        self.calls.append(("drop", name))
+        del self.indexes[name]
+
+    async def create_index(self, keys, unique=False):
+        self.calls.append(("create", keys, unique))
+        if len(set(self.emails)) != len(self.emails):
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        self.indexes["email_1"] = {"key": [("email", 1)], "unique": unique}
+
+    def aggregate(self, pipeline):
+        counts = {}
+        for email in self.emails:
+            counts[email] = counts.get(email, 0) + 1
+
+        class _Cursor:
+            async def to_list(self, length=None):
+                return [{"_id": email, "count": n} for email, n in counts.items() if n > 1]
+        return _Cursor()
+
+    async def delete_many(self, query):
+        self.emails = [email for email in self.emails if email not in query["email"]["$in"]]
+
+
+class EnsureIndexTests(unittest.TestCase):
+    def make_tracker(self, collection):
+        tracker = AttemptTracker("otp_attempts", max_attempts=5, lock_cache_ttl_seconds=5)
+        tracker.collection = collection
+        return tracker
+
+    def test_old_non_unique_index_is_replaced(self):
+        collection = _IndexedCollection({"email_1": {"key": [("email", 1)]}}, ["a", "b"])
+
+        asyncio.run(self.make_tracker(collection).ensure_index())
+
+        self.assertEqual(collection.calls, [("drop", "email_1"), ("create", "email", True)])
+
+    def test_existing_unique_index_is_left_alone(self):
+        collection = _IndexedCollection({"email_1": {"key": [("email", 1)], "unique": True}}, ["a"])
+
+        asyncio.run(self.make_tracker(collection).ensure_index())
+
+        self.assertEqual(collection.calls, [])
+
+    def test_duplicate_counters_are_removed(self):
+        collection = _IndexedCollection({}, ["a", "b", "b", "c", "c", "c"])
+
+        asyncio.run(self.make_tracker(collection).ensure_index())
+
+        self.assertEqual(collection.emails, ["a"])
+        self.assertTrue(collection.indexes["email_1"]["unique"])
+
+
+if __name__ == '__main__':
+    unittest.main()
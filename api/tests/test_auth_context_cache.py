@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+from app.models.subscription_schema import Subscription
+from app.utils.auth_context_cache import AuthContextCache
+
+
+def _context(user_id: str, property_ids=None):
+    return {
+        "user": {"_id": ObjectId(user_id), "email": "owner@example.com", "role": "propertyowner"},
+        "role": "propertyowner",
+        "property_ids": property_ids or ["prop-1"],
+        "subscription": Subscription(
+            ownerId=user_id,
+            plan="free",
+            price=0,
+            currentPeriodStart="2026-01-01T00:00:00",
+            currentPeriodEnd="2027-01-01T00:00:00",
+            propertyLimit=1,
+            roomLimit=30,
+            tenantLimit=20,
+            staffLimit=3,
+            createdAt="2026-01-01T00:00:00",
+            updatedAt="2026-01-01T00:00:00",
+        ),
+    }
+
+
+class AuthContextCacheTests(unittest.TestCase):
+    def test_miss_then_hit(self):
+        cache = AuthContextCache(max_entries=10, ttl_seconds=60)
+        user_id = "000000000000000000000001"
+
+        async def scenario():
+            self.assertIsNone(await cache.get(user_id))
+            await cache.set(user_id, _context(user_id))
+            return await cache.get(user_id)
+
+        cached = asyncio.run(scenario())
+
+        self.assertEqual(cached["property_ids"], ["prop-1"])
+        self.assertEqual(cached["subscription"].plan, "free")
+        self.assertIsInstance(cached["user"]["_id"], ObjectId)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_returned_context_is_a_copy(self):
+        cache = AuthContextCache(max_entries=10, ttl_seconds=60)
+        user_id = "000000000000000000000001"
+
+        async def scenario():
+            await cache.set(user_id, _context(user_id))
+            first = await cache.get(user_id)
+            first["property_ids"].append("prop-2")
+            return await cache.get(user_id)
+
+        self.assertEqual(asyncio.run(scenario())["property_ids"], ["prop-1"])
+
+    def test_invalidate_forces_reload(self):
+        cache = AuthContextCache(max_entries=10, ttl_seconds=60)
+        user_id = "000000000000000000000001"
+
+        async def scenario():
+            await cache.set(user_id, _context(user_id))
+            await cache.invalidate(ObjectId(user_id))
+            return await cache.get(user_id)
+
+        self.assertIsNone(asyncio.run(scenario()))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_expired_entries_are_misses(self):
+        cache = AuthContextCache(max_entries=10, ttl_seconds=0)
+        user_id = "000000000000000000000001"
+
+        async def scenario():
+            await cache.set(user_id, _context(user_id))
+            return await cache.get(user_id)
+
+        self.assertIsNone(asyncio.run(scenario()))
+
+    def test_lru_eviction_is_bounded(self):
+        cache = AuthContextCache(max_entries=2, ttl_seconds=60)
+        ids = [str(ObjectId()) for _ in range(3)]
+
+        async def scenario():
+            await cache.set(ids[0], _context(ids[0]))
+            await cache.set(ids[1], _context(ids[1]))
+            # Touch the first entry so the second becomes least recently used
+            await cache.get(ids[0])
+            await cache.set(ids[2], _context(ids[2]))
+            return [await cache.get(user_id) is not None for user_id in ids]
+
+        self.assertEqual(asyncio.run(scenario()), [True, False, True])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
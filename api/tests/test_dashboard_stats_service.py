@@ -0,0 +1,310 @@
+import asyncio
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services import dashboard_stats_service
+from app.services.dashboard_stats_service import DashboardStatsService
+
+
+_MISSING = object()
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$nin" in condition and value in condition["$nin"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _eval(expr, doc):
+    """The handful of aggregation expressions the stats pipelines use."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:], _MISSING)
+    if isinstance(expr, list):
+        return [_eval(e, doc) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if not next(iter(expr)).startswith("$"):
+        return {key: _eval(value, doc) for key, value in expr.items()}
+    (op, args), = expr.items()
+    if op == "$let":
+        scope = {f"${name}": _eval(value, doc) for name, value in args["vars"].items()}
+        return _eval(args["in"], {**doc, **scope})
+    if op == "$cond":
+        return _eval(args[1] if _eval(args[0], doc) else args[2], doc)
+    if op == "$type":
+        return "missing" if _eval(args, doc) is _MISSING else type(_eval(args, doc)).__name__
+    values = [None if v is _MISSING else v for v in _eval(args if isinstance(args, list) else [args], doc)]
+    if op == "$ifNull":
+        return values[1] if values[0] is None else values[0]
+    if op == "$eq":
+        return values[0] == values[1]
+    if op == "$toString":
+        return None if values[0] is None else str(values[0])
+    if op == "$replaceAll":
+        text = values[0]["input"]
+        return None if text is None else text.replace(values[0]["find"], values[0]["replacement"])
+    if op == "$trim":
+        return None if values[0]["input"] is None else values[0]["input"].strip()
+    if op == "$convert":
+        spec = values[0]
+        if spec["input"] is None:
+            return spec["onNull"]
+        try:
+            return float(spec["input"])
+        except ValueError:
+            return spec["onError"]
+    if op == "$multiply":
+        return values[0] * values[1]
+    if op == "$round":
+        return round(values[0], values[1])
+    if op == "$toLong":
+        return int(values[0])
+    if op == "$and":
+        return all(values)
+    if op == "$gt":
+        return values[0] > values[1]
+    if op == "$lt":
+        return values[0] < values[1]
+    if op == "$substrCP":
+        return values[0][values[1]:values[1] + values[2]]
+    raise NotImplementedError(op)
+
+
+def _aggregate(docs, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if _matches(d, spec)]
+        elif name == "$facet":
+            docs = [{key: _aggregate(docs, sub) for key, sub in spec.items()}]
+        elif name == "$group":
+            groups = {}
+            for doc in docs:
+                group_id = _eval(spec["_id"], doc)
+                key = repr(group_id)
+                row = groups.setdefault(key, {"_id": group_id, **{f: 0 for f in spec if f != "_id"}})
+                for field, accumulator in spec.items():
+                    if field != "_id":
+                        row[field] += _eval(accumulator["$sum"], doc)
+            docs = list(groups.values())
+        else:
+            raise NotImplementedError(name)
+    return docs
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return self._docs
+
+
+class _Collection:
+    """Just enough of a Motor collection for the stats service."""
+
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.aggregations = []
+
+    def find(self, query, _projection=None):
+        return _Cursor([d for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query):
+        for doc in self.docs:
+            if _matches(doc, query):
+                return doc
+        return None
+
+    def aggregate(self, pipeline):
+        self.aggregations.append(pipeline)
+        return _Cursor(_aggregate(self.docs, pipeline))
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            self.docs = [d for d in self.docs if d.get("_id") != op._filter["_id"]]
+            self.docs.append(dict(op._doc))
+
+    async def update_one(self, query, update, upsert=False):
+        doc = await self.find_one(query)
+        if doc is None:
+            doc = {"_id": query["_id"]}
+            self.docs.append(doc)
+        for field, value in update.get("$inc", {}).items():
+            if "." in field:
+                map_field, key = field.split(".", 1)
+                bucket = doc.setdefault(map_field, {})
+                bucket[key] = bucket.get(key, 0) + value
+            else:
+                doc[field] = doc.get(field, 0) + value
+        doc.update(update.get("$set", {}))
+
+
+def _fake_db(**collections):
+    db = {name: _Collection(collections.get(name)) for name in ["tenants", "beds", "payments", "staff", "properties"]}
+    db["dashboard_stats"] = _Collection()
+    return db
+
+
+class DashboardStatsServiceTests(unittest.TestCase):
+    def test_incremental_updates_match_rebuild(self):
+        fake_db = _fake_db()
+        tenant = {"propertyId": "prop-1", "tenantStatus": "active", "joinDate": "2026-03-05T10:00:00", "isDeleted": False}
+        due = {"propertyId": "prop-1", "status": "due", "amount": "₹12,000", "amountPaise": 1200000, "isDeleted": False}
+        bed = {"propertyId": "prop-1", "status": "available", "isDeleted": False}
+
+        async def scenario():
+            await DashboardStatsService.apply_change("tenants", None, tenant)
+            await DashboardStatsService.apply_change("beds", None, bed)
+            occupied = {**bed, "status": "occupied"}
+            await DashboardStatsService.apply_change("beds", bed, occupied)
+            await DashboardStatsService.apply_change("payments", None, due)
+            paid = {**due, "status": "paid", "paidDate": "2026-03-10"}
+            await DashboardStatsService.apply_change("payments", due, paid)
+            await DashboardStatsService.apply_change("staff", None, {"propertyId": "prop-1", "status": "on_leave", "archived": False})
+
+            # Source collections now hold the final state of every document
+            fake_db["tenants"].docs = [tenant]
+            fake_db["beds"].docs = [occupied]
+            fake_db["payments"].docs = [paid]
+            fake_db["staff"].docs = [{"propertyId": "prop-1", "status": "on_leave", "archived": False}]
+            return await DashboardStatsService.reconcile(["prop-1"])
+
+        with patch.object(dashboard_stats_service, "db", fake_db):
+            result = asyncio.run(scenario())
+
+        self.assertEqual(result["checked"], 1)
+        self.assertEqual(result["drifted"], 0, result["drift"])
+        stats = fake_db["dashboard_stats"].docs[0]
+        self.assertEqual(stats["activeTenants"], 1)
+        self.assertEqual(stats["occupiedBeds"], 1)
+        self.assertEqual(stats["pendingCount"], 0)
+        self.assertEqual(stats["revenuePaiseByMonth"], {"2026-03": 1200000})
+        self.assertEqual(stats["checkInsByDate"], {"2026-03-05": 1})
+        self.assertEqual((stats["totalStaff"], stats["availableStaff"]), (1, 0))
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        fake_db = _fake_db(beds=[{"propertyId": "prop-1", "status": "occupied"}])
+        fake_db["dashboard_stats"].docs = [{"_id": "prop-1", "totalBeds": 3, "occupiedBeds": 1}]
+
+        with patch.object(dashboard_stats_service, "db", fake_db):
+            result = asyncio.run(DashboardStatsService.reconcile(["prop-1"]))
+
+        self.assertEqual(result["drifted"], 1)
+        self.assertEqual(result["drift"]["prop-1"], {"totalBeds": {"stored": 3, "actual": 1}})
+        self.assertEqual(fake_db["dashboard_stats"].docs[0]["totalBeds"], 1)
+
+    def test_soft_deleted_and_archived_documents_do_not_count(self):
+        self.assertEqual(dashboard_stats_service.tenant_counters({"propertyId": "p", "archived": True}), {})
+        self.assertEqual(dashboard_stats_service.bed_counters({"propertyId": "p", "isDeleted": True}), {})
+        self.assertEqual(dashboard_stats_service.staff_counters({"propertyId": "p", "archived": True}), {})
+
+
+    def test_compute_matches_the_counter_functions(self):
+        tenants = [
+            {"propertyId": "p1", "tenantStatus": "active", "joinDate": "2026-03-05T10:00:00"},
+            {"propertyId": "p1", "tenantStatus": "", "joinDate": "2026-03-05"},
+            {"propertyId": "p1", "joinDate": None},
+            {"propertyId": "p1", "tenantStatus": "vacated", "joinDate": "2026-02-01"},
+            {"propertyId": "p1", "tenantStatus": "notice"},
+            {"propertyId": "p1", "tenantStatus": "active", "archived": True},
+            {"propertyId": "p2", "tenantStatus": "active", "isDeleted": True},
+            {"propertyId": "p2", "tenantStatus": "active", "joinDate": "2026-03-06"},
+        ]
+        beds = [
+            {"propertyId": "p1", "status": "occupied"},
+            {"propertyId": "p1", "status": "available"},
+            {"propertyId": "p2", "status": "occupied", "isDeleted": True},
+            {"propertyId": "p2", "status": "maintenance"},
+        ]
+        payments = [
+            {"propertyId": "p1", "status": "due", "amountPaise": 50000},
+            {"propertyId": "p1", "status": "due"},
+            # Written before amountPaise existed: counted from amount, junk as 0
+            {"propertyId": "p1", "status": "due", "amount": "₹1,250.50"},
+            {"propertyId": "p1", "status": "due", "amount": "NaN"},
+            {"propertyId": "p1", "status": "due", "amount": "1e400"},
+            {"propertyId": "p1", "status": "paid", "amount": " ₹ 8,000 ", "paidDate": "2026-03-11"},
+            {"propertyId": "p1", "status": "paid", "amount": 700, "paidDate": "2026-02-01"},
+            {"propertyId": "p1", "status": "paid", "amountPaise": 70000, "paidDate": "2026-03-10"},
+            {"propertyId": "p1", "status": "paid", "amountPaise": 30000, "paidDate": "2026-02-27"},
+            {"propertyId": "p1", "status": "paid", "amountPaise": 99999},
+            {"propertyId": "p2", "status": "due", "amountPaise": 10000, "isDeleted": True},
+            {"propertyId": "p2", "status": "paid", "amountPaise": 10000, "paidDate": "2026-03-01"},
+        ]
+        staff = [
+            {"propertyId": "p1"},
+            {"propertyId": "p1", "status": "on_leave"},
+            {"propertyId": "p1", "status": None},
+            {"propertyId": "p2", "status": "active", "archived": True},
+        ]
+        fake_db = _fake_db(tenants=tenants, beds=beds, payments=payments, staff=staff)
+
+        with patch.object(dashboard_stats_service, "db", fake_db):
+            computed = asyncio.run(DashboardStatsService.compute_many(["p1", "p2", "p3"]))
+
+        for property_id in ["p1", "p2", "p3"]:
+            totals = {}
+            for kind, docs in [("tenants", tenants), ("beds", beds), ("payments", payments), ("staff", staff)]:
+                for doc in docs:
+                    if doc["propertyId"] == property_id:
+                        for field, value in dashboard_stats_service.COUNTERS_BY_KIND[kind](doc).items():
+                            totals[field] = totals.get(field, 0) + value
+            expected = dashboard_stats_service._stats_document(property_id, totals)
+            self.assertEqual(computed[property_id], expected, property_id)
+
+    def test_compute_many_is_one_aggregation_per_collection(self):
+        fake_db = _fake_db(beds=[{"propertyId": f"p{i}", "status": "occupied"} for i in range(50)])
+
+        with patch.object(dashboard_stats_service, "db", fake_db):
+            computed = asyncio.run(DashboardStatsService.rebuild_many([f"p{i}" for i in range(50)]))
+
+        self.assertEqual(len(computed), 50)
+        for name in ["tenants", "beds", "payments", "staff"]:
+            self.assertEqual(len(fake_db[name].aggregations), 1, name)
+        self.assertEqual(len(fake_db["dashboard_stats"].docs), 50)
+
+    def test_rollup_across_properties(self):
+        fake_db = _fake_db(beds=[{"propertyId": "p2", "status": "occupied"}])
+        fake_db["dashboard_stats"].docs = [
+            {"_id": "p1", "totalBeds": 4, "occupiedBeds": 3, "pendingAmountPaise": 1000,
+             "revenuePaiseByMonth": {"2026-03": 500}, "checkInsByDate": {"2026-03-05": 1}},
+        ]
+
+        with patch.object(dashboard_stats_service, "db", fake_db):
+            stats_by_property = asyncio.run(DashboardStatsService.get_stats_many(["p1", "p2"]))
+
+        # p2 had no stats document yet and is built on the way
+        self.assertEqual(list(stats_by_property), ["p1", "p2"])
+        rollup = DashboardStatsService.rollup(stats_by_property.values())
+        self.assertEqual((rollup["totalBeds"], rollup["occupiedBeds"]), (5, 4))
+        self.assertEqual(rollup["pendingAmountPaise"], 1000)
+        self.assertEqual(rollup["revenuePaiseByMonth"], {"2026-03": 500})
+        self.assertEqual(rollup["checkInsByDate"], {"2026-03-05": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
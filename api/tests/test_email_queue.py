@@ -0,0 +1,224 @@
+import asyncio
+import json
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+
+from app.config import settings
+
+# auth_service imports helpers, which refuses to load without a strong JWT secret
+if not settings.JWT_SECRET:
+    settings.JWT_SECRET = "test-secret-key-that-is-at-least-32-chars"
+
+import app.services.auth_service as auth_service
+import app.utils.email_queue as email_queue_module
+import app.utils.email_service as email_service
+from app.utils.email_queue import EmailQueue
+
+
+class _DeadLetters:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+class _ZeptoStub:
+    """httpx transport standing in for the Zepto Mail API"""
+
+    def __init__(self, statuses=None, delay=0.0):
+        self.statuses = list(statuses or [])
+        self.delay = delay
+        self.requests = []
+        self.release = None
+
+    async def handler(self, request):
+        self.requests.append(json.loads(request.content))
+        if self.release is not None:
+            await self.release.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = self.statuses.pop(0) if self.statuses else 201
+        return httpx.Response(status, json={"message": "ok" if status < 400 else "error"})
+
+
+class EmailQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.dead_letters = _DeadLetters()
+        patches = [
+            patch.object(email_service, "ZEPTO_MAIL_API_KEY", "zepto-key"),
+            patch.object(email_service, "FROM_EMAIL", "noreply@example.com"),
+            patch.object(email_queue_module, "db", {email_queue_module.DEAD_LETTER_COLLECTION: self.dead_letters}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _run(self, stub, scenario):
+        async def wrapped():
+            email_service._client = httpx.AsyncClient(transport=httpx.MockTransport(stub.handler))
+            try:
+                return await scenario()
+            finally:
+                await email_service.close_email_client()
+        return asyncio.run(wrapped())
+
+    def _queue(self, **kwargs):
+        options = {"max_size": 100, "workers": 2, "max_attempts": 3, "backoff_seconds": 0.001}
+        options.update(kwargs)
+        return EmailQueue(**options)
+
+    def test_enqueue_returns_before_delivery(self):
+        stub = _ZeptoStub(delay=0.2)
+        queue = self._queue()
+
+        async def scenario():
+            start = time.perf_counter()
+            queued = await queue.enqueue("otp", "a@example.com", otp="123456")
+            enqueue_ms = (time.perf_counter() - start) * 1000
+            await queue.stop()
+            return queued, enqueue_ms
+
+        queued, enqueue_ms = self._run(stub, scenario)
+
+        self.assertTrue(queued)
+        self.assertLess(enqueue_ms, 50)
+        self.assertEqual(queue.stats()["sent"], 1)
+        self.assertGreaterEqual(queue.stats()["latencyMs"]["p50"], 200)
+        self.assertEqual(stub.requests[0]["to"][0]["email_address"]["address"], "a@example.com")
+
+    def test_emails_share_one_pooled_client(self):
+        stub = _ZeptoStub()
+        clients = []
+        original = email_service._get_client
+
+        def spy():
+            client = original()
+            clients.append(client)
+            return client
+
+        async def scenario():
+            await email_service.send_otp_email("a@example.com", "111111")
+            await email_service.send_welcome_email("b@example.com", "Bee Keeper")
+
+        with patch.object(email_service, "_get_client", spy):
+            self._run(stub, scenario)
+
+        self.assertEqual(len(stub.requests), 2)
+        self.assertIs(clients[0], clients[1])
+
+    def test_retryable_failures_are_retried(self):
+        stub = _ZeptoStub(statuses=[503, 429])
+        queue = self._queue()
+
+        async def scenario():
+            await queue.enqueue("welcome", "a@example.com", name="Ann Lee")
+            await queue.stop()
+
+        self._run(stub, scenario)
+
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual((queue.stats()["sent"], queue.stats()["retries"]), (1, 2))
+        self.assertEqual(self.dead_letters.docs, [])
+
+    def test_permanent_rejection_is_dead_lettered_without_the_otp(self):
+        stub = _ZeptoStub(statuses=[400])
+        queue = self._queue()
+
+        async def scenario():
+            await queue.enqueue("otp", "a@example.com", otp="654321", otp_type="password_reset")
+            await queue.stop()
+
+        self._run(stub, scenario)
+
+        self.assertEqual(len(stub.requests), 1)
+        letter = self.dead_letters.docs[0]
+        self.assertEqual((letter["reason"], letter["attempts"]), ("rejected", 1))
+        self.assertEqual(letter["params"], {"otp": "[redacted]", "otp_type": "password_reset"})
+        self.assertIn("HTTP 400", letter["error"])
+
+    def test_exhausted_retries_are_dead_lettered(self):
+        stub = _ZeptoStub(statuses=[500, 502, 503, 504])
+        queue = self._queue(max_attempts=3)
+
+        async def scenario():
+            await queue.enqueue("otp", "a@example.com", otp="000000")
+            await queue.stop()
+
+        self._run(stub, scenario)
+
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(self.dead_letters.docs[0]["reason"], "retries_exhausted")
+        self.assertEqual(queue.stats()["deadLettered"], 1)
+
+    def test_full_queue_rejects_instead_of_blocking(self):
+        stub = _ZeptoStub()
+        queue = self._queue(max_size=1, workers=1)
+
+        async def scenario():
+            stub.release = asyncio.Event()
+            first = await queue.enqueue("otp", "a@example.com", otp="1")
+            await asyncio.sleep(0.01)  # worker picks up the first email and blocks
+            second = await queue.enqueue("otp", "b@example.com", otp="2")
+            third = await queue.enqueue("otp", "c@example.com", otp="3")
+            stub.release.set()
+            await queue.stop()
+            return first, second, third
+
+        results = self._run(stub, scenario)
+
+        self.assertEqual(results, (True, True, False))
+        self.assertEqual(queue.stats()["rejected"], 1)
+        self.assertEqual(self.dead_letters.docs[0]["to"], "c@example.com")
+        self.assertEqual(self.dead_letters.docs[0]["reason"], "queue_full")
+        self.assertEqual(queue.stats()["sent"], 2)
+
+    def test_shutdown_dead_letters_undrained_emails(self):
+        stub = _ZeptoStub()
+        queue = self._queue(workers=1)
+
+        async def scenario():
+            stub.release = asyncio.Event()
+            for i in range(3):
+                await queue.enqueue("otp", f"{i}@example.com", otp=str(i))
+            await asyncio.sleep(0.01)
+            await queue.stop(drain_seconds=0.05)
+
+        self._run(stub, scenario)
+
+        self.assertEqual([d["reason"] for d in self.dead_letters.docs], ["shutdown"] * 3)
+        self.assertFalse(queue.stats()["running"])
+
+    def test_forgot_password_returns_without_waiting_for_delivery(self):
+        stub = _ZeptoStub(delay=0.3)
+        queue = self._queue()
+        user = {"_id": "u1", "email": "a@example.com"}
+
+        async def scenario():
+            start = time.perf_counter()
+            response = await auth_service.forgot_password_service("A@example.com ")
+            elapsed = time.perf_counter() - start
+            await queue.stop()
+            return response, elapsed
+
+        with patch.object(auth_service, "email_queue", queue), \
+                patch.object(auth_service, "get_resend_cooldown_remaining", AsyncMock(return_value=0)), \
+                patch.object(auth_service, "generate_and_store_otp", AsyncMock(return_value=("123456", True))), \
+                patch.object(auth_service.users_collection, "find_one", AsyncMock(return_value=user)):
+            response, elapsed = self._run(stub, scenario)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual(queue.stats()["sent"], 1)
+        self.assertIn("Password Reset", stub.requests[0]["subject"])
+
+
+if __name__ == '__main__':
+    unittest.main()
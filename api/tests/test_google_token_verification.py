@@ -0,0 +1,309 @@
+"""
+Google ID-token verification against a local stub of Google's certs endpoint.
+"""
+import asyncio
+import json
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import rsa
+from fastapi import HTTPException
+from google.auth import crypt, jwt as google_jwt
+
+from app.config import settings
+
+# auth_service imports helpers, which refuses to load without a strong JWT secret
+if not settings.JWT_SECRET:
+    settings.JWT_SECRET = "test-secret-key-that-is-at-least-32-chars"
+
+import app.services.auth_service as auth_service
+from app.utils.google_certs import GoogleCertCache, GoogleCertsUnavailable
+
+CLIENT_ID = "client-1.apps.googleusercontent.com"
+
+
+class _CertsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *_args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status = server.failures.pop(0) if server.failures else 200
+            body = json.dumps(server.certs).encode()
+        time.sleep(server.delay)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if server.cache_control:
+            self.send_header("Cache-Control", server.cache_control)
+        if server.age:
+            self.send_header("Age", str(server.age))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _StubGoogleCerts:
+    """Serves {kid: public key PEM} like https://www.googleapis.com/oauth2/v1/certs"""
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _CertsHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.failures = []
+        self.server.certs = {}
+        self.server.cache_control = "public, max-age=3600, must-revalidate, no-transform"
+        self.server.age = 0
+        self.server.delay = 0.0
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/oauth2/v1/certs"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _claims(**overrides):
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "ann@example.com",
+        "email_verified": True,
+        "name": "Ann Lee",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    claims.update(overrides)
+    return claims
+
+
+class GoogleCertCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.keys = {kid: rsa.newkeys(1024) for kid in ("key-1", "key-2")}
+
+    def setUp(self):
+        self.stub = _StubGoogleCerts()
+        self.addCleanup(self.stub.stop)
+        self.publish("key-1")
+
+    def publish(self, *kids):
+        self.stub.server.certs = {
+            kid: self.keys[kid][0].save_pkcs1().decode() for kid in kids
+        }
+
+    def token(self, kid="key-1", **claims):
+        signer = crypt.RSASigner.from_string(self.keys[kid][1].save_pkcs1().decode(), key_id=kid)
+        return google_jwt.encode(signer, _claims(**claims)).decode()
+
+    def _cache(self, **kwargs):
+        options = {"timeout_seconds": 2, "refresh_margin_seconds": 0, "min_refetch_seconds": 30}
+        options.update(kwargs)
+        return GoogleCertCache(self.stub.url, **options)
+
+    def _run(self, cache, scenario):
+        async def wrapped():
+            try:
+                return await scenario()
+            finally:
+                await cache.aclose()
+        return asyncio.run(wrapped())
+
+    def test_certs_are_fetched_once_and_reused(self):
+        cache = self._cache()
+
+        async def scenario():
+            return [await cache.verify_id_token(self.token(), CLIENT_ID) for _ in range(5)]
+
+        claims = self._run(cache, scenario)
+
+        self.assertEqual(claims[0]["email"], "ann@example.com")
+        self.assertEqual(self.stub.server.requests, 1)
+        self.assertEqual((cache.stats()["fetches"], cache.stats()["hits"]), (1, 4))
+
+    def test_lifetime_follows_max_age_minus_age(self):
+        self.stub.server.cache_control = "public, max-age=20000"
+        self.stub.server.age = 500
+        cache = self._cache()
+
+        self._run(cache, lambda: cache.get_certs())
+
+        self.assertAlmostEqual(cache.stats()["expiresInSeconds"], 19500, delta=2)
+
+    def test_expired_certs_are_refetched(self):
+        self.stub.server.cache_control = "max-age=1"
+        cache = self._cache()
+
+        async def scenario():
+            await cache.verify_id_token(self.token(), CLIENT_ID)
+            await asyncio.sleep(1.05)
+            await cache.verify_id_token(self.token(), CLIENT_ID)
+
+        self._run(cache, scenario)
+
+        self.assertEqual(self.stub.server.requests, 2)
+
+    def test_refresh_ahead_happens_in_the_background(self):
+        self.stub.server.cache_control = "max-age=60"
+        cache = self._cache(refresh_margin_seconds=120)
+
+        async def scenario():
+            await cache.get_certs()
+            self.stub.server.delay = 0.3
+            start = time.perf_counter()
+            await cache.verify_id_token(self.token(), CLIENT_ID)
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(0.5)
+            return elapsed
+
+        elapsed = self._run(cache, scenario)
+
+        # The caller was served from cache while the refresh ran behind it
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual(self.stub.server.requests, 2)
+        self.assertEqual(cache.stats()["backgroundRefreshes"], 1)
+
+    def test_concurrent_cold_callers_share_one_fetch(self):
+        self.stub.server.delay = 0.1
+        cache = self._cache()
+
+        async def scenario():
+            token = self.token()
+            return await asyncio.gather(*(cache.verify_id_token(token, CLIENT_ID) for _ in range(20)))
+
+        claims = self._run(cache, scenario)
+
+        self.assertEqual(len(claims), 20)
+        self.assertEqual(self.stub.server.requests, 1)
+
+    def test_rotated_key_triggers_one_refetch(self):
+        cache = self._cache(min_refetch_seconds=0)
+
+        async def scenario():
+            await cache.verify_id_token(self.token("key-1"), CLIENT_ID)
+            self.publish("key-1", "key-2")
+            return await cache.verify_id_token(self.token("key-2"), CLIENT_ID)
+
+        claims = self._run(cache, scenario)
+
+        self.assertEqual(claims["sub"], "1234567890")
+        self.assertEqual(self.stub.server.requests, 2)
+
+    def test_unknown_key_ids_do_not_hammer_google(self):
+        cache = self._cache(min_refetch_seconds=30)
+
+        async def scenario():
+            await cache.get_certs()
+            for _ in range(5):
+                with self.assertRaises(ValueError):
+                    await cache.verify_id_token(self.token("key-2"), CLIENT_ID)
+
+        self._run(cache, scenario)
+
+        self.assertEqual(self.stub.server.requests, 1)
+
+    def test_invalid_tokens_raise_value_error(self):
+        cache = self._cache()
+
+        async def scenario():
+            for token in (
+                self.token(aud="someone-else"),
+                self.token(exp=int(time.time()) - 600),
+                self.token()[:-4] + "AAAA",
+                "not-a-jwt",
+            ):
+                with self.assertRaises(ValueError):
+                    await cache.verify_id_token(token, [CLIENT_ID, "client-2"])
+
+        self._run(cache, scenario)
+
+    def test_stale_certs_are_used_when_google_is_down(self):
+        self.stub.server.cache_control = "max-age=0"
+        cache = self._cache(min_refetch_seconds=60)
+
+        async def scenario():
+            await cache.get_certs()
+            self.stub.server.failures = [503]
+            return await cache.verify_id_token(self.token(), CLIENT_ID)
+
+        claims = self._run(cache, scenario)
+
+        self.assertEqual(claims["email"], "ann@example.com")
+        self.assertEqual(cache.stats()["fetchErrors"], 1)
+
+    def test_no_certs_at_all_is_unavailable(self):
+        self.stub.server.failures = [500]
+        cache = self._cache()
+
+        with self.assertRaises(GoogleCertsUnavailable):
+            self._run(cache, lambda: cache.verify_id_token(self.token(), CLIENT_ID))
+
+
+class GoogleSignInVerificationTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = _StubGoogleCerts()
+        self.addCleanup(self.stub.stop)
+        self.keys = {"key-1": rsa.newkeys(1024)}
+        self.stub.server.certs = {"key-1": self.keys["key-1"][0].save_pkcs1().decode()}
+        self.cache = GoogleCertCache(self.stub.url, timeout_seconds=2)
+        patches = [
+            patch.object(auth_service, "google_cert_cache", self.cache),
+            patch.object(settings, "GOOGLE_CLIENT_IDS", f"{CLIENT_ID}, client-2"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _verify(self, token):
+        async def scenario():
+            try:
+                return await auth_service._verify_google_id_token(token)
+            finally:
+                await self.cache.aclose()
+        return asyncio.run(scenario())
+
+    def token(self, **claims):
+        signer = crypt.RSASigner.from_string(self.keys["key-1"][1].save_pkcs1().decode(), key_id="key-1")
+        return google_jwt.encode(signer, _claims(**claims)).decode()
+
+    def test_accepts_any_configured_client_id(self):
+        self.assertEqual(self._verify(self.token(aud="client-2"))["aud"], "client-2")
+
+    def test_rejections_map_to_http_errors(self):
+        cases = [
+            (self.token(aud="other"), 401, "Invalid Google token"),
+            (self.token(iss="https://evil.example.com"), 401, "Invalid Google token issuer"),
+            (self.token(email_verified=False), 401, "Google email is not verified"),
+            ("", 400, "Google idToken is required"),
+        ]
+        for token, status_code, detail in cases:
+            with self.assertRaises(HTTPException) as ctx:
+                self._verify(token)
+            self.assertEqual((ctx.exception.status_code, ctx.exception.detail), (status_code, detail))
+
+    def test_unreachable_google_is_503(self):
+        self.stub.server.failures = [502]
+        with self.assertRaises(HTTPException) as ctx:
+            self._verify(self.token())
+        self.assertEqual(ctx.exception.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
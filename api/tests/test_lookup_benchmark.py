@@ -0,0 +1,316 @@
+"""
+Shape checks for the typed-key $lookup pipelines, an in-memory run of them
+over documents written before the typed refs existed, plus a latency benchmark.
+
+The benchmark seeds a scratch database (50k tenants / 500k payments by
+default) and compares per-page latency of the previous `$toString` joins with
+the localField/foreignField joins. It needs a disposable MongoDB:
+
+    RUN_BENCHMARKS=1 BENCH_MONGO_URL=mongodb://localhost:27017 \
+        python -m pytest -q -s tests/test_lookup_benchmark.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+from app.services.payment_service import PaymentService
+from app.services.tenant_service import TenantService
+from app.utils.refs import BED_REFS, PAYMENT_REFS, TENANT_REFS, with_refs
+
+BENCH_DB = "bench_typed_lookups"
+
+
+def _string_id_lookup(from_collection, local_field, as_field, project, inner=None):
+    """Previous join style: compare $toString of both sides for every document."""
+    return {
+        "$lookup": {
+            "from": from_collection,
+            "let": {"ref": f"${local_field}"},
+            "as": as_field,
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": [{"$toString": "$_id"}, {"$toString": "$$ref"}]}}},
+                *(inner or []),
+                {"$project": project},
+            ],
+        }
+    }
+
+
+def _legacy_tenant_pipeline(query, skip, limit):
+    return [
+        {"$match": query},
+        _string_id_lookup("rooms", "roomId", "room_info", {"roomNumber": 1}),
+        _string_id_lookup("beds", "bedId", "bed_info", {"bedNumber": 1}),
+        {"$project": {
+            "name": 1, "createdAt": 1,
+            "roomNumber": {"$arrayElemAt": ["$room_info.roomNumber", 0]},
+            "bedNumber": {"$arrayElemAt": ["$bed_info.bedNumber", 0]},
+        }},
+        {"$sort": {"createdAt": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+    ]
+
+
+def _legacy_payment_pipeline(match_stage, skip, limit):
+    return [
+        {"$match": match_stage},
+        {"$sort": {"dueDate": -1, "createdAt": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        _string_id_lookup("tenants", "tenantId", "tenant", {"name": 1, "roomId": 1, "tenantStatus": 1}),
+        _string_id_lookup(
+            "beds", "bed", "bed_info", {"roomNumber": {"$arrayElemAt": ["$room_info.roomNumber", 0]}},
+            inner=[_string_id_lookup("rooms", "roomId", "room_info", {"roomNumber": 1})],
+        ),
+        {"$project": {"tenantName": {"$arrayElemAt": ["$tenant.name", 0]}, "roomNumber": {"$arrayElemAt": ["$bed_info.roomNumber", 0]}}},
+    ]
+
+
+def _lookups(pipeline):
+    return [stage["$lookup"] for stage in pipeline if "$lookup" in stage]
+
+
+def _path(doc, path):
+    """Field path as MongoDB resolves it: through arrays, collecting a list."""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [item.get(part) for item in value if isinstance(item, dict) and part in item]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def _eval(doc, expr):
+    """The subset of aggregation expressions the list pipelines use."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _path(doc, expr[1:])
+    if isinstance(expr, dict) and len(expr) == 1:
+        op, args = next(iter(expr.items()))
+        if op == "$ifNull":
+            first = _eval(doc, args[0])
+            return _eval(doc, args[1]) if first is None else first
+        if op == "$arrayElemAt":
+            array, index = _eval(doc, args[0]), args[1]
+            return array[index] if array and len(array) > index else None
+        if op == "$convert":
+            assert args["to"] == "objectId"
+            value = _eval(doc, args["input"])
+            if value is None:
+                return args["onNull"]
+            return ObjectId(value) if ObjectId.is_valid(value) else args["onError"]
+    return expr
+
+
+def _run_pipeline(pipeline, collection, db):
+    """Run a list pipeline over plain dicts; enough to check what its joins resolve."""
+    docs = [dict(doc) for doc in db[collection]]
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if all(doc.get(k) == v for k, v in spec.items() if not isinstance(v, dict))]
+        elif name == "$sort":
+            for key, direction in reversed(list(spec.items())):
+                docs.sort(key=lambda doc: str(doc.get(key)), reverse=direction < 0)
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$addFields":
+            docs = [{**doc, **{field: _eval(doc, expr) for field, expr in spec.items()}} for doc in docs]
+        elif name == "$lookup":
+            for doc in docs:
+                keys = _path(doc, spec["localField"])
+                keys = keys if isinstance(keys, list) else [keys]
+                doc[spec["as"]] = [dict(other) for other in db[spec["from"]] if other.get(spec["foreignField"]) in keys]
+        elif name == "$project":
+            docs = [
+                {field: doc.get(field) if expr == 1 else _eval(doc, expr) for field, expr in spec.items() if expr != 1 or field in doc}
+                for doc in docs
+            ]
+    return docs
+
+
+class TypedLookupPipelineTests(unittest.TestCase):
+    def test_tenant_pipeline_pages_before_index_joins(self):
+        pipeline = TenantService._build_list_pipeline({"propertyId": "p"}, -1, 100, 50)
+
+        self.assertNotIn("$toString", repr(pipeline))
+        self.assertEqual([list(stage)[0] for stage in pipeline[:4]], ["$match", "$sort", "$skip", "$limit"])
+        self.assertEqual(
+            {(l["localField"], l["foreignField"]) for l in _lookups(pipeline)},
+            {("roomRef", "_id"), ("bedRef", "_id")},
+        )
+
+    def test_payment_pipeline_uses_typed_refs(self):
+        pipeline = PaymentService.build_list_pipeline({"propertyId": "p"}, 0, 50)
+
+        self.assertNotIn("$toString", repr(pipeline))
+        self.assertEqual(
+            [l["localField"] for l in _lookups(pipeline)],
+            ["tenantRef", "bedRef", "bedRoomRef", "tenantRoomRef"],
+        )
+
+    def test_documents_without_refs_still_join(self):
+        # Written before the typed refs existed: only the string ids are set
+        room = {"_id": ObjectId(), "propertyId": "p", "roomNumber": "101"}
+        bed = {"_id": ObjectId(), "roomId": str(room["_id"]), "bedNumber": "2"}
+        tenant = {"_id": ObjectId(), "propertyId": "p", "roomId": str(room["_id"]), "bedId": str(bed["_id"]),
+                  "name": "Anita", "tenantStatus": "active", "createdAt": "2024-01-01"}
+        payment = {"_id": ObjectId(), "propertyId": "p", "tenantId": str(tenant["_id"]), "bed": str(bed["_id"]),
+                   "dueDate": "2024-02-01", "createdAt": "2024-01-01"}
+        db = {"rooms": [room], "beds": [bed], "tenants": [tenant], "payments": [payment]}
+
+        tenants = _run_pipeline(TenantService._build_list_pipeline({"propertyId": "p"}, -1, 0, 50), "tenants", db)
+        self.assertEqual([(t["name"], t["roomNumber"], t["bedNumber"]) for t in tenants], [("Anita", "101", "2")])
+
+        payments = _run_pipeline(PaymentService.build_list_pipeline({"propertyId": "p"}, 0, 50), "payments", db)
+        self.assertEqual([(p["tenantName"], p["tenantStatus"], p["roomNumber"]) for p in payments], [("Anita", "active", "101")])
+
+        # Without the bed, the room still resolves through the tenant; bad ids match nothing
+        db["beds"] = []
+        payments = _run_pipeline(PaymentService.build_list_pipeline({"propertyId": "p"}, 0, 50), "payments", db)
+        self.assertEqual(payments[0]["roomNumber"], "101")
+        payment["tenantId"] = "not-an-object-id"
+        payments = _run_pipeline(PaymentService.build_list_pipeline({"propertyId": "p"}, 0, 50), "payments", db)
+        self.assertEqual((payments[0]["tenantName"], payments[0]["roomNumber"]), (None, "N/A"))
+
+    def test_typed_refs_win_over_string_ids(self):
+        room, other_room = ({"_id": ObjectId(), "roomNumber": number} for number in ("101", "202"))
+        tenant = with_refs({"_id": ObjectId(), "propertyId": "p", "roomId": str(room["_id"]), "bedId": None,
+                            "name": "Ravi", "createdAt": "2024-01-01"}, TENANT_REFS)
+        tenant["roomId"] = str(other_room["_id"])  # when both are set, the ref decides
+        db = {"rooms": [room, other_room], "beds": [], "tenants": [tenant]}
+
+        tenants = _run_pipeline(TenantService._build_list_pipeline({"propertyId": "p"}, -1, 0, 50), "tenants", db)
+        self.assertEqual((tenants[0]["roomNumber"], tenants[0].get("bedNumber")), ("101", None))
+
+    def test_with_refs_tracks_source_fields(self):
+        room_id, bed_id = ObjectId(), ObjectId()
+        doc = with_refs({"roomId": str(room_id), "bedId": str(bed_id), "name": "A"}, TENANT_REFS)
+        self.assertEqual((doc["roomRef"], doc["bedRef"]), (room_id, bed_id))
+
+        cleared = with_refs({"roomId": None, "bedId": None}, TENANT_REFS)
+        self.assertEqual((cleared["roomRef"], cleared["bedRef"]), (None, None))
+
+        # Fields not being written are left alone; non-ObjectId legacy ids map to None
+        partial = with_refs({"tenantId": "not-an-object-id"}, PAYMENT_REFS)
+        self.assertEqual(partial, {"tenantId": "not-an-object-id", "tenantRef": None})
+
+
+@unittest.skipUnless(
+    os.getenv("RUN_BENCHMARKS") and os.getenv("BENCH_MONGO_URL"),
+    "set RUN_BENCHMARKS=1 and BENCH_MONGO_URL to a disposable MongoDB to run benchmarks",
+)
+class TypedLookupBenchmark(unittest.TestCase):
+    tenants = int(os.getenv("LOOKUP_BENCH_TENANTS", 50_000))
+    payments = int(os.getenv("LOOKUP_BENCH_PAYMENTS", 500_000))
+    properties = 50
+    beds_per_room = 4
+    page_size = 50
+    samples = 5
+
+    async def _seed(self, db):
+        await db.client.drop_database(BENCH_DB)
+        rng = random.Random(7)
+        property_ids = [str(ObjectId()) for _ in range(self.properties)]
+
+        rooms, beds = [], []
+        for i in range(self.tenants // self.beds_per_room + 1):
+            room = {"_id": ObjectId(), "propertyId": property_ids[i % self.properties], "roomNumber": str(100 + i)}
+            rooms.append(room)
+            for b in range(self.beds_per_room):
+                beds.append(with_refs({"_id": ObjectId(), "roomId": str(room["_id"]), "bedNumber": str(b + 1)}, BED_REFS))
+        await db["rooms"].insert_many(rooms, ordered=False)
+        await db["beds"].insert_many(beds, ordered=False)
+
+        tenants = []
+        for i in range(self.tenants):
+            bed = beds[i]
+            tenants.append(with_refs({
+                "_id": ObjectId(),
+                "propertyId": property_ids[i % self.properties],
+                "roomId": bed["roomId"],
+                "bedId": str(bed["_id"]),
+                "name": f"Tenant {i}",
+                "createdAt": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00",
+                "isDeleted": False,
+            }, TENANT_REFS))
+        await db["tenants"].insert_many(tenants, ordered=False)
+
+        chunk = []
+        for i in range(self.payments):
+            tenant = tenants[rng.randrange(self.tenants)]
+            chunk.append(with_refs({
+                "tenantId": str(tenant["_id"]),
+                "propertyId": tenant["propertyId"],
+                "bed": tenant["bedId"],
+                "amount": "₹10,000",
+                "status": "due",
+                "dueDate": f"20{20 + i % 6}-{1 + i % 12:02d}-05",
+                "createdAt": i,
+                "isDeleted": False,
+            }, PAYMENT_REFS))
+            if len(chunk) == 10_000:
+                await db["payments"].insert_many(chunk, ordered=False)
+                chunk = []
+        if chunk:
+            await db["payments"].insert_many(chunk, ordered=False)
+
+        await db["tenants"].create_index([("propertyId", 1), ("createdAt", -1)])
+        await db["payments"].create_index([("propertyId", 1), ("dueDate", -1), ("createdAt", -1)])
+        return property_ids
+
+    async def _page_ms(self, collection, pipeline):
+        timings = []
+        for _ in range(self.samples):
+            start = time.perf_counter()
+            await collection.aggregate(pipeline).to_list(length=None)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def test_benchmark_page_latency(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        async def run():
+            client = AsyncIOMotorClient(os.environ["BENCH_MONGO_URL"])
+            db = client[BENCH_DB]
+            try:
+                property_ids = await self._seed(db)
+                query = {"propertyId": property_ids[0], "isDeleted": {"$ne": True}}
+                results = {}
+                for label, skip in [("first page", 0), ("page 10", 9 * self.page_size)]:
+                    results[f"tenants {label}"] = (
+                        await self._page_ms(db["tenants"], _legacy_tenant_pipeline(query, skip, self.page_size)),
+                        await self._page_ms(db["tenants"], TenantService._build_list_pipeline(query, -1, skip, self.page_size)),
+                    )
+                    results[f"payments {label}"] = (
+                        await self._page_ms(db["payments"], _legacy_payment_pipeline(query, skip, self.page_size)),
+                        await self._page_ms(db["payments"], PaymentService.build_list_pipeline(query, skip, self.page_size)),
+                    )
+                return results
+            finally:
+                await client.drop_database(BENCH_DB)
+                client.close()
+
+        results = asyncio.run(run())
+        print(f"\n[bench] {self.tenants:,} tenants / {self.payments:,} payments, page size {self.page_size}")
+        for name, (legacy_ms, typed_ms) in results.items():
+            print(f"[bench] {name}: $toString={legacy_ms:,.1f}ms typed={typed_ms:,.1f}ms ({legacy_ms / max(typed_ms, 0.001):.1f}x)")
+        self.assertTrue(results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Behaviour checks and a throughput benchmark for the pure ASGI middleware stack.
+
+The benchmark compares the current TimingMiddleware/UserContextMiddleware with
+BaseHTTPMiddleware equivalents of the previous implementation, against a mocked DB.
+Run it with:
+
+    RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_middleware_benchmark.py
+"""
+import asyncio
+import os
+import time
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI, Request
+from jose import jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+from app.middleware import user_context
+from app.middleware.timing_middleware import TimingMiddleware
+from app.middleware.user_context import UserContextMiddleware
+
+TEST_SECRET = "benchmark-secret-key-that-is-at-least-32-chars"
+USER_ID = "000000000000000000000001"
+
+
+class _LegacyTimingMiddleware(BaseHTTPMiddleware):
+    """Previous BaseHTTPMiddleware implementation, kept for comparison."""
+
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = f"{time.time() - start_time:.4f}"
+        return response
+
+
+class _LegacyUserContextMiddleware(BaseHTTPMiddleware):
+    """BaseHTTPMiddleware wrapper around the same authentication logic."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.context = UserContextMiddleware(app)
+
+    async def dispatch(self, request, call_next):
+        if self.context.is_public(request.url.path):
+            return await call_next(request)
+        error_response = await self.context.authenticate(request)
+        if error_response is not None:
+            return error_response
+        return await call_next(request)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    async def to_list(self, length=None):
+        return self._docs
+
+
+class _Collection:
+    def __init__(self, find_one_result=None, find_result=None):
+        self._find_one_result = find_one_result
+        self._find_result = find_result or []
+
+    async def find_one(self, *_args, **_kwargs):
+        return self._find_one_result
+
+    def find(self, *_args, **_kwargs):
+        return _Cursor(self._find_result)
+
+
+class _NoCache:
+    async def get(self, _user_id):
+        return None
+
+    async def set(self, _user_id, _context):
+        return None
+
+
+def _build_app(timing_cls, context_cls):
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping(request: Request):
+        return {
+            "userId": request.state.user_id,
+            "role": request.state.role,
+            "propertyIds": request.state.property_ids,
+            "plan": request.state.subscription.plan,
+        }
+
+    @app.get("/api/v1/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(timing_cls)
+    app.add_middleware(context_cls)
+    return app
+
+
+class MiddlewareStackTests(unittest.TestCase):
+    def setUp(self):
+        fake_db = {
+            "users": _Collection(find_one_result={
+                "_id": ObjectId(USER_ID),
+                "email": "owner@example.com",
+                "role": "propertyowner",
+                "password": "hashed",
+            }),
+            "properties": _Collection(find_result=[{"_id": ObjectId()}, {"_id": ObjectId()}]),
+        }
+        subscription = SimpleNamespace(plan="pro")
+        self._patches = [
+            patch.object(settings, "JWT_SECRET", TEST_SECRET),
+            patch.object(user_context, "db", fake_db),
+            patch.object(user_context, "auth_context_cache", _NoCache()),
+            patch(
+                "app.services.subscription_service.SubscriptionService.get_subscription",
+                AsyncMock(return_value=subscription),
+            ),
+        ]
+        for p in self._patches:
+            p.start()
+        self.token = jwt.encode({"sub": USER_ID}, TEST_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+
+    async def _get(self, app, path, headers=None):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers or {})
+
+    def test_state_and_timing_header_match_legacy_stack(self):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        new = asyncio.run(self._get(_build_app(TimingMiddleware, UserContextMiddleware), "/api/v1/ping", headers))
+        legacy = asyncio.run(self._get(_build_app(_LegacyTimingMiddleware, _LegacyUserContextMiddleware), "/api/v1/ping", headers))
+
+        self.assertEqual(new.status_code, 200)
+        self.assertEqual(new.json(), legacy.json())
+        self.assertEqual(new.json()["userId"], USER_ID)
+        self.assertEqual(len(new.json()["propertyIds"]), 2)
+        self.assertIn("x-process-time", new.headers)
+
+    def test_missing_token_is_rejected(self):
+        response = asyncio.run(self._get(_build_app(TimingMiddleware, UserContextMiddleware), "/api/v1/ping"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_public_path_skips_authentication(self):
+        response = asyncio.run(self._get(_build_app(TimingMiddleware, UserContextMiddleware), "/api/v1/health"))
+        self.assertEqual(response.status_code, 200)
+
+    @unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+    def test_benchmark_requests_per_second(self):
+        total_requests = int(os.getenv("MIDDLEWARE_BENCH_REQUESTS", 2000))
+        concurrency = 50
+        headers = {"Authorization": f"Bearer {self.token}"}
+
+        async def measure(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def one():
+                    async with semaphore:
+                        response = await client.get("/api/v1/ping", headers=headers)
+                        assert response.status_code == 200
+
+                # Warm up
+                await asyncio.gather(*(one() for _ in range(100)))
+                start = time.perf_counter()
+                await asyncio.gather(*(one() for _ in range(total_requests)))
+                return total_requests / (time.perf_counter() - start)
+
+        legacy_rps = asyncio.run(measure(_build_app(_LegacyTimingMiddleware, _LegacyUserContextMiddleware)))
+        asgi_rps = asyncio.run(measure(_build_app(TimingMiddleware, UserContextMiddleware)))
+
+        print(
+            f"\n[bench] middleware stack: BaseHTTPMiddleware={legacy_rps:,.0f} req/s, "
+            f"pure ASGI={asgi_rps:,.0f} req/s ({asgi_rps / legacy_rps:.2f}x)"
+        )
+        self.assertGreater(asgi_rps, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pydantic import ValidationError
+
+from app.models.payment_schema import PaymentCreate, PaymentUpdate
+from app.models.tenant_schema import TenantCreate, TenantUpdate
+from app.utils.money import format_rupees, paise_to_rupees, payment_paise, to_paise
+
+
+class MoneyTests(unittest.TestCase):
+    def test_display_strings_convert_to_paise(self):
+        self.assertEqual(to_paise("₹12,000"), 1200000)
+        self.assertEqual(to_paise("5000.50"), 500050)
+        self.assertEqual(to_paise(" ₹ 1,00,000 "), 10000000)
+        self.assertEqual(to_paise(750), 75000)
+
+    def test_invalid_amounts_are_zero(self):
+        for value in [None, "", "₹", "abc"]:
+            self.assertEqual(to_paise(value), 0)
+
+    def test_non_finite_and_overflowing_amounts_raise_value_error(self):
+        for value in ["NaN", "nan", "Infinity", "-inf", "1e400", "₹1e30", float("nan"), float("inf")]:
+            with self.assertRaises(ValueError, msg=value):
+                to_paise(value)
+
+    def test_models_reject_unusable_amounts(self):
+        payment = {"tenantId": "t1", "propertyId": "p1", "bed": "", "status": "due"}
+        with self.assertRaises(ValidationError):
+            PaymentCreate(**payment, amount="NaN")
+        with self.assertRaises(ValidationError):
+            PaymentUpdate(amount="1e400")
+        self.assertEqual(PaymentCreate(**payment, amount="₹8,000").amount, "₹8,000")
+        with self.assertRaises(ValidationError):
+            TenantCreate(name="A", rent="Infinity")
+        with self.assertRaises(ValidationError):
+            TenantUpdate(rent="NaN")
+
+    def test_payments_without_amount_paise_fall_back_to_amount(self):
+        self.assertEqual(payment_paise({"amount": "₹9,999", "amountPaise": 50}), 50)
+        self.assertEqual(payment_paise({"amount": "₹12,000"}), 1200000)
+        self.assertEqual(payment_paise({"amount": "₹12,000", "amountPaise": None}), 1200000)
+        for value in [None, "abc", "NaN", "1e400"]:
+            self.assertEqual(payment_paise({"amount": value}), 0, value)
+
+    def test_round_trip_formatting(self):
+        self.assertEqual(format_rupees(to_paise("₹12,000")), "₹12,000")
+        self.assertEqual(paise_to_rupees(1200000), 12000)
+        self.assertEqual(paise_to_rupees(50), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
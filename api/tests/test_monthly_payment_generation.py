@@ -0,0 +1,158 @@
+import asyncio
+import unittest
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from dateutil.relativedelta import relativedelta
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+
+from app.services import tenant_service as tenant_service_module
+from app.services.tenant_service import TenantService
+from app.utils.scheduler_lock import PARTITION_HASH_FIELD, partition_for, partition_hash
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self._docs:
+                yield doc
+        return gen()
+
+
+class _Tenants:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, _projection=None):
+        self.queries.append(query)
+        partition = query.get(PARTITION_HASH_FIELD)
+        if partition:
+            divisor, remainder = partition["$mod"]
+            return _Cursor([d for d in self.docs if d[PARTITION_HASH_FIELD] % divisor == remainder])
+        return _Cursor(self.docs)
+
+
+class _Payments:
+    def __init__(self, latest_rows, duplicate_due_dates=()):
+        self.latest_rows = latest_rows
+        self.duplicate_due_dates = set(duplicate_due_dates)
+        self.aggregate_calls = 0
+        self.insert_calls = []
+
+    def aggregate(self, _pipeline):
+        self.aggregate_calls += 1
+        return _Cursor(self.latest_rows)
+
+    async def insert_many(self, docs, ordered=True):
+        self.insert_calls.append((len(docs), ordered))
+        errors = [
+            {"index": i, "code": 11000, "errmsg": "duplicate key"}
+            for i, doc in enumerate(docs)
+            if (doc["tenantId"], doc["dueDate"]) in self.duplicate_due_dates
+        ]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+def _tenant(tenant_id, join_date, anchor_day=5, checkout_date=None):
+    return {
+        "_id": tenant_id,
+        "propertyId": "prop-1",
+        "bedId": "bed-1",
+        "rent": "₹10,000",
+        "joinDate": join_date,
+        "checkoutDate": checkout_date,
+        "billingConfig": {"status": "due", "billingCycle": "monthly", "anchorDay": anchor_day, "method": "Cash"},
+        PARTITION_HASH_FIELD: partition_hash(tenant_id),
+    }
+
+
+class MonthlyPaymentGenerationTests(unittest.TestCase):
+    def test_plan_catches_up_from_latest_due_date(self):
+        due_dates = TenantService._plan_missing_due_dates(
+            _tenant("t1", "2025-12-01"), latest_due_date="2026-01-05", today=date(2026, 4, 10)
+        )
+        self.assertEqual(due_dates, [date(2026, 2, 5), date(2026, 3, 5), date(2026, 4, 5)])
+
+    def test_plan_stops_at_checkout_and_before_future_anchor(self):
+        tenant = _tenant("t1", "2026-01-20", checkout_date="2026-03-01")
+        self.assertEqual(
+            TenantService._plan_missing_due_dates(tenant, latest_due_date=None, today=date(2026, 4, 3)),
+            [date(2026, 2, 5)],
+        )
+        self.assertEqual(
+            TenantService._plan_missing_due_dates(_tenant("t2", "2026-04-01"), latest_due_date=None, today=date(2026, 4, 3)),
+            [],
+        )
+
+    def test_batched_generation_uses_one_prefetch_per_batch_and_chunked_inserts(self):
+        today = datetime.now(timezone.utc).date()
+        tenants = [_tenant(f"t{i}", "2000-01-01") for i in range(3)]
+        # t0 is up to date; t1 and t2 are two months behind
+        latest = today + relativedelta(months=-2, day=5)
+        rows = [
+            {"_id": "t0", "latestDueDate": today.isoformat()},
+            {"_id": "t1", "latestDueDate": latest.isoformat()},
+            {"_id": "t2", "latestDueDate": latest.isoformat()},
+        ]
+        service = TenantService()
+        service.collection = _Tenants(tenants)
+        planned = TenantService._plan_missing_due_dates(tenants[1], latest.isoformat(), today)
+        payments = _Payments(rows, duplicate_due_dates={("t2", planned[0].isoformat())})
+
+        with patch.object(tenant_service_module, "getCollection", lambda _name: payments), \
+                patch.object(settings, "PAYMENT_GENERATION_BATCH_SIZE", 2), \
+                patch.object(tenant_service_module.DashboardStatsService, "apply_changes", AsyncMock()):
+            result = asyncio.run(service.generate_monthly_payments())
+
+        expected = 2 * len(planned)
+        # Three tenants read in batches of two
+        self.assertEqual(payments.aggregate_calls, 2)
+        self.assertEqual(sum(n for n, _ in payments.insert_calls), expected)
+        self.assertTrue(all(n <= 2 and ordered is False for n, ordered in payments.insert_calls))
+        self.assertEqual(result["created"], expected - 1)
+        # t0 up to date + one duplicate insert
+        self.assertEqual(result["skipped"], 2)
+        self.assertEqual(result["tenants"], 3)
+        self.assertIn("inserts_per_sec", result)
+        self.assertIn("tenants_per_sec", result)
+
+    def test_partitions_are_selected_in_the_query(self):
+        tenants = [_tenant(f"t{i}", "2000-01-01") for i in range(20)]
+        service = TenantService()
+        service.collection = _Tenants(tenants)
+        payments = _Payments([])
+
+        async def run_all():
+            results = [await service.generate_monthly_payments(partition=p, partitions=3) for p in range(3)]
+            await service.generate_monthly_payments()
+            return results
+
+        with patch.object(tenant_service_module, "getCollection", lambda _name: payments), \
+                patch.object(tenant_service_module.DashboardStatsService, "apply_changes", AsyncMock()):
+            results = asyncio.run(run_all())
+
+        for partition, result in enumerate(results):
+            self.assertEqual(service.collection.queries[partition][PARTITION_HASH_FIELD], {"$mod": [3, partition]})
+            self.assertEqual(result["tenants"], sum(1 for t in tenants if partition_for(t["_id"], 3) == partition))
+        self.assertEqual(sum(result["tenants"] for result in results), len(tenants))
+        self.assertNotIn(PARTITION_HASH_FIELD, service.collection.queries[-1])
+
+if __name__ == '__main__':
+    unittest.main()
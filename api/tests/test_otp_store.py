@@ -0,0 +1,232 @@
+import asyncio
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+import app.utils.otp_store as otp_store
+from app.utils.cache_service import RedisCache
+from app.utils.otp_store import InMemoryOTPBackend, RedisOTPBackend
+
+
+class _OTPStoreBehaviour:
+    """Behaviour both backends must share; subclasses provide make_backend()"""
+
+    def setUp(self):
+        self.backend = self.make_backend()
+        p = patch.object(otp_store, "otp_backend", self.backend)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def run_async(self, coro):
+        async def wrapped():
+            try:
+                return await coro
+            finally:
+                await self.backend.stop()
+        return asyncio.run(wrapped())
+
+    def test_generate_then_verify(self):
+        async def scenario():
+            otp, is_new = await otp_store.generate_and_store_otp(" Ann@Example.com ")
+            return otp, is_new, await otp_store.verify_otp("ann@example.com", otp)
+
+        otp, is_new, result = self.run_async(scenario())
+
+        self.assertTrue(is_new)
+        self.assertEqual(len(otp), 6)
+        self.assertEqual(result, (True, None))
+
+    def test_resend_within_cooldown_returns_same_otp(self):
+        async def scenario():
+            first = await otp_store.generate_and_store_otp("a@example.com")
+            second = await otp_store.generate_and_store_otp("a@example.com")
+            other_flow = await otp_store.generate_and_store_otp("a@example.com", "password_reset")
+            return first, second, other_flow, await otp_store.get_resend_cooldown_remaining("a@example.com")
+
+        first, second, other_flow, cooldown = self.run_async(scenario())
+
+        self.assertEqual(second, (first[0], False))
+        self.assertTrue(other_flow[1])
+        self.assertTrue(40 <= cooldown <= 45)
+
+    def test_wrong_flow_and_missing_otp(self):
+        async def scenario():
+            otp, _ = await otp_store.generate_and_store_otp("a@example.com", "password_reset")
+            return (
+                await otp_store.verify_otp("a@example.com", otp, otp_type="registration"),
+                await otp_store.verify_otp("nobody@example.com", "123456"),
+            )
+
+        wrong_flow, missing = self.run_async(scenario())
+
+        self.assertEqual(wrong_flow, (False, "Invalid OTP for this action. Please request a new OTP"))
+        self.assertEqual(missing, (False, "OTP not found. Please request a new OTP"))
+
+    def test_attempts_are_limited(self):
+        async def scenario():
+            otp, _ = await otp_store.generate_and_store_otp("a@example.com")
+            wrong = "000000" if otp != "000000" else "111111"
+            results = [await otp_store.verify_otp("a@example.com", wrong) for _ in range(5)]
+            results.append(await otp_store.verify_otp("a@example.com", otp))
+            return results
+
+        results = self.run_async(scenario())
+
+        self.assertEqual(results[0], (False, "Invalid OTP. 4 attempt(s) remaining"))
+        self.assertEqual(results[4], (False, "Too many failed attempts. Please request a new OTP after 10 minutes"))
+        self.assertEqual(results[5], (False, "Too many failed attempts. Please try again in 10 minutes"))
+
+    def test_concurrent_sends_issue_one_otp(self):
+        async def scenario():
+            return await asyncio.gather(*(otp_store.generate_and_store_otp("a@example.com") for _ in range(25)))
+
+        results = self.run_async(scenario())
+
+        self.assertEqual(sum(is_new for _, is_new in results), 1)
+        self.assertEqual(len({otp for otp, _ in results}), 1)
+
+    def test_concurrent_wrong_guesses_are_all_counted(self):
+        async def scenario():
+            otp, _ = await otp_store.generate_and_store_otp("a@example.com")
+            wrong = "000000" if otp != "000000" else "111111"
+            results = await asyncio.gather(*(otp_store.verify_otp("a@example.com", wrong) for _ in range(30)))
+            record = await otp_store.get_otp("a@example.com")
+            return results, record, await otp_store.verify_otp("a@example.com", otp)
+
+        results, record, final = self.run_async(scenario())
+
+        self.assertFalse(any(ok for ok, _ in results))
+        self.assertEqual(record["attempt_count"], 30)
+        self.assertIn("locked_until", record)
+        self.assertFalse(final[0])
+
+    def test_mark_verified_and_delete(self):
+        async def scenario():
+            await otp_store.generate_and_store_otp("a@example.com")
+            marked = await otp_store.mark_otp_verified("a@example.com")
+            verified = (await otp_store.get_otp("a@example.com"))["verified"]
+            deleted = await otp_store.delete_otp("a@example.com")
+            return marked, verified, deleted, await otp_store.mark_otp_verified("a@example.com"), await otp_store.get_otp("a@example.com")
+
+        self.assertEqual(self.run_async(scenario()), (True, True, True, False, None))
+
+
+class InMemoryOTPBackendTests(_OTPStoreBehaviour, unittest.TestCase):
+    def make_backend(self):
+        return InMemoryOTPBackend(slot_seconds=0.05, slots=16)
+
+    def test_sweeper_evicts_expired_otps_without_reads(self):
+        async def scenario():
+            for i in range(200):
+                await otp_store.generate_and_store_otp(f"spam{i}@example.com")
+            before = self.backend.stats()["entries"]
+            await asyncio.sleep(0.35)
+            return before, self.backend.stats()
+
+        with patch.object(otp_store, "OTP_TTL_SECONDS", 0.15):
+            before, stats = self.run_async(scenario())
+
+        self.assertEqual(before, 200)
+        self.assertEqual((stats["entries"], stats["swept"]), (0, 200))
+
+    def test_wheel_handles_ttls_longer_than_one_revolution(self):
+        backend = InMemoryOTPBackend(slot_seconds=1, slots=8)
+        now = time.time()
+        backend._records["a"] = {"expires_at": now + 20}
+        backend._schedule("a", now + 20)
+        backend._last_tick = backend._tick(now)
+
+        self.assertEqual(backend.sweep(now + 10), 0)
+        self.assertIn("a", backend._records)
+        self.assertEqual(backend.sweep(now + 21), 1)
+        self.assertNotIn("a", backend._records)
+
+    def test_reissued_otp_is_not_swept_with_its_old_slot(self):
+        backend = InMemoryOTPBackend(slot_seconds=1, slots=64)
+        now = time.time()
+        backend._last_tick = backend._tick(now)
+        backend._records["a"] = {"expires_at": now + 5}
+        backend._schedule("a", now + 5)
+        backend._records["a"] = {"expires_at": now + 30}
+        backend._schedule("a", now + 30)
+
+        self.assertEqual(backend.sweep(now + 6), 0)
+        self.assertEqual(backend.sweep(now + 31), 1)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class RedisOTPBackendTests(_OTPStoreBehaviour, unittest.TestCase):
+    def make_backend(self):
+        self.server = fakeredis.FakeServer()
+        p = patch.object(RedisCache, "_client", fakeredis.aioredis.FakeRedis(server=self.server, decode_responses=True))
+        p.start()
+        self.addCleanup(p.stop)
+        return RedisOTPBackend()
+
+    def test_keys_carry_the_otp_ttl(self):
+        async def scenario():
+            await otp_store.generate_and_store_otp("a@example.com")
+            await otp_store.mark_otp_verified("a@example.com")
+            client = await RedisCache.get_client()
+            return await client.ttl("otp:a@example.com")
+
+        ttl = self.run_async(scenario())
+
+        self.assertTrue(295 <= ttl <= 300)
+
+    def test_expired_key_is_not_recreated(self):
+        async def scenario():
+            verified = await otp_store.mark_otp_verified("gone@example.com")
+            client = await RedisCache.get_client()
+            return verified, await client.exists("otp:gone@example.com")
+
+        self.assertEqual(self.run_async(scenario()), (False, 0))
+
+    def test_workers_share_otps(self):
+        # A second backend on the same Redis stands in for another gunicorn worker
+        other_worker = RedisOTPBackend()
+
+        async def scenario():
+            otp, _ = await otp_store.generate_and_store_otp("a@example.com")
+            return await other_worker.verify("a@example.com", otp, "registration")
+
+        self.assertEqual(self.run_async(scenario()), (True, None))
+
+    def test_interleaved_write_from_another_worker_is_retried(self):
+        other_worker = fakeredis.FakeRedis(server=self.server, decode_responses=True)
+        decode = RedisOTPBackend._decode
+        interleaved = []
+
+        def decode_then_interfere(raw):
+            record = decode(raw)
+            if record and not interleaved:
+                # Another worker counts a wrong guess between our WATCH and MULTI
+                interleaved.append(other_worker.hincrby("otp:a@example.com", "attempt_count", 1))
+            return record
+
+        async def scenario():
+            otp, _ = await otp_store.generate_and_store_otp("a@example.com")
+            wrong = "000000" if otp != "000000" else "111111"
+            with patch.object(RedisOTPBackend, "_decode", staticmethod(decode_then_interfere)):
+                result = await otp_store.verify_otp("a@example.com", wrong)
+            return result, await otp_store.get_otp("a@example.com")
+
+        result, record = self.run_async(scenario())
+
+        self.assertEqual(result, (False, "Invalid OTP. 3 attempt(s) remaining"))
+        self.assertEqual(record["attempt_count"], 2)
+        self.assertEqual(self.backend.conflicts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import asyncio
+import random
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+from app.utils.pagination import (
+    CountCache,
+    apply_cursor,
+    decode_cursor,
+    encode_cursor,
+    page_result,
+    wants_total,
+)
+
+
+def _matches(doc, query):
+    """Evaluate the subset of query operators the keyset filters use"""
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            for op, operand in cond.items():
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+def _sort_key(doc, sort):
+    # Mongo sorts null lowest
+    return tuple(
+        (doc.get(field) is not None, doc.get(field)) if direction > 0 else _Desc((doc.get(field) is not None, doc.get(field)))
+        for field, direction in sort
+    )
+
+
+class _Desc:
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _walk(docs, sort, limit):
+    """Page through docs with cursors the way the list endpoints do"""
+    ordered = sorted(docs, key=lambda d: _sort_key(d, sort))
+    pages, cursor = [], None
+    while True:
+        query = apply_cursor({}, sort, cursor)
+        page = [d for d in ordered if _matches(d, query)][: limit + 1]
+        page, cursor = page_result(page, limit, sort)
+        pages.append(page)
+        if cursor is None:
+            return ordered, pages
+
+
+class KeysetPaginationTests(unittest.TestCase):
+    def _docs(self):
+        rng = random.Random(3)
+        docs = []
+        for _ in range(57):
+            docs.append({
+                "_id": ObjectId(),
+                # Heavy ties plus missing values exercise the tiebreaker and null branches
+                "dueDate": rng.choice(["2025-01-05", "2025-02-05", "2025-03-05", None]),
+                "createdAt": rng.choice(["2025-01-01T00:00:00", "2025-01-02T00:00:00", None]),
+            })
+        return docs
+
+    def test_descending_pages_cover_every_document_once(self):
+        sort = [("dueDate", -1), ("createdAt", -1), ("_id", -1)]
+        ordered, pages = _walk(self._docs(), sort, limit=10)
+
+        flattened = [d["_id"] for page in pages for d in page]
+        self.assertEqual(flattened, [d["_id"] for d in ordered])
+        self.assertEqual([len(p) for p in pages], [10, 10, 10, 10, 10, 7])
+
+    def test_ascending_pages_cover_every_document_once(self):
+        sort = [("createdAt", 1), ("_id", 1)]
+        ordered, pages = _walk(self._docs(), sort, limit=8)
+
+        flattened = [d["_id"] for page in pages for d in page]
+        self.assertEqual(flattened, [d["_id"] for d in ordered])
+
+    def test_exact_multiple_of_limit_ends_without_empty_page(self):
+        sort = [("_id", -1)]
+        docs = [{"_id": ObjectId()} for _ in range(20)]
+        _, pages = _walk(docs, sort, limit=10)
+        self.assertEqual([len(p) for p in pages], [10, 10])
+
+    def test_cursor_round_trips_bson_types(self):
+        values = ["2025-01-05", None, ObjectId()]
+        self.assertEqual(decode_cursor(encode_cursor(values), [("a", 1), ("b", 1), ("c", 1)]), values)
+
+    def test_malformed_cursor_raises_value_error(self):
+        sort = [("createdAt", -1), ("_id", -1)]
+        for cursor in ["not-base64!!", encode_cursor(["only-one"]), encode_cursor({"a": 1})]:
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, sort)
+
+    def test_no_cursor_leaves_query_untouched(self):
+        query = {"propertyId": "p"}
+        self.assertIs(apply_cursor(query, [("_id", -1)], None), query)
+
+    def test_totals_default_by_mode(self):
+        self.assertTrue(wants_total(None, None))
+        self.assertFalse(wants_total(None, "abc"))
+        self.assertTrue(wants_total(True, "abc"))
+        self.assertFalse(wants_total(False, None))
+
+
+class _CountingCollection:
+    name = "tenants"
+
+    def __init__(self, total):
+        self.total = total
+        self.calls = 0
+
+    async def count_documents(self, query):
+        self.calls += 1
+        return self.total
+
+
+class CountCacheTests(unittest.TestCase):
+    def test_reuses_count_within_ttl(self):
+        cache = CountCache(ttl_seconds=60)
+        collection = _CountingCollection(42)
+
+        async def run():
+            first = await cache.count(collection, {"propertyId": "p"})
+            second = await cache.count(collection, {"propertyId": "p"})
+            other = await cache.count(collection, {"propertyId": "q"})
+            return first, second, other
+
+        self.assertEqual(asyncio.run(run()), (42, 42, 42))
+        self.assertEqual(collection.calls, 2)
+
+    def test_zero_ttl_disables_cache(self):
+        cache = CountCache(ttl_seconds=0)
+        collection = _CountingCollection(5)
+
+        async def run():
+            await cache.count(collection, {})
+            await cache.count(collection, {})
+
+        asyncio.run(run())
+        self.assertEqual(collection.calls, 2)
+
+    def test_evicts_oldest_entries(self):
+        cache = CountCache(ttl_seconds=60, max_entries=2)
+        collection = _CountingCollection(1)
+
+        async def run():
+            for pid in ["a", "b", "c", "a"]:
+                await cache.count(collection, {"propertyId": pid})
+
+        asyncio.run(run())
+        self.assertEqual(collection.calls, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Checks for the off-loop password hashing helpers, plus a login-storm benchmark.
+
+The benchmark fires a burst of Argon2 verifications at a small app while
+probing an unrelated endpoint, once with the blocking helpers and once with
+the pooled async ones, and reports the probe latency percentiles:
+
+    RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_password_hashing.py
+"""
+import asyncio
+import os
+import statistics
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from fastapi import FastAPI
+
+from app.config import settings
+
+# helpers refuses to import without a strong JWT secret
+if not settings.JWT_SECRET:
+    settings.JWT_SECRET = "test-secret-key-that-is-at-least-32-chars"
+
+from app.utils import helpers
+from app.utils.helpers import (
+    hash_password,
+    hash_password_async,
+    verify_password,
+    verify_password_async,
+)
+
+
+class PasswordHashingTests(unittest.TestCase):
+    def tearDown(self):
+        helpers.shutdown_password_executor()
+
+    def test_async_round_trip_matches_sync_helpers(self):
+        async def scenario():
+            hashed = await hash_password_async("s3cret-pass")
+            return (
+                hashed,
+                await verify_password_async("s3cret-pass", hashed),
+                await verify_password_async("wrong", hashed),
+            )
+
+        hashed, ok, wrong = asyncio.run(scenario())
+
+        self.assertTrue(hashed.startswith("$argon2"))
+        self.assertTrue(ok)
+        self.assertFalse(wrong)
+        self.assertTrue(verify_password("s3cret-pass", hashed))
+        self.assertTrue(asyncio.run(verify_password_async("legacy", hash_password("legacy"))))
+
+    def test_work_runs_on_dedicated_pool(self):
+        threads = []
+
+        def spy(plain, hashed):
+            threads.append(threading.current_thread().name)
+            return True
+
+        with patch.object(helpers, "verify_password", spy):
+            asyncio.run(verify_password_async("a", "b"))
+
+        self.assertTrue(threads[0].startswith("password-hash"))
+        self.assertNotEqual(threads[0], threading.main_thread().name)
+
+    def test_pool_size_bounds_concurrent_hashes(self):
+        active, peak = 0, 0
+        lock = threading.Lock()
+
+        def slow_hash(password):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+            return password
+
+        async def scenario():
+            await asyncio.gather(*(hash_password_async(str(i)) for i in range(12)))
+
+        with patch.object(settings, "PASSWORD_HASH_WORKERS", 3), patch.object(helpers, "hash_password", slow_hash):
+            helpers.shutdown_password_executor()
+            asyncio.run(scenario())
+
+        self.assertEqual(peak, 3)
+
+    def test_cost_parameters_come_from_settings(self):
+        params = hash_password("x").split("$")[3]
+        self.assertEqual(
+            params,
+            f"m={settings.ARGON2_MEMORY_COST},t={settings.ARGON2_TIME_COST},p={settings.ARGON2_PARALLELISM}",
+        )
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+@unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+class LoginStormBenchmark(unittest.TestCase):
+    logins = int(os.getenv("LOGIN_STORM_REQUESTS", 40))
+    probe_interval = 0.005
+
+    def _build_app(self, hashed, use_pool):
+        app = FastAPI()
+
+        @app.post("/login")
+        async def login():
+            if use_pool:
+                ok = await verify_password_async("s3cret-pass", hashed)
+            else:
+                ok = verify_password("s3cret-pass", hashed)
+            return {"ok": ok}
+
+        @app.get("/ping")
+        async def ping():
+            return {"status": "ok"}
+
+        return app
+
+    async def _storm(self, app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            probe_ms = []
+            done = asyncio.Event()
+
+            async def probe():
+                # Measure from when the probe wanted to fire, so time spent
+                # waiting for a blocked event loop counts as latency
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await asyncio.sleep(self.probe_interval)
+                    await client.get("/ping")
+                    probe_ms.append((time.perf_counter() - start - self.probe_interval) * 1000)
+
+            async def storm():
+                start = time.perf_counter()
+                await asyncio.gather(*(client.post("/login") for _ in range(self.logins)))
+                done.set()
+                return time.perf_counter() - start
+
+            prober = asyncio.create_task(probe())
+            await asyncio.sleep(0)
+            elapsed = await storm()
+            await prober
+            return probe_ms, elapsed
+
+    def test_benchmark_login_storm(self):
+        hashed = hash_password("s3cret-pass")
+        results = {}
+        for label, use_pool in [("blocking", False), ("pooled", True)]:
+            probe_ms, elapsed = asyncio.run(self._storm(self._build_app(hashed, use_pool)))
+            results[label] = (probe_ms, elapsed)
+        helpers.shutdown_password_executor()
+
+        print(f"\n[bench] {self.logins} concurrent logins, {settings.PASSWORD_HASH_WORKERS} hash workers")
+        for label, (probe_ms, elapsed) in results.items():
+            print(
+                f"[bench] {label}: /ping p50={statistics.median(probe_ms):.1f}ms "
+                f"p99={_percentile(probe_ms, 0.99):.1f}ms max={max(probe_ms):.1f}ms "
+                f"samples={len(probe_ms)} storm={elapsed:.2f}s"
+            )
+        self.assertLess(_percentile(results["pooled"][0], 0.99), _percentile(results["blocking"][0], 0.99))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import asyncio
+import gzip
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+import app.services.payment_service as payment_service_module
+from app.services.payment_service import PaymentService, PAYMENT_EXPORT_FIELDS
+from app.utils.streaming import buffered, encode_rows, gzip_stream
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+            if "$gte" in condition and not (value is not None and value >= condition["$gte"]):
+                return False
+            if "$lte" in condition and not (value is not None and value <= condition["$lte"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda doc: str(doc.get(field)), reverse=direction < 0)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return _Cursor([dict(doc) for doc in self.docs if _matches(doc, query)])
+
+
+class PaymentExportTests(unittest.TestCase):
+    def setUp(self):
+        self.room_a, self.room_b = ObjectId(), ObjectId()
+        self.bed_a = ObjectId()
+        self.anita, self.ravi = ObjectId(), ObjectId()
+        self.collections = {
+            "rooms": _Collection([
+                {"_id": self.room_a, "propertyId": "p1", "roomNumber": "A-101"},
+                {"_id": self.room_b, "propertyId": "p1", "roomNumber": "B-201"},
+            ]),
+            "beds": _Collection([{"_id": self.bed_a, "roomId": str(self.room_a)}]),
+            "tenants": _Collection([
+                {"_id": self.anita, "name": "Anita", "tenantStatus": "active", "roomId": str(self.room_b)},
+                {"_id": self.ravi, "name": "Ravi", "tenantStatus": "vacated", "roomId": None},
+            ]),
+        }
+        payments = []
+        for month in range(1, 7):
+            payments.append(self._payment(self.anita, str(self.bed_a), f"2026-0{month}-05"))
+            payments.append(self._payment(self.ravi, "", f"2026-0{month}-10"))
+        payments.append(self._payment(ObjectId(), "", "2026-03-01"))
+        payments.append({**self._payment(self.anita, "", "2026-03-20"), "isDeleted": True})
+        payments.append({**self._payment(self.anita, "", "2026-03-21"), "propertyId": "p2"})
+        self.service = PaymentService()
+        self.service.collection = _Collection(payments)
+
+        patcher = patch.object(payment_service_module, "getCollection", self.collections.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _payment(tenant_id, bed, due_date):
+        return {"_id": ObjectId(), "propertyId": "p1", "tenantId": str(tenant_id), "bed": bed,
+                "amount": "8000", "amountPaise": 800000, "status": "due", "dueDate": due_date, "isDeleted": False}
+
+    def export(self, *args):
+        async def run():
+            return [row async for row in self.service.export_payments("p1", *args)]
+        with patch.object(payment_service_module.settings, "EXPORT_CURSOR_BATCH_SIZE", 4):
+            return asyncio.run(run())
+
+    def test_ledger_rows_are_resolved_in_batches(self):
+        rows = self.export("2026-02-01", "2026-05-31")
+
+        self.assertEqual([row["dueDate"] for row in rows], sorted(row["dueDate"] for row in rows))
+        self.assertEqual(len(rows), 9)
+        by_name = {(row["tenantName"], row["dueDate"]): row for row in rows}
+        # Room of the payment's bed first, then the tenant's room, else N/A
+        self.assertEqual(by_name[("Anita", "2026-02-05")]["roomNumber"], "A-101")
+        self.assertEqual(by_name[("Ravi", "2026-02-10")]["roomNumber"], "N/A")
+        self.assertEqual(by_name[("Ravi", "2026-02-10")]["tenantStatus"], "vacated")
+        self.assertEqual(by_name[(None, "2026-03-01")]["roomNumber"], "N/A")
+        self.assertTrue(all(isinstance(row["id"], str) for row in rows))
+
+        # One cursor; three batches, but every tenant (including a missing one) appears in the first
+        self.assertEqual(len(self.service.collection.queries), 1)
+        self.assertEqual(len(self.collections["tenants"].queries), 1)
+        self.assertEqual(len(self.collections["beds"].queries), 1)
+        self.assertEqual(len(self.collections["rooms"].queries), 1)
+
+    def test_tenant_room_is_used_when_the_payment_has_no_bed(self):
+        self.service.collection.docs[1]["tenantId"] = str(self.anita)
+
+        rows = self.export(None, "2026-01-31")
+
+        self.assertEqual([row["roomNumber"] for row in rows], ["A-101", "B-201"])
+
+    def test_gzip_stream_matches_the_plain_body(self):
+        async def body(compress):
+            async def rows():
+                for i in range(3000):
+                    yield {"id": str(i), "tenantName": f"Tenant {i}", "amount": "8000"}
+            chunks = buffered(encode_rows(rows(), "csv", PAYMENT_EXPORT_FIELDS))
+            if compress:
+                chunks = gzip_stream(chunks)
+            return [chunk async for chunk in chunks]
+
+        plain = asyncio.run(body(False))
+        compressed = asyncio.run(body(True))
+
+        self.assertGreater(len(plain), 1)
+        self.assertEqual(gzip.decompress(b"".join(compressed)), b"".join(plain))
+        self.assertLess(sum(map(len, compressed)), sum(map(len, plain)) / 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.payment_service import PaymentService
+
+
+class _AggregateCursor:
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def to_list(self, length=None):
+        return self._rows
+
+
+class _PaymentsCollection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return _AggregateCursor(self.rows)
+
+
+def _row(property_id, month, status, amount_paise, count):
+    return {"_id": {"propertyId": property_id, "month": month, "status": status}, "amountPaise": amount_paise, "count": count}
+
+
+class PaymentStatsTests(unittest.TestCase):
+    def setUp(self):
+        self.service = PaymentService()
+        self.service.collection = _PaymentsCollection([
+            _row("prop-1", "2026-03", "paid", 1200000, 2),
+            _row("prop-1", "2026-04", "due", 600000, 1),
+            _row("prop-2", "2026-04", "paid", 500000, 1),
+        ])
+
+    def test_totals_and_monthly_counts_from_single_group(self):
+        stats = asyncio.run(self.service.get_payment_stats(property_ids=["prop-1", "prop-2"]))
+
+        self.assertEqual(stats["collected"], "₹17,000")
+        self.assertEqual(stats["pending"], "₹6,000")
+        self.assertEqual((stats["paidCount"], stats["dueCount"]), (3, 1))
+        self.assertEqual([m["month"] for m in stats["byMonth"]], ["2026-04", "2026-03"])
+        self.assertEqual(stats["byMonth"][0]["collectedPaise"], 500000)
+        self.assertNotIn("byProperty", stats)
+        self.assertEqual(len(self.service.collection.pipelines), 1)
+        self.assertEqual(self.service.collection.pipelines[0][0]["$match"]["propertyId"], {"$in": ["prop-1", "prop-2"]})
+
+    def test_per_property_breakdown(self):
+        stats = asyncio.run(self.service.get_payment_stats(property_ids=["prop-1", "prop-2"], include_breakdown=True))
+
+        by_property = {p["propertyId"]: p for p in stats["byProperty"]}
+        self.assertEqual(by_property["prop-1"]["collected"], "₹12,000")
+        self.assertEqual(by_property["prop-1"]["pending"], "₹6,000")
+        self.assertEqual(by_property["prop-2"]["paidCount"], 1)
+
+    def test_empty_scope_skips_query(self):
+        stats = asyncio.run(self.service.get_payment_stats(property_ids=[]))
+
+        self.assertEqual(stats, {"collected": "₹0", "pending": "₹0"})
+        self.assertEqual(self.service.collection.pipelines, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
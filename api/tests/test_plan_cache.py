@@ -0,0 +1,240 @@
+import asyncio
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+import app.services.plan_service as plan_service_module
+import app.services.subscription_service as subscription_service_module
+import app.utils.plan_cache as plan_cache_module
+from app.models.plan_schema import PlanUpdate
+from app.services.plan_service import PlanService
+from app.services.subscription_service import SubscriptionService
+from app.utils.cache_service import RedisCache
+from app.utils.plan_cache import PlanCache, REDIS_KEY
+
+
+def _plan(name, sort_order, tenants, is_active=True):
+    return {
+        "_id": ObjectId(),
+        "name": name,
+        "display_name": name.title(),
+        "description": "",
+        "properties": 1,
+        "tenants": tenants,
+        "rooms": 10,
+        "staff": 2,
+        "periods": {"0": 0} if name == "free" else {"1": 7900, "12": 60000},
+        "is_active": is_active,
+        "sort_order": sort_order,
+    }
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d.get(key, 0), reverse=direction < 0)
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(d) for d in self.docs]
+
+
+class _FakePlans:
+    def __init__(self, docs):
+        self.docs = {d["name"]: d for d in docs}
+        self.finds = 0
+
+    def find(self, query):
+        self.finds += 1
+        return _Cursor(list(self.docs.values()))
+
+    async def find_one(self, query):
+        doc = self.docs.get(query.get("name"))
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query.get("name"))
+        if doc:
+            doc.update(update["$set"])
+        return SimpleNamespace(matched_count=int(bool(doc)), modified_count=int(bool(doc)))
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class PlanCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.plans = _FakePlans([
+            _plan("free", 0, 20),
+            _plan("pro", 1, 50),
+            _plan("legacy", 3, 10, is_active=False),
+            _plan("premium", 2, 100),
+        ])
+        self.fake_db = SimpleNamespace(plans=self.plans)
+        self.server = fakeredis.FakeServer()
+        self.cache = PlanCache(ttl_seconds=60, redis_ttl_seconds=300, use_redis=True)
+
+        patches = [
+            patch.object(plan_cache_module, "db", self.fake_db),
+            patch.object(plan_service_module, "db", self.fake_db),
+            patch.object(plan_service_module, "plan_cache", self.cache),
+            patch.object(subscription_service_module, "plan_cache", self.cache),
+            patch.object(RedisCache, "_client", fakeredis.aioredis.FakeRedis(server=self.server, decode_responses=True)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _worker(self, ttl_seconds=60):
+        """Another process: its own L1, the same Redis and Mongo."""
+        return PlanCache(ttl_seconds=ttl_seconds, redis_ttl_seconds=300, use_redis=True)
+
+    def test_l1_serves_repeated_quota_checks(self):
+        async def scenario():
+            return [await SubscriptionService.get_plan_limits("Pro") for _ in range(50)]
+
+        limits = asyncio.run(scenario())
+
+        self.assertEqual(limits[-1], {"properties": 1, "tenants": 50, "rooms": 10, "staff": 2})
+        self.assertEqual(self.plans.finds, 1)
+        self.assertEqual(self.cache.stats()["hits"], 49)
+
+    def test_second_worker_reads_through_redis(self):
+        other = self._worker()
+
+        async def scenario():
+            await self.cache.get_plans()
+            return await other.get_plan("premium")
+
+        plan = asyncio.run(scenario())
+
+        self.assertEqual(plan["tenants"], 100)
+        self.assertEqual(self.plans.finds, 1)
+        self.assertEqual(other.stats()["redisHits"], 1)
+
+    def test_all_plans_lists_active_plans_in_order(self):
+        async def scenario():
+            public = await SubscriptionService.get_all_plans()
+            admin = await PlanService.get_all_plans()
+            active = await PlanService.get_all_plans(active_only=True)
+            return public, admin, active
+
+        public, admin, active = asyncio.run(scenario())
+
+        self.assertEqual([p["name"] for p in public], ["free", "pro", "premium"])
+        self.assertEqual(public[1]["periods"][0]["priceText"], "₹79")
+        self.assertEqual([p.name for p in admin], ["free", "pro", "premium", "legacy"])
+        self.assertEqual([p.name for p in active], ["free", "pro", "premium"])
+        self.assertEqual(self.plans.finds, 1)
+
+    def test_update_plan_invalidates_both_tiers(self):
+        other = self._worker(ttl_seconds=0)
+
+        async def scenario():
+            await SubscriptionService.get_plan_limits("pro")
+            await other.get_plans()
+            await PlanService.update_plan("pro", PlanUpdate(tenants=75))
+            redis_value = await RedisCache.get(REDIS_KEY)
+            local = await SubscriptionService.get_plan_limits("pro")
+            remote = await other.get_plan("pro")
+            return redis_value, local, remote
+
+        redis_value, local, remote = asyncio.run(scenario())
+
+        self.assertIsNone(redis_value)
+        self.assertEqual(local["tenants"], 75)
+        self.assertEqual(remote["tenants"], 75)
+
+    def test_read_overlapping_an_update_does_not_repopulate_redis(self):
+        # Worker A reads Mongo, the plan changes and is invalidated elsewhere, then A finishes
+        slow = self._worker()
+        load_from_db = slow._load_from_db
+
+        async def load_then_update_elsewhere():
+            plans = await load_from_db()
+            await PlanService.update_plan("pro", PlanUpdate(tenants=75))
+            return plans
+
+        slow._load_from_db = load_then_update_elsewhere
+
+        async def scenario():
+            stale = await slow.get_plan("pro")
+            redis_value = await RedisCache.get(REDIS_KEY)
+            fresh = await self._worker().get_plan("pro")
+            return stale, redis_value, fresh
+
+        stale, redis_value, fresh = asyncio.run(scenario())
+
+        self.assertEqual(stale["tenants"], 50)
+        self.assertIsNone(redis_value)
+        self.assertEqual(fresh["tenants"], 75)
+
+    def test_activate_and_deactivate_invalidate(self):
+        async def scenario():
+            before = [p["name"] for p in await SubscriptionService.get_all_plans()]
+            await PlanService.deactivate_plan("pro")
+            after_deactivate = [p["name"] for p in await SubscriptionService.get_all_plans()]
+            plan = await PlanService.activate_plan("legacy")
+            after_activate = [p["name"] for p in await SubscriptionService.get_all_plans()]
+            return before, after_deactivate, plan, after_activate
+
+        before, after_deactivate, plan, after_activate = asyncio.run(scenario())
+
+        self.assertEqual(before, ["free", "pro", "premium"])
+        self.assertEqual(after_deactivate, ["free", "premium"])
+        self.assertTrue(plan.is_active)
+        self.assertEqual(after_activate, ["free", "premium", "legacy"])
+        self.assertEqual(self.cache.stats()["invalidations"], 2)
+
+    def test_unknown_plan_falls_back_to_defaults(self):
+        async def scenario():
+            return await SubscriptionService.get_plan_limits("nonexistent"), await PlanService.get_plan_by_name("nope")
+
+        limits, plan = asyncio.run(scenario())
+
+        self.assertIsNone(limits)
+        self.assertIsNone(plan)
+
+    def test_concurrent_misses_load_once(self):
+        async def scenario():
+            return await asyncio.gather(*(self.cache.get_plan("free") for _ in range(25)))
+
+        results = asyncio.run(scenario())
+
+        self.assertTrue(all(r["tenants"] == 20 for r in results))
+        self.assertEqual(self.plans.finds, 1)
+
+    def test_returned_plans_are_copies(self):
+        async def scenario():
+            first = await self.cache.get_plan("free")
+            first["tenants"] = 0
+            return await self.cache.get_plan("free")
+
+        self.assertEqual(asyncio.run(scenario())["tenants"], 20)
+
+    def test_redis_outage_falls_back_to_mongo(self):
+        self.server.connected = False
+
+        async def scenario():
+            return await self.cache.get_plan("pro"), await self._worker().get_plan("pro")
+
+        first, second = asyncio.run(scenario())
+
+        self.assertEqual((first["tenants"], second["tenants"]), (50, 50))
+        self.assertEqual(self.plans.finds, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+"""
+Rate-limit keys, storage selection and enforcement, plus a limiter overhead benchmark.
+
+The benchmark times requests through a small app with and without the limiter
+middleware (memory storage, and Redis when RATE_LIMIT_BENCH_REDIS_URL is set):
+
+    RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_rate_limit.py
+"""
+import asyncio
+import os
+import statistics
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from fastapi import FastAPI, Request
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.middleware import SlowAPIASGIMiddleware, SlowAPIMiddleware
+from starlette.requests import Request as StarletteRequest
+
+from app.config import settings
+import app.utils.rate_limit as rate_limit
+from app.utils.rate_limit import client_ip, create_limiter, storage_config
+
+
+def _request(headers=None, peer="172.18.0.5"):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (peer, 40000),
+    }
+    return StarletteRequest(scope)
+
+
+def _build_app(limiter, limit="3/minute", middleware=SlowAPIASGIMiddleware):
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    if middleware:
+        app.add_middleware(middleware)
+
+    @app.post("/login")
+    @limiter.limit(limit)
+    async def login(request: Request):
+        return {"ok": True}
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+async def _post_many(app, headers_list):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [(await client.post("/login", headers=headers)).status_code for headers in headers_list]
+
+
+class ClientKeyTests(unittest.TestCase):
+    def test_rightmost_untrusted_forwarded_address_is_the_client(self):
+        # nginx appends the address it saw; anything to the left came from the client
+        request = _request({"X-Forwarded-For": "1.2.3.4, 203.0.113.7"})
+        self.assertEqual(client_ip(request), "203.0.113.7")
+
+    def test_internal_hops_are_skipped(self):
+        request = _request({"X-Forwarded-For": "203.0.113.7, 10.0.0.5, 172.18.0.2"})
+        self.assertEqual(client_ip(request), "203.0.113.7")
+
+    def test_all_internal_chain_uses_the_first_hop(self):
+        request = _request({"X-Forwarded-For": "10.0.0.9, 172.18.0.2"})
+        self.assertEqual(client_ip(request), "10.0.0.9")
+
+    def test_real_ip_then_peer_address(self):
+        self.assertEqual(client_ip(_request({"X-Real-IP": "198.51.100.4"})), "198.51.100.4")
+        self.assertEqual(client_ip(_request(peer="198.51.100.9")), "198.51.100.9")
+
+    def test_direct_clients_cannot_choose_their_key(self):
+        spoofed = {"X-Forwarded-For": "9.9.9.1", "X-Real-IP": "9.9.9.2"}
+        self.assertEqual(client_ip(_request(spoofed, peer="203.0.113.7")), "203.0.113.7")
+
+    def test_garbage_hops_are_not_trusted(self):
+        request = _request({"X-Forwarded-For": "not-an-ip"})
+        self.assertEqual(client_ip(request), "not-an-ip")
+
+
+class StorageConfigTests(unittest.TestCase):
+    def test_redis_requires_redis_url(self):
+        with patch.object(settings, "REDIS_URL", None):
+            with self.assertRaises(ValueError):
+                storage_config("redis")
+        with patch.object(settings, "REDIS_URL", "redis://cache:6379/0"):
+            self.assertEqual(storage_config("redis"), ("redis://cache:6379/0", {}))
+
+    def test_mongodb_uses_the_app_database(self):
+        with patch.object(settings, "MONGO_URL", "mongodb://db:27017"), \
+                patch.object(settings, "MONGO_DB_NAME", "hostel"):
+            uri, options = storage_config("mongodb")
+
+        self.assertEqual(uri, "mongodb://db:27017")
+        self.assertEqual(options["database_name"], "hostel")
+        self.assertEqual(options["counter_collection_name"], "rate_limit_counters")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            storage_config("memcached")
+
+    def test_default_strategy_is_sliding_window(self):
+        limiter = create_limiter("memory")
+        self.assertEqual(type(limiter._limiter).__name__, "SlidingWindowCounterRateLimiter")
+
+
+class EnforcementTests(unittest.TestCase):
+    def test_limit_is_per_forwarded_client(self):
+        app = _build_app(create_limiter("memory"))
+        alice = {"X-Forwarded-For": "203.0.113.7"}
+        bob = {"X-Forwarded-For": "198.51.100.4"}
+
+        statuses = asyncio.run(_post_many(app, [alice] * 4 + [bob]))
+
+        self.assertEqual(statuses, [200, 200, 200, 429, 200])
+
+    def test_spoofed_forwarded_entries_do_not_reset_the_limit(self):
+        app = _build_app(create_limiter("memory"))
+        headers = [{"X-Forwarded-For": f"10.{i}.{i}.{i}, 1.1.1.{i}, 203.0.113.7"} for i in range(5)]
+
+        statuses = asyncio.run(_post_many(app, headers))
+
+        self.assertEqual(statuses.count(429), 2)
+
+    def test_direct_client_rotating_forwarded_for_is_still_limited(self):
+        app = _build_app(create_limiter("memory"))
+        headers = [{"X-Forwarded-For": f"9.9.9.{i}"} for i in range(5)]
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app, client=("203.0.113.7", 40000))
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return [(await client.post("/login", headers=h)).status_code for h in headers]
+
+        statuses = asyncio.run(scenario())
+
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+
+    def test_default_limit_applies_to_undecorated_routes(self):
+        app = _build_app(create_limiter("memory"))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return [(await client.get("/ping")).status_code for _ in range(101)]
+
+        statuses = asyncio.run(scenario())
+
+        self.assertEqual(statuses.count(429), 1)
+
+    def test_unreachable_shared_storage_falls_back_to_memory(self):
+        with patch.object(settings, "REDIS_URL", "redis://127.0.0.1:1/0"):
+            limiter = create_limiter("redis")
+        app = _build_app(limiter)
+
+        statuses = asyncio.run(_post_many(app, [{"X-Forwarded-For": "203.0.113.7"}] * 4))
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertTrue(limiter._storage_dead)
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+@unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+class LimiterOverheadBenchmark(unittest.TestCase):
+    requests = int(os.getenv("RATE_LIMIT_BENCH_REQUESTS", 2000))
+
+    async def _time_requests(self, app):
+        transport = httpx.ASGITransport(app=app)
+        samples = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for i in range(self.requests):
+                headers = {"X-Forwarded-For": f"203.0.{i // 250}.{i % 250}"}
+                start = time.perf_counter()
+                await client.get("/ping", headers=headers)
+                samples.append((time.perf_counter() - start) * 1e6)
+        return samples
+
+    def test_benchmark_per_request_overhead(self):
+        variants = [
+            ("no limiter", "memory", None),
+            ("memory, SlowAPIMiddleware", "memory", SlowAPIMiddleware),
+            ("memory, SlowAPIASGIMiddleware", "memory", SlowAPIASGIMiddleware),
+        ]
+        redis_url = os.getenv("RATE_LIMIT_BENCH_REDIS_URL")
+        if redis_url:
+            variants.append(("redis, SlowAPIASGIMiddleware", "redis", SlowAPIASGIMiddleware))
+
+        results = {}
+        for label, backend, middleware in variants:
+            with patch.object(settings, "REDIS_URL", redis_url):
+                app = _build_app(create_limiter(backend), middleware=middleware)
+            results[label] = asyncio.run(self._time_requests(app))
+
+        # Limiter cost on its own: key extraction plus one sliding-window hit
+        limiter = create_limiter("memory")
+        item = rate_limit.limiter._default_limits[0]
+        limit = next(iter(item)).limit
+        request = _request({"X-Forwarded-For": "1.2.3.4, 203.0.113.7"})
+        start = time.perf_counter()
+        for _ in range(self.requests):
+            limiter._limiter.hit(limit, client_ip(request), "/ping")
+        raw_us = (time.perf_counter() - start) / self.requests * 1e6
+
+        baseline = statistics.median(results["no limiter"])
+        print(f"\n[bench] {self.requests} requests per variant, /ping")
+        for label, samples in results.items():
+            median = statistics.median(samples)
+            print(
+                f"[bench] {label}: p50={median:.0f}us p99={_percentile(samples, 0.99):.0f}us "
+                f"overhead={median - baseline:+.0f}us"
+            )
+        print(f"[bench] key + sliding-window hit (memory storage): {raw_us:.1f}us")
+        self.assertLess(raw_us, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
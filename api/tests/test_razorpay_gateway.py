@@ -0,0 +1,267 @@
+"""
+RazorpayGateway and the renewal job against a local stub of the Razorpay REST API.
+"""
+import asyncio
+import base64
+import json
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+import app.services.razorpay_subscription_service as renewal_module
+from app.services.razorpay_subscription_service import RazorpaySubscriptionService
+from app.utils.razorpay_gateway import RazorpayAPIError, RazorpayGateway
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *_args):
+        pass
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.headers.get("Authorization")))
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            failure = server.failures.pop(0) if server.failures else None
+        try:
+            time.sleep(server.delay)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+            if failure:
+                status, payload = failure
+            elif self.path.endswith("/orders"):
+                with server.lock:
+                    server.order_seq += 1
+                    order_id = f"order_{server.order_seq}"
+                status, payload = 200, {
+                    "id": order_id,
+                    "amount": body.get("amount"),
+                    "currency": body.get("currency"),
+                    "receipt": body.get("receipt"),
+                    "status": "created",
+                    "notes": body.get("notes", {}),
+                }
+            elif self.command == "GET" and "/subscriptions/" in self.path:
+                status, payload = 200, {"id": self.path.rsplit("/", 1)[-1], "status": "active"}
+            else:
+                status, payload = 404, {"error": {"code": "BAD_REQUEST_ERROR", "description": "not found"}}
+
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    do_GET = _respond
+    do_POST = _respond
+
+
+class _StubRazorpay:
+    """Razorpay-shaped HTTP server on an ephemeral localhost port"""
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.failures = []
+        self.server.delay = 0.0
+        self.server.in_flight = 0
+        self.server.peak = 0
+        self.server.order_seq = 0
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RazorpayGatewayTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = _StubRazorpay()
+        self.addCleanup(self.stub.stop)
+
+    def _gateway(self, **kwargs):
+        options = {"timeout_seconds": 2, "max_retries": 3, "backoff_seconds": 0.01, "max_concurrency": 4}
+        options.update(kwargs)
+        return RazorpayGateway("rzp_test_key", "secret", self.stub.base_url, **options)
+
+    def _run(self, gateway, coro_factory):
+        async def scenario():
+            try:
+                return await coro_factory()
+            finally:
+                await gateway.aclose()
+        return asyncio.run(scenario())
+
+    def test_create_order_uses_basic_auth(self):
+        gateway = self._gateway()
+        order = self._run(gateway, lambda: gateway.create_order({"amount": 7900, "currency": "INR", "receipt": "r1"}))
+
+        self.assertEqual((order["id"], order["amount"]), ("order_1", 7900))
+        method, path, auth = self.stub.server.requests[0]
+        self.assertEqual((method, path), ("POST", "/v1/orders"))
+        self.assertEqual(auth, "Basic " + base64.b64encode(b"rzp_test_key:secret").decode())
+
+    def test_retries_unprocessed_responses_with_backoff(self):
+        busy = (503, {"error": {"description": "busy"}})
+        self.stub.server.failures = [busy, (429, {"error": {"description": "slow down"}})]
+        gateway = self._gateway()
+
+        order = self._run(gateway, lambda: gateway.create_order({"amount": 100, "currency": "INR"}))
+
+        self.assertEqual(order["id"], "order_1")
+        self.assertEqual(len(self.stub.server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.stub.server.failures = [(503, {"error": {"description": "busy"}})] * 5
+        gateway = self._gateway(max_retries=2)
+
+        with self.assertRaises(RazorpayAPIError) as ctx:
+            self._run(gateway, lambda: gateway.create_order({"amount": 100}))
+
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(self.stub.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.stub.server.failures = [(400, {"error": {"code": "BAD_REQUEST_ERROR", "description": "amount too low"}})]
+        gateway = self._gateway()
+
+        with self.assertRaises(RazorpayAPIError) as ctx:
+            self._run(gateway, lambda: gateway.create_order({"amount": 1}))
+
+        self.assertEqual(str(ctx.exception), "amount too low")
+        self.assertEqual(ctx.exception.error["code"], "BAD_REQUEST_ERROR")
+        self.assertEqual(len(self.stub.server.requests), 1)
+
+    def test_order_timeout_is_not_resent(self):
+        # The order may have been created, so a read timeout on POST must not retry
+        self.stub.server.delay = 0.3
+        gateway = self._gateway(timeout_seconds=0.1)
+
+        with self.assertRaises(RazorpayAPIError):
+            self._run(gateway, lambda: gateway.create_order({"amount": 100}))
+
+        time.sleep(0.3)
+        self.assertEqual(len(self.stub.server.requests), 1)
+
+    def test_reads_retry_server_errors(self):
+        self.stub.server.failures = [(502, {})]
+        gateway = self._gateway()
+
+        sub = self._run(gateway, lambda: gateway.fetch_subscription("sub_1"))
+
+        self.assertEqual(sub, {"id": "sub_1", "status": "active"})
+        self.assertEqual(len(self.stub.server.requests), 2)
+
+    def test_concurrency_is_bounded(self):
+        self.stub.server.delay = 0.05
+        gateway = self._gateway(max_concurrency=3)
+
+        async def burst():
+            return await asyncio.gather(*(gateway.create_order({"amount": i}) for i in range(1, 13)))
+
+        orders = self._run(gateway, burst)
+
+        self.assertEqual(len({o["id"] for o in orders}), 12)
+        self.assertLessEqual(self.stub.server.peak, 3)
+        self.assertGreaterEqual(self.stub.server.peak, 2)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class _Collection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.inserted = []
+        self.updates = []
+
+    def find(self, query, projection=None):
+        ids = query.get("_id", {}).get("$in")
+        return _Cursor([d for d in self.docs if ids is None or d["_id"] in ids])
+
+    async def insert_one(self, doc):
+        self.inserted.append(doc)
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+class _Plans:
+    async def get_plan(self, name):
+        return {"name": name, "periods": {"1": 7900}} if name == "pro" else None
+
+
+class RenewalJobTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = _StubRazorpay()
+        self.addCleanup(self.stub.stop)
+
+    def test_renewal_orders_are_created_in_parallel(self):
+        owners = [ObjectId() for _ in range(10)]
+        subscriptions = [
+            {"_id": ObjectId(), "ownerId": str(owner), "plan": "pro", "period": 1}
+            for owner in owners
+        ]
+        subscriptions.append({"_id": ObjectId(), "ownerId": str(ObjectId()), "plan": "pro", "period": 1})
+        subscriptions.append({"_id": ObjectId(), "ownerId": str(owners[0]), "plan": "gold", "period": 1})
+        fake_db = SimpleNamespace(
+            subscriptions=_Collection(subscriptions),
+            users=_Collection([{"_id": owner, "razorpayCustomerId": f"cust_{i}"} for i, owner in enumerate(owners)]),
+            renewal_orders=_Collection(),
+        )
+
+        self.stub.server.delay = 0.1
+        gateway = RazorpayGateway("k", "s", self.stub.base_url, backoff_seconds=0.01, max_concurrency=5)
+
+        async def scenario():
+            try:
+                start = time.perf_counter()
+                stats = await RazorpaySubscriptionService.check_and_renew_subscriptions()
+                return stats, time.perf_counter() - start
+            finally:
+                await gateway.aclose()
+
+        with patch.object(renewal_module, "db", fake_db), \
+                patch.object(renewal_module, "razorpay_gateway", gateway), \
+                patch.object(renewal_module, "plan_cache", _Plans()):
+            stats, elapsed = asyncio.run(scenario())
+
+        self.assertEqual((stats["checked"], stats["renewed"], stats["failed"]), (12, 10, 2))
+        self.assertEqual(len(fake_db.renewal_orders.inserted), 10)
+        self.assertEqual({o["amount"] for o in fake_db.renewal_orders.inserted}, {7900})
+        self.assertEqual(self.stub.server.peak, 5)
+        # 10 orders at 100ms each, 5 at a time: about 0.2s rather than 1s sequentially
+        self.assertLess(elapsed, 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+import asyncio
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+from pymongo import UpdateMany
+
+import app.services.room_service as room_service_module
+from app.services.room_service import RoomService
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$nin" in condition and value in condition["$nin"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda doc: str(doc.get(field)), reverse=direction < 0)
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.calls = []
+
+    def find(self, query, projection=None, session=None):
+        self.calls.append("find")
+        return _Cursor([dict(doc) for doc in self.docs if _matches(doc, query)])
+
+    async def find_one(self, query, session=None):
+        self.calls.append("find_one")
+        return next((dict(doc) for doc in self.docs if _matches(doc, query)), None)
+
+    async def insert_many(self, docs, session=None):
+        self.calls.append("insert_many")
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+        self.docs.extend(docs)
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        self.calls.append("bulk_write")
+        matched = 0
+        for op in ops:
+            hits = [doc for doc in self.docs if _matches(doc, op._filter)]
+            if not isinstance(op, UpdateMany):
+                hits = hits[:1]
+            for doc in hits:
+                doc.update(op._doc["$set"])
+            matched += len(hits)
+        return SimpleNamespace(matched_count=matched)
+
+    async def update_many(self, query, update, session=None):
+        self.calls.append("update_many")
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update["$set"])
+
+
+def _bed(room_id, number, tenant_id=None, status=None):
+    return {
+        "_id": ObjectId(),
+        "propertyId": "p1",
+        "roomId": room_id,
+        "bedNumber": str(number),
+        "status": status or ("occupied" if tenant_id else "available"),
+        "tenantId": tenant_id,
+        "isDeleted": False,
+    }
+
+
+class BedReductionPlannerTests(unittest.TestCase):
+    def test_bed_numbers_compare_numerically(self):
+        beds = [_bed("r1", n) for n in range(1, 13)]
+
+        plan = RoomService.plan_bed_reduction(beds, [], 9)
+
+        # As strings "10" < "9", which used to remove beds 2-9 and keep 10-12
+        self.assertEqual([bed["bedNumber"] for bed in plan["remove"]], ["10", "11", "12"])
+        self.assertEqual(plan["free_in_room"], 9)
+
+    def test_tenants_move_to_lowest_free_bed_in_room_then_elsewhere_then_vacate(self):
+        room = [_bed("r1", n, tenant_id=f"t{n}" if n not in (3, 7) else None) for n in range(1, 13)]
+        elsewhere = [_bed("r2", 1)]
+
+        plan = RoomService.plan_bed_reduction(room, elsewhere, 8)
+
+        moves = [(bed["tenantId"], target["roomId"], target["bedNumber"]) for bed, target in plan["relocate"]]
+        self.assertEqual(moves, [("t9", "r1", "3"), ("t10", "r1", "7"), ("t11", "r2", "1")])
+        self.assertEqual([bed["tenantId"] for bed in plan["vacate"]], ["t12"])
+
+    def test_non_numeric_beds_are_kept_and_can_receive_tenants(self):
+        room = [_bed("r1", "A"), _bed("r1", 1, "t1"), _bed("r1", 2, "t2")]
+
+        plan = RoomService.plan_bed_reduction(room, [], 1)
+
+        self.assertEqual([bed["bedNumber"] for bed in plan["remove"]], ["2"])
+        self.assertEqual(plan["relocate"][0][1]["bedNumber"], "A")
+
+    def test_maintenance_beds_are_not_targets(self):
+        room = [_bed("r1", 1, status="maintenance"), _bed("r1", 2, "t2")]
+
+        plan = RoomService.plan_bed_reduction(room, [], 1)
+
+        self.assertEqual(plan["relocate"], [])
+        self.assertEqual([bed["tenantId"] for bed in plan["vacate"]], ["t2"])
+
+
+class BedCountChangeTests(unittest.TestCase):
+    def setUp(self):
+        self.room_id = ObjectId()
+        self.rooms = _Collection([{"_id": self.room_id, "propertyId": "p1", "numberOfBeds": 12, "isDeleted": False}])
+        self.tenant_ids = {n: ObjectId() for n in (5, 10, 11, 12)}
+        room = str(self.room_id)
+        self.beds = _Collection(
+            [_bed(room, n, str(self.tenant_ids[n]) if n in self.tenant_ids else None) for n in range(1, 13)]
+            + [_bed("other-room", 1)]
+        )
+        # Only beds 1-3 are free in the room once it shrinks to 3
+        for bed in self.beds.docs[3:9]:
+            bed["status"] = "occupied"
+        self.tenants = _Collection([{"_id": tid, "name": f"Tenant {n}", "isDeleted": False} for n, tid in self.tenant_ids.items()])
+        self.service = RoomService()
+        self.service.collection = self.rooms
+        self.transactions = 0
+
+        self.session = "session"
+
+        async def fake_transaction(callback):
+            self.transactions += 1
+            return await callback(self.session)
+
+        collections = {"beds": self.beds, "tenants": self.tenants}
+        patches = [
+            patch.object(room_service_module, "getCollection", collections.__getitem__),
+            patch.object(room_service_module, "run_in_transaction", fake_transaction),
+            patch.object(room_service_module.DashboardStatsService, "rebuild_many", AsyncMock()),
+            patch.object(room_service_module.DashboardStatsService, "apply_changes", AsyncMock()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def bed(self, room_id, number):
+        return next(b for b in self.beds.docs if b["roomId"] == room_id and b["bedNumber"] == str(number))
+
+    def test_shrinking_a_room_with_more_than_ten_beds(self):
+        asyncio.run(self.service._handle_bed_count_change(str(self.room_id), {"numberOfBeds": 3}))
+
+        room = str(self.room_id)
+        live = sorted(int(b["bedNumber"]) for b in self.beds.docs if b["roomId"] == room and not b["isDeleted"])
+        self.assertEqual(live, [1, 2, 3])
+        # Tenant on bed 5 and the three above 9 are displaced: beds 1-3 first, then the other room
+        tenants = {n: next(t for t in self.tenants.docs if t["_id"] == tid) for n, tid in self.tenant_ids.items()}
+        self.assertEqual(tenants[5]["bedId"], str(self.bed(room, 1)["_id"]))
+        self.assertEqual(tenants[10]["bedId"], str(self.bed(room, 2)["_id"]))
+        self.assertEqual(tenants[11]["bedId"], str(self.bed(room, 3)["_id"]))
+        self.assertEqual(tenants[12]["roomId"], "other-room")
+        self.assertEqual(self.bed(room, 2)["tenantId"], str(self.tenant_ids[10]))
+        self.assertEqual(self.bed("other-room", 1)["status"], "occupied")
+        self.assertEqual(self.transactions, 1)
+        # Two bed reads, then claims and removals in bulk, no per-tenant round trips
+        self.assertEqual(self.beds.calls, ["find", "find", "bulk_write", "update_many"])
+        self.assertEqual(self.tenants.calls, ["bulk_write"])
+        room_service_module.DashboardStatsService.rebuild_many.assert_awaited_once_with(["p1"])
+
+    def test_tenants_are_vacated_when_the_property_is_full(self):
+        self.bed("other-room", 1)["status"] = "maintenance"
+        for bed in self.beds.docs[:3]:
+            bed["status"] = "occupied"
+
+        asyncio.run(self.service._handle_bed_count_change(str(self.room_id), {"numberOfBeds": 9}))
+
+        statuses = {n: next(t for t in self.tenants.docs if t["_id"] == tid).get("tenantStatus") for n, tid in self.tenant_ids.items()}
+        self.assertEqual(statuses, {5: None, 10: "vacated", 11: "vacated", 12: "vacated"})
+
+    def test_bed_claimed_after_planning_aborts_the_change(self):
+        original = self.beds.bulk_write
+
+        async def claim_then_write(ops, **kwargs):
+            self.bed(str(self.room_id), 1)["status"] = "occupied"
+            return await original(ops, **kwargs)
+
+        self.beds.bulk_write = claim_then_write
+        with self.assertRaises(ValueError):
+            asyncio.run(self.service._handle_bed_count_change(str(self.room_id), {"numberOfBeds": 3}))
+        self.assertEqual(self.tenants.calls, [])
+
+    def test_failed_claim_on_a_standalone_server_leaves_beds_as_they_were(self):
+        # No transaction to roll back: claims are undone and nothing is removed
+        self.session = None
+        room = str(self.room_id)
+        before = [dict(bed) for bed in self.beds.docs]
+        original = self.beds.bulk_write
+
+        async def claim_then_write(ops, **kwargs):
+            self.bed("other-room", 1)["status"] = "maintenance"
+            self.beds.bulk_write = original
+            return await original(ops, **kwargs)
+
+        self.beds.bulk_write = claim_then_write
+        with self.assertRaises(ValueError):
+            asyncio.run(self.service._handle_bed_count_change(room, {"numberOfBeds": 3}))
+
+        self.assertNotIn("update_many", self.beds.calls)
+        self.assertEqual(self.tenants.calls, [])
+        after = {bed["_id"]: bed for bed in self.beds.docs}
+        for bed in before:
+            if bed["roomId"] == room:
+                self.assertEqual(
+                    (after[bed["_id"]]["status"], after[bed["_id"]]["tenantId"], after[bed["_id"]]["isDeleted"]),
+                    (bed["status"], bed["tenantId"], False),
+                )
+
+    def test_growing_a_room_inserts_new_beds_at_once(self):
+        asyncio.run(self.service._handle_bed_count_change(str(self.room_id), {"numberOfBeds": 15}))
+
+        room = str(self.room_id)
+        numbers = sorted(int(b["bedNumber"]) for b in self.beds.docs if b["roomId"] == room)
+        self.assertEqual(numbers, list(range(1, 16)))
+        self.assertEqual(self.beds.calls, ["insert_many"])
+        _, changes = room_service_module.DashboardStatsService.apply_changes.await_args.args
+        self.assertEqual(len(changes), 3)
+
+    def test_preview_matches_the_plan(self):
+        preview = asyncio.run(self.service.preview_bed_count_change(str(self.room_id), 3))
+
+        self.assertEqual(
+            [(t["bedNumber"], t["action"], t["location"]) for t in preview["affectedTenants"]],
+            [("5", "relocate", "same_room"), ("10", "relocate", "same_room"),
+             ("11", "relocate", "same_room"), ("12", "relocate", "other_room")],
+        )
+        self.assertEqual((preview["availableBedsInSameRoom"], preview["availableBedsInProperty"]), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
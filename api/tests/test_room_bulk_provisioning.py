@@ -0,0 +1,234 @@
+"""
+Bulk room provisioning: validation, round trips and the transaction wrapper.
+
+The benchmark provisions a property with per-room create_room calls and with
+create_rooms_bulk against collections that add a fixed latency per round trip
+(ROOM_BENCH_LATENCY_MS, default 0.5):
+
+    RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_room_bulk_provisioning.py
+"""
+import asyncio
+import os
+import time
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+from app.database import transactions
+import app.services.room_service as room_service_module
+import app.services.bed_service as bed_service_module
+from app.services.room_service import RoomService
+
+
+class _Collection:
+    def __init__(self, latency=0.0):
+        self.docs = []
+        self.round_trips = 0
+        self.sessions = []
+        self.latency = latency
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def distinct(self, field, query):
+        await self._round_trip()
+        return [doc[field] for doc in self.docs if doc["propertyId"] == query["propertyId"] and not doc.get("isDeleted")]
+
+    async def find_one(self, query):
+        await self._round_trip()
+        for doc in self.docs:
+            if all(doc.get(k) == v for k, v in query.items() if not isinstance(v, dict)):
+                return doc
+        return None
+
+    async def insert_one(self, doc):
+        await self._round_trip()
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, session=None):
+        await self._round_trip()
+        self.sessions.append(session)
+        self.docs.extend(docs)
+
+
+def _rooms(count, beds=3, start=1):
+    return [
+        {"roomNumber": str(100 + i), "floor": "1", "price": 5000, "numberOfBeds": beds, "active": True}
+        for i in range(start, start + count)
+    ]
+
+
+class BulkProvisioningTests(unittest.TestCase):
+    def setUp(self):
+        self.rooms = _Collection()
+        self.beds = _Collection()
+        self.service = RoomService()
+        self.service.collection = self.rooms
+        self.transactions = []
+
+        async def fake_transaction(callback):
+            self.transactions.append(callback)
+            return await callback("session")
+
+        patches = [
+            patch.object(room_service_module, "getCollection", lambda name: {"beds": self.beds}[name]),
+            patch.object(room_service_module, "run_in_transaction", fake_transaction),
+            patch.object(room_service_module.DashboardStatsService, "apply_changes", AsyncMock()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_rooms_and_beds_are_inserted_in_one_transaction(self):
+        result = asyncio.run(self.service.create_rooms_bulk("p1", _rooms(100, beds=4)))
+
+        self.assertEqual((result["roomsCreated"], result["bedsCreated"]), (100, 400))
+        self.assertEqual(len(self.transactions), 1)
+        # One distinct for the uniqueness check and one insert_many per collection, whatever the size
+        self.assertEqual((self.rooms.round_trips, self.beds.round_trips), (2, 1))
+        self.assertEqual(self.rooms.sessions + self.beds.sessions, ["session", "session"])
+        self.assertEqual(set(result["timingsMs"]), {"validate", "insert", "stats", "total"})
+
+    def test_beds_reference_their_rooms(self):
+        result = asyncio.run(self.service.create_rooms_bulk("p1", _rooms(2, beds=2)))
+
+        room_ids = [room.id for room in result["rooms"]]
+        self.assertEqual(
+            [(bed["roomId"], bed["bedNumber"]) for bed in self.beds.docs],
+            [(room_ids[0], "1"), (room_ids[0], "2"), (room_ids[1], "1"), (room_ids[1], "2")],
+        )
+        bed = self.beds.docs[0]
+        self.assertEqual(bed["roomRef"], ObjectId(room_ids[0]))
+        self.assertEqual((bed["status"], bed["propertyId"], bed["isDeleted"]), ("available", "p1", False))
+        self.assertTrue(all(room.propertyId == "p1" for room in result["rooms"]))
+
+    def test_stats_are_applied_once_for_all_beds(self):
+        asyncio.run(self.service.create_rooms_bulk("p1", _rooms(5, beds=2)))
+
+        apply_changes = room_service_module.DashboardStatsService.apply_changes
+        apply_changes.assert_awaited_once()
+        kind, changes = apply_changes.await_args.args
+        self.assertEqual((kind, len(changes)), ("beds", 10))
+
+    def test_existing_room_numbers_are_rejected_before_writing(self):
+        self.rooms.docs.append({"propertyId": "p1", "roomNumber": "102", "isDeleted": False})
+        self.rooms.docs.append({"propertyId": "p2", "roomNumber": "103", "isDeleted": False})
+        self.rooms.docs.append({"propertyId": "p1", "roomNumber": "104", "isDeleted": True})
+
+        with self.assertRaisesRegex(ValueError, "already exist for this property: 102$"):
+            asyncio.run(self.service.create_rooms_bulk("p1", _rooms(4)))
+        self.assertEqual(self.transactions, [])
+
+    def test_duplicates_within_the_request_are_rejected(self):
+        rooms = _rooms(3) + _rooms(1)
+
+        with self.assertRaisesRegex(ValueError, "Duplicate room numbers in request: 101"):
+            asyncio.run(self.service.create_rooms_bulk("p1", rooms))
+        self.assertEqual(self.rooms.round_trips, 0)
+
+
+class _Session:
+    def __init__(self):
+        self.callbacks = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        self.callbacks.append(callback)
+        return await callback(self)
+
+
+class RunInTransactionTests(unittest.TestCase):
+    def run_with_hello(self, hello):
+        session = _Session()
+        client = SimpleNamespace(
+            admin=SimpleNamespace(command=AsyncMock(return_value=hello)),
+            start_session=AsyncMock(return_value=session),
+        )
+
+        async def callback(s):
+            return s
+
+        with patch.object(transactions, "client", client), patch.object(transactions, "_supported", None):
+            first = asyncio.run(transactions.run_in_transaction(callback))
+            second = asyncio.run(transactions.run_in_transaction(callback))
+        return session, client, (first, second)
+
+    def test_replica_set_runs_the_callback_in_a_transaction(self):
+        session, client, results = self.run_with_hello({"setName": "rs0"})
+
+        self.assertEqual(results, (session, session))
+        self.assertEqual(len(session.callbacks), 2)
+        client.admin.command.assert_awaited_once_with("hello")
+
+    def test_standalone_server_runs_without_a_session(self):
+        session, client, results = self.run_with_hello({"isWritablePrimary": True})
+
+        self.assertEqual(results, (None, None))
+        client.start_session.assert_not_awaited()
+
+    def test_mongos_supports_transactions(self):
+        session, _, results = self.run_with_hello({"msg": "isdbgrid"})
+
+        self.assertEqual(results, (session, session))
+
+
+@unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+class BulkProvisioningBenchmark(unittest.TestCase):
+    latency = float(os.getenv("ROOM_BENCH_LATENCY_MS", 0.5)) / 1000
+
+    def test_benchmark_per_room_vs_bulk(self):
+        room_count, beds_per_room = 100, 4
+
+        async def direct(callback):
+            return await callback(None)
+
+        def make_service():
+            service = RoomService()
+            service.collection = _Collection(self.latency)
+            beds = _Collection(self.latency)
+            return service, beds
+
+        # Per-room path: create_room, which inserts each bed with its own round trip
+        service, beds = make_service()
+        bed_service = bed_service_module.BedService()
+        bed_service.db = {"beds": beds}
+        with patch.object(room_service_module, "bed_service", bed_service), \
+                patch.object(bed_service_module.DashboardStatsService, "apply_changes", AsyncMock()):
+            start = time.perf_counter()
+            for room in _rooms(room_count, beds_per_room):
+                asyncio.run(service.create_room({**room, "propertyId": "p1"}))
+            per_room = time.perf_counter() - start
+        per_room_trips = service.collection.round_trips + beds.round_trips
+
+        service, beds = make_service()
+        with patch.object(room_service_module, "getCollection", lambda name: beds), \
+                patch.object(room_service_module, "run_in_transaction", direct), \
+                patch.object(room_service_module.DashboardStatsService, "apply_changes", AsyncMock()):
+            start = time.perf_counter()
+            result = asyncio.run(service.create_rooms_bulk("p1", _rooms(room_count, beds_per_room)))
+            bulk = time.perf_counter() - start
+        bulk_trips = service.collection.round_trips + beds.round_trips
+
+        print(f"\n[bench] {room_count} rooms x {beds_per_room} beds, {self.latency * 1000:.1f}ms per round trip")
+        print(f"[bench] create_room loop: {per_room * 1000:.0f}ms, {per_room_trips} round trips")
+        print(f"[bench] create_rooms_bulk: {bulk * 1000:.0f}ms, {bulk_trips} round trips, timings={result['timingsMs']}")
+        self.assertEqual(bulk_trips, 3)
+        self.assertLess(bulk, per_room)
+
+
+if __name__ == '__main__':
+    unittest.main()
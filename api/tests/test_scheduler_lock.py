@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from pymongo.errors import DuplicateKeyError
+
+from app.utils import scheduler_lock
+from app.utils.scheduler_lock import partition_for, run_exclusive, run_partitioned
+
+
+class _LockCollection:
+    """Implements the subset of find_one_and_update/update_one used by JobLock."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _matches(self, doc, query):
+        for key, condition in query.items():
+            if key == "$or":
+                if not any(self._matches(doc, sub) for sub in condition):
+                    return False
+            elif isinstance(condition, dict) and "$ne" in condition:
+                if doc.get(key) == condition["$ne"]:
+                    return False
+            elif isinstance(condition, dict) and "$lte" in condition:
+                if doc.get(key) is None or doc[key] > condition["$lte"]:
+                    return False
+            elif doc.get(key) != condition:
+                return False
+        return True
+
+    async def find_one_and_update(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+            return None
+        if not self._matches(doc, query):
+            if upsert:
+                raise DuplicateKeyError("E11000 duplicate key")
+            return None
+        before = dict(doc)
+        doc.update(update["$set"])
+        return before
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc and self._matches(doc, query):
+            doc.update(update["$set"])
+            return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+
+class SchedulerLockTests(unittest.TestCase):
+    def setUp(self):
+        self.locks = _LockCollection()
+        self._patch = patch.object(scheduler_lock, "db", {scheduler_lock.LOCK_COLLECTION: self.locks})
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+
+    def test_job_runs_once_per_period_across_workers(self):
+        runs = []
+
+        async def job():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        async def worker(worker_id):
+            return await run_exclusive("nightly", job, period_seconds=86400, owner=worker_id)
+
+        async def scenario():
+            first = await asyncio.gather(*(worker(f"w{i}") for i in range(4)))
+            # A worker whose trigger fires after the winner finished still skips this period
+            late = await worker("w-late")
+            return first, late
+
+        with patch.object(scheduler_lock.time, "time", return_value=86400 * 10 + 300):
+            first, late = asyncio.run(scenario())
+
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(sorted(r for r in first if r), ["done"])
+        self.assertIsNone(late)
+        self.assertIsNotNone(self.locks.docs["nightly"]["finishedAt"])
+
+        # Next period runs again
+        with patch.object(scheduler_lock.time, "time", return_value=86400 * 11 + 300):
+            self.assertEqual(asyncio.run(run_exclusive("nightly", job, period_seconds=86400)), "done")
+        self.assertEqual(len(runs), 2)
+
+    def test_partitions_are_split_between_workers(self):
+        claimed = []
+
+        async def job(partition, partitions):
+            claimed.append(partition)
+            await asyncio.sleep(0.01)
+            return {"partition": partition}
+
+        async def worker(worker_id):
+            return await run_partitioned("payments", job, partitions=4, period_seconds=86400, owner=worker_id)
+
+        async def scenario():
+            return await asyncio.gather(worker("w1"), worker("w2"))
+
+        results = asyncio.run(scenario())
+
+        self.assertEqual(sorted(claimed), [0, 1, 2, 3])
+        self.assertEqual(sum(len(r) for r in results), 4)
+
+    def test_partition_for_is_stable_and_in_range(self):
+        ids = [f"{i:024x}" for i in range(1000)]
+        parts = [partition_for(i, 4) for i in ids]
+        self.assertEqual(parts, [partition_for(i, 4) for i in ids])
+        self.assertEqual(set(parts), {0, 1, 2, 3})
+        self.assertEqual(partition_for("anything", 1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+"""
+Search terms and query building, plus a search latency benchmark.
+
+The benchmark seeds a scratch database (50k tenants across 10 properties by
+default) and compares typeahead queries on the previous unanchored `$regex`
+path with the indexed prefix and `$text` paths. It needs a disposable MongoDB:
+
+    RUN_BENCHMARKS=1 BENCH_MONGO_URL=mongodb://localhost:27017 \
+        python -m pytest -q -s tests/test_search_terms.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+
+from app.services.staff_service import StaffService
+from app.utils.search_terms import (
+    ROOM_SEARCH_FIELDS,
+    STAFF_SEARCH_FIELDS,
+    TENANT_SEARCH_FIELDS,
+    normalize_search_text,
+    query_words,
+    search_filter,
+    search_terms,
+    with_search_terms,
+)
+
+BENCH_DB = "bench_search_terms"
+
+
+class SearchTermTests(unittest.TestCase):
+    def test_normalization_folds_case_accents_and_punctuation(self):
+        self.assertEqual(normalize_search_text("  Zoë  O'Brien-Núñez "), "zoe o brien nunez")
+
+    def test_tenant_terms(self):
+        doc = {"name": "Anita Sharma", "phone": "+91 98765-43210", "documentId": "AB-1234"}
+
+        self.assertEqual(
+            search_terms(doc, TENANT_SEARCH_FIELDS),
+            ["1234", "919876543210", "9876543210", "ab", "ab1234", "anita", "anitasharma", "sharma"],
+        )
+
+    def test_room_numbers_match_with_or_without_punctuation(self):
+        terms = search_terms({"roomNumber": "A-101"}, ROOM_SEARCH_FIELDS)
+        self.assertEqual(terms, ["101", "a", "a101"])
+
+    def test_with_search_terms_on_partial_updates(self):
+        stored = {"name": "Ravi Kumar", "mobileNumber": "9000000001", "address": "Pune"}
+
+        update = with_search_terms({"address": "Mumbai"}, STAFF_SEARCH_FIELDS, stored)
+        self.assertEqual(update["searchTerms"], ["9000000001", "kumar", "mumbai", "ravi", "ravikumar"])
+
+        untouched = with_search_terms({"role": "cook"}, STAFF_SEARCH_FIELDS, stored)
+        self.assertNotIn("searchTerms", untouched)
+
+
+class SearchFilterTests(unittest.TestCase):
+    def test_prefix_mode_anchors_every_word(self):
+        self.assertEqual(search_filter("ani"), {"searchTerms": {"$regex": "^ani"}})
+        self.assertEqual(
+            search_filter("Anita Sh"),
+            {"$and": [{"searchTerms": {"$regex": "^anita"}}, {"searchTerms": {"$regex": "^sh"}}]},
+        )
+
+    def test_phone_like_input_collapses_to_digits(self):
+        self.assertEqual(query_words("+91 98765 432"), ["9198765432"])
+        self.assertEqual(query_words("987-65"), ["98765"])
+
+    def test_regex_metacharacters_cannot_reach_the_query(self):
+        self.assertEqual(search_filter(".*(a"), {"searchTerms": {"$regex": "^a"}})
+        self.assertEqual(search_filter("%%%"), {"searchTerms": {"$in": []}})
+
+    def test_text_mode_and_blank_search(self):
+        self.assertEqual(search_filter(" anita ", "text"), {"$text": {"$search": "anita"}})
+        self.assertEqual(search_filter("   "), {})
+        self.assertEqual(search_filter(None, "text"), {})
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            search_filter("anita", "fuzzy")
+
+
+class _StaffCollection:
+    name = "staff"
+
+    def __init__(self):
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        return self
+
+    def sort(self, keys):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return []
+
+    async def count_documents(self, query):
+        return 0
+
+
+class ServiceQueryTests(unittest.TestCase):
+    def test_staff_list_uses_the_indexed_prefix_filter(self):
+        service = StaffService()
+        service.collection = _StaffCollection()
+
+        asyncio.run(service.get_staff_list(property_id="p1", search="Ravi", property_ids=["p1"]))
+
+        query = service.collection.queries[0]
+        self.assertEqual(query["searchTerms"], {"$regex": "^ravi"})
+        self.assertNotIn("$or", query)
+
+    def test_staff_update_refreshes_terms_from_the_stored_document(self):
+        service = StaffService()
+        writes = []
+        stored = {"_id": ObjectId(), "name": "Ravi", "mobileNumber": "9000000001", "archived": False}
+
+        class Collection:
+            async def find_one_and_update(self, query, update, return_document=None):
+                return stored
+
+            async def update_one(self, query, update):
+                writes.append(update["$set"])
+
+        service.collection = Collection()
+        with patch("app.services.staff_service.DashboardStatsService.apply_change", AsyncMock()):
+            updated = asyncio.run(service.update_staff(str(stored["_id"]), {"name": "Ravi Kumar"}))
+
+        self.assertEqual(updated.name, "Ravi Kumar")
+        self.assertEqual(writes, [{"searchTerms": ["9000000001", "kumar", "ravi", "ravikumar"]}])
+
+
+def _legacy_filter(search):
+    return {"$or": [
+        {"name": {"$regex": search, "$options": "i"}},
+        {"phone": {"$regex": search, "$options": "i"}},
+        {"documentId": {"$regex": search, "$options": "i"}},
+    ]}
+
+
+@unittest.skipUnless(
+    os.getenv("RUN_BENCHMARKS") and os.getenv("BENCH_MONGO_URL"),
+    "set RUN_BENCHMARKS=1 and BENCH_MONGO_URL to a disposable MongoDB to run benchmarks",
+)
+class SearchBenchmark(unittest.TestCase):
+    tenants = int(os.getenv("SEARCH_BENCH_TENANTS", 50_000))
+    properties = 10
+    samples = 7
+    first_names = ["anita", "ravi", "priya", "arjun", "meera", "kiran", "sanjay", "deepa", "vikram", "lakshmi"]
+    last_names = ["sharma", "kumar", "reddy", "iyer", "patel", "singh", "nair", "gupta", "rao", "das"]
+
+    async def _seed(self, db):
+        await db.client.drop_database(BENCH_DB)
+        rng = random.Random(11)
+        property_ids = [str(ObjectId()) for _ in range(self.properties)]
+        docs = []
+        for i in range(self.tenants):
+            doc = {
+                "propertyId": property_ids[i % self.properties],
+                "name": f"{rng.choice(self.first_names).title()} {rng.choice(self.last_names).title()} {i}",
+                "phone": f"9{rng.randrange(10**9):09d}",
+                "documentId": f"ID{i:07d}",
+                "isDeleted": False,
+            }
+            docs.append(with_search_terms(doc, TENANT_SEARCH_FIELDS))
+        for start in range(0, len(docs), 10_000):
+            await db["tenants"].insert_many(docs[start:start + 10_000], ordered=False)
+        await db["tenants"].create_index([("propertyId", 1), ("searchTerms", 1)])
+        await db["tenants"].create_index([("name", "text"), ("phone", "text"), ("documentId", "text")])
+        return property_ids
+
+    async def _query_ms(self, collection, query):
+        timings = []
+        for _ in range(self.samples):
+            start = time.perf_counter()
+            await collection.find(query).limit(20).to_list(length=20)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def test_benchmark_search_latency(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        async def run():
+            client = AsyncIOMotorClient(os.environ["BENCH_MONGO_URL"])
+            db = client[BENCH_DB]
+            try:
+                property_ids = await self._seed(db)
+                base = {"propertyId": property_ids[0], "isDeleted": {"$ne": True}}
+                results = {}
+                # Typeahead keystrokes, a rare full word, and a phone prefix
+                for search in ["a", "an", "anit", "lakshmi rao", "ID0049", "98765"]:
+                    legacy = await self._query_ms(db["tenants"], {**base, **_legacy_filter(search)})
+                    prefix = await self._query_ms(db["tenants"], {**base, **search_filter(search)})
+                    results[search] = (legacy, prefix)
+                text = await self._query_ms(db["tenants"], {**base, **search_filter("lakshmi", "text")})
+                return results, text
+            finally:
+                await client.drop_database(BENCH_DB)
+                client.close()
+
+        results, text_ms = asyncio.run(run())
+        print(f"\n[bench] {self.tenants:,} tenants, {self.properties} properties, first 20 matches")
+        for search, (legacy_ms, prefix_ms) in results.items():
+            print(f"[bench] {search!r}: $regex={legacy_ms:,.2f}ms prefix={prefix_ms:,.2f}ms ({legacy_ms / max(prefix_ms, 0.001):.1f}x)")
+        print(f"[bench] 'lakshmi' $text: {text_ms:,.2f}ms")
+        self.assertTrue(results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,348 @@
+import asyncio
+import json
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+import app.routes.tenant as tenant_routes
+import app.services.tenant_service as tenant_service_module
+from app.services.tenant_service import TenantService
+from app.utils.streaming import encode_rows, iter_records
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, n):
+        self.batch = n
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.calls = []
+
+    def find(self, query, projection=None):
+        self.calls.append("find")
+        return _Cursor([dict(doc) for doc in self.docs if _matches(doc, query)])
+
+    async def insert_many(self, docs, ordered=True, session=None):
+        self.calls.append("insert_many")
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+        self.docs.extend(docs)
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        self.calls.append("bulk_write")
+        matched = 0
+        for op in ops:
+            doc = next((d for d in self.docs if _matches(d, op._filter)), None)
+            if doc:
+                doc.update(op._doc["$set"])
+                matched += 1
+        return SimpleNamespace(matched_count=matched)
+
+    async def update_many(self, query, update):
+        self.calls.append("update_many")
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update["$set"])
+
+    async def delete_many(self, query):
+        self.calls.append("delete_many")
+        self.docs = [doc for doc in self.docs if not _matches(doc, query)]
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part.encode()
+
+
+async def _records(*rows):
+    for number, row in enumerate(rows, start=1):
+        yield number, row
+
+
+def _collect(agen):
+    async def run():
+        return [item async for item in agen]
+    return asyncio.run(run())
+
+
+class StreamingParserTests(unittest.TestCase):
+    def test_csv_rows_split_across_chunks_with_quoted_newlines(self):
+        records = _collect(iter_records(_chunks(
+            "name,address,billingConfig.status,billingConfig.anchorDay\r\nAnita,\"12 Main St\n",
+            "Pune\",due,5\nRavi,,,\n\"Unclosed,x",
+        ), "csv"))
+
+        self.assertEqual(records[0], (1, {"name": "Anita", "address": "12 Main St\nPune",
+                                          "billingConfig": {"status": "due", "anchorDay": "5"}}))
+        self.assertEqual(records[1], (2, {"name": "Ravi"}))
+        self.assertIsInstance(records[2][1], ValueError)
+
+    def test_ndjson_reports_bad_lines_and_keeps_going(self):
+        records = _collect(iter_records(_chunks('{"name": "A"}\n[1]\n{oops\n', '{"name": "B"}'), "ndjson"))
+
+        self.assertEqual([number for number, _ in records], [1, 2, 3, 4])
+        self.assertIsInstance(records[1][1], ValueError)
+        self.assertIsInstance(records[2][1], ValueError)
+        self.assertEqual(records[3][1], {"name": "B"})
+
+
+class TenantImportTests(unittest.TestCase):
+    def setUp(self):
+        self.room_a, self.room_b = ObjectId(), ObjectId()
+        self.rooms = _Collection([
+            {"_id": self.room_a, "propertyId": "p1", "roomNumber": "A-101"},
+            {"_id": self.room_b, "propertyId": "p1", "roomNumber": "B-201"},
+        ])
+        self.beds = _Collection(
+            [self._bed(self.room_a, n) for n in (1, 2, 10)]
+            + [self._bed(self.room_b, 1, status="occupied"), self._bed(self.room_b, 2)]
+        )
+        self.tenants = _Collection()
+        self.payments = _Collection()
+        self.service = TenantService()
+        self.service.collection = self.tenants
+        self.transactions = 0
+
+        async def fake_transaction(callback):
+            self.transactions += 1
+            return await callback("session")
+
+        collections = {"rooms": self.rooms, "beds": self.beds, "payments": self.payments}
+        patches = [
+            patch.object(tenant_service_module, "getCollection", collections.__getitem__),
+            patch.object(tenant_service_module, "run_in_transaction", fake_transaction),
+            patch.object(tenant_service_module.DashboardStatsService, "apply_changes", AsyncMock()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    @staticmethod
+    def _bed(room_id, number, status="available"):
+        return {"_id": ObjectId(), "propertyId": "p1", "roomId": str(room_id), "bedNumber": str(number),
+                "status": status, "isDeleted": False}
+
+    def bed(self, room_id, number):
+        return next(b for b in self.beds.docs if b["roomId"] == str(room_id) and b["bedNumber"] == str(number))
+
+    def run_import(self, *rows, max_new=None):
+        results = _collect(self.service.import_tenants("p1", _records(*rows), max_new=max_new))
+        return results[:-1], results[-1]["summary"]
+
+    def test_rows_are_validated_assigned_and_written_in_bulk(self):
+        billing = {"status": "due", "billingCycle": "monthly", "anchorDay": "5"}
+        results, summary = self.run_import(
+            {"name": "Anita Sharma", "phone": "9000000001", "rent": "8000", "roomNumber": "A-101", "billingConfig": billing},
+            {"name": "Ravi", "rent": "7000", "roomNumber": "A-101", "bedNumber": "10"},
+            {"name": "Meera", "rent": "7000", "roomNumber": "B-201", "bedNumber": "1"},
+            {"name": "Kiran", "rent": "7000", "billingConfig": {**billing, "anchorDay": "40"}},
+            {"name": "Deepa", "rent": "6000", "bedId": str(self.bed(self.room_b, 2)["_id"])},
+        )
+
+        self.assertEqual([r["status"] for r in results], ["error", "error", "created", "created", "created"])
+        errors = {r["row"]: r["error"] for r in results if r["status"] == "error"}
+        self.assertEqual(errors[3], "Bed 1 in room B-201 is not available")
+        self.assertIn("billingConfig.anchorDay", errors[4])
+        self.assertEqual((summary["created"], summary["failed"], summary["bedsAssigned"], summary["paymentsCreated"]), (3, 2, 3, 1))
+
+        # Lowest free bed of the room, then the requested ones
+        anita = next(t for t in self.tenants.docs if t["name"] == "Anita Sharma")
+        self.assertEqual(anita["bedId"], str(self.bed(self.room_a, 1)["_id"]))
+        self.assertEqual(anita["bedRef"], self.bed(self.room_a, 1)["_id"])
+        self.assertIn("anitasharma", anita["searchTerms"])
+        self.assertEqual(self.bed(self.room_a, 1)["tenantId"], str(anita["_id"]))
+        self.assertEqual(self.bed(self.room_a, 10)["status"], "occupied")
+        self.assertEqual(self.bed(self.room_a, 2)["status"], "available")
+        self.assertEqual(self.payments.docs[0]["tenantId"], str(anita["_id"]))
+        self.assertEqual(self.payments.docs[0]["amountPaise"], 800000)
+
+        # One read per source, one write per collection for the whole chunk
+        self.assertEqual(self.beds.calls, ["find", "bulk_write"])
+        self.assertEqual(self.tenants.calls, ["insert_many"])
+        self.assertEqual(self.payments.calls, ["insert_many"])
+        self.assertEqual(self.transactions, 1)
+
+    def test_unusable_rent_fails_only_its_row(self):
+        results, summary = self.run_import({"name": "A", "rent": "Infinity"}, {"name": "B", "rent": "5000"})
+
+        self.assertEqual([r["status"] for r in results], ["error", "created"])
+        self.assertIn("Invalid amount", results[0]["error"])
+        self.assertEqual(summary["created"], 1)
+
+    def test_rows_are_written_in_chunks(self):
+        rows = [{"name": f"Tenant {i}", "rent": "5000"} for i in range(5)]
+
+        with patch.object(tenant_service_module.settings, "TENANT_IMPORT_CHUNK_SIZE", 2):
+            results, summary = self.run_import(*rows)
+
+        self.assertEqual(summary["created"], 5)
+        self.assertEqual(self.tenants.calls, ["insert_many"] * 3)
+        self.assertEqual([r["row"] for r in results], [1, 2, 3, 4, 5])
+
+    def test_rows_past_the_quota_are_rejected(self):
+        results, summary = self.run_import(*[{"name": f"T{i}"} for i in range(4)], max_new=2)
+
+        # Rejections stream straight away; created rows follow when their chunk is written
+        statuses = {r["row"]: r["status"] for r in results}
+        self.assertEqual(statuses, {1: "created", 2: "created", 3: "error", 4: "error"})
+        self.assertIn("limit", results[0]["error"])
+        self.assertEqual(len(self.tenants.docs), 2)
+
+    def test_bed_taken_during_import_fails_the_chunk_and_undoes_it(self):
+        original = self.beds.bulk_write
+
+        async def claim_then_write(ops, **kwargs):
+            self.bed(self.room_a, 1)["status"] = "occupied"
+            return await original(ops, **kwargs)
+
+        self.beds.bulk_write = claim_then_write
+        results, summary = self.run_import(
+            {"name": "A", "roomNumber": "A-101"},
+            {"name": "B", "roomNumber": "A-101"},
+        )
+
+        self.assertEqual([r["status"] for r in results], ["error", "error"])
+        self.assertEqual(summary["created"], 0)
+        self.assertEqual(self.tenants.docs, [])
+        self.assertEqual(self.bed(self.room_a, 2)["status"], "available")
+        tenant_service_module.DashboardStatsService.apply_changes.assert_not_awaited()
+
+
+class TenantImportRouteTests(unittest.TestCase):
+    """POST /tenants/import over HTTP, so the body is read the way the server delivers it"""
+
+    def setUp(self):
+        self.tenants = _Collection()
+        self.payments = _Collection()
+        collections = {"rooms": _Collection(), "beds": _Collection(), "payments": self.payments}
+
+        async def fake_transaction(callback):
+            return await callback(None)
+
+        patches = [
+            patch.object(tenant_routes.tenant_service, "collection", self.tenants),
+            patch.object(tenant_service_module, "getCollection", collections.__getitem__),
+            patch.object(tenant_service_module, "run_in_transaction", fake_transaction),
+            patch.object(tenant_service_module.DashboardStatsService, "apply_changes", AsyncMock()),
+            patch.object(tenant_routes.SubscriptionEnforcement, "ensure_can_create_tenant", AsyncMock(return_value=None)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.app = FastAPI()
+        self.app.include_router(tenant_routes.router)
+
+        @self.app.middleware("http")
+        async def scope_user(request, call_next):
+            request.state.property_ids = ["p1"]
+            request.state.user_id = "u1"
+            return await call_next(request)
+
+    def post_csv(self, rows):
+        async def body():
+            yield b"name,phone,rent\n"
+            for start in range(0, rows, 250):
+                yield "".join(f"Tenant {i},90000{i:05d},5000\n" for i in range(start, min(rows, start + 250))).encode()
+
+        async def run():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(
+                    "/tenants/import", params={"property_id": "p1"},
+                    content=body(), headers={"Content-Type": "text/csv"},
+                )
+
+        return asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+    def test_streamed_csv_body_is_imported_end_to_end(self):
+        response = self.post_csv(2000)
+
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(lines[-1]["summary"]["rows"], 2000)
+        self.assertEqual(lines[-1]["summary"]["created"], 2000)
+        self.assertEqual(len(self.tenants.docs), 2000)
+
+    def test_unknown_property_is_rejected_before_reading_the_body(self):
+        async def run():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/tenants/import", params={"property_id": "p2"}, content=b"name\nA\n")
+
+        self.assertEqual(asyncio.run(run()).status_code, 403)
+        self.assertEqual(self.tenants.docs, [])
+
+
+class TenantExportTests(unittest.TestCase):
+    def test_export_streams_from_a_cursor_and_round_trips_through_import(self):
+        room_id, bed_id = ObjectId(), ObjectId()
+        tenants = _Collection([
+            {"_id": ObjectId(), "propertyId": "p1", "name": "Anita", "rent": "8000", "roomId": str(room_id),
+             "bedId": str(bed_id), "billingConfig": {"status": "due", "billingCycle": "monthly", "anchorDay": 5},
+             "autoGeneratePayments": True, "isDeleted": False},
+            {"_id": ObjectId(), "propertyId": "p1", "name": "Gone", "isDeleted": True},
+        ])
+        collections = {
+            "rooms": _Collection([{"_id": room_id, "propertyId": "p1", "roomNumber": "A-101"}]),
+            "beds": _Collection([{"_id": bed_id, "propertyId": "p1", "bedNumber": "3"}]),
+        }
+        service = TenantService()
+        service.collection = tenants
+
+        async def export_csv():
+            lines = [line async for line in encode_rows(service.export_tenants("p1"), "csv", TenantService.EXPORT_FIELDS)]
+            return lines, [record async for record in iter_records(_chunks(*lines), "csv")]
+
+        with patch.object(tenant_service_module, "getCollection", collections.__getitem__):
+            lines, records = asyncio.run(export_csv())
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(tenants.calls, ["find"])
+        row = records[0][1]
+        self.assertEqual((row["name"], row["roomNumber"], row["bedNumber"]), ("Anita", "A-101", "3"))
+        self.assertEqual(row["billingConfig"], {"status": "due", "billingCycle": "monthly", "anchorDay": "5"})
+        self.assertEqual(row["autoGeneratePayments"], "true")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+"""
+Tenant create/move/checkout writes: atomic bed claims, the transaction
+wrapper, and a stress test of concurrent moves.
+
+The fake collections yield to the event loop before and after every
+operation, so concurrent requests interleave between their reads and writes
+the way they do against a real server. Moves run without transactions (the
+standalone-server path), where only the conditional writes keep beds from
+being double-booked.
+"""
+import asyncio
+import random
+import unittest
+import sys
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+import app.services.tenant_service as tenant_service_module
+from app.services.tenant_service import TenantService
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.sessions = []
+
+    async def _yield(self, session):
+        self.sessions.append(session)
+        await asyncio.sleep(0)
+
+    def _first(self, query):
+        return next((doc for doc in self.docs if _matches(doc, query)), None)
+
+    async def find_one(self, query, session=None):
+        await self._yield(session)
+        doc = self._first(query)
+        return dict(doc) if doc else None
+
+    def find(self, query, projection=None, session=None):
+        self.sessions.append(session)
+        return _Cursor([dict(doc) for doc in self.docs if _matches(doc, query)])
+
+    async def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE, session=None):
+        await self._yield(session)
+        doc = self._first(query)
+        if not doc:
+            return None
+        before = dict(doc)
+        doc.update(update["$set"])
+        await asyncio.sleep(0)
+        return dict(doc) if return_document == ReturnDocument.AFTER else before
+
+    async def insert_one(self, doc, session=None):
+        await self._yield(session)
+        self.docs.append(doc)
+
+    async def update_one(self, query, update, session=None):
+        await self._yield(session)
+        doc = self._first(query)
+        if doc:
+            doc.update(update["$set"])
+        return SimpleNamespace(modified_count=1 if doc else 0)
+
+    async def update_many(self, query, update, session=None):
+        await self._yield(session)
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update["$set"])
+
+    async def delete_many(self, query, session=None):
+        await self._yield(session)
+        self.docs = [doc for doc in self.docs if not _matches(doc, query)]
+
+
+class _TenantWritesTestCase(unittest.TestCase):
+    beds_count = 6
+    session = "session"
+
+    def setUp(self):
+        self.beds = _Collection([
+            {"_id": ObjectId(), "propertyId": "p1", "roomId": "r1", "bedNumber": str(n),
+             "status": "available", "tenantId": None, "isDeleted": False}
+            for n in range(1, self.beds_count + 1)
+        ])
+        self.tenants = _Collection()
+        self.payments = _Collection()
+        self.service = TenantService()
+        self.service.collection = self.tenants
+        self.transactions = 0
+
+        async def fake_transaction(callback):
+            self.transactions += 1
+            return await callback(self.session)
+
+        collections = {"beds": self.beds, "payments": self.payments}
+        patches = [
+            patch.object(tenant_service_module, "getCollection", collections.__getitem__),
+            patch.object(tenant_service_module, "run_in_transaction", fake_transaction),
+            patch.object(tenant_service_module.DashboardStatsService, "apply_change", AsyncMock()),
+            patch.object(tenant_service_module.DashboardStatsService, "apply_changes", AsyncMock()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def bed_id(self, index):
+        return str(self.beds.docs[index]["_id"])
+
+    def create(self, name, bed_index, **extra):
+        data = {"propertyId": "p1", "name": name, "rent": "8000", "roomId": "r1", "bedId": self.bed_id(bed_index), **extra}
+        return asyncio.run(self.service.create_tenant(data))
+
+    def assert_consistent(self):
+        live = [t for t in self.tenants.docs if not t.get("isDeleted")]
+        bed_holders = Counter(t["bedId"] for t in live if t.get("bedId"))
+        self.assertEqual([bed for bed, count in bed_holders.items() if count > 1], [], "double-booked beds")
+        for tenant in live:
+            if tenant.get("bedId"):
+                bed = next(b for b in self.beds.docs if str(b["_id"]) == tenant["bedId"])
+                self.assertEqual((bed["status"], bed["tenantId"]), ("occupied", str(tenant["_id"])))
+        for bed in self.beds.docs:
+            if bed["status"] == "occupied":
+                self.assertEqual(bed_holders[str(bed["_id"])], 1, "orphaned occupied bed")
+
+
+class TenantWriteTests(_TenantWritesTestCase):
+    def test_create_claims_the_bed_and_writes_the_payment_in_one_transaction(self):
+        billing = {"status": "due", "billingCycle": "monthly", "anchorDay": 1}
+        tenant = self.create("Anita", 0, billingConfig=billing)
+
+        self.assertEqual(self.transactions, 1)
+        self.assertEqual(self.beds.docs[0]["tenantId"], tenant.id)
+        self.assertEqual(self.payments.docs[0]["tenantId"], tenant.id)
+        self.assertEqual(set(self.beds.sessions + self.tenants.sessions + self.payments.sessions), {"session"})
+        self.assert_consistent()
+
+    def test_second_tenant_for_the_same_bed_is_rejected_without_leftovers(self):
+        self.create("Anita", 0)
+
+        with self.assertRaisesRegex(ValueError, "already occupied"):
+            self.create("Ravi", 0)
+
+        self.assertEqual([t["name"] for t in self.tenants.docs], ["Anita"])
+        self.assert_consistent()
+
+    def test_move_to_a_taken_bed_changes_nothing(self):
+        anita = self.create("Anita", 0)
+        self.create("Ravi", 1)
+
+        with self.assertRaisesRegex(ValueError, "already occupied"):
+            asyncio.run(self.service.update_tenant(anita.id, {"roomId": "r1", "bedId": self.bed_id(1)}))
+
+        self.assertEqual(self.tenants.docs[0]["bedId"], self.bed_id(0))
+        self.assert_consistent()
+
+    def test_move_checkout_and_delete_keep_beds_consistent(self):
+        anita = self.create("Anita", 0)
+
+        moved = asyncio.run(self.service.update_tenant(anita.id, {"roomId": "r1", "bedId": self.bed_id(2)}))
+        self.assertEqual(moved.bedId, self.bed_id(2))
+        self.assertEqual(self.beds.docs[0]["status"], "available")
+        self.assert_consistent()
+
+        vacated = asyncio.run(self.service.update_tenant(anita.id, {"tenantStatus": "vacated"}))
+        self.assertIsNone(vacated.bedId)
+        self.assertEqual(self.beds.docs[2]["status"], "available")
+
+        asyncio.run(self.service.update_tenant(anita.id, {"tenantStatus": "active", "roomId": "r1", "bedId": self.bed_id(3)}))
+        result = asyncio.run(self.service.delete_tenant(anita.id))
+        self.assertTrue(result["success"])
+        self.assertEqual([b["status"] for b in self.beds.docs], ["available"] * self.beds_count)
+        self.assert_consistent()
+
+    def test_stale_update_is_rejected_and_its_claim_released(self):
+        anita = self.create("Anita", 0)
+        original = self.tenants.find_one_and_update
+
+        async def moved_meanwhile(query, update, **kwargs):
+            self.tenants.docs[0]["bedId"] = "elsewhere"
+            return await original(query, update, **kwargs)
+
+        self.tenants.find_one_and_update = moved_meanwhile
+        self.session = None  # standalone server: no rollback, only the compensation
+        with self.assertRaisesRegex(ValueError, "changed by another request"):
+            asyncio.run(self.service.update_tenant(anita.id, {"roomId": "r1", "bedId": self.bed_id(4)}))
+
+        self.assertEqual((self.beds.docs[4]["status"], self.beds.docs[4]["tenantId"]), ("available", None))
+
+
+class ConcurrentMoveStressTest(_TenantWritesTestCase):
+    beds_count = 60
+    session = None
+    tenants_count = 40
+    moves = 100
+
+    def test_parallel_moves_never_double_book(self):
+        rng = random.Random(7)
+        tenants = [self.create(f"Tenant {i}", i) for i in range(self.tenants_count)]
+
+        async def move(tenant, bed_index):
+            try:
+                await self.service.update_tenant(tenant.id, {"roomId": "r1", "bedId": self.bed_id(bed_index)})
+                return "moved"
+            except ValueError as e:
+                return "occupied" if "occupied" in str(e) else "conflict"
+
+        async def run():
+            return await asyncio.gather(*(
+                move(rng.choice(tenants), rng.randrange(self.beds_count)) for _ in range(self.moves)
+            ))
+
+        outcomes = Counter(asyncio.run(run()))
+
+        self.assertEqual(sum(outcomes.values()), self.moves)
+        self.assertGreater(outcomes["moved"], 0)
+        self.assertGreater(outcomes["occupied"] + outcomes["conflict"], 0)
+        self.assert_consistent()
+        occupied = sum(1 for bed in self.beds.docs if bed["status"] == "occupied")
+        self.assertEqual(occupied, self.tenants_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+"""
+Refresh-token blacklist keyed by jti, with the in-process Bloom filter fast path.
+
+The benchmark loads 1M revoked jtis into the filter and compares lookups for
+live tokens with a scan over the same entries (what an unindexed `token`
+lookup did):
+
+    RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_token_blacklist.py
+"""
+import asyncio
+import os
+import time
+import unittest
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from bson import ObjectId
+from fastapi import HTTPException
+from jose import jwt
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+
+# auth_service imports helpers, which refuses to load without a strong JWT secret
+if not settings.JWT_SECRET:
+    settings.JWT_SECRET = "test-secret-key-that-is-at-least-32-chars"
+
+import app.database.token_blacklist as token_blacklist
+import app.services.auth_service as auth_service
+from app.migrations.backfill_token_blacklist_jti import _jti_fields
+from app.utils.bloom_filter import BloomFilter
+from app.utils.helpers import create_access_token, create_refresh_token
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, _size):
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Blacklist:
+    """token_blacklist stand-in enforcing the unique jti index"""
+
+    def __init__(self, jtis=()):
+        self.docs = {jti: {"jti": jti} for jti in jtis}
+        self.reads = 0
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        cutoff = query["expiresAt"]["$not"]["$lte"]
+        return _Cursor(
+            {"jti": jti} for jti, doc in self.docs.items()
+            if not (doc.get("expiresAt") and doc["expiresAt"] <= cutoff)
+        )
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        await asyncio.sleep(0)
+        return self.docs.get(query["jti"])
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(0)
+        if doc["jti"] in self.docs:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        self.docs[doc["jti"]] = doc
+
+
+class BloomFilterTests(unittest.TestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(10000, 0.01)
+        members = [str(uuid.uuid4()) for _ in range(10000)]
+        for key in members:
+            bloom.add(key)
+
+        self.assertTrue(all(key in bloom for key in members))
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_sizing(self):
+        bloom = BloomFilter(1000000, 0.001)
+        self.assertEqual(bloom.hash_count, 10)
+        self.assertLess(bloom.memory_bytes, 2 * 1024 * 1024)
+
+
+class TokenBlacklistTests(unittest.TestCase):
+    def setUp(self):
+        self.collection = _Blacklist(["revoked-1", "revoked-2"])
+        patches = [
+            patch.object(token_blacklist, "blacklist_collection", self.collection),
+            patch.object(token_blacklist, "_filter", None),
+            patch.dict(token_blacklist._stats, {"lookups": 0, "filterSkips": 0, "dbReads": 0}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_live_tokens_skip_the_database_once_loaded(self):
+        async def scenario():
+            loaded = await token_blacklist.load_blacklist_filter()
+            checks = [await token_blacklist.is_token_blacklisted(str(uuid.uuid4())) for _ in range(100)]
+            return loaded, checks, await token_blacklist.is_token_blacklisted("revoked-1")
+
+        loaded, checks, revoked = asyncio.run(scenario())
+
+        self.assertEqual(loaded, 2)
+        self.assertFalse(any(checks))
+        self.assertTrue(revoked)
+        self.assertLessEqual(self.collection.reads, 2)
+        self.assertGreaterEqual(token_blacklist.blacklist_stats()["filterSkips"], 99)
+
+    def test_falls_back_to_the_database_before_the_filter_is_loaded(self):
+        async def scenario():
+            return (
+                await token_blacklist.is_token_blacklisted("revoked-2"),
+                await token_blacklist.is_token_blacklisted("live"),
+            )
+
+        self.assertEqual(asyncio.run(scenario()), (True, False))
+        self.assertEqual(self.collection.reads, 2)
+
+    def test_revocation_updates_filter_and_is_idempotent(self):
+        expires = datetime.now(timezone.utc) + timedelta(days=1)
+
+        async def scenario():
+            await token_blacklist.load_blacklist_filter()
+            first = await token_blacklist.blacklist_token("new-jti", expires)
+            second = await token_blacklist.blacklist_token("new-jti", expires)
+            return first, second, await token_blacklist.is_token_blacklisted("new-jti")
+
+        self.assertEqual(asyncio.run(scenario()), (True, False, True))
+        self.assertEqual(self.collection.docs["new-jti"]["expiresAt"], expires)
+
+    def test_revocations_during_a_rebuild_are_kept(self):
+        original = token_blacklist._build_filter
+        expires = datetime.now(timezone.utc) + timedelta(days=1)
+
+        async def slow_build():
+            bloom = await original()
+            await token_blacklist.blacklist_token("mid-load", expires)
+            return bloom
+
+        async def scenario():
+            with patch.object(token_blacklist, "_build_filter", slow_build):
+                await token_blacklist.load_blacklist_filter()
+            self.collection.docs.pop("mid-load")  # only the filter can answer now
+            return "mid-load" in token_blacklist._filter
+
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_rebuild_drops_expired_entries(self):
+        expires = datetime.now(timezone.utc) + timedelta(days=1)
+
+        async def scenario():
+            await token_blacklist.load_blacklist_filter()
+            await token_blacklist.blacklist_token("short-lived", expires)
+            before = "short-lived" in token_blacklist._filter
+            # Past its expiry: the TTL monitor may or may not have removed it yet
+            self.collection.docs["short-lived"]["expiresAt"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+            await token_blacklist.load_blacklist_filter()
+            return before, "short-lived" in token_blacklist._filter, token_blacklist._filter.count
+
+        before, after, count = asyncio.run(scenario())
+
+        self.assertTrue(before)
+        self.assertFalse(after)
+        self.assertEqual(count, 2)
+
+
+class RefreshRotationTests(unittest.TestCase):
+    def setUp(self):
+        self.collection = _Blacklist()
+        self.user_id = ObjectId()
+        user = {"_id": self.user_id, "name": "Ann", "email": "ann@example.com"}
+        patches = [
+            patch.object(token_blacklist, "blacklist_collection", self.collection),
+            patch.object(token_blacklist, "_filter", None),
+            patch.object(auth_service.users_collection, "find_one", AsyncMock(return_value=user)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        asyncio.run(token_blacklist.load_blacklist_filter())
+
+    def _refresh(self, token):
+        return auth_service.refresh_token_service(SimpleNamespace(refreshToken=token))
+
+    def test_rotation_needs_no_blacklist_read_and_rejects_reuse(self):
+        token = create_refresh_token({"sub": str(self.user_id)})
+
+        response = asyncio.run(self._refresh(token))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.collection.reads, 0)
+
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(self._refresh(token))
+        self.assertEqual(ctx.exception.status_code, 401)
+
+        jti = jwt.get_unverified_claims(token)["jti"]
+        self.assertIn(jti, self.collection.docs)
+
+    def test_concurrent_reuse_only_succeeds_once(self):
+        token = create_refresh_token({"sub": str(self.user_id)})
+
+        async def scenario():
+            return await asyncio.gather(*(self._refresh(token) for _ in range(5)), return_exceptions=True)
+
+        # Simulate other workers: their filters have not seen this process's revocations
+        with patch.object(token_blacklist, "_filter", BloomFilter(1000)):
+            results = asyncio.run(scenario())
+
+        self.assertEqual(sum(not isinstance(r, Exception) for r in results), 1)
+        self.assertTrue(all(r.status_code == 401 for r in results if isinstance(r, HTTPException)))
+
+    def test_logout_revokes_until_the_token_expires(self):
+        token = create_refresh_token({"sub": str(self.user_id)})
+        claims = jwt.get_unverified_claims(token)
+
+        asyncio.run(auth_service.logout_user_service(SimpleNamespace(refreshToken=token)))
+
+        entry = self.collection.docs[claims["jti"]]
+        self.assertEqual(entry["expiresAt"], datetime.fromtimestamp(claims["exp"], timezone.utc))
+        with self.assertRaises(HTTPException):
+            asyncio.run(self._refresh(token))
+
+    def test_logout_ignores_tokens_that_cannot_be_refreshed(self):
+        for token in ("garbage", create_access_token({"sub": str(self.user_id)})):
+            result = asyncio.run(auth_service.logout_user_service(SimpleNamespace(refreshToken=token)))
+            self.assertEqual(result, {"success": True})
+        self.assertEqual(self.collection.docs, {})
+
+
+class LegacyBackfillTests(unittest.TestCase):
+    def test_jti_is_read_from_the_stored_token(self):
+        token = create_refresh_token({"sub": "u1"})
+        claims = jwt.get_unverified_claims(token)
+
+        fields = _jti_fields({"_id": ObjectId(), "token": token})
+
+        self.assertEqual(fields["jti"], claims["jti"])
+        self.assertEqual(fields["expiresAt"], datetime.fromtimestamp(claims["exp"], timezone.utc))
+
+    def test_unreadable_tokens_get_a_placeholder(self):
+        doc_id = ObjectId()
+        self.assertEqual(_jti_fields({"_id": doc_id, "token": "garbage"}), {"jti": f"legacy:{doc_id}"})
+
+
+@unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+class BlacklistFilterBenchmark(unittest.TestCase):
+    entries = int(os.getenv("BLACKLIST_BENCH_ENTRIES", 1000000))
+    lookups = 100000
+
+    def test_benchmark_one_million_revoked_tokens(self):
+        jtis = [str(uuid.uuid4()) for _ in range(self.entries)]
+        collection = _Blacklist(jtis)
+
+        with patch.object(token_blacklist, "blacklist_collection", collection), \
+                patch.object(token_blacklist, "_filter", None):
+            start = time.perf_counter()
+            asyncio.run(token_blacklist.load_blacklist_filter())
+            load_s = time.perf_counter() - start
+            bloom = token_blacklist._filter
+
+            live = [str(uuid.uuid4()) for _ in range(self.lookups)]
+
+            async def check_all():
+                return [await token_blacklist.is_token_blacklisted(jti) for jti in live]
+
+            start = time.perf_counter()
+            results = asyncio.run(check_all())
+            live_us = (time.perf_counter() - start) / self.lookups * 1e6
+
+        # Old path: no index on `token`, so every lookup compared against every entry
+        start = time.perf_counter()
+        for jti in live[:5]:
+            any(entry == jti for entry in jtis)
+        scan_us = (time.perf_counter() - start) / 5 * 1e6
+
+        print(
+            f"\n[bench] {self.entries} revoked jtis: filter load={load_s:.2f}s "
+            f"size={bloom.memory_bytes / 1024 / 1024:.1f}MiB k={bloom.hash_count}"
+        )
+        print(
+            f"[bench] live-token check={live_us:.1f}us, db reads={collection.reads}/{self.lookups} "
+            f"(false positive rate {collection.reads / self.lookups:.4%}); "
+            f"in-memory scan of all entries={scan_us / 1000:.1f}ms"
+        )
+        self.assertFalse(any(results))
+        self.assertLess(collection.reads / self.lookups, 0.005)
+
+
+if __name__ == '__main__':
+    unittest.main()